@@ -8,7 +8,7 @@ import uuid
 from src.database import get_db
 import src.schemas as schemas
 import src.models as models
-from src.services import OrderService
+from src.services import OrderService, ExternalServiceError
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -60,6 +60,8 @@ async def checkout_cart(
         return await service.process_checkout(checkout_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ExternalServiceError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @router.put("/{order_id}/status", response_model=schemas.OrderResponse)
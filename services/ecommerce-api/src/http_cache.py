@@ -0,0 +1,77 @@
+# Copie de services/reporting-api/src/http_cache.py, à garder identique :
+# chaque image de service n'embarque que son propre src/. Le test
+# reporting-api/tests/test_http_cache.py vérifie que les deux copies
+# concordent.
+import httpx
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ConditionalCache:
+    """Cache LRU de réponses JSON revalidées par requêtes conditionnelles.
+
+    Seules les réponses portant un ETag ou un Last-Modified sont conservées ;
+    un 304 renvoie le corps mémorisé sans retransfert ni re-parsing.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Optional[str], Any]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def store(self, key: str, response: httpx.Response) -> Any:
+        data = response.json()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            self._entries[key] = (etag, last_modified, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.pop(key, None)
+        return data
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[httpx.Response, Any]:
+        """GET conditionnel de ``url`` ; le corps vaut None hors statut 200/304"""
+        key = str(httpx.URL(url, params=params))
+        request_headers = {**(headers or {}), **self.conditional_headers(key)}
+        response = await client.get(url, params=params, headers=request_headers)
+
+        if response.status_code == 304:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response, entry[2]
+            # Entrée évincée pendant la requête : on la récupère à nouveau
+            response = await client.get(url, params=params, headers=headers)
+
+        if response.status_code == 200:
+            self.misses += 1
+            return response, self.store(key, response)
+        return response, None
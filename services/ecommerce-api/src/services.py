@@ -16,6 +16,7 @@ from decimal import Decimal
 import src.models as models
 import src.schemas as schemas
 from src.events import EventPublisher
+from src.http_cache import ConditionalCache
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,7 @@ STOCK_API_URL = os.getenv("STOCK_API_URL", "http://inventory-api:8001")
 KONG_API_KEY = os.getenv("KONG_API_KEY", "admin-api-key-12345")
 ORDERS_EVENT_STREAM = os.getenv("ORDERS_EVENT_STREAM", "ecommerce.orders.events")
 PAYMENTS_EVENT_STREAM = os.getenv("PAYMENTS_EVENT_STREAM", "ecommerce.payments.events")
+STOCK_RESERVATION_TTL_SECONDS = int(os.getenv("STOCK_RESERVATION_TTL_SECONDS", "900"))
 
 # Configuration pour l'authentification
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -39,6 +41,11 @@ KONG_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Fiches produit revalidées par ETag : un 304 évite retransfert et parsing
+product_cache = ConditionalCache(
+    max_entries=int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "2048"))
+)
+
 
 class ExternalServiceError(Exception):
     """Exception pour les erreurs de services externes"""
@@ -59,19 +66,19 @@ class ProductService:
         """Récupère les informations d'un produit"""
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
+                response, product_data = await product_cache.get_json(
+                    client,
                     f"{PRODUCTS_API_URL}/api/v1/products/{product_id}",
                     headers=KONG_HEADERS
                 )
 
                 if response.status_code == 404:
                     return None
-                elif response.status_code != 200:
+                elif product_data is None:
                     raise ExternalServiceError(
                         f"Products API error: {response.status_code}"
                     )
 
-                product_data = response.json()
                 return schemas.ProductInfo(**product_data)
 
         except httpx.RequestError as e:
@@ -134,6 +141,64 @@ class StockService:
                 product_id=product_id, available_stock=999, is_available=True
             )
 
+    @staticmethod
+    async def reserve_stock(reference: str, items: List[Dict[str, int]]) -> None:
+        """Retient le stock de plusieurs lignes en une réservation (tout ou rien)"""
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{STOCK_API_URL}/api/v1/reservations/",
+                    json={
+                        "lines": [
+                            {"product_id": it["product_id"], "quantite": it["quantity"]}
+                            for it in items
+                        ],
+                        "ttl_seconds": STOCK_RESERVATION_TTL_SECONDS,
+                        "reference": reference,
+                    },
+                    headers=KONG_HEADERS,
+                )
+        except httpx.RequestError as e:
+            logger.error(f"❌ Erreur communication Stock API: {str(e)}")
+            raise ExternalServiceError(f"Cannot connect to Stock API: {str(e)}")
+
+        if response.status_code in (404, 409):
+            raise ValueError(f"Stock reservation refused: {response.text}")
+        elif response.status_code != 201:
+            raise ExternalServiceError(
+                f"Stock reservation failed: {response.status_code}"
+            )
+
+    @staticmethod
+    async def confirm_reservation(reference: str) -> None:
+        """Confirme une réservation : inventory-api décrémente le stock retenu"""
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    f"{STOCK_API_URL}/api/v1/reservations/by-reference/{reference}/confirm",
+                    headers=KONG_HEADERS,
+                )
+        except httpx.RequestError as e:
+            logger.error(f"❌ Erreur communication Stock API: {str(e)}")
+            raise ExternalServiceError(f"Cannot connect to Stock API: {str(e)}")
+
+        if response.status_code != 200:
+            raise ExternalServiceError(
+                f"Stock reservation confirmation failed: {response.status_code}"
+            )
+
+    @staticmethod
+    async def release_reservation(reference: str) -> None:
+        """Libère une réservation non confirmée (best effort, l'expiration prend le relais)"""
+        try:
+            async with httpx.AsyncClient() as client:
+                await client.post(
+                    f"{STOCK_API_URL}/api/v1/reservations/by-reference/{reference}/release",
+                    headers=KONG_HEADERS,
+                )
+        except httpx.RequestError as e:
+            logger.warning(f"Failed to release stock reservation {reference}: {e}")
+
 
 # ============================================================================
 # CUSTOMER SERVICES
@@ -919,20 +984,26 @@ class OrderService:
             )
             self.db.add(order_item)
 
-        # Mettre à jour le stock dans inventory-api
-        for cart_item in cart.items:
-            try:
-                await self.update_stock_after_order(
-                    cart_item.product_id, cart_item.quantity
-                )
-                logger.info(
-                    f"Stock updated for product {cart_item.product_id}: -{cart_item.quantity}"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Failed to update stock for product {cart_item.product_id}: {str(e)}"
-                )
-                # On continue même si la mise à jour du stock échoue
+        # Retenir puis confirmer le stock dans inventory-api, sous la référence
+        # que suit aussi le consommateur de saga (réservation idempotente) :
+        # le stock n'est décrémenté qu'une fois, à la confirmation
+        reference = f"order_{order.id}"
+        stock_items = [
+            {"product_id": ci.product_id, "quantity": ci.quantity}
+            for ci in cart.items
+        ]
+        try:
+            await StockService.reserve_stock(reference, stock_items)
+        except Exception:
+            self.db.rollback()
+            raise
+        try:
+            await StockService.confirm_reservation(reference)
+        except Exception:
+            self.db.rollback()
+            await StockService.release_reservation(reference)
+            raise
+        logger.info(f"Stock reservation {reference} confirmed")
 
         # Désactiver le panier
         cart.is_active = False
@@ -1032,6 +1103,24 @@ class OrderService:
 
         self.db.commit()
         self.db.refresh(order)
+
+        # Confirmation/annulation : la réservation de stock est confirmée ou libérée
+        if status in (schemas.OrderStatus.CONFIRMED, schemas.OrderStatus.CANCELLED):
+            event_type = (
+                "OrderConfirmed"
+                if status == schemas.OrderStatus.CONFIRMED
+                else "OrderCancelled"
+            )
+            try:
+                EventPublisher().publish(
+                    event_type=event_type,
+                    aggregate_type="Order",
+                    aggregate_id=order.id,
+                    data={"order_number": order.order_number},
+                    stream=ORDERS_EVENT_STREAM,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to publish {event_type}: {e}")
         return order
 
     def update_payment_status(
@@ -1087,33 +1176,6 @@ class OrderService:
         """Annule une commande"""
         return self.update_order_status(order_id, schemas.OrderStatus.CANCELLED)
 
-    async def update_stock_after_order(self, product_id: int, quantity: int) -> None:
-        """Met à jour le stock après une commande"""
-        try:
-            async with httpx.AsyncClient() as client:
-                # Réduire le stock en utilisant l'endpoint approprié
-                params = {
-                    "quantity": quantity,
-                    "raison": "commande_ecommerce",
-                    "reference": f"order_{int(time.time())}",
-                }
-                update_response = await client.put(
-                    f"{STOCK_API_URL}/api/v1/stock/products/{product_id}/stock/reduce",
-                    params=params,
-                )
-
-                if update_response.status_code != 200:
-                    raise ExternalServiceError(
-                        f"Failed to update stock for product {product_id}"
-                    )
-
-                result = update_response.json()
-                logger.info(f"Stock reduced for product {product_id}: {result}")
-
-        except httpx.RequestError as e:
-            logger.error(f"Error updating stock for product {product_id}: {str(e)}")
-            raise ExternalServiceError(f"Stock update failed: {str(e)}")
-
     def get_order_stats(self) -> schemas.OrderStats:
         """Récupère les statistiques des commandes"""
         total_orders = self.db.query(models.Order).count()
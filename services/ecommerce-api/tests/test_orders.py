@@ -125,3 +125,127 @@ class TestOrders:
         # On teste l'endpoint de confirmation à la place
         response = client.post("/api/v1/orders/999/confirm")
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestCheckoutStockReservation:
+    """Le checkout retient puis confirme le stock, sans décrément direct"""
+
+    @pytest.fixture
+    def cart(self, db_session):
+        from decimal import Decimal
+        import src.models as models
+
+        customer = models.Customer(
+            email="checkout@example.com", first_name="Jean", last_name="Test"
+        )
+        db_session.add(customer)
+        db_session.flush()
+        cart = models.Cart(customer_id=customer.id)
+        cart.items = [
+            models.CartItem(product_id=1, quantity=2, unit_price=Decimal("10.00")),
+            models.CartItem(product_id=2, quantity=1, unit_price=Decimal("5.00")),
+        ]
+        db_session.add(cart)
+        db_session.commit()
+        return cart
+
+    @pytest.fixture
+    def stock_calls(self, monkeypatch):
+        from decimal import Decimal
+        import src.schemas as schemas
+        from src.services import CartService, ProductService, StockService
+
+        calls = []
+
+        async def validate_cart(self, cart_id):
+            return schemas.CartValidationResponse(
+                is_valid=True, total_price=Decimal("0.00")
+            )
+
+        async def get_product(product_id):
+            return None
+
+        async def reserve_stock(reference, items):
+            calls.append(("reserve", reference, items))
+
+        async def confirm_reservation(reference):
+            calls.append(("confirm", reference))
+
+        async def release_reservation(reference):
+            calls.append(("release", reference))
+
+        monkeypatch.setattr(CartService, "validate_cart", validate_cart)
+        monkeypatch.setattr(ProductService, "get_product", staticmethod(get_product))
+        monkeypatch.setattr(StockService, "reserve_stock", staticmethod(reserve_stock))
+        monkeypatch.setattr(
+            StockService, "confirm_reservation", staticmethod(confirm_reservation)
+        )
+        monkeypatch.setattr(
+            StockService, "release_reservation", staticmethod(release_reservation)
+        )
+        return calls
+
+    def checkout(self, client, cart):
+        return client.post(
+            "/api/v1/orders/checkout",
+            json={
+                "cart_id": cart.id,
+                "customer_id": cart.customer_id,
+                "shipping_address": "123 rue du Test, Paris",
+                "billing_address": "123 rue du Test, Paris",
+            },
+        )
+
+    def test_checkout_reserves_then_confirms(self, client, cart, stock_calls):
+        response = self.checkout(client, cart)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        reference = f"order_{response.json()['id']}"
+        assert stock_calls == [
+            (
+                "reserve",
+                reference,
+                [
+                    {"product_id": 1, "quantity": 2},
+                    {"product_id": 2, "quantity": 1},
+                ],
+            ),
+            ("confirm", reference),
+        ]
+
+    def test_checkout_refused_reservation_keeps_no_order(
+        self, client, db_session, cart, stock_calls, monkeypatch
+    ):
+        import src.models as models
+        from src.services import StockService
+
+        async def reserve_stock(reference, items):
+            raise ValueError("Stock reservation refused: insufficient stock")
+
+        monkeypatch.setattr(StockService, "reserve_stock", staticmethod(reserve_stock))
+
+        response = self.checkout(client, cart)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert db_session.query(models.Order).count() == 0
+        db_session.refresh(cart)
+        assert cart.is_active is True
+
+    def test_checkout_failed_confirmation_releases_reservation(
+        self, client, db_session, cart, stock_calls, monkeypatch
+    ):
+        import src.models as models
+        from src.services import ExternalServiceError, StockService
+
+        async def confirm_reservation(reference):
+            raise ExternalServiceError("Stock reservation confirmation failed: 500")
+
+        monkeypatch.setattr(
+            StockService, "confirm_reservation", staticmethod(confirm_reservation)
+        )
+
+        response = self.checkout(client, cart)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert [call[0] for call in stock_calls] == ["reserve", "release"]
+        assert db_session.query(models.Order).count() == 0
@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import logging
 
 from src.database import get_db
+from src.api.v1.conditional import (
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified,
+    set_validators,
+)
 import src.models as models
 import src.schemas as schemas
 from src.services import CategoryService
@@ -14,12 +21,22 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.CategoryResponse])
-async def get_categories(db: Session = Depends(get_db)):
-    """Récupérer toutes les catégories"""
+async def get_categories(
+    request: Request, response: Response, db: Session = Depends(get_db)
+):
+    """Récupérer toutes les catégories (requête conditionnelle supportée)"""
     logger.info("📋 Getting all categories")
 
     service = CategoryService(db)
-    return service.get_categories()
+    categories = service.get_categories()
+
+    etag = make_etag([(category.id, category.version) for category in categories])
+    last_modified = latest(category.date_modification for category in categories)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+
+    return categories
 
 
 @router.post("/", response_model=schemas.CategoryResponse, status_code=201)
@@ -1,20 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import io
 import logging
+import tempfile
 
 from src.database import get_db
+from src.api.v1.conditional import (
+    is_not_modified,
+    latest,
+    make_etag,
+    not_modified,
+    set_validators,
+)
 import src.models as models
 import src.schemas as schemas
-from src.services import ProductService, StockService
+from src.services import (
+    EXPORT_MEDIA_TYPES,
+    PRODUCT_EXPORT_FIELDS,
+    ExportService,
+    ProductImportService,
+    ProductService,
+    StockService,
+    encode_export,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Au-delà de cette taille, le corps de la requête est mis en tampon sur disque
+IMPORT_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+def _product_version(product: models.Product) -> tuple:
+    # La catégorie est imbriquée dans la réponse : sa version compte aussi
+    category = product.category
+    return (
+        product.id,
+        product.version,
+        category.id if category else None,
+        category.version if category else None,
+    )
+
+
+def _product_last_modified(product: models.Product):
+    category = product.category
+    return latest(
+        [product.date_modification, category.date_modification if category else None]
+    )
+
 
 @router.get("/", response_model=schemas.ProductPage)
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
     search: Optional[str] = Query(
@@ -22,16 +64,35 @@ async def get_products(
     ),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
     actif: Optional[bool] = Query(None, description="Filter by active status"),
+    ids: Optional[str] = Query(
+        None, description="Comma-separated product IDs (batch lookup)"
+    ),
     db: Session = Depends(get_db),
 ):
     """Récupérer la liste des produits avec pagination et filtres"""
     logger.info(f"📋 Getting products - skip={skip}, limit={limit}, search={search}")
 
+    try:
+        product_ids = [int(i) for i in ids.split(",") if i.strip()] if ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+
     service = ProductService(db)
     products, total = service.get_products(
-        skip=skip, limit=limit, search=search, category_id=category_id, actif=actif
+        skip=skip,
+        limit=limit,
+        search=search,
+        category_id=category_id,
+        actif=actif,
+        ids=product_ids,
     )
 
+    etag = make_etag(skip, limit, total, [_product_version(p) for p in products])
+    last_modified = latest(_product_last_modified(p) for p in products)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+
     pages = (total + limit - 1) // limit
     current_page = (skip // limit) + 1
 
@@ -49,9 +110,66 @@ async def create_product(product: schemas.ProductCreate, db: Session = Depends(g
     return service.create_product(product)
 
 
+@router.post("/import", response_model=schemas.ProductImportReport)
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(
+        None,
+        pattern="^(ndjson|csv)$",
+        description="Payload format (defaults to the Content-Type)",
+    ),
+    chunk_size: int = Query(1000, ge=1, le=10000, description="Rows per write"),
+    db: Session = Depends(get_db),
+):
+    """Importer un catalogue NDJSON ou CSV en flux (upsert sur le code produit)"""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+
+    logger.info(f"📥 Importing products - format={format}, chunk_size={chunk_size}")
+
+    # Le corps est reçu en flux et ne reste en mémoire que s'il est petit
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_SIZE) as buffer:
+        async for chunk in request.stream():
+            buffer.write(chunk)
+        buffer.seek(0)
+
+        stream = io.TextIOWrapper(buffer, encoding="utf-8-sig", newline="")
+        service = ProductImportService(db, chunk_size=chunk_size)
+        try:
+            return await run_in_threadpool(service.import_stream, stream, format)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Payload must be UTF-8")
+        finally:
+            stream.detach()
+
+
+@router.get("/export")
+async def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Format"),
+    category_id: Optional[int] = Query(None, description="Filter by category ID"),
+    actif: Optional[bool] = Query(None, description="Filter by active status"),
+    db: Session = Depends(get_db),
+):
+    """Exporter le catalogue complet en flux (NDJSON ou CSV)"""
+    logger.info(f"📤 Exporting products - format={format}, category={category_id}")
+
+    rows = ExportService(db).iter_products(category_id=category_id, actif=actif)
+    return StreamingResponse(
+        encode_export(rows, format, PRODUCT_EXPORT_FIELDS),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=products.{format}"},
+    )
+
+
 @router.get("/{product_id}", response_model=schemas.ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Récupérer un produit par son ID"""
+async def get_product(
+    product_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+):
+    """Récupérer un produit par son ID (requête conditionnelle supportée)"""
     logger.info(f"📋 Getting product {product_id}")
 
     service = ProductService(db)
@@ -60,6 +178,12 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    etag = make_etag(_product_version(product))
+    last_modified = _product_last_modified(product)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    set_validators(response, etag, last_modified)
+
     return product
 
 
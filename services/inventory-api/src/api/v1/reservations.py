@@ -0,0 +1,145 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+import logging
+
+from src.database import get_db
+import src.schemas as schemas
+from src.services import (
+    ReservationService,
+    InsufficientStockError,
+    ReservationStateError,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/", response_model=schemas.StockReservationResponse, status_code=201)
+async def create_reservation(
+    reservation: schemas.StockReservationCreate, db: Session = Depends(get_db)
+):
+    """Retenir du stock pour plusieurs produits pendant une durée limitée"""
+    logger.info(
+        f"🔒 Creating stock reservation - lines={len(reservation.lines)}, "
+        f"ttl={reservation.ttl_seconds}s, reference={reservation.reference}"
+    )
+
+    service = ReservationService(db)
+    try:
+        db_reservation = service.create_reservation(reservation)
+    except (InsufficientStockError, ReservationStateError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not db_reservation:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    return db_reservation
+
+
+@router.post("/expire", response_model=schemas.StockReservationSweepResult)
+async def expire_reservations(
+    batch_size: int = Query(500, ge=1, le=10000, description="Batch size"),
+    db: Session = Depends(get_db),
+):
+    """Expirer les réservations échues (normalement fait par le balayeur)"""
+    logger.info(f"⏳ Expiring stock reservations - batch_size={batch_size}")
+
+    service = ReservationService(db)
+    return schemas.StockReservationSweepResult(
+        expired=service.expire_reservations(batch_size=batch_size)
+    )
+
+
+@router.get("/{reservation_id}", response_model=schemas.StockReservationResponse)
+async def get_reservation(reservation_id: int, db: Session = Depends(get_db)):
+    """Récupérer une réservation de stock"""
+    logger.info(f"🔒 Getting stock reservation {reservation_id}")
+
+    service = ReservationService(db)
+    reservation = service.get_reservation(reservation_id)
+
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    return reservation
+
+
+@router.post(
+    "/{reservation_id}/confirm", response_model=schemas.StockReservationResponse
+)
+async def confirm_reservation(reservation_id: int, db: Session = Depends(get_db)):
+    """Confirmer une réservation : le stock retenu est décrémenté"""
+    logger.info(f"✅ Confirming stock reservation {reservation_id}")
+
+    service = ReservationService(db)
+    try:
+        reservation = service.confirm_reservation(reservation_id)
+    except ReservationStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    return reservation
+
+
+@router.post(
+    "/{reservation_id}/release", response_model=schemas.StockReservationResponse
+)
+async def release_reservation(reservation_id: int, db: Session = Depends(get_db)):
+    """Libérer une réservation (compensation) sans mouvement de stock"""
+    logger.info(f"🔓 Releasing stock reservation {reservation_id}")
+
+    service = ReservationService(db)
+    try:
+        reservation = service.release_reservation(reservation_id)
+    except ReservationStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    return reservation
+
+
+@router.post(
+    "/by-reference/{reference}/confirm",
+    response_model=schemas.StockReservationResponse,
+)
+async def confirm_reservation_by_reference(
+    reference: str, db: Session = Depends(get_db)
+):
+    """Confirmer la réservation associée à une référence externe"""
+    logger.info(f"✅ Confirming stock reservation for reference {reference}")
+
+    service = ReservationService(db)
+    reservation = service.get_reservation_by_reference(reference)
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    try:
+        return service.confirm_reservation(reservation.id)
+    except ReservationStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post(
+    "/by-reference/{reference}/release",
+    response_model=schemas.StockReservationResponse,
+)
+async def release_reservation_by_reference(
+    reference: str, db: Session = Depends(get_db)
+):
+    """Libérer la réservation associée à une référence externe"""
+    logger.info(f"🔓 Releasing stock reservation for reference {reference}")
+
+    service = ReservationService(db)
+    reservation = service.get_reservation_by_reference(reference)
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+
+    try:
+        return service.release_reservation(reservation.id)
+    except ReservationStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
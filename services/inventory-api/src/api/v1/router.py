@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from .products import router as products_router
 from .categories import router as categories_router
 from .stock import router as stock_router
+from .reservations import router as reservations_router
 
 api_router = APIRouter()
 
@@ -9,3 +10,6 @@ api_router = APIRouter()
 api_router.include_router(products_router, prefix="/products", tags=["products"])
 api_router.include_router(categories_router, prefix="/categories", tags=["categories"])
 api_router.include_router(stock_router, prefix="/stock", tags=["stock"])
+api_router.include_router(
+    reservations_router, prefix="/reservations", tags=["reservations"]
+)
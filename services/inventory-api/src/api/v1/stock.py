@@ -1,11 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 import logging
 
 from src.database import get_db
 import src.schemas as schemas
-from src.services import StockService
+from src.services import (
+    EXPORT_MEDIA_TYPES,
+    STOCK_MOVEMENT_EXPORT_FIELDS,
+    ExportService,
+    StockService,
+    encode_export,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +39,36 @@ async def get_stock_movements(
     )
 
 
+@router.get("/movements/export")
+async def export_stock_movements(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Format"),
+    product_id: Optional[int] = Query(None, description="Filter by product ID"),
+    type_mouvement: Optional[str] = Query(None, description="Filter by movement type"),
+    date_from: Optional[datetime] = Query(None, description="Start date (inclusive)"),
+    date_to: Optional[datetime] = Query(None, description="End date (exclusive)"),
+    db: Session = Depends(get_db),
+):
+    """Exporter les mouvements de stock en flux (NDJSON ou CSV), sans limite"""
+    logger.info(
+        f"📤 Exporting stock movements - format={format}, product_id={product_id}, "
+        f"type={type_mouvement}, from={date_from}, to={date_to}"
+    )
+
+    rows = ExportService(db).iter_stock_movements(
+        product_id=product_id,
+        type_mouvement=type_mouvement,
+        date_from=date_from,
+        date_to=date_to,
+    )
+    return StreamingResponse(
+        encode_export(rows, format, STOCK_MOVEMENT_EXPORT_FIELDS),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f"attachment; filename=stock_movements.{format}"
+        },
+    )
+
+
 @router.post(
     "/movements", response_model=schemas.StockMovementResponse, status_code=201
 )
@@ -104,6 +142,20 @@ async def reduce_stock(
     return result
 
 
+@router.post("/reduce/bulk", response_model=schemas.BulkStockReductionResult)
+async def reduce_stock_bulk(
+    reduction: schemas.BulkStockReduction, db: Session = Depends(get_db)
+):
+    """Réduire le stock de plusieurs produits en un appel (idempotent par référence)"""
+    logger.info(
+        f"📦 Bulk stock reduction {reduction.reference} "
+        f"({len(reduction.items)} items)"
+    )
+
+    service = StockService(db)
+    return service.reduce_stock_bulk(reduction)
+
+
 @router.put("/products/{product_id}/stock/increase")
 async def increase_stock(
     product_id: int,
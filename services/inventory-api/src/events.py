@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import redis
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src.services import _utcnow
+
+logger = logging.getLogger(__name__)
+
+# Verrou consultatif PostgreSQL du relais : un seul réplica publie à la fois
+OUTBOX_RELAY_LOCK_KEY = int(os.getenv("OUTBOX_RELAY_LOCK_KEY", "720419"))
+
+
+class EventPublisher:
+    """Publication des événements d'inventaire sur un stream Redis.
+
+    Même enveloppe que les autres services (event_id, event_type, stream,
+    occurred_at, aggregate_type, aggregate_id, data). La connexion est
+    établie au premier usage : sans Redis, les événements restent dans
+    l'outbox et partent au premier passage du relais après son retour.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("EVENT_BUS_URL") or os.getenv(
+            "REDIS_URL", "redis://localhost:6379/0"
+        )
+        self.stream_name = os.getenv(
+            "INVENTORY_EVENT_STREAM", "inventory.products.events"
+        )
+        self.instance_id = os.getenv("INSTANCE_ID", "inventory-api")
+        self.maxlen = int(os.getenv("INVENTORY_EVENT_STREAM_MAXLEN", "100000"))
+        self.client: Optional[redis.Redis] = None
+        self._unavailable_logged = False
+
+    @property
+    def enabled(self) -> bool:
+        """Redis joignable. Tant qu'il ne l'a pas été, la connexion est
+        retentée à chaque appel (donc à chaque passage du relais)."""
+        return self._connect() is not None
+
+    def _connect(self) -> Optional[redis.Redis]:
+        if self.client is not None:
+            return self.client
+        try:
+            client = redis.from_url(self.redis_url, decode_responses=True)
+            client.ping()
+        except Exception as e:
+            if not self._unavailable_logged:
+                logger.warning(f"EventPublisher waiting for Redis: {e}")
+                self._unavailable_logged = True
+            return None
+        self.client = client
+        logger.info(
+            f"EventPublisher connected to Redis at {self.redis_url}, stream='{self.stream_name}'"
+        )
+        return client
+
+    def publish(self, event: Dict[str, Any]) -> Optional[str]:
+        """Publier une enveloppe déjà construite. Lève en cas d'échec Redis."""
+        client = self._connect()
+        if client is None:
+            return None
+
+        event = {
+            **event,
+            "stream": self.stream_name,
+            "producer_instance": self.instance_id,
+        }
+        return client.xadd(
+            self.stream_name,
+            {"event": json.dumps(event)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+
+
+class OutboxRelay:
+    """Relaye les événements de l'outbox vers Redis, dans l'ordre d'écriture.
+
+    Chaque lot est publié sous un verrou consultatif de transaction : avec
+    plusieurs réplicas, un seul relaie à la fois et le suivant repart après
+    le commit du lot, ce qui préserve l'ordre sur le stream. La livraison
+    est « au moins une fois » : un crash entre le XADD et le commit
+    republie l'événement, les consommateurs dédupliquent sur ``event_id``
+    ou ignorent les versions déjà vues.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        publisher: EventPublisher,
+        batch_size: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.batch_size = batch_size
+
+    def relay_pending(self) -> int:
+        """Publier les événements en attente. Retourne le nombre publiés."""
+        if not self.publisher.enabled:
+            return 0
+
+        published = 0
+        db = self.session_factory()
+        try:
+            while self._lock(db):
+                events = (
+                    db.query(models.InventoryOutboxEvent)
+                    .filter(models.InventoryOutboxEvent.date_publication.is_(None))
+                    .order_by(models.InventoryOutboxEvent.id)
+                    .limit(self.batch_size)
+                    .all()
+                )
+                if not events:
+                    break
+
+                sent = 0
+                try:
+                    for event in events:
+                        self.publisher.publish(json.loads(event.payload))
+                        event.date_publication = _utcnow()
+                        sent += 1
+                except Exception as e:
+                    # On s'arrête au premier échec pour préserver l'ordre
+                    logger.warning(f"⚠️ Outbox relay interrupted: {e}")
+                finally:
+                    db.commit()
+                    published += sent
+
+                if sent < len(events) or len(events) < self.batch_size:
+                    break
+        finally:
+            db.close()
+
+        if published:
+            logger.info(f"📣 Relayed {published} inventory events")
+        return published
+
+    @staticmethod
+    def _lock(db: Session) -> bool:
+        """Prendre le verrou du relais jusqu'à la fin de la transaction ;
+        False si un autre réplica relaie déjà"""
+        if db.get_bind().dialect.name != "postgresql":
+            return True  # SQLite : base locale à un seul processus
+        return bool(
+            db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"),
+                {"key": OUTBOX_RELAY_LOCK_KEY},
+            ).scalar()
+        )
+
+    @staticmethod
+    def purge_published(db: Session, older_than: datetime) -> int:
+        """Supprimer les événements publiés avant ``older_than``"""
+        deleted = (
+            db.query(models.InventoryOutboxEvent)
+            .filter(
+                models.InventoryOutboxEvent.date_publication.isnot(None),
+                models.InventoryOutboxEvent.date_publication < older_than,
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
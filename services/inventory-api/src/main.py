@@ -2,15 +2,19 @@ import uvicorn
 from fastapi import FastAPI, Request, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+import asyncio
 import logging
 import time
 import uuid
 import os
-from src.database import engine, Base
+from datetime import timedelta
+from src.database import engine, Base, SessionLocal
 from src.api.v1.router import api_router
 from src.init_db import init_database
 from src.metrics_service import metrics_service, CONTENT_TYPE_LATEST
 from src.metrics_middleware import MetricsMiddleware
+from src.services import ReservationService, _utcnow
+from src.events import EventPublisher, OutboxRelay
 
 # Configuration du logging structuré
 logging.basicConfig(
@@ -26,6 +30,15 @@ logger = logging.getLogger("inventory-api")
 # ID de l'instance pour le load balancing
 INSTANCE_ID = os.getenv("INSTANCE_ID", "inventory-api-default")
 
+# Balayage des réservations de stock expirées
+RESERVATION_SWEEP_INTERVAL = int(os.getenv("RESERVATION_SWEEP_INTERVAL", "30"))
+RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv("RESERVATION_SWEEP_BATCH_SIZE", "500"))
+
+# Relais de l'outbox des événements d'inventaire vers Redis
+OUTBOX_RELAY_INTERVAL = float(os.getenv("OUTBOX_RELAY_INTERVAL", "1"))
+OUTBOX_RELAY_BATCH_SIZE = int(os.getenv("OUTBOX_RELAY_BATCH_SIZE", "100"))
+OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+
 app = FastAPI(
     title="Inventory API",
     description="API RESTful de gestion des produits, catégories et stocks - Architecture DDD",
@@ -129,6 +142,52 @@ app.add_middleware(MetricsMiddleware)
 app.include_router(api_router, prefix="/api/v1")
 
 
+def _expire_reservations() -> int:
+    db = SessionLocal()
+    try:
+        return ReservationService(db).expire_reservations(
+            batch_size=RESERVATION_SWEEP_BATCH_SIZE
+        )
+    finally:
+        db.close()
+
+
+async def reservation_sweeper():
+    """Libère périodiquement les réservations de stock échues"""
+    while True:
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL)
+        try:
+            await asyncio.to_thread(_expire_reservations)
+        except Exception as e:
+            logger.warning(f"⚠️ [{INSTANCE_ID}] Reservation sweep failed: {e}")
+
+
+def _purge_outbox() -> int:
+    db = SessionLocal()
+    try:
+        return OutboxRelay.purge_published(
+            db, _utcnow() - timedelta(hours=OUTBOX_RETENTION_HOURS)
+        )
+    finally:
+        db.close()
+
+
+async def outbox_relay():
+    """Publie en continu les événements d'inventaire écrits dans l'outbox"""
+    publisher = await asyncio.to_thread(EventPublisher)
+    relay = OutboxRelay(SessionLocal, publisher, batch_size=OUTBOX_RELAY_BATCH_SIZE)
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(OUTBOX_RELAY_INTERVAL)
+        try:
+            await asyncio.to_thread(relay.relay_pending)
+            if time.monotonic() - last_purge > 3600:
+                await asyncio.to_thread(_purge_outbox)
+                last_purge = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ [{INSTANCE_ID}] Outbox relay failed: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialise la base de données avec des données d'exemple si vide"""
@@ -170,12 +229,31 @@ async def startup_event():
                 f"⚠️ [{INSTANCE_ID}] Continuing startup despite database setup issues"
             )
 
+        if RESERVATION_SWEEP_INTERVAL > 0:
+            app.state.reservation_sweeper = asyncio.create_task(reservation_sweeper())
+            logger.info(
+                f"⏳ [{INSTANCE_ID}] Reservation sweeper started "
+                f"(every {RESERVATION_SWEEP_INTERVAL}s)"
+            )
+
+        if OUTBOX_RELAY_INTERVAL > 0:
+            app.state.outbox_relay = asyncio.create_task(outbox_relay())
+            logger.info(
+                f"📣 [{INSTANCE_ID}] Outbox relay started "
+                f"(every {OUTBOX_RELAY_INTERVAL}s)"
+            )
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Nettoyage lors de l'arrêt"""
     logger.info(f"🛑 [{INSTANCE_ID}] Shutting down Inventory API")
 
+    for task_name in ("reservation_sweeper", "outbox_relay"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+
 
 @app.get("/")
 async def root():
@@ -193,6 +271,8 @@ async def root():
             "Stock Management",
             "Inventory Tracking",
             "Stock Alerts",
+            "Stock Reservations",
+            "Inventory Change Events",
             "Structured Logging",
             "Load Balancing Support",
         ],
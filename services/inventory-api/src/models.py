@@ -7,6 +7,8 @@ from sqlalchemy import (
     Text,
     DateTime,
     Boolean,
+    Index,
+    text,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -19,6 +21,10 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    date_modification = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     # Relations
     products = relationship("Product", back_populates="category")
@@ -39,6 +45,12 @@ class Product(Base):
     seuil_alerte = Column(Integer, default=10)  # Seuil d'alerte pour le stock
     categorie_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
     actif = Column(Boolean, default=True)  # Si le produit est actif
+    version = Column(
+        Integer, nullable=False, default=1, server_default="1"
+    )  # Incrémentée à chaque changement publié (voir InventoryOutboxEvent)
+    date_modification = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     # Relations
     category = relationship("Category", back_populates="products")
@@ -59,7 +71,7 @@ class StockMovement(Base):
         String, nullable=True
     )  # "vente", "reapprovisionnement", "inventaire", etc.
     reference = Column(
-        String, nullable=True
+        String, index=True, nullable=True
     )  # Référence externe (commande, facture, etc.)
     date_mouvement = Column(DateTime(timezone=True), server_default=func.now())
     utilisateur = Column(
@@ -91,3 +103,80 @@ class StockAlert(Base):
 
     def __repr__(self):
         return f"<StockAlert(id={self.id}, product_id={self.product_id}, type={self.type_alerte}, resolu={self.resolu})>"
+
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reference = Column(
+        String, index=True, nullable=True
+    )  # Référence externe (saga, panier, commande...)
+    statut = Column(
+        String, index=True, nullable=False, default="active"
+    )  # "active", "confirmee", "liberee", "expiree"
+    date_creation = Column(DateTime(timezone=True), server_default=func.now())
+    date_expiration = Column(DateTime(timezone=True), index=True, nullable=False)
+    date_cloture = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Une seule réservation active par référence : une référence libérée,
+        # expirée ou confirmée peut être réservée à nouveau
+        Index(
+            "uq_stock_reservations_reference_active",
+            "reference",
+            unique=True,
+            postgresql_where=text("statut = 'active'"),
+            sqlite_where=text("statut = 'active'"),
+        ),
+    )
+
+    # Relations
+    lines = relationship(
+        "StockReservationLine",
+        back_populates="reservation",
+        cascade="all, delete-orphan",
+    )
+
+    def __repr__(self):
+        return f"<StockReservation(id={self.id}, reference='{self.reference}', statut={self.statut})>"
+
+
+class StockReservationLine(Base):
+    __tablename__ = "stock_reservation_lines"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(
+        Integer, ForeignKey("stock_reservations.id"), index=True, nullable=False
+    )
+    product_id = Column(Integer, ForeignKey("products.id"), index=True, nullable=False)
+    quantite = Column(Integer, nullable=False)
+
+    # Relations
+    reservation = relationship("StockReservation", back_populates="lines")
+    product = relationship("Product")
+
+    def __repr__(self):
+        return f"<StockReservationLine(reservation_id={self.reservation_id}, product_id={self.product_id}, quantite={self.quantite})>"
+
+
+class InventoryOutboxEvent(Base):
+    """Événement de changement d'inventaire en attente de publication.
+
+    Écrit dans la même transaction que le changement, puis relayé vers le
+    stream Redis par ``src.events.OutboxRelay`` dans l'ordre des identifiants.
+    """
+
+    __tablename__ = "inventory_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String, nullable=False)
+    product_id = Column(Integer, index=True, nullable=False)
+    version = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)  # Enveloppe JSON complète
+    date_creation = Column(DateTime(timezone=True), server_default=func.now())
+    date_publication = Column(DateTime(timezone=True), index=True, nullable=True)
+
+    def __repr__(self):
+        return f"<InventoryOutboxEvent(id={self.id}, type='{self.event_type}', product_id={self.product_id}, version={self.version})>"
@@ -68,6 +68,22 @@ class ProductPage(BaseModel):
     pages: int
 
 
+class ProductImportError(BaseModel):
+    line: int
+    code: Optional[str] = None
+    errors: List[str]
+
+
+class ProductImportReport(BaseModel):
+    format: str
+    processed: int = 0
+    upserted: int = 0
+    failed: int = 0
+    chunks: int = 0
+    errors: List[ProductImportError] = []
+    errors_truncated: bool = False
+
+
 # Stock Movement schemas
 class StockMovementBase(BaseModel):
     product_id: int = Field(..., description="Product ID")
@@ -135,6 +151,8 @@ class StockAdjustment(BaseModel):
 class StockInfo(BaseModel):
     product_id: int
     quantite_stock: int
+    quantite_reservee: int = 0
+    quantite_disponible: int = 0
     seuil_alerte: int
     status: str  # "normal", "faible", "rupture", "surstock"
     dernier_mouvement: Optional[datetime] = None
@@ -143,6 +161,78 @@ class StockInfo(BaseModel):
         from_attributes = True
 
 
+# Stock Reservation schemas
+class StockReservationLineCreate(BaseModel):
+    product_id: int = Field(..., description="Product ID")
+    quantite: int = Field(..., gt=0, description="Quantity to hold")
+
+
+class StockReservationCreate(BaseModel):
+    lines: List[StockReservationLineCreate] = Field(
+        ..., min_length=1, description="Lines to hold"
+    )
+    ttl_seconds: int = Field(
+        default=900, gt=0, le=86400, description="Hold duration in seconds"
+    )
+    reference: Optional[str] = Field(
+        None, description="External reference (saga, cart, order)"
+    )
+
+
+class StockReservationLineResponse(BaseModel):
+    product_id: int
+    quantite: int
+
+    class Config:
+        from_attributes = True
+
+
+class StockReservationResponse(BaseModel):
+    id: int
+    reference: Optional[str] = None
+    statut: str
+    date_creation: Optional[datetime] = None
+    date_expiration: datetime
+    date_cloture: Optional[datetime] = None
+    lines: List[StockReservationLineResponse] = []
+
+    class Config:
+        from_attributes = True
+
+
+class StockReservationSweepResult(BaseModel):
+    expired: int
+
+
+# Bulk stock reduction schemas
+class BulkStockReductionItem(BaseModel):
+    product_id: int = Field(..., description="Product ID")
+    quantite: int = Field(..., gt=0, description="Quantity to reduce")
+
+
+class BulkStockReduction(BaseModel):
+    reference: str = Field(
+        ..., min_length=1, description="Idempotency reference (e.g. sale_42)"
+    )
+    raison: str = Field(default="vente", description="Reason for stock reduction")
+    items: List[BulkStockReductionItem] = Field(..., min_length=1)
+
+
+class BulkStockReductionLine(BaseModel):
+    product_id: int
+    quantite: int
+    new_stock: int
+    movement_id: int
+
+
+class BulkStockReductionResult(BaseModel):
+    reference: str
+    deja_traite: bool = False
+    applied: List[BulkStockReductionLine] = []
+    missing: List[int] = []
+    insuffisants: List[int] = []
+
+
 # Inventory schemas
 class InventorySummary(BaseModel):
     total_products: int
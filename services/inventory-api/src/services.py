@@ -1,8 +1,15 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
-from typing import List, Optional, Tuple
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from pydantic import ValidationError
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import csv
+import io
+import json
 import logging
+import uuid
 
 import src.models as models
 import src.schemas as schemas
@@ -10,6 +17,109 @@ import src.schemas as schemas
 logger = logging.getLogger(__name__)
 
 
+class InsufficientStockError(Exception):
+    """Stock disponible insuffisant pour une réservation"""
+
+    def __init__(self, product_id: int, requested: int, available: int):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(
+            f"Insufficient stock for product {product_id}: "
+            f"requested {requested}, available {available}"
+        )
+
+
+class ReservationStateError(Exception):
+    """Transition invalide pour une réservation de stock"""
+
+    pass
+
+
+def _utcnow() -> datetime:
+    # Les dates sont stockées en UTC naïf (SQLite ne conserve pas le fuseau)
+    return datetime.utcnow()
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def get_reserved_quantities(
+    db: Session, product_ids: Optional[Iterable[int]] = None
+) -> Dict[int, int]:
+    """Quantités retenues par les réservations actives et non expirées"""
+    query = (
+        db.query(
+            models.StockReservationLine.product_id,
+            func.sum(models.StockReservationLine.quantite),
+        )
+        .join(models.StockReservation)
+        .filter(
+            models.StockReservation.statut == "active",
+            models.StockReservation.date_expiration > _utcnow(),
+        )
+    )
+    if product_ids is not None:
+        query = query.filter(
+            models.StockReservationLine.product_id.in_(list(product_ids))
+        )
+
+    rows = query.group_by(models.StockReservationLine.product_id).all()
+    return {product_id: int(total or 0) for product_id, total in rows}
+
+
+def product_change_values(product: Any, event_type: str) -> Dict[str, Any]:
+    """Colonnes d'une ligne d'outbox pour l'état courant d'un produit
+    (objet ORM ou ligne ``RETURNING`` avec les mêmes attributs)"""
+    event = {
+        "event_id": str(uuid.uuid4()),
+        "event_type": event_type,
+        "occurred_at": datetime.now(timezone.utc).isoformat(),
+        "aggregate_type": "product",
+        "aggregate_id": str(product.id),
+        "data": {
+            "product_id": product.id,
+            "code": product.code,
+            "quantite_stock": product.quantite_stock,
+            "prix": product.prix,
+            "actif": product.actif,
+            "version": product.version,
+        },
+    }
+    return {
+        "event_id": event["event_id"],
+        "event_type": event_type,
+        "product_id": product.id,
+        "version": product.version,
+        "payload": json.dumps(event),
+    }
+
+
+def record_product_change(
+    db: Session, product: models.Product, event_type: str
+) -> models.InventoryOutboxEvent:
+    """Versionner un changement de produit et l'inscrire dans l'outbox.
+
+    À appeler avant le commit du changement : l'événement est écrit dans la
+    même transaction et ne sera publié que si celle-ci est validée.
+    """
+    if product.id is None:
+        db.flush()  # Création : la version initiale vient du défaut de colonne
+    else:
+        # Incrément côté SQL : sérialisé par le verrou de ligne de l'UPDATE
+        product.version = models.Product.version + 1
+        db.flush()
+
+    outbox_event = models.InventoryOutboxEvent(
+        **product_change_values(product, event_type)
+    )
+    db.add(outbox_event)
+    return outbox_event
+
+
 class ProductService:
     def __init__(self, db: Session):
         self.db = db
@@ -21,10 +131,14 @@ class ProductService:
         search: Optional[str] = None,
         category_id: Optional[int] = None,
         actif: Optional[bool] = None,
+        ids: Optional[List[int]] = None,
     ) -> Tuple[List[models.Product], int]:
         """Récupérer les produits avec filtres et pagination"""
         query = self.db.query(models.Product)
 
+        if ids is not None:
+            query = query.filter(models.Product.id.in_(ids))
+
         if search:
             query = query.filter(
                 or_(
@@ -40,7 +154,7 @@ class ProductService:
             query = query.filter(models.Product.actif == actif)
 
         total = query.count()
-        products = query.offset(skip).limit(limit).all()
+        products = query.order_by(models.Product.id).offset(skip).limit(limit).all()
 
         return products, total
 
@@ -56,6 +170,7 @@ class ProductService:
         """Créer un nouveau produit"""
         db_product = models.Product(**product.dict())
         self.db.add(db_product)
+        record_product_change(self.db, db_product, "ProductCreated")
         self.db.commit()
         self.db.refresh(db_product)
         return db_product
@@ -72,6 +187,7 @@ class ProductService:
         for field, value in update_data.items():
             setattr(db_product, field, value)
 
+        record_product_change(self.db, db_product, "ProductUpdated")
         self.db.commit()
         self.db.refresh(db_product)
         return db_product
@@ -83,17 +199,338 @@ class ProductService:
             return False
 
         db_product.actif = False
+        record_product_change(self.db, db_product, "ProductUpdated")
         self.db.commit()
         return True
 
 
+# Champs mis à jour lorsqu'un code produit existe déjà. Le stock n'est jamais
+# écrasé par un import de catalogue : il n'est appliqué qu'aux nouveaux produits.
+PRODUCT_IMPORT_UPDATE_FIELDS = (
+    "nom",
+    "description",
+    "prix",
+    "seuil_alerte",
+    "categorie_id",
+    "actif",
+)
+
+
+def iter_ndjson_rows(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Lire un flux NDJSON ligne par ligne (numéro de ligne, objet décodé)"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Lire un flux CSV avec en-tête (numéro de ligne, dictionnaire)"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        # Les cellules vides prennent la valeur par défaut du schéma
+        yield reader.line_num, {
+            key: value
+            for key, value in row.items()
+            if key is not None and value not in (None, "")
+        }
+
+
+class ProductImportService:
+    """Import de catalogue en flux, écrit par lots avec upsert sur le code"""
+
+    def __init__(self, db: Session, chunk_size: int = 1000, max_errors: int = 1000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def import_stream(
+        self, stream: IO[str], format: str
+    ) -> schemas.ProductImportReport:
+        """Valider et importer les lignes d'un flux NDJSON ou CSV"""
+        rows = iter_csv_rows(stream) if format == "csv" else iter_ndjson_rows(stream)
+        report = schemas.ProductImportReport(format=format)
+        category_ids = {row.id for row in self.db.query(models.Category.id).all()}
+
+        # Un seul exemplaire par code dans un lot : la dernière ligne l'emporte
+        chunk: Dict[str, Tuple[int, dict]] = {}
+        for line_number, raw in rows:
+            report.processed += 1
+            product = self._validate(line_number, raw, category_ids, report)
+            if product is None:
+                continue
+
+            chunk.pop(product["code"], None)
+            chunk[product["code"]] = (line_number, product)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk, report)
+                chunk = {}
+
+        if chunk:
+            self._flush(chunk, report)
+
+        logger.info(
+            f"📥 Product import finished - processed={report.processed}, "
+            f"upserted={report.upserted}, failed={report.failed}"
+        )
+        return report
+
+    def _validate(
+        self,
+        line_number: int,
+        raw: Any,
+        category_ids: set,
+        report: schemas.ProductImportReport,
+    ) -> Optional[dict]:
+        if isinstance(raw, Exception):
+            self._record_error(report, line_number, None, [str(raw)])
+            return None
+        if not isinstance(raw, dict):
+            self._record_error(report, line_number, None, ["Row must be an object"])
+            return None
+
+        try:
+            product = schemas.ProductCreate(**raw).dict()
+        except ValidationError as e:
+            errors = [
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            ]
+            self._record_error(report, line_number, raw.get("code"), errors)
+            return None
+
+        if product["categorie_id"] not in category_ids:
+            self._record_error(
+                report,
+                line_number,
+                product["code"],
+                [f"categorie_id: Category {product['categorie_id']} not found"],
+            )
+            return None
+
+        return product
+
+    def _flush(
+        self, chunk: Dict[str, Tuple[int, dict]], report: schemas.ProductImportReport
+    ):
+        """Écrire un lot en une seule instruction INSERT ... ON CONFLICT"""
+        values = [product for _, product in chunk.values()]
+        try:
+            upserted = self.db.execute(self._upsert_statement(), values).all()
+            # Un événement par produit écrit, dans la transaction du lot
+            self.db.execute(
+                models.InventoryOutboxEvent.__table__.insert(),
+                [
+                    product_change_values(
+                        product,
+                        "ProductCreated" if product.version == 1 else "ProductUpdated",
+                    )
+                    for product in upserted
+                ],
+            )
+            self.db.commit()
+            report.upserted += len(values)
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"❌ Product import chunk failed: {e}")
+            for line_number, product in chunk.values():
+                self._record_error(
+                    report, line_number, product["code"], ["Database error"]
+                )
+        report.chunks += 1
+
+    def _upsert_statement(self):
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        table = models.Product.__table__
+        stmt = insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[models.Product.code],
+            set_={
+                **{
+                    field: stmt.excluded[field]
+                    for field in PRODUCT_IMPORT_UPDATE_FIELDS
+                },
+                "version": table.c.version + 1,
+                "date_modification": func.now(),
+            },
+        ).returning(
+            table.c.id,
+            table.c.code,
+            table.c.quantite_stock,
+            table.c.prix,
+            table.c.actif,
+            table.c.version,
+        )
+
+    def _record_error(
+        self,
+        report: schemas.ProductImportReport,
+        line_number: int,
+        code: Optional[str],
+        errors: List[str],
+    ):
+        report.failed += 1
+        if len(report.errors) >= self.max_errors:
+            report.errors_truncated = True
+            return
+        report.errors.append(
+            schemas.ProductImportError(line=line_number, code=code, errors=errors)
+        )
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+PRODUCT_EXPORT_FIELDS = (
+    "id",
+    "code",
+    "nom",
+    "description",
+    "prix",
+    "quantite_stock",
+    "seuil_alerte",
+    "categorie_id",
+    "actif",
+)
+
+STOCK_MOVEMENT_EXPORT_FIELDS = (
+    "id",
+    "product_id",
+    "type_mouvement",
+    "quantite",
+    "raison",
+    "reference",
+    "date_mouvement",
+    "utilisateur",
+)
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_ndjson(
+    rows: Iterable[Dict[str, Any]], batch_size: int = 500
+) -> Iterator[str]:
+    """Sérialiser des lignes en NDJSON, par paquets de ``batch_size`` lignes"""
+    buffer: List[str] = []
+    for row in rows:
+        buffer.append(
+            json.dumps(
+                {key: _export_value(value) for key, value in row.items()},
+                ensure_ascii=False,
+            )
+        )
+        if len(buffer) >= batch_size:
+            yield "\n".join(buffer) + "\n"
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def encode_csv(
+    rows: Iterable[Dict[str, Any]], fieldnames: Iterable[str], batch_size: int = 500
+) -> Iterator[str]:
+    """Sérialiser des lignes en CSV (en-tête inclus), par paquets de lignes"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(fieldnames))
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow({key: _export_value(value) for key, value in row.items()})
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def encode_export(
+    rows: Iterable[Dict[str, Any]], format: str, fieldnames: Iterable[str]
+) -> Iterator[str]:
+    """Choisir l'encodeur d'export selon le format demandé"""
+    if format == "csv":
+        return encode_csv(rows, fieldnames)
+    return encode_ndjson(rows)
+
+
+class ExportService:
+    """Export en flux des produits et mouvements de stock.
+
+    Les requêtes portent sur des colonnes (pas d'entités ORM) et sont lues via
+    ``yield_per`` : curseur côté serveur sur PostgreSQL, mémoire constante
+    quelle que soit la taille de l'export.
+    """
+
+    def __init__(self, db: Session, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+
+    def iter_products(
+        self,
+        category_id: Optional[int] = None,
+        actif: Optional[bool] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Parcourir les produits par ordre d'identifiant"""
+        query = self.db.query(
+            *(getattr(models.Product, field) for field in PRODUCT_EXPORT_FIELDS)
+        )
+
+        if category_id is not None:
+            query = query.filter(models.Product.categorie_id == category_id)
+
+        if actif is not None:
+            query = query.filter(models.Product.actif == actif)
+
+        return self._stream(query.order_by(models.Product.id))
+
+    def iter_stock_movements(
+        self,
+        product_id: Optional[int] = None,
+        type_mouvement: Optional[str] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Parcourir les mouvements de stock par ordre d'identifiant"""
+        movement = models.StockMovement
+        query = self.db.query(
+            *(getattr(movement, field) for field in STOCK_MOVEMENT_EXPORT_FIELDS)
+        )
+
+        if product_id is not None:
+            query = query.filter(movement.product_id == product_id)
+
+        if type_mouvement:
+            query = query.filter(movement.type_mouvement == type_mouvement)
+
+        if date_from is not None:
+            query = query.filter(movement.date_mouvement >= date_from)
+
+        if date_to is not None:
+            query = query.filter(movement.date_mouvement < date_to)
+
+        return self._stream(query.order_by(movement.id))
+
+    def _stream(self, query) -> Iterator[Dict[str, Any]]:
+        for row in query.yield_per(self.batch_size):
+            yield row._asdict()
+
+
 class CategoryService:
     def __init__(self, db: Session):
         self.db = db
 
     def get_categories(self) -> List[models.Category]:
         """Récupérer toutes les catégories"""
-        return self.db.query(models.Category).all()
+        return self.db.query(models.Category).order_by(models.Category.id).all()
 
     def get_category(self, category_id: int) -> Optional[models.Category]:
         """Récupérer une catégorie par son ID"""
@@ -122,6 +559,7 @@ class CategoryService:
         update_data = category_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_category, field, value)
+        db_category.version = models.Category.version + 1
 
         self.db.commit()
         self.db.refresh(db_category)
@@ -162,6 +600,10 @@ class StockService:
         else:
             status = "normal"
 
+        quantite_reservee = get_reserved_quantities(self.db, [product_id]).get(
+            product_id, 0
+        )
+
         # Obtenir le dernier mouvement
         dernier_mouvement = (
             self.db.query(models.StockMovement)
@@ -173,6 +615,8 @@ class StockService:
         return schemas.StockInfo(
             product_id=product_id,
             quantite_stock=product.quantite_stock,
+            quantite_reservee=quantite_reservee,
+            quantite_disponible=max(product.quantite_stock - quantite_reservee, 0),
             seuil_alerte=product.seuil_alerte,
             status=status,
             dernier_mouvement=(
@@ -208,6 +652,7 @@ class StockService:
             product.quantite_stock = 0
 
         self.db.add(movement)
+        record_product_change(self.db, product, "StockAdjusted")
         self.db.commit()
         self.db.refresh(product)
 
@@ -232,7 +677,9 @@ class StockService:
         if not product:
             return None
 
-        if product.quantite_stock < quantity:
+        # Le stock retenu par des réservations actives n'est pas vendable
+        reserved = get_reserved_quantities(self.db, [product_id]).get(product_id, 0)
+        if product.quantite_stock - reserved < quantity:
             return None  # Stock insuffisant
 
         # Créer le mouvement de stock
@@ -249,6 +696,7 @@ class StockService:
         product.quantite_stock -= quantity
 
         self.db.add(movement)
+        record_product_change(self.db, product, "StockReduced")
         self.db.commit()
         self.db.refresh(product)
 
@@ -261,6 +709,84 @@ class StockService:
             "movement_id": movement.id,
         }
 
+    def reduce_stock_bulk(
+        self, reduction: schemas.BulkStockReduction
+    ) -> schemas.BulkStockReductionResult:
+        """Décrémenter le stock de plusieurs produits en une transaction.
+
+        Les quantités sont agrégées par produit et la référence rend l'appel
+        idempotent : un rejeu ne décrémente pas deux fois. Les ventes étant
+        déjà réalisées, le stock est borné à zéro plutôt que refusé.
+        """
+        result = schemas.BulkStockReductionResult(reference=reduction.reference)
+
+        quantities: Dict[int, int] = {}
+        for item in reduction.items:
+            quantities[item.product_id] = (
+                quantities.get(item.product_id, 0) + item.quantite
+            )
+
+        products = (
+            self.db.query(models.Product)
+            .filter(models.Product.id.in_(quantities.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .all()
+        )
+        # Vérifiée sous verrou : deux rejeux concurrents ne passent pas tous deux
+        already_applied = (
+            self.db.query(models.StockMovement.id)
+            .filter(
+                models.StockMovement.reference == reduction.reference,
+                models.StockMovement.raison == reduction.raison,
+            )
+            .first()
+        )
+        if already_applied:
+            self.db.rollback()  # Libère les verrous pris ci-dessus
+            result.deja_traite = True
+            return result
+
+        found = {product.id for product in products}
+        result.missing = sorted(set(quantities) - found)
+
+        movements = []
+        for product in products:
+            quantite = quantities[product.id]
+            if product.quantite_stock < quantite:
+                result.insuffisants.append(product.id)
+            product.quantite_stock = max(product.quantite_stock - quantite, 0)
+            movement = models.StockMovement(
+                product_id=product.id,
+                type_mouvement="sortie",
+                quantite=quantite,
+                raison=reduction.raison,
+                reference=reduction.reference,
+                utilisateur="system",
+            )
+            self.db.add(movement)
+            movements.append(movement)
+            record_product_change(self.db, product, "StockReduced")
+
+        self.db.commit()
+
+        for product, movement in zip(products, movements):
+            result.applied.append(
+                schemas.BulkStockReductionLine(
+                    product_id=product.id,
+                    quantite=quantities[product.id],
+                    new_stock=product.quantite_stock,
+                    movement_id=movement.id,
+                )
+            )
+            self._check_stock_alerts(product)
+
+        logger.info(
+            f"📦 Bulk stock reduction {reduction.reference}: "
+            f"{len(result.applied)} products, {len(result.missing)} missing"
+        )
+        return result
+
     def increase_stock(
         self,
         product_id: int,
@@ -291,6 +817,7 @@ class StockService:
         product.quantite_stock += quantity
 
         self.db.add(movement)
+        record_product_change(self.db, product, "StockIncreased")
         self.db.commit()
         self.db.refresh(product)
 
@@ -497,3 +1024,224 @@ class StockService:
             )
             self.db.add(alert)
             self.db.commit()
+
+
+class ReservationService:
+    """Réservations temporaires de stock (holds) pour les sagas et paniers"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_reservation(self, reservation_id: int) -> Optional[models.StockReservation]:
+        """Récupérer une réservation par son ID"""
+        return (
+            self.db.query(models.StockReservation)
+            .filter(models.StockReservation.id == reservation_id)
+            .first()
+        )
+
+    def get_reservation_by_reference(
+        self, reference: str
+    ) -> Optional[models.StockReservation]:
+        """Récupérer la réservation la plus récente pour une référence externe"""
+        return (
+            self.db.query(models.StockReservation)
+            .filter(models.StockReservation.reference == reference)
+            .order_by(models.StockReservation.id.desc())
+            .first()
+        )
+
+    def create_reservation(
+        self, reservation: schemas.StockReservationCreate
+    ) -> Optional[models.StockReservation]:
+        """Retenir du stock pour plusieurs lignes (tout ou rien)"""
+        # Idempotence : une saga qui rejoue sa réservation retrouve la même
+        # (active ou déjà confirmée) ; une réservation libérée ou expirée
+        # laisse place à une nouvelle
+        if reservation.reference:
+            existing = self.get_reservation_by_reference(reservation.reference)
+            if existing and (
+                self._is_active(existing) or existing.statut == "confirmee"
+            ):
+                return existing
+            if existing and existing.statut == "active":
+                # Échue mais pas encore balayée : libère la référence
+                existing.statut = "expiree"
+                existing.date_cloture = _utcnow()
+
+        # Regrouper les lignes par produit
+        requested: Dict[int, int] = {}
+        for line in reservation.lines:
+            requested[line.product_id] = (
+                requested.get(line.product_id, 0) + line.quantite
+            )
+
+        # Verrouiller les produits dans un ordre stable pour éviter les interblocages
+        products = (
+            self.db.query(models.Product)
+            .filter(models.Product.id.in_(requested.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .all()
+        )
+        if len(products) != len(requested):
+            self.db.rollback()
+            return None
+
+        reserved = get_reserved_quantities(self.db, requested.keys())
+        for product in products:
+            available = product.quantite_stock - reserved.get(product.id, 0)
+            if available < requested[product.id]:
+                self.db.rollback()
+                raise InsufficientStockError(
+                    product.id, requested[product.id], max(available, 0)
+                )
+
+        db_reservation = models.StockReservation(
+            reference=reservation.reference,
+            statut="active",
+            date_expiration=_utcnow() + timedelta(seconds=reservation.ttl_seconds),
+            lines=[
+                models.StockReservationLine(product_id=product_id, quantite=quantite)
+                for product_id, quantite in requested.items()
+            ],
+        )
+        self.db.add(db_reservation)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Création concurrente de la même référence : la gagnante est servie
+            self.db.rollback()
+            winner = self.get_reservation_by_reference(reservation.reference)
+            if winner and self._is_active(winner):
+                return winner
+            raise ReservationStateError(
+                f"Reservation {reservation.reference} is being created concurrently"
+            )
+        self.db.refresh(db_reservation)
+
+        logger.info(
+            f"🔒 Reservation {db_reservation.id} created for {len(requested)} products"
+        )
+        return db_reservation
+
+    def confirm_reservation(
+        self, reservation_id: int
+    ) -> Optional[models.StockReservation]:
+        """Confirmer une réservation : le stock retenu est décrémenté"""
+        reservation = self.get_reservation(reservation_id)
+        if not reservation:
+            return None
+        if reservation.statut == "confirmee":
+            return reservation
+        if not self._is_active(reservation):
+            raise ReservationStateError(
+                f"Reservation {reservation_id} is {self._effective_status(reservation)}"
+            )
+
+        quantities = {line.product_id: line.quantite for line in reservation.lines}
+        products = (
+            self.db.query(models.Product)
+            .filter(models.Product.id.in_(quantities.keys()))
+            .order_by(models.Product.id)
+            .with_for_update()
+            .all()
+        )
+
+        reference = reservation.reference or f"reservation_{reservation.id}"
+        for product in products:
+            quantite = quantities[product.id]
+            product.quantite_stock = max(product.quantite_stock - quantite, 0)
+            self.db.add(
+                models.StockMovement(
+                    product_id=product.id,
+                    type_mouvement="sortie",
+                    quantite=quantite,
+                    raison="reservation_confirmee",
+                    reference=reference,
+                    utilisateur="system",
+                )
+            )
+            record_product_change(self.db, product, "StockReduced")
+
+        reservation.statut = "confirmee"
+        reservation.date_cloture = _utcnow()
+        self.db.commit()
+        self.db.refresh(reservation)
+
+        for product in products:
+            StockService(self.db)._check_stock_alerts(product)
+
+        logger.info(f"✅ Reservation {reservation_id} confirmed")
+        return reservation
+
+    def release_reservation(
+        self, reservation_id: int
+    ) -> Optional[models.StockReservation]:
+        """Libérer une réservation (compensation) sans toucher au stock"""
+        reservation = self.get_reservation(reservation_id)
+        if not reservation:
+            return None
+        if reservation.statut == "confirmee":
+            raise ReservationStateError(
+                f"Reservation {reservation_id} is already confirmed"
+            )
+        if reservation.statut != "active":
+            return reservation
+
+        reservation.statut = "liberee"
+        reservation.date_cloture = _utcnow()
+        self.db.commit()
+        self.db.refresh(reservation)
+
+        logger.info(f"🔓 Reservation {reservation_id} released")
+        return reservation
+
+    def expire_reservations(self, batch_size: int = 500) -> int:
+        """Marquer les réservations échues comme expirées, par lots"""
+        expired = 0
+        while True:
+            now = _utcnow()
+            ids = [
+                row.id
+                for row in self.db.query(models.StockReservation.id)
+                .filter(
+                    models.StockReservation.statut == "active",
+                    models.StockReservation.date_expiration <= now,
+                )
+                .limit(batch_size)
+                .all()
+            ]
+            if not ids:
+                break
+
+            expired += (
+                self.db.query(models.StockReservation)
+                .filter(
+                    models.StockReservation.id.in_(ids),
+                    models.StockReservation.statut == "active",
+                )
+                .update(
+                    {"statut": "expiree", "date_cloture": now},
+                    synchronize_session=False,
+                )
+            )
+            self.db.commit()
+
+            if len(ids) < batch_size:
+                break
+
+        if expired:
+            logger.info(f"⏳ {expired} stock reservations expired")
+        return expired
+
+    def _is_active(self, reservation: models.StockReservation) -> bool:
+        return (
+            reservation.statut == "active"
+            and _as_naive_utc(reservation.date_expiration) > _utcnow()
+        )
+
+    def _effective_status(self, reservation: models.StockReservation) -> str:
+        if reservation.statut == "active" and not self._is_active(reservation):
+            return "expiree"
+        return reservation.statut
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import status
+
+
+@pytest.fixture
+def product(client):
+    category = client.post("/api/v1/categories/", json={"nom": "Cache"}).json()
+    response = client.post(
+        "/api/v1/products/",
+        json={
+            "code": "ETAG-001",
+            "nom": "Produit ETag",
+            "prix": 3.0,
+            "quantite_stock": 5,
+            "categorie_id": category["id"],
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+class TestConditionalRequests:
+    def test_get_product_returns_304_when_unchanged(self, client, product):
+        url = f"/api/v1/products/{product['id']}"
+        first = client.get(url)
+        assert first.status_code == status.HTTP_200_OK
+        etag = first.headers["etag"]
+        assert first.headers["last-modified"]
+
+        second = client.get(url, headers={"If-None-Match": etag})
+        assert second.status_code == status.HTTP_304_NOT_MODIFIED
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+    def test_product_etag_changes_on_stock_and_category_update(self, client, product):
+        url = f"/api/v1/products/{product['id']}"
+        etag = client.get(url).headers["etag"]
+
+        client.put(
+            f"/api/v1/stock/products/{product['id']}/stock/increase",
+            params={"quantity": 1},
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["quantite_stock"] == 6
+        etag = response.headers["etag"]
+
+        client.put(
+            f"/api/v1/categories/{product['categorie_id']}", json={"nom": "Renommée"}
+        )
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["category"]["nom"] == "Renommée"
+
+    def test_product_list_and_categories_conditional(self, client, product):
+        for url in ("/api/v1/products/?limit=10", "/api/v1/categories/"):
+            etag = client.get(url).headers["etag"]
+            response = client.get(url, headers={"If-None-Match": f'"x", {etag}'})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        etag = client.get("/api/v1/products/?limit=10").headers["etag"]
+        client.put(f"/api/v1/products/{product['id']}", json={"prix": 4.0})
+        response = client.get(
+            "/api/v1/products/?limit=10", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        etag = client.get("/api/v1/categories/").headers["etag"]
+        client.post("/api/v1/categories/", json={"nom": "Nouvelle"})
+        response = client.get("/api/v1/categories/", headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == 2
+
+    def test_if_modified_since(self, client, product):
+        url = f"/api/v1/products/{product['id']}"
+        last_modified = client.get(url).headers["last-modified"]
+        response = client.get(url, headers={"If-Modified-Since": last_modified})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = client.get(
+            url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+        )
+        assert response.status_code == status.HTTP_200_OK
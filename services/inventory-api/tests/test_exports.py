@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from src.models import Category, Product, StockMovement
+
+
+@pytest.fixture
+def catalog(db_session):
+    category = Category(nom="Export")
+    db_session.add(category)
+    db_session.flush()
+    products = [
+        Product(
+            code=f"EXP-{index:03d}",
+            nom=f"Produit {index}",
+            prix=1.5 + index,
+            quantite_stock=index,
+            categorie_id=category.id,
+            actif=index % 2 == 0,
+        )
+        for index in range(3)
+    ]
+    db_session.add_all(products)
+    db_session.flush()
+    db_session.add_all(
+        [
+            StockMovement(
+                product_id=products[0].id,
+                type_mouvement="entree",
+                quantite=10,
+                raison="reapprovisionnement",
+                date_mouvement=datetime(2024, 1, 10),
+            ),
+            StockMovement(
+                product_id=products[0].id,
+                type_mouvement="sortie",
+                quantite=2,
+                raison="vente",
+                date_mouvement=datetime(2024, 2, 5),
+            ),
+            StockMovement(
+                product_id=products[1].id,
+                type_mouvement="sortie",
+                quantite=1,
+                raison="vente",
+                date_mouvement=datetime(2024, 2, 20),
+            ),
+        ]
+    )
+    db_session.commit()
+    return products
+
+
+class TestExports:
+    def test_export_products_ndjson(self, client, catalog):
+        response = client.get("/api/v1/products/export")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["code"] for row in rows] == ["EXP-000", "EXP-001", "EXP-002"]
+        assert rows[1]["quantite_stock"] == 1
+
+    def test_export_products_csv_with_filter(self, client, catalog):
+        response = client.get(
+            "/api/v1/products/export", params={"format": "csv", "actif": True}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [row["code"] for row in rows] == ["EXP-000", "EXP-002"]
+
+    def test_export_stock_movements_filters(self, client, catalog):
+        response = client.get(
+            "/api/v1/stock/movements/export",
+            params={
+                "type_mouvement": "sortie",
+                "date_from": "2024-02-01T00:00:00",
+                "date_to": "2024-02-15T00:00:00",
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 1
+        assert rows[0]["product_id"] == catalog[0].id
+        assert rows[0]["quantite"] == 2
+        assert rows[0]["date_mouvement"].startswith("2024-02-05")
+
+    def test_export_stock_movements_csv_empty(self, client, catalog):
+        response = client.get(
+            "/api/v1/stock/movements/export",
+            params={"format": "csv", "product_id": 999},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.text.strip() == (
+            "id,product_id,type_mouvement,quantite,raison,reference,"
+            "date_mouvement,utilisateur"
+        )
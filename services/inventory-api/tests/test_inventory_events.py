@@ -0,0 +1,182 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+
+import src.models as models
+from src.events import EventPublisher, OutboxRelay
+
+
+class RecordingPublisher:
+    enabled = True
+
+    def __init__(self, fail_after=None):
+        self.events = []
+        self.fail_after = fail_after
+
+    def publish(self, event):
+        if self.fail_after is not None and len(self.events) >= self.fail_after:
+            raise ConnectionError("redis down")
+        self.events.append(event)
+        return f"{len(self.events)}-0"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.entries = []
+
+    def ping(self):
+        return True
+
+    def xadd(self, stream, fields, **kwargs):
+        self.entries.append((stream, fields))
+        return f"{len(self.entries)}-0"
+
+
+def create_product(client, code, quantite_stock=10):
+    response = client.post(
+        "/api/v1/products/",
+        json={
+            "nom": f"Produit {code}",
+            "prix": 5.0,
+            "categorie_id": 1,
+            "code": code,
+            "quantite_stock": quantite_stock,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def outbox(db_session):
+    return (
+        db_session.query(models.InventoryOutboxEvent)
+        .order_by(models.InventoryOutboxEvent.id)
+        .all()
+    )
+
+
+class TestInventoryEvents:
+    def test_writes_are_recorded_in_outbox_with_versions(self, client, db_session):
+        product_id = create_product(client, "EVT-001", 10)
+
+        client.put(
+            f"/api/v1/stock/products/{product_id}/stock/reduce", params={"quantity": 3}
+        )
+        client.put(
+            f"/api/v1/stock/products/{product_id}/stock/increase",
+            params={"quantity": 5},
+        )
+        client.put(
+            f"/api/v1/products/{product_id}/stock/adjust",
+            json={"quantite": -2, "raison": "inventaire"},
+        )
+        client.put(f"/api/v1/products/{product_id}", json={"prix": 7.5})
+
+        events = outbox(db_session)
+        assert [event.event_type for event in events] == [
+            "ProductCreated",
+            "StockReduced",
+            "StockIncreased",
+            "StockAdjusted",
+            "ProductUpdated",
+        ]
+        assert [event.version for event in events] == [1, 2, 3, 4, 5]
+
+        last = json.loads(events[-1].payload)
+        assert last["aggregate_id"] == str(product_id)
+        assert last["data"] == {
+            "product_id": product_id,
+            "code": "EVT-001",
+            "quantite_stock": 10,
+            "prix": 7.5,
+            "actif": True,
+            "version": 5,
+        }
+
+    def test_failed_write_does_not_emit_event(self, client, db_session):
+        product_id = create_product(client, "EVT-002", 1)
+
+        response = client.put(
+            f"/api/v1/stock/products/{product_id}/stock/reduce", params={"quantity": 5}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert [event.event_type for event in outbox(db_session)] == ["ProductCreated"]
+
+    def test_import_records_one_event_per_upserted_product(self, client, db_session):
+        category = client.post("/api/v1/categories/", json={"nom": "Import"}).json()
+        product_id = create_product(client, "EVT-IMP-1", 4)
+        rows = [
+            {"code": code, "nom": code, "prix": 2.0, "categorie_id": category["id"]}
+            for code in ("EVT-IMP-1", "EVT-IMP-2")
+        ]
+        response = client.post(
+            "/api/v1/products/import",
+            content="\n".join(json.dumps(row) for row in rows),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.json()["upserted"] == 2
+
+        events = {
+            (event.product_id, event.event_type, event.version)
+            for event in outbox(db_session)[1:]
+        }
+        created_id = db_session.query(models.Product.id).filter_by(code="EVT-IMP-2")
+        assert events == {
+            (product_id, "ProductUpdated", 2),
+            (created_id.scalar(), "ProductCreated", 1),
+        }
+        payload = json.loads(outbox(db_session)[-1].payload)
+        assert payload["data"]["prix"] == 2.0
+
+    def test_relay_publishes_in_order_and_stops_on_failure(self, client, db_session):
+        product_id = create_product(client, "EVT-003", 10)
+        for _ in range(3):
+            client.put(
+                f"/api/v1/stock/products/{product_id}/stock/increase",
+                params={"quantity": 1},
+            )
+
+        session_factory = sessionmaker(bind=db_session.get_bind())
+        failing = RecordingPublisher(fail_after=2)
+        assert OutboxRelay(session_factory, failing).relay_pending() == 2
+
+        publisher = RecordingPublisher()
+        assert OutboxRelay(session_factory, publisher).relay_pending() == 2
+        assert [event["data"]["version"] for event in publisher.events] == [3, 4]
+
+        db_session.expire_all()
+        assert all(event.date_publication for event in outbox(db_session))
+        assert OutboxRelay(session_factory, publisher).relay_pending() == 0
+
+    def test_relay_skips_while_another_replica_holds_the_lock(self, client, db_session):
+        create_product(client, "EVT-005", 10)
+        session_factory = sessionmaker(bind=db_session.get_bind())
+        publisher = RecordingPublisher()
+
+        with patch.object(OutboxRelay, "_lock", return_value=False):
+            assert OutboxRelay(session_factory, publisher).relay_pending() == 0
+        assert publisher.events == []
+
+        assert OutboxRelay(session_factory, publisher).relay_pending() == 1
+
+    def test_relay_connects_once_redis_is_back(self, client, db_session):
+        create_product(client, "EVT-004", 10)
+        session_factory = sessionmaker(bind=db_session.get_bind())
+        redis_client = FakeRedis()
+        with patch(
+            "src.events.redis.from_url",
+            side_effect=[ConnectionError("redis down"), redis_client],
+        ):
+            publisher = EventPublisher()
+            relay = OutboxRelay(session_factory, publisher)
+            # Redis absent au démarrage : rien n'est publié, rien n'est perdu
+            assert relay.relay_pending() == 0
+            assert relay.relay_pending() == 1
+
+        assert len(redis_client.entries) == 1
+        assert all(
+            stream == publisher.stream_name for stream, _ in redis_client.entries
+        )
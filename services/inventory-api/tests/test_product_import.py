@@ -0,0 +1,130 @@
+import json
+import pytest
+from fastapi import status
+
+
+@pytest.fixture
+def category_id(client):
+    response = client.post("/api/v1/categories/", json={"nom": "Import"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+
+class TestProductImport:
+    def test_import_ndjson_inserts_and_upserts_on_code(self, client, category_id):
+        existing = client.post(
+            "/api/v1/products/",
+            json={
+                "code": "IMP-001",
+                "nom": "Ancien nom",
+                "prix": 1.0,
+                "quantite_stock": 7,
+                "categorie_id": category_id,
+            },
+        ).json()
+
+        payload = ndjson(
+            [
+                {
+                    "code": "IMP-001",
+                    "nom": "Nouveau nom",
+                    "prix": 2.5,
+                    "quantite_stock": 100,
+                    "categorie_id": category_id,
+                },
+                {
+                    "code": "IMP-002",
+                    "nom": "Produit importé",
+                    "prix": 3.0,
+                    "quantite_stock": 12,
+                    "categorie_id": category_id,
+                },
+            ]
+        )
+        response = client.post(
+            "/api/v1/products/import?chunk_size=1",
+            content=payload,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert report["format"] == "ndjson"
+        assert report["processed"] == 2
+        assert report["upserted"] == 2
+        assert report["failed"] == 0
+        assert report["chunks"] == 2
+
+        updated = client.get(f"/api/v1/products/{existing['id']}").json()
+        assert updated["nom"] == "Nouveau nom"
+        assert updated["prix"] == 2.5
+        # Le stock d'un produit existant n'est pas écrasé par l'import
+        assert updated["quantite_stock"] == 7
+
+        products = client.get("/api/v1/products/", params={"search": "IMP-002"})
+        assert products.json()["items"][0]["quantite_stock"] == 12
+
+    def test_import_reports_row_errors(self, client, category_id):
+        payload = (
+            ndjson(
+                [
+                    {
+                        "code": "IMP-010",
+                        "nom": "Ok",
+                        "prix": 1.0,
+                        "categorie_id": category_id,
+                    },
+                    {
+                        "code": "IMP-011",
+                        "nom": "Prix invalide",
+                        "prix": -1,
+                        "categorie_id": category_id,
+                    },
+                    {
+                        "code": "IMP-012",
+                        "nom": "Sans catégorie",
+                        "prix": 1.0,
+                        "categorie_id": 999,
+                    },
+                ]
+            )
+            + "{not json}\n"
+        )
+        response = client.post(
+            "/api/v1/products/import",
+            content=payload,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        report = response.json()
+        assert report["upserted"] == 1
+        assert report["failed"] == 3
+        assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+        assert report["errors"][0]["code"] == "IMP-011"
+
+    def test_import_csv(self, client, category_id):
+        payload = (
+            "code,nom,description,prix,quantite_stock,categorie_id,actif\n"
+            f"CSV-001,Produit CSV,,4.20,5,{category_id},true\n"
+            f'CSV-002,"Nom, avec virgule",Desc,1.10,,{category_id},false\n'
+            f"CSV-003,Prix manquant,,,1,{category_id},true\n"
+        )
+        response = client.post(
+            "/api/v1/products/import",
+            content=payload,
+            headers={"Content-Type": "text/csv"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert report["format"] == "csv"
+        assert report["upserted"] == 2
+        assert report["failed"] == 1
+        assert report["errors"][0]["line"] == 4
+
+        products = client.get("/api/v1/products/", params={"search": "CSV-002"})
+        item = products.json()["items"][0]
+        assert item["nom"] == "Nom, avec virgule"
+        assert item["actif"] is False
+        assert item["quantite_stock"] == 0
@@ -49,3 +49,21 @@ class TestProducts:
     def test_delete_product_not_found(self, client):
         response = client.delete("/api/v1/products/999")
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_get_products_by_ids(self, client):
+        ids = []
+        for code in ("IDS-001", "IDS-002", "IDS-003"):
+            response = client.post(
+                "/api/v1/products/",
+                json={"nom": code, "prix": 1.0, "categorie_id": 2, "code": code},
+            )
+            ids.append(response.json()["id"])
+
+        response = client.get(
+            "/api/v1/products/", params={"ids": f"{ids[2]},{ids[0]},999999"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [p["id"] for p in response.json()["items"]] == [ids[0], ids[2]]
+
+        response = client.get("/api/v1/products/", params={"ids": "1,abc"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
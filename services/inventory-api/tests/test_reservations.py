@@ -0,0 +1,219 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi import status
+
+import src.models as models
+import src.schemas as schemas
+from src.services import ReservationService
+
+
+def create_product(client, code, quantite_stock):
+    response = client.post(
+        "/api/v1/products/",
+        json={
+            "nom": f"Produit {code}",
+            "prix": 5.0,
+            "categorie_id": 1,
+            "code": code,
+            "quantite_stock": quantite_stock,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+class TestReservations:
+    def test_create_reservation_holds_available_stock(self, client):
+        product_id = create_product(client, "RES-001", 10)
+
+        response = client.post(
+            "/api/v1/reservations/",
+            json={"lines": [{"product_id": product_id, "quantite": 4}]},
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["statut"] == "active"
+
+        stock = client.get(f"/api/v1/products/{product_id}/stock").json()
+        assert stock["quantite_stock"] == 10
+        assert stock["quantite_reservee"] == 4
+        assert stock["quantite_disponible"] == 6
+
+    def test_create_reservation_insufficient_stock(self, client):
+        first = create_product(client, "RES-002", 10)
+        second = create_product(client, "RES-003", 1)
+
+        response = client.post(
+            "/api/v1/reservations/",
+            json={
+                "lines": [
+                    {"product_id": first, "quantite": 2},
+                    {"product_id": second, "quantite": 3},
+                ]
+            },
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+        # Tout ou rien : aucune ligne n'est retenue
+        stock = client.get(f"/api/v1/products/{first}/stock").json()
+        assert stock["quantite_reservee"] == 0
+
+    def test_create_reservation_unknown_product(self, client):
+        response = client.post(
+            "/api/v1/reservations/",
+            json={"lines": [{"product_id": 999, "quantite": 1}]},
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_reservation_is_idempotent_by_reference(self, client):
+        product_id = create_product(client, "RES-004", 10)
+        payload = {
+            "lines": [{"product_id": product_id, "quantite": 3}],
+            "reference": "saga_abc",
+        }
+
+        first = client.post("/api/v1/reservations/", json=payload).json()
+        second = client.post("/api/v1/reservations/", json=payload).json()
+        assert first["id"] == second["id"]
+
+    def test_release_reservation_restores_availability(self, client):
+        product_id = create_product(client, "RES-005", 5)
+        reservation = client.post(
+            "/api/v1/reservations/",
+            json={"lines": [{"product_id": product_id, "quantite": 5}]},
+        ).json()
+
+        reduce_response = client.put(
+            f"/api/v1/stock/products/{product_id}/stock/reduce",
+            params={"quantity": 1},
+        )
+        assert reduce_response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = client.post(f"/api/v1/reservations/{reservation['id']}/release")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["statut"] == "liberee"
+
+        stock = client.get(f"/api/v1/products/{product_id}/stock").json()
+        assert stock["quantite_stock"] == 5
+        assert stock["quantite_disponible"] == 5
+
+    def test_confirm_reservation_decrements_stock(self, client):
+        product_id = create_product(client, "RES-006", 8)
+        reservation = client.post(
+            "/api/v1/reservations/",
+            json={"lines": [{"product_id": product_id, "quantite": 3}]},
+        ).json()
+
+        response = client.post(f"/api/v1/reservations/{reservation['id']}/confirm")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["statut"] == "confirmee"
+
+        stock = client.get(f"/api/v1/products/{product_id}/stock").json()
+        assert stock["quantite_stock"] == 5
+        assert stock["quantite_reservee"] == 0
+
+        release = client.post(f"/api/v1/reservations/{reservation['id']}/release")
+        assert release.status_code == status.HTTP_409_CONFLICT
+
+    def test_release_by_reference(self, client):
+        product_id = create_product(client, "RES-007", 4)
+        client.post(
+            "/api/v1/reservations/",
+            json={
+                "lines": [{"product_id": product_id, "quantite": 2}],
+                "reference": "order_42",
+            },
+        )
+
+        response = client.post("/api/v1/reservations/by-reference/order_42/release")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["statut"] == "liberee"
+
+    def test_expired_reservations_are_swept(self, client, db_session):
+        product_id = create_product(client, "RES-008", 6)
+        reservation = client.post(
+            "/api/v1/reservations/",
+            json={"lines": [{"product_id": product_id, "quantite": 6}]},
+        ).json()
+
+        db_reservation = db_session.get(models.StockReservation, reservation["id"])
+        db_reservation.date_expiration = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+
+        # Une réservation échue ne retient plus de stock, même avant le balayage
+        stock = client.get(f"/api/v1/products/{product_id}/stock").json()
+        assert stock["quantite_disponible"] == 6
+
+        response = client.post("/api/v1/reservations/expire")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["expired"] == 1
+
+        confirm = client.post(f"/api/v1/reservations/{reservation['id']}/confirm")
+        assert confirm.status_code == status.HTTP_409_CONFLICT
+
+    def test_reference_can_be_reserved_again_after_release(self, client):
+        product_id = create_product(client, "RES-009", 5)
+        payload = {
+            "lines": [{"product_id": product_id, "quantite": 3}],
+            "reference": "saga_x",
+        }
+        first = client.post("/api/v1/reservations/", json=payload).json()
+        client.post(f"/api/v1/reservations/{first['id']}/release")
+
+        again = client.post("/api/v1/reservations/", json=payload)
+        assert again.status_code == status.HTTP_201_CREATED
+        assert again.json()["id"] != first["id"]
+        assert again.json()["statut"] == "active"
+
+    def test_reference_can_be_reserved_again_after_expiry(self, client, db_session):
+        product_id = create_product(client, "RES-010", 5)
+        payload = {
+            "lines": [{"product_id": product_id, "quantite": 3}],
+            "reference": "order_7",
+        }
+        first = client.post("/api/v1/reservations/", json=payload).json()
+        db_reservation = db_session.get(models.StockReservation, first["id"])
+        db_reservation.date_expiration = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+
+        # Échue mais pas encore balayée
+        again = client.post("/api/v1/reservations/", json=payload)
+        assert again.status_code == status.HTTP_201_CREATED
+        assert again.json()["id"] != first["id"]
+        db_session.expire_all()
+        assert db_session.get(models.StockReservation, first["id"]).statut == "expiree"
+
+    def test_confirmed_reference_is_returned_on_retry(self, client):
+        product_id = create_product(client, "RES-011", 5)
+        payload = {
+            "lines": [{"product_id": product_id, "quantite": 2}],
+            "reference": "saga_y",
+        }
+        first = client.post("/api/v1/reservations/", json=payload).json()
+        client.post(f"/api/v1/reservations/{first['id']}/confirm")
+
+        retry = client.post("/api/v1/reservations/", json=payload).json()
+        assert (retry["id"], retry["statut"]) == (first["id"], "confirmee")
+        stock = client.get(f"/api/v1/products/{product_id}/stock").json()
+        assert (stock["quantite_stock"], stock["quantite_reservee"]) == (3, 0)
+
+    def test_concurrent_create_returns_the_winner(self, client, db_session):
+        product_id = create_product(client, "RES-012", 5)
+        payload = {
+            "lines": [{"product_id": product_id, "quantite": 1}],
+            "reference": "saga_race",
+        }
+        winner = client.post("/api/v1/reservations/", json=payload).json()
+
+        service = ReservationService(db_session)
+        lookup = service.get_reservation_by_reference
+        # La création concurrente ne voyait pas encore la gagnante
+        with patch.object(
+            service,
+            "get_reservation_by_reference",
+            side_effect=[None, lookup("saga_race")],
+        ):
+            reservation = service.create_reservation(
+                schemas.StockReservationCreate(**payload)
+            )
+        assert reservation.id == winner["id"]
@@ -43,3 +43,51 @@ class TestStock:
         update_data = {"quantite": 50}
         response = client.put("/api/v1/stock/999", json=update_data)
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def create_product(client, code, quantite_stock):
+    response = client.post(
+        "/api/v1/products/",
+        json={
+            "nom": f"Produit {code}",
+            "prix": 5.0,
+            "categorie_id": 1,
+            "code": code,
+            "quantite_stock": quantite_stock,
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["id"]
+
+
+class TestBulkStockReduction:
+    def test_aggregates_per_product_and_is_idempotent(self, client):
+        first = create_product(client, "BULK-001", 10)
+        second = create_product(client, "BULK-002", 1)
+        payload = {
+            "reference": "sale_1",
+            "items": [
+                {"product_id": first, "quantite": 2},
+                {"product_id": second, "quantite": 3},
+                {"product_id": first, "quantite": 1},
+                {"product_id": 999, "quantite": 1},
+            ],
+        }
+
+        response = client.post("/api/v1/stock/reduce/bulk", json=payload)
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        assert result["deja_traite"] is False
+        assert {
+            line["product_id"]: line["new_stock"] for line in result["applied"]
+        } == {
+            first: 7,
+            second: 0,
+        }
+        assert result["missing"] == [999]
+        assert result["insuffisants"] == [second]
+
+        replay = client.post("/api/v1/stock/reduce/bulk", json=payload).json()
+        assert replay["deja_traite"] is True
+        stock = client.get(f"/api/v1/products/{first}/stock").json()
+        assert stock["quantite_stock"] == 7
@@ -18,6 +18,7 @@ PAYMENTS_STREAM = os.getenv("PAYMENTS_EVENT_STREAM", "ecommerce.payments.events"
 EVENT_BUS_URL = os.getenv("EVENT_BUS_URL", "redis://redis:6379/0")
 INVENTORY_API = os.getenv("INVENTORY_API_URL", "http://inventory-api:8001")
 GROUP = os.getenv("EVENT_GROUP", "inventory-saga")
+RESERVATION_TTL_SECONDS = int(os.getenv("STOCK_RESERVATION_TTL_SECONDS", "900"))
 
 
 def publish(client: redis.Redis, stream: str, event: Dict) -> None:
@@ -27,29 +28,45 @@ def publish(client: redis.Redis, stream: str, event: Dict) -> None:
         logger.warning(f"Failed to publish to {stream}: {e}")
 
 
-async def reserve_items(items: List[Dict]) -> bool:
+def reservation_reference(order_id) -> str:
+    return f"order_{order_id}"
+
+
+async def reserve_items(order_id, items: List[Dict]) -> bool:
+    """Retient le stock de la commande en une seule réservation temporaire"""
+    lines = [
+        {"product_id": it.get("product_id"), "quantite": it.get("quantity", 0)}
+        for it in items
+        if it.get("quantity", 0) > 0
+    ]
+    if not lines:
+        return True
+    async with httpx.AsyncClient() as client:
+        resp = await client.post(
+            f"{INVENTORY_API}/api/v1/reservations/",
+            json={
+                "lines": lines,
+                "ttl_seconds": RESERVATION_TTL_SECONDS,
+                "reference": reservation_reference(order_id),
+            },
+        )
+    return resp.status_code == 201
+
+
+async def confirm_items(order_id) -> bool:
     async with httpx.AsyncClient() as client:
-        for it in items:
-            product_id = it.get("product_id")
-            qty = it.get("quantity", 0)
-            resp = await client.put(
-                f"{INVENTORY_API}/api/v1/stock/products/{product_id}/stock/reduce",
-                params={"quantity": qty, "raison": "order_reservation", "reference": f"order_{int(time.time())}"},
-            )
-            if resp.status_code != 200:
-                return False
-    return True
-
-
-async def compensate_items(items: List[Dict]) -> None:
+        resp = await client.post(
+            f"{INVENTORY_API}/api/v1/reservations/by-reference/{reservation_reference(order_id)}/confirm"
+        )
+    return resp.status_code == 200
+
+
+async def compensate_items(order_id) -> None:
+    # Compensation = libération de la réservation, aucun mouvement de stock
     async with httpx.AsyncClient() as client:
-        for it in items:
-            product_id = it.get("product_id")
-            qty = it.get("quantity", 0)
-            await client.put(
-                f"{INVENTORY_API}/api/v1/stock/products/{product_id}/stock/increase",
-                params={"quantity": qty, "raison": "order_compensation", "reference": f"comp_{int(time.time())}"},
-            )
+        await client.post(
+            f"{INVENTORY_API}/api/v1/reservations/by-reference/{reservation_reference(order_id)}/release"
+        )
 
 
 def consume_forever():
@@ -84,7 +101,9 @@ def consume_forever():
                         if stream == ORDERS_STREAM and etype == "OrderCreated":
                             # Try to reserve stock
                             import asyncio
-                            ok = asyncio.run(reserve_items(data.get("items", [])))
+                            ok = asyncio.run(
+                                reserve_items(order_id, data.get("items", []))
+                            )
                             out = {
                                 "event_id": f"stock-{int(time.time()*1000)}",
                                 "event_type": "StockReserved" if ok else "StockReservationFailed",
@@ -96,9 +115,18 @@ def consume_forever():
                             }
                             publish(client, ORDERS_STREAM, out)
 
-                        elif stream == PAYMENTS_STREAM and etype == "PaymentFailed":
+                        elif stream == ORDERS_STREAM and etype == "OrderConfirmed":
+                            import asyncio
+                            if not asyncio.run(confirm_items(order_id)):
+                                logger.warning(
+                                    f"Stock reservation for order {order_id} could not be confirmed"
+                                )
+
+                        elif (stream == PAYMENTS_STREAM and etype == "PaymentFailed") or (
+                            stream == ORDERS_STREAM and etype == "OrderCancelled"
+                        ):
                             import asyncio
-                            asyncio.run(compensate_items(data.get("items", [])))
+                            asyncio.run(compensate_items(order_id))
                             out = {
                                 "event_id": f"comp-{int(time.time()*1000)}",
                                 "event_type": "StockCompensated",
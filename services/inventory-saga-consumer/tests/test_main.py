@@ -0,0 +1,99 @@
+import json
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+from src import main
+
+AsyncClient = httpx.AsyncClient
+
+
+class FakeInventory:
+    """Inventaire simulé : enregistre les appels et répond par statut"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.requests = []
+
+    def __call__(self, *args, **kwargs):
+        transport = httpx.MockTransport(self.handle)
+        return AsyncClient(transport=transport)
+
+    def handle(self, request):
+        self.requests.append(request)
+        return httpx.Response(self.status_code, json={})
+
+
+@pytest.fixture
+def inventory():
+    def install(status_code):
+        fake = FakeInventory(status_code)
+        patcher = patch.object(main.httpx, "AsyncClient", fake)
+        patcher.start()
+        installed.append(patcher)
+        return fake
+
+    installed = []
+    yield install
+    for patcher in installed:
+        patcher.stop()
+
+
+class TestReservationCalls:
+    @pytest.mark.asyncio
+    async def test_reserve_holds_the_order_lines_under_its_reference(self, inventory):
+        fake = inventory(201)
+        items = [
+            {"product_id": 1, "quantity": 2},
+            {"product_id": 2, "quantity": 0},
+        ]
+
+        assert await main.reserve_items(42, items)
+
+        (request,) = fake.requests
+        assert request.url.path == "/api/v1/reservations/"
+        body = json.loads(request.content)
+        assert body["reference"] == "order_42"
+        assert body["lines"] == [{"product_id": 1, "quantite": 2}]
+        assert body["ttl_seconds"] == main.RESERVATION_TTL_SECONDS
+
+    @pytest.mark.asyncio
+    async def test_redelivered_order_is_reserved_once(self, inventory):
+        # L'inventaire renvoie la réservation existante pour la même référence
+        fake = inventory(201)
+        items = [{"product_id": 1, "quantity": 1}]
+
+        assert await main.reserve_items(7, items)
+        assert await main.reserve_items(7, items)
+
+        references = {json.loads(r.content)["reference"] for r in fake.requests}
+        assert references == {"order_7"}
+
+    @pytest.mark.asyncio
+    async def test_reserve_fails_on_conflict(self, inventory):
+        inventory(409)
+        assert not await main.reserve_items(3, [{"product_id": 1, "quantity": 5}])
+
+    @pytest.mark.asyncio
+    async def test_reserve_without_lines_skips_inventory(self, inventory):
+        fake = inventory(201)
+        assert await main.reserve_items(3, [])
+        assert fake.requests == []
+
+    @pytest.mark.asyncio
+    async def test_confirm_and_compensate_target_the_order_reference(self, inventory):
+        fake = inventory(200)
+
+        assert await main.confirm_items(9)
+        await main.compensate_items(9)
+
+        assert [r.url.path for r in fake.requests] == [
+            "/api/v1/reservations/by-reference/order_9/confirm",
+            "/api/v1/reservations/by-reference/order_9/release",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_confirm_reports_refusal(self, inventory):
+        inventory(409)
+        assert not await main.confirm_items(9)
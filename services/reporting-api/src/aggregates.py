@@ -0,0 +1,88 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, AsyncIterable, Dict, List, Optional, Tuple
+
+from src.projections import CANCELLED_STATUS
+
+# Sale fields needed to fold a retail sale stream into running totals
+STREAM_FIELDS = "store_id,date_vente,total,statut,sale_lines"
+
+
+class RunningSalesTotals:
+    """Sales totals folded one sale at a time from a streamed sale list.
+
+    Memory grows with the number of stores, days and products, not with the
+    number of sales. Results use the same tuples as ``ReportingService``.
+    """
+
+    def __init__(self):
+        self.stores: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+        self.days: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0, 0.0])
+        self.products: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0, 0])
+
+    @classmethod
+    async def fold(cls, sales: AsyncIterable[Dict[str, Any]]) -> "RunningSalesTotals":
+        totals = cls()
+        async for sale in sales:
+            totals.add(sale)
+        return totals
+
+    def add(self, sale: Dict[str, Any]) -> None:
+        if sale.get("statut") == CANCELLED_STATUS:
+            return
+        total = sale.get("total") or 0.0
+
+        store = self.stores[sale["store_id"]]
+        store[0] += 1
+        store[1] += total
+
+        day = self.days[
+            (sale["store_id"], datetime.fromisoformat(sale["date_vente"]).date())
+        ]
+        day[0] += 1
+        day[1] += total
+
+        for product_id in {line["product_id"] for line in sale.get("sale_lines") or []}:
+            self.products[product_id][2] += 1
+        for line in sale.get("sale_lines") or []:
+            product = self.products[line["product_id"]]
+            product[0] += line.get("quantite", 0)
+            product[1] += line.get("sous_total", 0.0)
+
+    def store_totals(
+        self, store_id: Optional[int] = None
+    ) -> List[Tuple[int, int, float]]:
+        rows = [
+            (sid, count, float(revenue))
+            for sid, (count, revenue) in self.stores.items()
+            if store_id is None or sid == store_id
+        ]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def product_totals(self, limit: int, by: str) -> List[Tuple[int, int, float, int]]:
+        rank = 1 if by == "quantity" else 2
+        rows = [
+            (product_id, quantity, float(revenue), sales_count)
+            for product_id, (quantity, revenue, sales_count) in self.products.items()
+        ]
+        rows.sort(key=lambda row: (-row[rank], row[0]))
+        return rows[:limit]
+
+    def daily_totals(
+        self,
+        since: date,
+        until: Optional[date] = None,
+        store_id: Optional[int] = None,
+    ) -> List[Tuple[date, int, float]]:
+        days: Dict[date, List[float]] = defaultdict(lambda: [0, 0.0])
+        for (sid, day), (count, revenue) in self.days.items():
+            if (
+                day >= since
+                and (until is None or day <= until)
+                and (store_id is None or sid == store_id)
+            ):
+                days[day][0] += count
+                days[day][1] += revenue
+        return sorted(
+            (day, count, float(revenue)) for day, (count, revenue) in days.items()
+        )
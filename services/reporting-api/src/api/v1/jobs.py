@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.orm import Session
+import logging
+
+import src.models as models
+from src.database import get_db
+from src.report_jobs import job_response, report_jobs
+from src.schemas import ReportJobRequest, ReportJobResponse
+
+logger = logging.getLogger("reporting-api")
+
+router = APIRouter()
+
+
+@router.post(
+    "/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED
+)
+async def create_report_job(
+    request: ReportJobRequest, response: Response, db: Session = Depends(get_db)
+):
+    """Compute a report in the background; poll the returned job for the result"""
+    logger.info(f"🧾 Report job requested: {request.report}")
+    try:
+        job, created = report_jobs.submit(db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["Location"] = f"/api/v1/reports/jobs/{job.id}"
+    if not created:
+        response.headers["X-Job-Deduplicated"] = "true"
+    return job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: str, db: Session = Depends(get_db)):
+    """Get a report job's status, progress and (once succeeded) result"""
+    job = db.get(models.ReportJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Report job {job_id} not found")
+    return job_response(job)
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 import logging
 
+from src.database import get_db
+from src.report_cache import report_cache
+from src.rollups import DateBound, TimeRange
 from src.services import ReportingService
 from src.schemas import (
     GlobalSummaryResponse,
+    SaleDistributionResponse,
     StorePerformanceResponse,
     TopProductResponse,
 )
@@ -14,122 +19,327 @@ logger = logging.getLogger("reporting-api")
 
 router = APIRouter()
 
+DEGRADED_HEADER = "X-Report-Degraded"
 
-# Dependency to get database session (not needed for reporting API)
-def get_db():
-    return None
+APPROXIMATE_DESCRIPTION = (
+    "Estimate from the streaming heavy-hitter sketches (whole days, "
+    "flagged 'approximate') instead of summing every product"
+)
+
+
+def report_time_range(
+    start_date: Optional[DateBound] = Query(
+        None, description="First day (YYYY-MM-DD) or instant (ISO 8601), inclusive"
+    ),
+    end_date: Optional[DateBound] = Query(
+        None, description="Last day or instant, inclusive"
+    ),
+) -> Optional[TimeRange]:
+    """Report date range; a datetime bound is widened to its whole hour"""
+    try:
+        return TimeRange.from_bounds(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _range_params(time_range: Optional[TimeRange]) -> Dict[str, Any]:
+    return time_range.params() if time_range else {}
+
+
+async def _cached_report(
+    report: str,
+    params: Dict[str, Any],
+    response: Response,
+    db: Session,
+    build: Callable[[ReportingService], Awaitable[Any]],
+):
+    """Serve ``report`` from the report cache, computing it on a miss.
+
+    The computation gets its own session: a stale entry is refreshed in the
+    background, after the request session is closed. Partial reports (an
+    upstream failed or missed the deadline) are flagged with a header.
+    """
+    bind = db.get_bind()
+
+    async def compute():
+        session = Session(bind=bind, autoflush=False)
+        try:
+            service = ReportingService(session)
+            return await build(service), list(service.degraded)
+        finally:
+            session.close()
+
+    value, degraded = await report_cache.get(report, params, compute)
+    if degraded:
+        response.headers[DEGRADED_HEADER] = ",".join(degraded)
+    return value
+
+
+# One cache entry: report name, cache parameters and computation
+ReportSpec = Tuple[str, Dict[str, Any], Callable[[ReportingService], Awaitable[Any]]]
+
+
+def _store_performances_report(time_range: Optional[TimeRange] = None) -> ReportSpec:
+    return (
+        "store-performances",
+        _range_params(time_range),
+        lambda service: service.get_store_performances(time_range),
+    )
+
+
+def _top_products_report(
+    limit: int = 10,
+    by: str = "revenue",
+    time_range: Optional[TimeRange] = None,
+    store_id: Optional[int] = None,
+    approximate: bool = False,
+) -> ReportSpec:
+    return (
+        "top-products",
+        {
+            "limit": limit,
+            "by": by,
+            "store_id": store_id,
+            "approximate": approximate,
+            **_range_params(time_range),
+        },
+        lambda service: service.get_top_products(
+            limit,
+            by=by,
+            time_range=time_range,
+            store_id=store_id,
+            approximate=approximate,
+        ),
+    )
+
+
+def _global_summary_report(time_range: Optional[TimeRange] = None) -> ReportSpec:
+    return (
+        "global-summary",
+        _range_params(time_range),
+        lambda service: service.get_global_summary(time_range),
+    )
+
+
+def _revenue_trends_report(days: int = 30) -> ReportSpec:
+    return (
+        "revenue-trends",
+        {"days": days},
+        lambda service: service.get_revenue_trends(days),
+    )
+
+
+# Reports the scheduler (src.report_scheduler) can precompute, by name
+PRECOMPUTED_REPORTS: Dict[str, Callable[..., ReportSpec]] = {
+    "global-summary": _global_summary_report,
+    "store-performances": _store_performances_report,
+    "top-products": _top_products_report,
+    "revenue-trends": _revenue_trends_report,
+}
+
+
+async def _cached_spec(spec: ReportSpec, response: Response, db: Session):
+    report, params, build = spec
+    return await _cached_report(report, params, response, db, build)
+
+
+async def _store_performances(
+    response: Response, db: Session, time_range: Optional[TimeRange] = None
+):
+    return await _cached_spec(_store_performances_report(time_range), response, db)
+
+
+async def _top_products(
+    response: Response,
+    db: Session,
+    limit: int,
+    by: str,
+    time_range: Optional[TimeRange] = None,
+    store_id: Optional[int] = None,
+    approximate: bool = False,
+):
+    return await _cached_spec(
+        _top_products_report(limit, by, time_range, store_id, approximate),
+        response,
+        db,
+    )
+
+
+async def _global_summary(
+    response: Response, db: Session, time_range: Optional[TimeRange] = None
+):
+    return await _cached_spec(_global_summary_report(time_range), response, db)
 
 
 @router.get("/global-summary", response_model=GlobalSummaryResponse)
-async def get_global_summary(db: Session = Depends(get_db)):
+async def get_global_summary(
+    response: Response,
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    db: Session = Depends(get_db),
+):
     """Get global business summary"""
     logger.info("📊 Global summary requested")
-    service = ReportingService(db)
-    return await service.get_global_summary()
+    return await _global_summary(response, db, time_range)
 
 
 @router.get("/store-performances", response_model=List[StorePerformanceResponse])
-async def get_store_performances(db: Session = Depends(get_db)):
+async def get_store_performances(
+    response: Response,
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    db: Session = Depends(get_db),
+):
     """Get performance metrics for all stores"""
     logger.info("🏪 Store performances requested")
-    service = ReportingService(db)
-    return await service.get_store_performances()
+    return await _store_performances(response, db, time_range)
 
 
 @router.get("/top-stores", response_model=List[StorePerformanceResponse])
 async def get_top_stores(
+    response: Response,
     limit: int = Query(5, ge=1, le=50, description="Number of top stores to return"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
     db: Session = Depends(get_db),
 ):
     """Get top performing stores"""
     logger.info(f"🏆 Top {limit} stores requested")
-    service = ReportingService(db)
-    performances = await service.get_store_performances()
+    performances = await _store_performances(response, db, time_range)
     return performances[:limit]
 
 
 @router.get("/underperforming-stores", response_model=List[StorePerformanceResponse])
 async def get_underperforming_stores(
+    response: Response,
     threshold: float = Query(1000.0, ge=0, description="Revenue threshold"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
     db: Session = Depends(get_db),
 ):
     """Get stores with revenue below threshold"""
     logger.info(f"⚠️ Underperforming stores requested (threshold: {threshold})")
-    service = ReportingService(db)
-    performances = await service.get_store_performances()
+    performances = await _store_performances(response, db, time_range)
     get_revenue = lambda p: p.revenue if hasattr(p, "revenue") else p["revenue"]
     return [p for p in performances if get_revenue(p) < threshold]
 
 
 @router.get("/top-products", response_model=List[TopProductResponse])
 async def get_top_products(
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Number of top products to return"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
+    approximate: bool = Query(False, description=APPROXIMATE_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """Get top performing products"""
     logger.info(f"📈 Top {limit} products requested")
-    service = ReportingService(db)
-    return await service.get_top_products(limit)
+    return await _top_products(
+        response, db, limit, "revenue", time_range, store_id, approximate
+    )
 
 
 @router.get("/products-by-revenue", response_model=List[TopProductResponse])
 async def get_products_by_revenue(
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Number of products to return"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
+    approximate: bool = Query(False, description=APPROXIMATE_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """Get products sorted by revenue"""
     logger.info(f"💰 Products by revenue requested (limit: {limit})")
-    service = ReportingService(db)
-    return await service.get_top_products(limit)
+    return await _top_products(
+        response, db, limit, "revenue", time_range, store_id, approximate
+    )
 
 
 @router.get("/products-by-volume", response_model=List[TopProductResponse])
 async def get_products_by_volume(
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Number of products to return"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
+    approximate: bool = Query(False, description=APPROXIMATE_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
     """Get products sorted by quantity sold"""
     logger.info(f"📦 Products by volume requested (limit: {limit})")
-    service = ReportingService(db)
-    products = await service.get_top_products(limit * 2)  # Get more to sort by volume
-    get_qty = lambda x: (
-        x.total_quantity_sold
-        if hasattr(x, "total_quantity_sold")
-        else x["total_quantity_sold"]
+    return await _top_products(
+        response, db, limit, "quantity", time_range, store_id, approximate
     )
-    sorted_products = sorted(products, key=get_qty, reverse=True)
-    return sorted_products[:limit]
 
 
 @router.get("/store/{store_id}/performance", response_model=StorePerformanceResponse)
-async def get_store_performance(store_id: int, db: Session = Depends(get_db)):
+async def get_store_performance(
+    store_id: int,
+    response: Response,
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    db: Session = Depends(get_db),
+):
     """Get performance for a specific store"""
     logger.info(f"🏪 Store {store_id} performance requested")
-    service = ReportingService(db)
-    performance = await service.get_store_performance(store_id)
+    performance = await _cached_report(
+        "store-performance",
+        {"store_id": store_id, **_range_params(time_range)},
+        response,
+        db,
+        lambda service: service.get_store_performance(store_id, time_range),
+    )
     if not performance:
         raise HTTPException(status_code=404, detail=f"Store {store_id} not found")
     return performance
 
 
+@router.get("/sale-distribution", response_model=List[SaleDistributionResponse])
+async def get_sale_distribution(
+    response: Response,
+    by: str = Query("store", pattern="^(store|product)$"),
+    limit: int = Query(50, ge=1, le=500, description="Number of groups to return"),
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    approximate: bool = Query(
+        False,
+        description="Store percentiles from the per-day t-digests (whole days, "
+        "flagged 'approximate') instead of every sale amount",
+    ),
+    db: Session = Depends(get_db),
+):
+    """Get sale amount distribution (mean, p50, p90, p99) per store or product"""
+    logger.info(f"📊 Sale distribution by {by} requested (limit: {limit})")
+    return await _cached_report(
+        "sale-distribution",
+        {
+            "by": by,
+            "limit": limit,
+            "approximate": approximate,
+            **_range_params(time_range),
+        },
+        response,
+        db,
+        lambda service: service.get_sale_distribution(
+            by, limit, time_range=time_range, approximate=approximate
+        ),
+    )
+
+
 @router.get("/all-stores-performance", response_model=List[StorePerformanceResponse])
-async def get_all_stores_performance(db: Session = Depends(get_db)):
+async def get_all_stores_performance(
+    response: Response,
+    time_range: Optional[TimeRange] = Depends(report_time_range),
+    db: Session = Depends(get_db),
+):
     """Get performance for all stores (alias for store-performances)"""
     logger.info("🏪 All stores performance requested")
-    service = ReportingService(db)
-    return await service.get_store_performances()
+    return await _store_performances(response, db, time_range)
 
 
 @router.get("/business-insights")
-async def get_business_insights(db: Session = Depends(get_db)):
+async def get_business_insights(response: Response, db: Session = Depends(get_db)):
     """Get business insights and recommendations"""
     logger.info("💡 Business insights requested")
-    service = ReportingService(db)
 
-    # Get data for insights
-    summary = await service.get_global_summary()
-    performances = await service.get_store_performances()
-    top_products = await service.get_top_products(5)
+    # Get data for insights (shares the cache entries of the reports above)
+    summary = await _global_summary(response, db)
+    performances = await _store_performances(response, db)
+    top_products = await _top_products(response, db, 5, "revenue")
 
     get_total_revenue = lambda s: (
         s.total_revenue if hasattr(s, "total_revenue") else s["total_revenue"]
@@ -172,15 +382,42 @@ async def get_business_insights(db: Session = Depends(get_db)):
 # Mock endpoints for additional reporting features
 @router.get("/sales-by-period")
 async def get_sales_by_period(
+    response: Response,
     period: str = Query("month", regex="^(day|week|month|year)$"),
+    start_date: Optional[date] = Query(None, description="First day (YYYY-MM-DD)"),
+    end_date: Optional[date] = Query(None, description="Last day, inclusive"),
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
     db: Session = Depends(get_db),
 ):
-    """Get sales data grouped by time period"""
-    logger.info(f"📅 Sales by {period} requested")
+    """Get sales data grouped by time period.
+
+    Long ranges can outlast the gateway timeout on a cold cache: submit them
+    as a ``sales-by-period`` report job (POST /reports/jobs) instead.
+    """
+    logger.info(f"📅 Sales by {period} requested ({start_date} - {end_date})")
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=400, detail="start_date must be before end_date"
+        )
     return {
         "period": period,
-        "message": "This endpoint would provide sales data grouped by time period",
-        "data": [],
+        "start_date": start_date,
+        "end_date": end_date,
+        "store_id": store_id,
+        "data": await _cached_report(
+            "sales-by-period",
+            {
+                "period": period,
+                "start_date": start_date,
+                "end_date": end_date,
+                "store_id": store_id,
+            },
+            response,
+            db,
+            lambda service: service.get_sales_by_period(
+                period, start_date, end_date, store_id
+            ),
+        ),
     }
 
 
@@ -197,6 +434,7 @@ async def get_inventory_status(db: Session = Depends(get_db)):
 
 @router.get("/revenue-trends")
 async def get_revenue_trends(
+    response: Response,
     days: int = Query(30, ge=1, le=365, description="Number of days to analyze"),
     db: Session = Depends(get_db),
 ):
@@ -204,6 +442,6 @@ async def get_revenue_trends(
     logger.info(f"📈 Revenue trends requested (last {days} days)")
     return {
         "period_days": days,
-        "message": "This endpoint would provide revenue trends over time",
-        "trends": [],
+        "message": "Daily sales and revenue from the local sales projection",
+        "trends": await _cached_spec(_revenue_trends_report(days), response, db),
     }
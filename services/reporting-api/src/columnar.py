@@ -0,0 +1,256 @@
+import argparse
+import json
+import random
+import time
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src.projections import CANCELLED_STATUS
+from src.rollups import TimeRange
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Bits of a packed sort key holding an amount in cents (up to ~11 billion)
+CENTS_BITS = 40
+
+
+def _projected_sales(query, time_range: Optional[TimeRange]):
+    """Sales of the projection that are not cancelled, within ``time_range``"""
+    query = query.filter(models.ProjectedSale.cancelled.is_(False))
+    if time_range and time_range.start:
+        query = query.filter(models.ProjectedSale.hour >= time_range.start)
+    if time_range and time_range.end:
+        query = query.filter(models.ProjectedSale.hour < time_range.end)
+    return query
+
+
+@dataclass
+class GroupStats:
+    key: int
+    count: int
+    total: float
+    mean: float
+    percentiles: Dict[int, float]
+
+
+class SaleColumns:
+    """(key, amount) rows held in typed columns instead of Python objects.
+
+    Rows are appended to ``array`` buffers (8 bytes per value) and viewed as
+    NumPy arrays without copying when aggregated, so grouping, sums and
+    percentiles run vectorized rather than as per-sale Python loops.
+    """
+
+    def __init__(self):
+        self.keys = array("q")
+        self.amounts = array("d")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def extend(self, rows: Iterable[Tuple[int, float]]) -> None:
+        for key, amount in rows:
+            self.keys.append(key)
+            self.amounts.append(amount)
+
+    def add_sale(self, sale: Dict[str, Any], by: str) -> None:
+        """Append a retail sale record: its total, or its lines for products"""
+        if sale.get("statut") == CANCELLED_STATUS:
+            return
+        if by == "product":
+            self.extend(
+                (line["product_id"], line.get("sous_total", 0.0))
+                for line in sale.get("sale_lines") or []
+            )
+        else:
+            self.extend([(sale["store_id"], sale.get("total") or 0.0)])
+
+    @classmethod
+    def sale_totals_by_store(
+        cls,
+        db: Session,
+        time_range: Optional[TimeRange] = None,
+        batch_size: int = 50000,
+    ) -> "SaleColumns":
+        """One row per sale of the projection: (store_id, total)"""
+        columns = cls()
+        query = _projected_sales(
+            db.query(models.ProjectedSale.store_id, models.ProjectedSale.total),
+            time_range,
+        ).yield_per(batch_size)
+        columns.extend(query)
+        return columns
+
+    @classmethod
+    def line_amounts_by_product(
+        cls,
+        db: Session,
+        time_range: Optional[TimeRange] = None,
+        batch_size: int = 50000,
+    ) -> "SaleColumns":
+        """One row per sale line of the projection: (product_id, sous_total)"""
+        columns = cls()
+        query = _projected_sales(
+            db.query(models.ProjectedSale.lines), time_range
+        ).yield_per(batch_size)
+        for (lines,) in query:
+            columns.extend(
+                (line["product_id"], line["sous_total"]) for line in json.loads(lines)
+            )
+        return columns
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(keys, amounts) as NumPy views of the columns (no copy)"""
+        return (
+            np.frombuffer(self.keys, dtype=np.int64),
+            np.frombuffer(self.amounts, dtype=np.float64),
+        )
+
+    def group_stats(
+        self, percentiles: Sequence[int] = DEFAULT_PERCENTILES
+    ) -> List[GroupStats]:
+        """Count, sum, mean and percentiles of the amounts, per key"""
+        return group_stats(*self.arrays(), percentiles)
+
+
+def group_stats(
+    keys: np.ndarray,
+    amounts: np.ndarray,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+) -> List[GroupStats]:
+    """Vectorized group-by of ``amounts`` on ``keys`` (sorted by key).
+
+    Keys are mapped to dense group indexes (a plain offset when they span
+    fewer than 65536 values, as store and product IDs do, ``np.unique``
+    otherwise). Counts and sums come from ``np.bincount``. For percentiles
+    the amounts are ordered within their group by one sort and read off each
+    group with linear interpolation, like ``numpy.percentile``.
+    """
+    if not len(keys):
+        return []
+    low_key = int(keys.min())
+    if int(keys.max()) - low_key < 1 << 16:
+        index = (keys - low_key).astype(np.uint16)
+        group_keys = np.arange(low_key, low_key + int(index.max()) + 1)
+    else:
+        group_keys, index = np.unique(keys, return_inverse=True)
+
+    counts = np.bincount(index)
+    totals = np.bincount(index, weights=amounts)
+    present = np.flatnonzero(counts)
+    counts, totals, group_keys = counts[present], totals[present], group_keys[present]
+    means = totals / counts
+
+    ordered = _sort_within_groups(index, amounts)
+    starts = np.cumsum(counts) - counts
+
+    quantiles = {}
+    for percentile in percentiles:
+        offset = (counts - 1) * (percentile / 100)
+        fraction = offset - np.floor(offset)
+        low = starts + np.floor(offset).astype(np.int64)
+        high = starts + np.ceil(offset).astype(np.int64)
+        quantiles[percentile] = ordered[low] + (ordered[high] - ordered[low]) * fraction
+
+    return [
+        GroupStats(
+            key=int(group_keys[i]),
+            count=int(counts[i]),
+            total=float(totals[i]),
+            mean=float(means[i]),
+            percentiles={p: float(values[i]) for p, values in quantiles.items()},
+        )
+        for i in range(len(counts))
+    ]
+
+
+def _sort_within_groups(index: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """Amounts ordered by (group index, amount)"""
+    cents = np.rint(amounts * 100)
+    low_cents = cents.min()
+    if (
+        np.allclose(cents / 100, amounts, rtol=0, atol=1e-6)
+        and cents.max() - low_cents < 1 << CENTS_BITS
+        and int(index.max()) < 1 << (63 - CENTS_BITS)
+    ):
+        # Money amounts (cent precision, float noise ignored): one int64
+        # sort of (group << CENTS_BITS | cents)
+        packed = (index.astype(np.int64) << CENTS_BITS) | (cents - low_cents).astype(
+            np.int64
+        )
+        packed.sort()
+        return ((packed & ((1 << CENTS_BITS) - 1)) + low_cents) / 100
+
+    by_amount = np.argsort(amounts)
+    return amounts[by_amount][np.argsort(index[by_amount], kind="stable")]
+
+
+def _group_stats_loop(
+    rows: Iterable[Tuple[int, float]], percentiles: Sequence[int]
+) -> Dict[int, Tuple[int, float, float, Dict[int, float]]]:
+    """Reference implementation: per-key Python lists of amounts"""
+    amounts: Dict[int, List[float]] = defaultdict(list)
+    for key, amount in rows:
+        amounts[key].append(amount)
+    result = {}
+    for key, values in amounts.items():
+        values.sort()
+        quantiles = {}
+        for percentile in percentiles:
+            position = (len(values) - 1) * percentile / 100
+            low, frac = int(position), position - int(position)
+            high = min(low + 1, len(values) - 1)
+            quantiles[percentile] = values[low] + (values[high] - values[low]) * frac
+        total = sum(values)
+        result[key] = (len(values), total, total / len(values), quantiles)
+    return result
+
+
+def benchmark(rows: int, groups: int, seed: int = 42) -> Dict[str, float]:
+    """Time the columnar path against per-key Python lists on synthetic lines"""
+    rng = random.Random(seed)
+    columns = SaleColumns()
+    columns.keys.extend(rng.randrange(groups) for _ in range(rows))
+    columns.amounts.extend(round(rng.uniform(1, 500), 2) for _ in range(rows))
+
+    started = time.perf_counter()
+    columnar = columns.group_stats()
+    columnar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    loop = _group_stats_loop(zip(columns.keys, columns.amounts), DEFAULT_PERCENTILES)
+    loop_seconds = time.perf_counter() - started
+
+    for stats in columnar:
+        count, total, _, quantiles = loop[stats.key]
+        assert stats.count == count and abs(stats.total - total) < 1e-6 * total
+        assert all(abs(stats.percentiles[p] - quantiles[p]) < 1e-9 for p in quantiles)
+
+    return {
+        "rows": rows,
+        "groups": len(columnar),
+        "columnar_seconds": round(columnar_seconds, 3),
+        "loop_seconds": round(loop_seconds, 3),
+        "speedup": round(loop_seconds / columnar_seconds, 1),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Columnar sales aggregation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench = subparsers.add_parser("bench", help="Benchmark on synthetic sale lines")
+    bench.add_argument("--rows", type=int, default=10_000_000)
+    bench.add_argument("--groups", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(json.dumps(benchmark(args.rows, args.groups)))
+
+
+if __name__ == "__main__":
+    main()
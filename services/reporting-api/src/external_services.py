@@ -1,11 +1,38 @@
+import asyncio
 import httpx
+import logging
 import os
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional
 from datetime import datetime
 
+from src.http_cache import ConditionalCache
+from src.json_stream import iter_response_records
+
+logger = logging.getLogger("reporting-api")
+
+
+@dataclass
+class FanOutResult:
+    """Outcome of ``ExternalServiceClient.fan_out``.
+
+    ``values`` holds every call's result; a call that failed or missed the
+    deadline gets its default instead and is listed in ``degraded``.
+    """
+
+    values: Dict[str, Any]
+    degraded: List[str] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
 
 class ExternalServiceClient:
-    """Client to communicate with other microservices"""
+    """Client to communicate with other microservices.
+
+    All calls share one pooled ``httpx.AsyncClient`` (keep-alive connections
+    are reused across requests) instead of opening a client per call.
+    """
 
     def __init__(self):
         self.inventory_api_url = os.getenv(
@@ -17,21 +44,117 @@ class ExternalServiceClient:
         self.ecommerce_api_url = os.getenv(
             "ECOMMERCE_API_URL", "http://ecommerce-api:8000/api/v1"
         )
-        self.timeout = 30.0
+        self.timeout = float(os.getenv("EXTERNAL_TIMEOUT_SECONDS", "30"))
+        # Global budget of one report request across all its upstream calls
+        self.request_deadline = float(os.getenv("REPORT_DEADLINE_SECONDS", "3"))
+        self.max_connections = int(os.getenv("EXTERNAL_MAX_CONNECTIONS", "50"))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Catalog responses are revalidated with If-None-Match (304 = reuse)
+        self.catalog_cache = ConditionalCache(
+            max_entries=int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "2048"))
+        )
+
+    def _http(self) -> httpx.AsyncClient:
+        """Shared pooled client, recreated if the event loop changed"""
+        loop = asyncio.get_running_loop()
+        if (
+            self._client is None
+            or self._client.is_closed
+            or self._client_loop is not loop
+        ):
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def fan_out(
+        self,
+        calls: Dict[str, Awaitable[Any]],
+        defaults: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+    ) -> FanOutResult:
+        """Run independent upstream calls concurrently under one deadline.
+
+        Calls still running when ``deadline`` (default: REPORT_DEADLINE_SECONDS)
+        expires are cancelled. Failed or late calls yield their default
+        (None unless given in ``defaults``) and are reported as degraded.
+        """
+        defaults = defaults or {}
+        tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+        if tasks:
+            await asyncio.wait(
+                tasks.values(),
+                timeout=self.request_deadline if deadline is None else deadline,
+            )
+
+        result = FanOutResult(values={})
+        for name, task in tasks.items():
+            if task.done() and not task.cancelled() and task.exception() is None:
+                result.values[name] = task.result()
+                continue
+            if not task.done():
+                task.cancel()
+                logger.warning(f"⏱️ Upstream call '{name}' missed the deadline")
+            elif task.exception() is not None:
+                logger.warning(f"⚠️ Upstream call '{name}' failed: {task.exception()}")
+            result.values[name] = defaults.get(name)
+            result.degraded.append(name)
+        return result
+
+    async def get_products_by_ids(
+        self, product_ids: Iterable[int], batch_size: int = 200
+    ) -> Dict[int, Dict[Any, Any]]:
+        """Look up many products with one Inventory API call per batch of IDs"""
+        ids = sorted(set(product_ids))
+        batches = [ids[i : i + batch_size] for i in range(0, len(ids), batch_size)]
+
+        async def fetch(batch: List[int]) -> List[Dict[Any, Any]]:
+            response, data = await self.catalog_cache.get_json(
+                self._http(),
+                f"{self.inventory_api_url}/products/",
+                params={"ids": ",".join(map(str, batch)), "limit": len(batch)},
+            )
+            if data is None:
+                response.raise_for_status()
+            return data.get("items", []) if isinstance(data, dict) else data
+
+        products: Dict[int, Dict[Any, Any]] = {}
+        for items in await asyncio.gather(*(fetch(batch) for batch in batches)):
+            products.update({item["id"]: item for item in items})
+        return products
+
+    async def count_products(self) -> int:
+        """Total number of products (one-row page from Inventory API)"""
+        response, data = await self.catalog_cache.get_json(
+            self._http(), f"{self.inventory_api_url}/products/", params={"limit": 1}
+        )
+        if data is None:
+            response.raise_for_status()
+        return data["total"] if isinstance(data, dict) else len(data)
 
     async def get_product(self, product_id: int) -> Optional[Dict[Any, Any]]:
         """Get product information from Inventory API"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.inventory_api_url}/products/{product_id}"
-                )
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    response.raise_for_status()
+            response, data = await self.catalog_cache.get_json(
+                self._http(), f"{self.inventory_api_url}/products/{product_id}"
+            )
+            if data is not None:
+                return data
+            elif response.status_code == 404:
+                return None
+            else:
+                response.raise_for_status()
         except Exception as e:
             print(f"Error fetching product {product_id}: {e}")
             return None
@@ -41,63 +164,110 @@ class ExternalServiceClient:
     ) -> List[Dict[Any, Any]]:
         """Get products list from Inventory API"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.inventory_api_url}/products/",
-                    params={"skip": (page - 1) * size, "limit": size},
-                )
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    response.raise_for_status()
+            response, data = await self.catalog_cache.get_json(
+                self._http(),
+                f"{self.inventory_api_url}/products/",
+                params={"skip": (page - 1) * size, "limit": size},
+            )
+            if data is not None:
+                return data.get("items", []) if isinstance(data, dict) else data
+            else:
+                response.raise_for_status()
         except Exception as e:
             print(f"Error fetching products: {e}")
             return []
 
+    async def iter_sales(
+        self,
+        fields: Optional[str] = None,
+        store_id: Optional[int] = None,
+        date_debut: Optional[str] = None,
+        date_fin: Optional[str] = None,
+    ) -> AsyncIterator[Dict[Any, Any]]:
+        """Stream all sales from Retail API (NDJSON), one dict at a time.
+
+        ``fields`` is forwarded as the retail projection (e.g. "store_id,total")
+        so sale lines are only transferred when they are needed. Records are
+        parsed as the body arrives (see ``src.json_stream``).
+        """
+        params: Dict[str, Any] = {"format": "ndjson"}
+        if fields:
+            params["fields"] = fields
+        if store_id is not None:
+            params["store_id"] = store_id
+        if date_debut:
+            params["date_debut"] = date_debut
+        if date_fin:
+            params["date_fin"] = date_fin
+
+        async for sale in self.iter_records(f"{self.retail_api_url}/sales/", params):
+            yield sale
+
+    async def iter_records(
+        self, url: str, params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Any]:
+        """Stream the records of a list endpoint (NDJSON or JSON array).
+
+        The body is parsed incrementally from the response chunks, so the
+        whole list is never held in memory.
+        """
+        async with self._http().stream("GET", url, params=params) as response:
+            response.raise_for_status()
+            async for record in iter_response_records(response):
+                yield record
+
+    async def get_sales(
+        self, fields: Optional[str] = None, store_id: Optional[int] = None
+    ) -> List[Dict[Any, Any]]:
+        """Get all sales from Retail API as a list (see ``iter_sales``)"""
+        return [sale async for sale in self.iter_sales(fields, store_id)]
+
+    async def get_sales_stats(self, dimension: str, **params: Any) -> Any:
+        """Get SQL-side sales aggregates from Retail API.
+
+        ``dimension`` is one of "summary", "by-store", "by-product" or
+        "by-date"; ``params`` are forwarded (dates, store_id, limit, order_by).
+        """
+        response = await self._http().get(
+            f"{self.retail_api_url}/sales/stats/{dimension}",
+            params={k: v for k, v in params.items() if v is not None},
+        )
+        response.raise_for_status()
+        return response.json()
+
     async def get_store(self, store_id: int) -> Optional[Dict[Any, Any]]:
-        """Get store information from Retail API"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(f"{self.retail_api_url}/stores/{store_id}")
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    response.raise_for_status()
-        except Exception as e:
-            print(f"Error fetching store {store_id}: {e}")
+        """Get store information from Retail API (None if it does not exist).
+
+        Upstream failures raise: under ``fan_out`` they mark the call degraded
+        instead of passing for an unknown store.
+        """
+        response = await self._http().get(f"{self.retail_api_url}/stores/{store_id}")
+        if response.status_code == 404:
             return None
+        response.raise_for_status()
+        return response.json()
 
     async def get_stores(self, page: int = 1, size: int = 100) -> List[Dict[Any, Any]]:
-        """Get stores list from Retail API"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.retail_api_url}/stores/",
-                    params={"skip": (page - 1) * size, "limit": size},
-                )
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    response.raise_for_status()
-        except Exception as e:
-            print(f"Error fetching stores: {e}")
-            return []
+        """Get stores list from Retail API; raises if retail-api fails"""
+        response = await self._http().get(
+            f"{self.retail_api_url}/stores/",
+            params={"skip": (page - 1) * size, "limit": size},
+        )
+        response.raise_for_status()
+        return response.json()
 
     async def get_cash_register(self, register_id: int) -> Optional[Dict[Any, Any]]:
         """Get cash register information from Retail API"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.retail_api_url}/cash-registers/{register_id}"
-                )
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    response.raise_for_status()
+            response = await self._http().get(
+                f"{self.retail_api_url}/cash-registers/{register_id}"
+            )
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                return None
+            else:
+                response.raise_for_status()
         except Exception as e:
             print(f"Error fetching cash register {register_id}: {e}")
             return None
@@ -105,16 +275,15 @@ class ExternalServiceClient:
     async def reduce_product_stock(self, product_id: int, quantity: int) -> bool:
         """Reduce product stock via Inventory API"""
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.put(
-                    f"{self.inventory_api_url}/stock/products/{product_id}/stock/reduce",
-                    params={
-                        "quantity": quantity,
-                        "raison": "reporting_update",
-                        "reference": "reporting",
-                    },
-                )
-                return response.status_code == 200
+            response = await self._http().put(
+                f"{self.inventory_api_url}/stock/products/{product_id}/stock/reduce",
+                params={
+                    "quantity": quantity,
+                    "raison": "reporting_update",
+                    "reference": "reporting",
+                },
+            )
+            return response.status_code == 200
         except Exception as e:
             print(f"Error reducing stock for product {product_id}: {e}")
             return False
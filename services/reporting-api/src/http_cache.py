@@ -0,0 +1,76 @@
+# Kept in sync with services/ecommerce-api/src/http_cache.py: each service
+# image only ships its own src/, so the class is duplicated rather than
+# shared (tests/test_http_cache.py checks both copies match).
+import httpx
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class ConditionalCache:
+    """LRU cache of JSON responses revalidated with conditional requests.
+
+    Only responses carrying an ETag or Last-Modified validator are kept. A
+    304 answer returns the stored body without re-downloading or re-parsing.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Optional[str], Any]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def conditional_headers(self, key: str) -> Dict[str, str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def store(self, key: str, response: httpx.Response) -> Any:
+        data = response.json()
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag or last_modified:
+            self._entries[key] = (etag, last_modified, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.pop(key, None)
+        return data
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_json(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[httpx.Response, Any]:
+        """GET ``url`` conditionally; the body is None unless status is 200/304"""
+        key = str(httpx.URL(url, params=params))
+        request_headers = {**(headers or {}), **self.conditional_headers(key)}
+        response = await client.get(url, params=params, headers=request_headers)
+
+        if response.status_code == 304:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response, entry[2]
+            # Entry evicted while the request was in flight: fetch it again
+            response = await client.get(url, params=params, headers=headers)
+
+        if response.status_code == 200:
+            self.misses += 1
+            return response, self.store(key, response)
+        return response, None
@@ -1,2 +1,41 @@
-# Reporting API doesn't need database initialization
-# All data is fetched from external services (retail-api, inventory-api, etc.)
+import logging
+
+from sqlalchemy import inspect
+
+from src.database import Base, engine
+import src.models as models
+
+logger = logging.getLogger("reporting-api")
+
+# Projection tables: derived data, dropped when their layout is outdated
+PROJECTION_TABLES = [
+    models.ProjectedSale.__table__,
+    models.StoreSalesProjection.__table__,
+    models.ProductSalesProjection.__table__,
+    models.DailySalesProjection.__table__,
+    models.HourlySalesProjection.__table__,
+    models.DailyProductSalesProjection.__table__,
+    models.HourlyProductSalesProjection.__table__,
+    models.ProductSalesSketch.__table__,
+    models.SaleAmountDigest.__table__,
+]
+
+
+def init_db():
+    """Create the local sales projection tables.
+
+    They start empty: fill them with ``python -m src.projections rebuild``,
+    then the event consumer keeps them up to date. A projection created
+    before the hourly rollups (no ``projected_sales.hour``) is dropped and
+    must be rebuilt.
+    """
+    inspector = inspect(engine)
+    if inspector.has_table("projected_sales") and "hour" not in {
+        column["name"] for column in inspector.get_columns("projected_sales")
+    }:
+        logger.warning(
+            "⚠️ Outdated sales projection dropped: run "
+            "'python -m src.projections rebuild'"
+        )
+        Base.metadata.drop_all(bind=engine, tables=PROJECTION_TABLES)
+    Base.metadata.create_all(bind=engine)
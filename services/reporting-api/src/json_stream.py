@@ -0,0 +1,126 @@
+import codecs
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Union
+
+import httpx
+
+Chunk = Union[bytes, str]
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class _TextChunks:
+    """Incrementally decode UTF-8 byte chunks (split code points included)"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def feed(self, chunk: Chunk, final: bool = False) -> str:
+        if isinstance(chunk, str):
+            return chunk
+        return self._decoder.decode(chunk, final)
+
+
+def _skip_whitespace(buffer: str, index: int) -> int:
+    while index < len(buffer) and buffer[index] in _WHITESPACE:
+        index += 1
+    return index
+
+
+async def iter_ndjson(chunks: AsyncIterable[Chunk]) -> AsyncIterator[Any]:
+    """Yield the records of an NDJSON body as its chunks arrive.
+
+    Only complete lines are parsed; memory holds one chunk plus the
+    trailing partial line.
+    """
+    text = _TextChunks()
+    pending = ""
+    async for chunk in chunks:
+        pending += text.feed(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    pending += text.feed(b"", final=True)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+async def iter_json_array(chunks: AsyncIterable[Chunk]) -> AsyncIterator[Any]:
+    """Yield the elements of a top-level JSON array as its chunks arrive.
+
+    Each element is decoded as soon as the separator following it has been
+    received, so numbers split across chunks are never cut short. Memory
+    holds one chunk plus the element being received, never the whole array.
+    """
+    text = _TextChunks()
+    buffer = ""
+    index = 0
+    started = finished = False
+    expect_value = True  # after "[" or ","
+    count = 0
+
+    async def more() -> bool:
+        nonlocal buffer, index
+        try:
+            chunk = await iterator.__anext__()
+        except StopAsyncIteration:
+            tail = text.feed(b"", final=True)
+            buffer = buffer[index:] + tail
+            index = 0
+            return bool(tail)
+        buffer = buffer[index:] + text.feed(chunk)
+        index = 0
+        return True
+
+    iterator = chunks.__aiter__()
+    while not finished:
+        index = _skip_whitespace(buffer, index)
+        if index >= len(buffer):
+            if not await more():
+                raise ValueError("Truncated JSON array")
+            continue
+
+        char = buffer[index]
+        if not started:
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            index += 1
+        elif char == "]" and not (expect_value and count):
+            finished = True
+        elif char == "," and not expect_value:
+            expect_value = True
+            index += 1
+        elif expect_value:
+            try:
+                value, end = _decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # Only trust the value once the next separator has been received
+            following = _skip_whitespace(buffer, end) if end is not None else None
+            if following is None or following >= len(buffer):
+                if not await more():
+                    raise ValueError("Truncated JSON array")
+                continue
+            yield value
+            count += 1
+            index = end
+            expect_value = False
+        else:
+            raise ValueError(f"Unexpected character {char!r} in JSON array")
+
+    index = _skip_whitespace(buffer, index + 1)
+    while index >= len(buffer) and await more():
+        index = _skip_whitespace(buffer, index)
+    if index < len(buffer):
+        raise ValueError("Unexpected data after JSON array")
+
+
+def iter_response_records(response: httpx.Response) -> AsyncIterator[Any]:
+    """Stream the records of a list response (NDJSON or JSON array)"""
+    content_type = response.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return iter_ndjson(response.aiter_bytes())
+    return iter_json_array(response.aiter_bytes())
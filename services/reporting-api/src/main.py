@@ -1,13 +1,23 @@
 from src.api.v1.router import api_router
 from fastapi import FastAPI, Request, HTTPException, Response
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import logging
 import time
 import uuid
 import os
+import redis
 from src.metrics_service import metrics_service, CONTENT_TYPE_LATEST
 from src.metrics_middleware import MetricsMiddleware
+from src.database import SessionLocal
+from src.external_services import external_client
+from src.api.v1.reports import PRECOMPUTED_REPORTS
+from src.report_cache import SharedReportStore, report_cache
+from src.report_jobs import report_jobs
+from src.report_scheduler import scheduler_from_env
+from src.init_db import init_db
+from src.projections import SalesEventConsumer, is_ready, rebuild
 
 # Configuration du logging structuré
 logging.basicConfig(
@@ -18,6 +28,17 @@ logging.basicConfig(
 
 logger = logging.getLogger("reporting-api")
 
+# Alimentation de la projection des ventes depuis le bus d'événements
+PROJECTION_CONSUMER_ENABLED = os.getenv("PROJECTION_CONSUMER_ENABLED", "1") == "1"
+PROJECTION_BLOCK_MS = int(os.getenv("PROJECTION_BLOCK_MS", "5000"))
+PROJECTION_REBUILD_RETRY_SECONDS = float(
+    os.getenv("PROJECTION_REBUILD_RETRY_SECONDS", "30")
+)
+
+# Précalcul des rapports récurrents (un leader parmi les réplicas, via Redis),
+# désactivé par défaut : PRECOMPUTE_ENABLED=1 pour l'activer
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "0") == "1"
+
 app = FastAPI(
     title="Reporting API",
     description="API RESTful de reporting et analytics - Architecture DDD",
@@ -110,17 +131,100 @@ app.add_middleware(MetricsMiddleware)
 app.include_router(api_router, prefix="/api/v1")
 
 
+async def projection_consumer():
+    """Applique en continu les événements de vente à la projection locale"""
+    consumer = None
+    while True:
+        try:
+            if consumer is None:
+                consumer = await asyncio.to_thread(SalesEventConsumer, SessionLocal)
+                logger.info(
+                    f"📥 Sales projection consumer started (stream={consumer.stream})"
+                )
+            if await asyncio.to_thread(consumer.consume_once, PROJECTION_BLOCK_MS):
+                # Les rapports en cache sont servis périmés le temps d'être recalculés
+                await asyncio.to_thread(report_cache.data_changed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Sales projection consumer error: {e}")
+            await asyncio.sleep(2)
+
+
+async def projection_bootstrap():
+    """Charge l'historique des ventes tant qu'aucune reconstruction n'a abouti :
+    jusque-là les rapports restent servis par retail-api"""
+    while True:
+        try:
+            db = SessionLocal()
+            try:
+                ready = is_ready(db)
+            finally:
+                db.close()
+            if ready:
+                return
+            logger.info("🔁 Sales projection never rebuilt, loading retail history")
+            await rebuild(SessionLocal)
+            await asyncio.to_thread(report_cache.data_changed)
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Sales projection rebuild failed, retrying: {e}")
+            await asyncio.sleep(PROJECTION_REBUILD_RETRY_SECONDS)
+
+
+async def start_report_scheduler():
+    """Partage les rapports précalculés via Redis ; sans Redis, chaque
+    instance précalcule pour elle-même"""
+    client = redis.from_url(
+        os.getenv("REPORT_CACHE_URL")
+        or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+        decode_responses=True,
+    )
+    try:
+        await asyncio.to_thread(client.ping)
+        report_cache.shared = SharedReportStore(
+            client, ttl=int(os.getenv("REPORT_SHARED_TTL", "600"))
+        )
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Shared report cache unavailable, precomputing locally: {e}")
+        client = None
+
+    scheduler = scheduler_from_env(PRECOMPUTED_REPORTS, SessionLocal, client)
+    app.state.report_scheduler = asyncio.create_task(scheduler.run())
+    logger.info(f"🗓️ Report scheduler started ({len(scheduler.specs)} reports)")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize reporting API"""
     logger.info("🚀 Starting Reporting API with enhanced logging and error handling")
-    logger.info("✅ Reporting API initialized - No local database required")
+
+    if not os.getenv("TESTING"):
+        init_db()
+        logger.info("✅ Reporting projection tables verified/created")
+
+        if PROJECTION_CONSUMER_ENABLED:
+            app.state.projection_consumer = asyncio.create_task(projection_consumer())
+            app.state.projection_bootstrap = asyncio.create_task(projection_bootstrap())
+
+        if PRECOMPUTE_ENABLED:
+            await start_report_scheduler()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("🛑 Shutting down Reporting API")
 
+    for name in ("projection_consumer", "projection_bootstrap", "report_scheduler"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+
+    await report_jobs.shutdown()
+    await external_client.aclose()
+
 
 @app.get("/")
 async def root():
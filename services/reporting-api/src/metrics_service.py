@@ -88,6 +88,19 @@ EXTERNAL_API_DURATION = Histogram(
     buckets=[0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
 )
 
+REPORT_CACHE_REQUESTS = Counter(
+    "reporting_api_report_cache_requests_total",
+    "Report cache lookups by result (hit, stale, miss)",
+    ["report_type", "result", "instance_id"],
+)
+
+REPORT_CACHE_REFRESH_DURATION = Histogram(
+    "reporting_api_report_cache_refresh_duration_seconds",
+    "Time to recompute a cached report in seconds",
+    ["report_type", "instance_id"],
+    buckets=[0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
+)
+
 
 class MetricsService:
     def __init__(self):
@@ -145,6 +158,18 @@ class MetricsService:
             report_type=report_type, instance_id=INSTANCE_ID
         ).observe(duration)
 
+    def record_report_cache(self, report_type: str, result: str):
+        """Enregistre une consultation du cache de rapports"""
+        REPORT_CACHE_REQUESTS.labels(
+            report_type=report_type, result=result, instance_id=INSTANCE_ID
+        ).inc()
+
+    def record_report_cache_refresh(self, report_type: str, duration: float):
+        """Enregistre le recalcul d'un rapport mis en cache"""
+        REPORT_CACHE_REFRESH_DURATION.labels(
+            report_type=report_type, instance_id=INSTANCE_ID
+        ).observe(duration)
+
     def record_external_api_call(
         self, service: str, endpoint: str, status: str, duration: float
     ):
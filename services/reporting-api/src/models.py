@@ -1,2 +1,167 @@
-# Reporting API doesn't need local database models
-# All data is fetched from external services (retail-api, inventory-api, etc.)
+from datetime import datetime
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+)
+
+from src.database import Base
+
+
+# Local read model fed by retail sale events (see src.projections).
+# All data is derived: the tables can be dropped and rebuilt at any time.
+
+
+class ProjectedSale(Base):
+    """Snapshot of every sale seen by the projection.
+
+    Makes event handling idempotent (a sale is counted once, a cancellation
+    is applied once) and keeps the lines needed to revert a cancelled sale.
+    """
+
+    __tablename__ = "projected_sales"
+
+    sale_id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, nullable=False, index=True)
+    day = Column(Date, nullable=False)
+    hour = Column(DateTime, nullable=False)  # date_vente truncated to the hour
+    total = Column(Float, nullable=False, default=0.0)
+    cancelled = Column(Boolean, nullable=False, default=False)
+    lines = Column(Text, nullable=False, default="[]")  # JSON sale lines
+    projected_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ProjectionState(Base):
+    """Marker written by a full rebuild (see src.projections.rebuild).
+
+    Events alone only cover the sales made since the consumer started;
+    reports read the projection once a rebuild has loaded the history.
+    """
+
+    __tablename__ = "projection_state"
+
+    name = Column(String(50), primary_key=True)
+    rebuilt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sales_count = Column(Integer, nullable=False, default=0)
+
+
+class StoreSalesProjection(Base):
+    __tablename__ = "store_sales_projection"
+
+    store_id = Column(Integer, primary_key=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0, index=True)
+
+
+class ProductSalesProjection(Base):
+    __tablename__ = "product_sales_projection"
+
+    product_id = Column(Integer, primary_key=True)
+    quantity_sold = Column(Integer, nullable=False, default=0, index=True)
+    revenue = Column(Float, nullable=False, default=0.0, index=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+
+
+class DailySalesProjection(Base):
+    __tablename__ = "daily_sales_projection"
+
+    day = Column(Date, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (Index("ix_daily_sales_projection_store_day", "store_id", "day"),)
+
+
+# Time-bucketed rollups: a date range is answered by summing its buckets
+# (whole days from the daily tables, partial days from the hourly ones),
+# never by scanning sales. Buckets are UTC.
+
+
+class HourlySalesProjection(Base):
+    __tablename__ = "hourly_sales_projection"
+
+    hour = Column(DateTime, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    sales_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class DailyProductSalesProjection(Base):
+    __tablename__ = "daily_product_sales_projection"
+
+    day = Column(Date, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    quantity_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    sales_count = Column(Integer, nullable=False, default=0)
+
+
+class HourlyProductSalesProjection(Base):
+    __tablename__ = "hourly_product_sales_projection"
+
+    hour = Column(DateTime, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    quantity_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    sales_count = Column(Integer, nullable=False, default=0)
+
+
+class ProductSalesSketch(Base):
+    """Approximate product sales of one store and day (see src.sketches):
+    a Count-Min table and the Space-Saving heavy hitters, mergeable"""
+
+    __tablename__ = "product_sales_sketches"
+
+    day = Column(Date, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    width = Column(Integer, nullable=False)
+    depth = Column(Integer, nullable=False)
+    counts = Column(LargeBinary, nullable=False)  # float64 [3][depth][width]
+    top_revenue = Column(Text, nullable=False, default="[]")  # JSON counters
+    top_quantity = Column(Text, nullable=False, default="[]")
+
+
+class SaleAmountDigest(Base):
+    """T-digest of the sale totals of one store and day (see src.sketches),
+    mergeable into percentiles over any range"""
+
+    __tablename__ = "sale_amount_digests"
+
+    day = Column(Date, primary_key=True)
+    store_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    minimum = Column(Float, nullable=False)
+    maximum = Column(Float, nullable=False)
+    centroids = Column(LargeBinary, nullable=False)  # float64 [2][n]: means, weights
+
+
+class ReportJob(Base):
+    """Report computed in the background (see src.report_jobs)"""
+
+    __tablename__ = "report_jobs"
+
+    id = Column(String(36), primary_key=True)
+    report = Column(String(50), nullable=False)
+    params = Column(Text, nullable=False, default="{}")  # JSON
+    # Hash of report + params: identical running jobs are shared
+    request_key = Column(String(64), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    progress = Column(Float, nullable=False, default=0.0)
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    degraded = Column(String(200), nullable=True)  # Missing upstream parts
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src import sketches
+from src.external_services import external_client
+
+logger = logging.getLogger(__name__)
+
+SALE_CREATED = "SaleCreated"
+SALE_CANCELLED = "SaleCancelled"
+SALE_RESTORED = "SaleRestored"
+
+# Retail status of a cancelled sale (excluded from every aggregate)
+CANCELLED_STATUS = "annulee"
+
+# Sale fields requested from retail-api when rebuilding from scratch
+REBUILD_FIELDS = "id,store_id,date_vente,total,statut,sale_lines"
+
+# ProjectionState row recording that a rebuild loaded the sale history
+PROJECTION_NAME = "sales"
+
+# Database failures abort the whole batch for a retry instead of
+# dead-lettering every event they hit
+DB_UNAVAILABLE = (OperationalError, InterfaceError)
+
+
+def sale_hour(sold_at: datetime) -> datetime:
+    """Hourly bucket of a sale timestamp (naive UTC, like retail dates)"""
+    if sold_at.tzinfo is not None:
+        sold_at = sold_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return sold_at.replace(minute=0, second=0, microsecond=0)
+
+
+class SalesProjector:
+    """Apply retail sale events to the local reporting tables.
+
+    Every handler is idempotent: a sale is counted when it is first seen and
+    a status change only moves the aggregates when it flips ``cancelled``,
+    so redelivered or replayed events are harmless. Changes are flushed in
+    the caller's transaction; the product sketches and sale amount digests
+    (src.sketches) are only updated by ``flush_sketches``, once per batch,
+    before it commits.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.sketch_deltas = sketches.new_deltas()
+        self.digest_deltas: sketches.DigestDeltas = {}
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """Apply one event envelope; returns True if the projection changed"""
+        data = event.get("data") or {}
+        event_type = event.get("event_type")
+        if event_type == SALE_CREATED:
+            return self._add_sale(data, data.get("statut") == CANCELLED_STATUS)
+        if event_type == SALE_CANCELLED:
+            return self._set_cancelled(data, True)
+        if event_type == SALE_RESTORED:
+            return self._set_cancelled(data, False)
+        return False
+
+    def reset(self) -> None:
+        """Empty every projection table (before a rebuild)"""
+        for model in (
+            models.SaleAmountDigest,
+            models.ProductSalesSketch,
+            models.HourlyProductSalesProjection,
+            models.DailyProductSalesProjection,
+            models.HourlySalesProjection,
+            models.DailySalesProjection,
+            models.ProductSalesProjection,
+            models.StoreSalesProjection,
+            models.ProjectedSale,
+        ):
+            self.db.query(model).delete(synchronize_session=False)
+        self.sketch_deltas = sketches.new_deltas()
+        self.digest_deltas = {}
+
+    def flush_sketches(self) -> None:
+        """Fold the sales applied since the last call into the sketches"""
+        if self.sketch_deltas:
+            sketches.persist(self.db, self.sketch_deltas)
+            self.sketch_deltas = sketches.new_deltas()
+        if self.digest_deltas:
+            sketches.persist_digests(self.db, self.digest_deltas)
+            self.digest_deltas = {}
+
+    def _add_sale(self, data: Dict[str, Any], cancelled: bool) -> bool:
+        """Count a sale the first time it is seen (never changes a known one)"""
+        if not self._insert_sale(data, cancelled):
+            return False
+        if not cancelled:
+            self._apply_sale(self._get_sale(data["sale_id"]), 1)
+        return True
+
+    def _set_cancelled(self, data: Dict[str, Any], cancelled: bool) -> bool:
+        if self._add_sale(data, cancelled):
+            return True
+
+        changed = (
+            self.db.query(models.ProjectedSale)
+            .filter(
+                models.ProjectedSale.sale_id == data["sale_id"],
+                models.ProjectedSale.cancelled != cancelled,
+            )
+            .update({"cancelled": cancelled}, synchronize_session=False)
+        )
+        if not changed:
+            return False
+        # Revert (or re-add) exactly what was counted for this sale
+        self._apply_sale(self._get_sale(data["sale_id"]), -1 if cancelled else 1)
+        return True
+
+    def _insert_sale(self, data: Dict[str, Any], cancelled: bool) -> bool:
+        lines = [
+            {
+                "product_id": line["product_id"],
+                "quantite": line.get("quantite", 0),
+                "sous_total": line.get("sous_total", 0.0),
+            }
+            for line in data.get("lines") or []
+        ]
+        stmt = self._insert(models.ProjectedSale).on_conflict_do_nothing(
+            index_elements=["sale_id"]
+        )
+        hour = sale_hour(datetime.fromisoformat(data["date_vente"]))
+        result = self.db.execute(
+            stmt,
+            {
+                "sale_id": data["sale_id"],
+                "store_id": data["store_id"],
+                "day": hour.date(),
+                "hour": hour,
+                "total": data.get("total") or 0.0,
+                "cancelled": cancelled,
+                "lines": json.dumps(lines),
+                "projected_at": datetime.utcnow(),
+            },
+        )
+        return result.rowcount == 1
+
+    def _get_sale(self, sale_id: int) -> models.ProjectedSale:
+        return (
+            self.db.query(models.ProjectedSale)
+            .filter(models.ProjectedSale.sale_id == sale_id)
+            .populate_existing()
+            .one()
+        )
+
+    def _apply_sale(self, sale: models.ProjectedSale, sign: int) -> None:
+        """Add (``sign`` 1) or remove (-1) a sale from every aggregate and
+        from its day and hour buckets"""
+        self._add(
+            models.StoreSalesProjection,
+            ["store_id"],
+            [
+                {
+                    "store_id": sale.store_id,
+                    "sales_count": sign,
+                    "revenue": sign * sale.total,
+                }
+            ],
+        )
+        self._add(
+            models.DailySalesProjection,
+            ["day", "store_id"],
+            [
+                {
+                    "day": sale.day,
+                    "store_id": sale.store_id,
+                    "sales_count": sign,
+                    "revenue": sign * sale.total,
+                }
+            ],
+        )
+        self._add(
+            models.HourlySalesProjection,
+            ["hour", "store_id"],
+            [
+                {
+                    "hour": sale.hour,
+                    "store_id": sale.store_id,
+                    "sales_count": sign,
+                    "revenue": sign * sale.total,
+                }
+            ],
+        )
+
+        lines = json.loads(sale.lines)
+        products: Dict[int, Dict[str, Any]] = {}
+        for line in lines:
+            row = products.setdefault(
+                line["product_id"],
+                {
+                    "product_id": line["product_id"],
+                    "quantity_sold": 0,
+                    "revenue": 0.0,
+                    "sales_count": sign,
+                },
+            )
+            row["quantity_sold"] += sign * line["quantite"]
+            row["revenue"] += sign * line["sous_total"]
+        self._add(
+            models.ProductSalesProjection, ["product_id"], list(products.values())
+        )
+        self._add(
+            models.DailyProductSalesProjection,
+            ["day", "store_id", "product_id"],
+            [
+                {"day": sale.day, "store_id": sale.store_id, **row}
+                for row in products.values()
+            ],
+        )
+        self._add(
+            models.HourlyProductSalesProjection,
+            ["hour", "store_id", "product_id"],
+            [
+                {"hour": sale.hour, "store_id": sale.store_id, **row}
+                for row in products.values()
+            ],
+        )
+
+        # Sketch deltas last: they are not rolled back with a failed event
+        sketches.add_sale_amount(
+            self.digest_deltas, sale.store_id, sale.day, sale.total, sign
+        )
+        sketches.add_sale_lines(
+            self.sketch_deltas, sale.store_id, sale.day, lines, sign
+        )
+
+    def _add(self, model, keys: List[str], rows: List[Dict[str, Any]]) -> None:
+        """Upsert ``rows``, adding their counters to the existing ones"""
+        if not rows:
+            return
+        table = model.__table__
+        stmt = self._insert(model)
+        counters = [name for name in rows[0] if name not in keys]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={name: table.c[name] + stmt.excluded[name] for name in counters},
+        )
+        self.db.execute(stmt, rows)
+
+    def _insert(self, model):
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        return insert(model.__table__)
+
+
+class SalesEventConsumer:
+    """Feed the projection from the retail sale stream (Redis consumer group).
+
+    Messages are applied and committed per batch, then acknowledged. Each
+    event runs in its own SAVEPOINT: an event the projector cannot apply is
+    rolled back alone, copied to the dead-letter stream and acknowledged with
+    the batch. When the database itself fails, the whole batch is rolled back
+    and the consumer first re-reads its own pending messages, so nothing is
+    lost; the idempotent projector absorbs the redelivery.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        client: Optional[redis.Redis] = None,
+        batch_size: int = 200,
+    ):
+        self.session_factory = session_factory
+        self.stream = os.getenv("RETAIL_EVENT_STREAM", "retail.sales.events")
+        self.group = os.getenv("PROJECTION_GROUP", "reporting-projections")
+        self.dead_letter_stream = os.getenv(
+            "PROJECTION_DEAD_LETTER_STREAM", f"{self.stream}.dead-letter"
+        )
+        self.consumer_name = os.getenv(
+            "CONSUMER_NAME", os.getenv("INSTANCE_ID", "reporting-api")
+        )
+        self.batch_size = batch_size
+        self.client = client or redis.from_url(
+            os.getenv("EVENT_BUS_URL")
+            or os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            decode_responses=True,
+        )
+        self._read_pending = True
+        try:
+            # Start from the beginning of the stream: the projection needs history
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError:
+            pass  # Group exists
+
+    def consume_once(self, block_ms: int = 5000) -> int:
+        """Read and apply one batch; returns the number of messages handled"""
+        last_id = "0" if self._read_pending else ">"
+        response = self.client.xreadgroup(
+            self.group,
+            self.consumer_name,
+            {self.stream: last_id},
+            count=self.batch_size,
+            block=None if self._read_pending else block_ms,
+        )
+        messages = [message for _, batch in response or [] for message in batch]
+        if not messages:
+            self._read_pending = False
+            return 0
+
+        db = self.session_factory()
+        dead_letters = []
+        try:
+            projector = SalesProjector(db)
+            for message_id, fields in messages:
+                try:
+                    event = json.loads(fields.get("event") or "{}")
+                except ValueError:
+                    logger.warning(f"Skipping malformed sale event {message_id}")
+                    continue
+                try:
+                    with db.begin_nested():
+                        projector.apply(event)
+                except DB_UNAVAILABLE:
+                    raise
+                except Exception as e:
+                    logger.exception(f"Dead-lettering sale event {message_id}: {e}")
+                    dead_letters.append((message_id, fields, e))
+            projector.flush_sketches()
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._read_pending = True
+            raise
+        finally:
+            db.close()
+
+        for message_id, fields, error in dead_letters:
+            self.client.xadd(
+                self.dead_letter_stream,
+                {**fields, "message_id": message_id, "error": repr(error)},
+            )
+        self.client.xack(self.stream, self.group, *[mid for mid, _ in messages])
+        return len(messages)
+
+
+def is_ready(db: Session) -> bool:
+    """True once a rebuild has loaded the sale history into the projection"""
+    return db.get(models.ProjectionState, PROJECTION_NAME) is not None
+
+
+def mark_rebuilt(db: Session, sales_count: int) -> None:
+    """Record a completed rebuild (flushed in the caller's transaction)"""
+    state = db.get(models.ProjectionState, PROJECTION_NAME)
+    if state is None:
+        state = models.ProjectionState(name=PROJECTION_NAME)
+        db.add(state)
+    state.rebuilt_at = datetime.utcnow()
+    state.sales_count = sales_count
+
+
+def _rebuild_event(sale: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "event_type": SALE_CREATED,
+        "data": {
+            "sale_id": sale["id"],
+            "store_id": sale["store_id"],
+            "date_vente": sale["date_vente"],
+            "total": sale.get("total") or 0.0,
+            "statut": sale.get("statut"),
+            "lines": sale.get("sale_lines") or [],
+        },
+    }
+
+
+async def rebuild(
+    session_factory: Callable[[], Session], batch_size: int = 1000
+) -> int:
+    """Rebuild the projection from scratch by streaming every retail sale.
+
+    The reset, the replay and the ready marker (``mark_rebuilt``) are one
+    transaction: reports keep reading the previous projection, or retail-api
+    before the first rebuild, until it commits, and a failed rebuild leaves
+    it untouched. Sketches are flushed every ``batch_size`` sales to
+    bound memory. Runs alongside the consumer: events for sales already
+    rebuilt are no-ops and a cancellation seen first is kept when the sale
+    is replayed.
+    """
+    db = session_factory()
+    count = 0
+    try:
+        projector = SalesProjector(db)
+        projector.reset()
+        async for sale in external_client.iter_sales(fields=REBUILD_FIELDS):
+            projector.apply(_rebuild_event(sale))
+            count += 1
+            if count % batch_size == 0:
+                projector.flush_sketches()
+        projector.flush_sketches()
+        mark_rebuilt(db, count)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"Sales projection rebuilt from {count} sales")
+    return count
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Reporting sales projection")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Rebuild from retail-api sales")
+    parser.parse_args(argv)
+
+    from src.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    asyncio.run(rebuild(SessionLocal))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
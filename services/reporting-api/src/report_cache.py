@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from src.metrics_service import metrics_service
+
+logger = logging.getLogger("reporting-api")
+
+# A report computation returns the report and the names of its degraded parts
+Compute = Callable[[], Awaitable[Tuple[Any, List[str]]]]
+
+
+@dataclass
+class CachedReport:
+    value: Any
+    computed_at: float  # cache clock when the computation started
+    generation: int  # invalidation generation the computation started in
+
+
+class SharedReportStore:
+    """Reports precomputed by the scheduler leader (src.report_scheduler),
+    shared by every replica through Redis.
+
+    Each entry is stamped with the data version it was computed from. The
+    version is a Redis counter bumped by the projection consumers of every
+    replica after each batch of sale events.
+    """
+
+    DATA_VERSION_KEY = "reporting:data-version"
+
+    def __init__(self, client, prefix: str = "reporting:report:", ttl: int = 600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """``{"version", "computed_at", "value"}`` of a published report"""
+        payload = self.client.get(self.prefix + key)
+        return json.loads(payload) if payload else None
+
+    def put(self, key: str, value: Any, version: int) -> None:
+        payload = {"version": version, "computed_at": time.time(), "value": value}
+        self.client.setex(self.prefix + key, self.ttl, json.dumps(payload))
+
+    def data_version(self) -> int:
+        return int(self.client.get(self.DATA_VERSION_KEY) or 0)
+
+    def bump_data_version(self) -> None:
+        self.client.incr(self.DATA_VERSION_KEY)
+
+
+class ReportCache:
+    """Stale-while-revalidate cache of computed reports.
+
+    Entries are keyed by report name and parameters. Younger than
+    ``soft_ttl`` they are served as is; between ``soft_ttl`` and ``hard_ttl``
+    they are still served while a single background task recomputes them;
+    older entries are recomputed before answering, concurrent misses on the
+    same key sharing one computation. ``invalidate()`` turns every entry
+    stale at once (called when sale events reach the projection).
+
+    The cache is per process: other instances only see an invalidation
+    through ``soft_ttl``. Degraded reports are returned but never stored.
+
+    Keys listed in ``precomputed`` are published by the report scheduler and
+    never refreshed by a request: a stale entry is served until the next
+    publication. With a ``shared`` store, a request missing them locally
+    takes the published report instead; only a cold start computes.
+    """
+
+    def __init__(
+        self,
+        soft_ttl: float = 5.0,
+        hard_ttl: float = 60.0,
+        max_entries: int = 512,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.clock = clock
+        self._entries: "OrderedDict[str, CachedReport]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generation = 0
+        self.shared: Optional[SharedReportStore] = None
+        self.precomputed: Set[str] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(report: str, params: Optional[Dict[str, Any]] = None) -> str:
+        items = sorted((params or {}).items())
+        return report + "?" + "&".join(f"{name}={value}" for name, value in items)
+
+    async def get(
+        self,
+        report: str,
+        params: Optional[Dict[str, Any]],
+        compute: Compute,
+    ) -> Tuple[Any, List[str]]:
+        """Cached report (and its degraded parts), computing it if needed"""
+        if not self.enabled:
+            return await compute()
+
+        key = self.key(report, params)
+        now = self.clock()
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry, now):
+            self._entries.move_to_end(key)
+            self._record(report, "hit")
+            return entry.value, []
+
+        if key in self.precomputed and self.shared is not None:
+            published = await asyncio.to_thread(self._published, key)
+            if published is not None:
+                self._store(key, published["value"], now, self._generation)
+                self._record(report, "shared")
+                return published["value"], []
+
+        if entry is not None and now - entry.computed_at < self.hard_ttl:
+            self._entries.move_to_end(key)
+            self._record(report, "stale")
+            if key not in self.precomputed:
+                self._refresh(key, report, compute)
+            return entry.value, []
+
+        self._record(report, "miss")
+        return await asyncio.shield(self._refresh(key, report, compute))
+
+    def invalidate(self) -> None:
+        """Mark every entry stale (served once more while it is refreshed)"""
+        self._generation += 1
+
+    def data_changed(self) -> None:
+        """New sale events reached the projection: invalidate, and bump the
+        shared data version so the scheduler recomputes (blocking call)"""
+        self.invalidate()
+        if self.shared is not None:
+            try:
+                self.shared.bump_data_version()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not bump the report data version: {e}")
+
+    def data_version(self) -> int:
+        """Version of the data reports are computed from (blocking call)"""
+        if self.shared is not None:
+            return self.shared.data_version()
+        return self._generation
+
+    def stamp(self, key: str) -> Optional[Tuple[int, float]]:
+        """(data version, age in seconds) of the published report ``key``"""
+        if self.shared is not None:
+            published = self.shared.get(key)
+            if published is None:
+                return None
+            return published["version"], time.time() - published["computed_at"]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        return entry.generation, self.clock() - entry.computed_at
+
+    def publish(
+        self, report: str, params: Optional[Dict[str, Any]], value: Any, version: int
+    ) -> None:
+        """Store a precomputed report locally and in the shared store
+        (blocking call)"""
+        key = self.key(report, params)
+        value = jsonable_encoder(value)
+        self._store(key, value, self.clock(), self._generation)
+        if self.shared is not None:
+            self.shared.put(key, value, version)
+
+    def _published(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Shared report cache unavailable: {e}")
+            return None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    def _is_fresh(self, entry: CachedReport, now: float) -> bool:
+        return (
+            now - entry.computed_at < self.soft_ttl
+            and entry.generation == self._generation
+        )
+
+    def _refresh(self, key: str, report: str, compute: Compute) -> asyncio.Task:
+        """Start (or join) the single computation of ``key``"""
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            return task
+
+        task = asyncio.ensure_future(self._compute(key, report, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    async def _compute(
+        self, key: str, report: str, compute: Compute
+    ) -> Tuple[Any, List[str]]:
+        started, generation = self.clock(), self._generation
+        timer = time.perf_counter()
+        value, degraded = await compute()
+        metrics_service.record_report_cache_refresh(report, time.perf_counter() - timer)
+        if not degraded:
+            self._store(key, value, started, generation)
+        return value, degraded
+
+    def _store(self, key: str, value: Any, computed_at: float, generation: int):
+        self._entries[key] = CachedReport(
+            value=value, computed_at=computed_at, generation=generation
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"⚠️ Report refresh failed for {key}: {task.exception()}")
+
+    def _record(self, report: str, result: str) -> None:
+        if result == "hit":
+            self.hits += 1
+        elif result == "stale":
+            self.stale_hits += 1
+        elif result == "shared":
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+        metrics_service.record_report_cache(report, result)
+
+
+report_cache = ReportCache(
+    soft_ttl=float(os.getenv("REPORT_CACHE_SOFT_TTL", "5")),
+    hard_ttl=float(os.getenv("REPORT_CACHE_HARD_TTL", "60")),
+    max_entries=int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "512")),
+    enabled=os.getenv("REPORT_CACHE_ENABLED", "1") == "1",
+)
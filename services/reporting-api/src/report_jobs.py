@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, sessionmaker
+
+import src.models as models
+from src.rollups import DateBound, TimeRange
+from src.schemas import ReportJobRequest, ReportJobResponse
+from src.services import ReportingService
+
+logger = logging.getLogger("reporting-api")
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+# Report name -> computation from a ReportingService and the job request
+REPORTS: Dict[str, Callable[[ReportingService, ReportJobRequest], Awaitable[Any]]] = {
+    "global-summary": lambda service, job: service.get_global_summary(
+        TimeRange.from_bounds(job.start_date, job.end_date)
+    ),
+    "store-performances": lambda service, job: service.get_store_performances(
+        TimeRange.from_bounds(job.start_date, job.end_date)
+    ),
+    "top-products": lambda service, job: service.get_top_products(
+        job.limit or 10,
+        by=job.by or "revenue",
+        time_range=TimeRange.from_bounds(job.start_date, job.end_date),
+        store_id=job.store_id,
+    ),
+    "sale-distribution": lambda service, job: service.get_sale_distribution(
+        job.by or "store",
+        job.limit or 50,
+        time_range=TimeRange.from_bounds(job.start_date, job.end_date),
+    ),
+    "revenue-trends": lambda service, job: service.get_revenue_trends(job.days or 30),
+    "sales-by-period": lambda service, job: service.get_sales_by_period(
+        job.period or "month", _day(job.start_date), _day(job.end_date), job.store_id
+    ),
+}
+
+# Allowed ``by`` values per report
+ORDERINGS = {
+    "top-products": ("revenue", "quantity"),
+    "sale-distribution": ("store", "product"),
+}
+
+
+def _day(bound: Optional[DateBound]) -> Optional[date]:
+    """Day of a bound (periods are made of whole days)"""
+    return bound.date() if isinstance(bound, datetime) else bound
+
+
+def job_params(request: ReportJobRequest) -> Dict[str, Any]:
+    return request.model_dump(mode="json", exclude={"report"}, exclude_none=True)
+
+
+def request_key(request: ReportJobRequest) -> str:
+    """Identity of a job request: same report and parameters, same key"""
+    payload = json.dumps(
+        {"report": request.report, "params": job_params(request)}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def job_response(job: models.ReportJob) -> ReportJobResponse:
+    return ReportJobResponse(
+        id=job.id,
+        report=job.report,
+        params=json.loads(job.params),
+        status=job.status,
+        progress=job.progress,
+        result=json.loads(job.result) if job.result is not None else None,
+        error=job.error,
+        degraded=job.degraded.split(",") if job.degraded else [],
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+class ReportJobRunner:
+    """Compute heavy reports in the background, past the proxy read timeout.
+
+    Jobs are rows of ``report_jobs``: any instance can answer a status
+    request. At most ``max_concurrency`` jobs run at once per instance;
+    their vectorized aggregation runs in a pool of ``processes`` worker
+    processes (0: in the event loop). A request identical to a pending or
+    running job returns that job instead of starting another one.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        processes: int = 2,
+        timeout: float = 1800.0,
+        retention: timedelta = timedelta(hours=24),
+    ):
+        self.max_concurrency = max_concurrency
+        self.processes = processes
+        self.timeout = timeout
+        self.retention = retention
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[Executor] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(
+        self, db: Session, request: ReportJobRequest
+    ) -> Tuple[models.ReportJob, bool]:
+        """Start a job (or join an identical active one); True if created"""
+        if request.by and request.by not in ORDERINGS.get(request.report, ()):
+            raise ValueError(f"Invalid 'by' for report {request.report}: {request.by}")
+        # Raises ValueError for a reversed range
+        TimeRange.from_bounds(request.start_date, request.end_date)
+
+        key = request_key(request)
+        now = datetime.utcnow()
+        self._purge(db, now)
+
+        existing = (
+            db.query(models.ReportJob)
+            .filter(
+                models.ReportJob.request_key == key,
+                models.ReportJob.status.in_(ACTIVE_STATUSES),
+                # A job left behind by a stopped instance is not joined
+                models.ReportJob.created_at >= now - timedelta(seconds=self.timeout),
+            )
+            .order_by(models.ReportJob.created_at.desc())
+            .first()
+        )
+        if existing is not None:
+            return existing, False
+
+        job = models.ReportJob(
+            id=str(uuid.uuid4()),
+            report=request.report,
+            params=json.dumps(job_params(request)),
+            request_key=key,
+            status=JOB_PENDING,
+            progress=0.0,
+            created_at=now,
+        )
+        db.add(job)
+        db.commit()
+
+        session_factory = sessionmaker(bind=db.get_bind(), autoflush=False)
+        task = asyncio.create_task(self._run(job.id, session_factory, request))
+        self._tasks[job.id] = task
+        task.add_done_callback(
+            lambda done, job_id=job.id: self._tasks.pop(job_id, None)
+        )
+        logger.info(f"🧾 Report job {job.id} queued ({request.report})")
+        return job, True
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(
+        self,
+        job_id: str,
+        session_factory: Callable[[], Session],
+        request: ReportJobRequest,
+    ) -> None:
+        async with self._semaphore():
+            self._update(
+                session_factory,
+                job_id,
+                status=JOB_RUNNING,
+                started_at=datetime.utcnow(),
+            )
+            db = session_factory()
+            try:
+                service = ReportingService(db)
+                service.cpu_executor = self._cpu_executor()
+                service.on_progress = lambda fraction: self._update(
+                    session_factory, job_id, progress=fraction
+                )
+                result = await asyncio.wait_for(
+                    REPORTS[request.report](service, request), self.timeout
+                )
+                self._update(
+                    session_factory,
+                    job_id,
+                    status=JOB_SUCCEEDED,
+                    progress=1.0,
+                    result=json.dumps(jsonable_encoder(result)),
+                    degraded=",".join(service.degraded) or None,
+                    finished_at=datetime.utcnow(),
+                )
+                logger.info(f"✅ Report job {job_id} succeeded")
+            except asyncio.TimeoutError:
+                self._fail(session_factory, job_id, "Report job timed out")
+            except Exception as e:
+                logger.error(f"❌ Report job {job_id} failed: {e}", exc_info=True)
+                self._fail(session_factory, job_id, str(e) or type(e).__name__)
+            finally:
+                db.close()
+
+    def _fail(self, session_factory, job_id: str, error: str) -> None:
+        self._update(
+            session_factory,
+            job_id,
+            status=JOB_FAILED,
+            error=error,
+            finished_at=datetime.utcnow(),
+        )
+
+    @staticmethod
+    def _update(session_factory, job_id: str, **values) -> None:
+        db = session_factory()
+        try:
+            db.query(models.ReportJob).filter(models.ReportJob.id == job_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _purge(self, db: Session, now: datetime) -> None:
+        """Delete finished jobs older than the retention period"""
+        db.query(models.ReportJob).filter(
+            models.ReportJob.status.notin_(ACTIVE_STATUSES),
+            models.ReportJob.finished_at < now - self.retention,
+        ).delete(synchronize_session=False)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+
+    def _cpu_executor(self) -> Optional[Executor]:
+        if self.processes <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self._executor
+
+
+report_jobs = ReportJobRunner(
+    max_concurrency=int(os.getenv("REPORT_JOB_CONCURRENCY", "2")),
+    processes=int(os.getenv("REPORT_JOB_PROCESSES", "2")),
+    timeout=float(os.getenv("REPORT_JOB_TIMEOUT_SECONDS", "1800")),
+    retention=timedelta(hours=float(os.getenv("REPORT_JOB_RETENTION_HOURS", "24"))),
+)
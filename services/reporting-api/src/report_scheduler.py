@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from sqlalchemy.orm import Session
+
+from src.report_cache import ReportCache, report_cache
+from src.services import ReportingService
+
+logger = logging.getLogger("reporting-api")
+
+# Reports precomputed by default: name, then query parameters
+DEFAULT_SCHEDULE = (
+    "global-summary,store-performances,top-products?limit=10,"
+    "top-products?limit=5,revenue-trends?days=30"
+)
+
+
+@dataclass(frozen=True)
+class ScheduledReport:
+    report: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def parse_schedule(spec: str) -> List[ScheduledReport]:
+    """``"global-summary,top-products?limit=10&by=quantity"`` -> reports.
+    Integer parameters are converted."""
+    scheduled = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        report, _, query = item.partition("?")
+        params = {
+            name: int(value) if value.isdigit() else value
+            for name, value in parse_qsl(query)
+        }
+        scheduled.append(ScheduledReport(report, params))
+    return scheduled
+
+
+class LeaderLock:
+    """Leadership of the scheduler among replicas: a Redis lock that expires
+    unless its holder renews it, so a dead leader is replaced after ``ttl``.
+    Without a Redis client every instance leads (single instance)."""
+
+    def __init__(self, client=None, name: str = "reporting:report-scheduler", ttl=60):
+        self._lock = (
+            client.lock(name, timeout=ttl, thread_local=False) if client else None
+        )
+
+    def acquire_or_renew(self) -> bool:
+        """Whether this instance leads until the next call (blocking call)"""
+        if self._lock is None:
+            return True
+        if self._lock.owned():
+            self._lock.reacquire()
+            return True
+        return self._lock.acquire(blocking=False)
+
+    def release(self) -> None:
+        if self._lock is not None and self._lock.owned():
+            self._lock.release()
+
+
+class ReportScheduler:
+    """Precompute recurring reports so that requests never compute them.
+
+    Every ``interval`` seconds (with random ``jitter`` so replicas do not
+    tick together) the leader (``LeaderLock``) recomputes each scheduled
+    report whose published stamp is behind the current data version or
+    older than ``max_age``, and publishes it to the report cache. Other
+    replicas serve the published reports from the shared store.
+
+    ``reports`` maps report names to functions building a ``ReportSpec``
+    (name, cache parameters, computation) from the scheduled parameters.
+    """
+
+    def __init__(
+        self,
+        reports: Dict[str, Callable[..., Tuple]],
+        schedule: List[ScheduledReport],
+        session_factory: Callable[[], Session],
+        cache: ReportCache = report_cache,
+        leader: Optional[LeaderLock] = None,
+        interval: float = 15.0,
+        jitter: float = 0.2,
+        max_age: float = 300.0,
+    ):
+        unknown = [item.report for item in schedule if item.report not in reports]
+        if unknown:
+            raise ValueError(f"Reports cannot be precomputed: {', '.join(unknown)}")
+        self.specs = [reports[item.report](**item.params) for item in schedule]
+        self.session_factory = session_factory
+        self.cache = cache
+        self.leader = leader or LeaderLock()
+        self.interval = interval
+        self.jitter = jitter
+        self.max_age = max_age
+        self.cache.precomputed.update(
+            self.cache.key(report, params) for report, params, _ in self.specs
+        )
+
+    async def run(self) -> None:
+        """Precompute forever (until cancelled)"""
+        try:
+            while True:
+                try:
+                    await self.run_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"⚠️ Report precomputation failed: {e}")
+                spread = self.interval * self.jitter
+                await asyncio.sleep(self.interval + random.uniform(-spread, spread))
+        finally:
+            await asyncio.to_thread(self.leader.release)
+
+    async def run_once(self) -> int:
+        """One tick; returns the number of reports recomputed"""
+        if not await asyncio.to_thread(self.leader.acquire_or_renew):
+            return 0
+        version = await asyncio.to_thread(self.cache.data_version)
+        computed = 0
+        for report, params, build in self.specs:
+            stamp = await asyncio.to_thread(
+                self.cache.stamp, self.cache.key(report, params)
+            )
+            if stamp is not None and stamp[0] == version and stamp[1] < self.max_age:
+                continue
+            if await self._precompute(report, params, build, version):
+                computed += 1
+        return computed
+
+    async def _precompute(self, report, params, build, version: int) -> bool:
+        session = self.session_factory()
+        try:
+            service = ReportingService(session)
+            started = time.perf_counter()
+            value = await build(service)
+            if service.degraded:
+                # Keep the last complete report rather than publish a partial one
+                logger.warning(
+                    f"⚠️ Precomputed {report} degraded "
+                    f"({', '.join(service.degraded)}), not published"
+                )
+                return False
+            await asyncio.to_thread(self.cache.publish, report, params, value, version)
+            logger.info(
+                f"🗓️ Precomputed {report} {params} in "
+                f"{(time.perf_counter() - started) * 1000:.0f}ms (v{version})"
+            )
+            return True
+        finally:
+            session.close()
+
+
+def scheduler_from_env(
+    reports: Dict[str, Callable[..., Tuple]],
+    session_factory: Callable[[], Session],
+    client=None,
+) -> ReportScheduler:
+    """Scheduler configured by ``PRECOMPUTE_*``; ``client`` (Redis) enables
+    leader election and the shared store"""
+    return ReportScheduler(
+        reports,
+        parse_schedule(os.getenv("PRECOMPUTE_REPORTS", DEFAULT_SCHEDULE)),
+        session_factory,
+        leader=LeaderLock(client, ttl=int(os.getenv("PRECOMPUTE_LOCK_TTL", "60"))),
+        interval=float(os.getenv("PRECOMPUTE_INTERVAL", "15")),
+        jitter=float(os.getenv("PRECOMPUTE_JITTER", "0.2")),
+        max_age=float(os.getenv("PRECOMPUTE_MAX_AGE", "300")),
+    )
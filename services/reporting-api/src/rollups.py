@@ -0,0 +1,216 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src.projections import sale_hour
+
+# Range bound: a whole day (date) or an instant (datetime)
+DateBound = Union[datetime, date]
+
+HOUR = timedelta(hours=1)
+
+
+@dataclass(frozen=True)
+class TimeRange:
+    """Half-open ``[start, end)`` range of hourly buckets (naive UTC).
+
+    A ``None`` bound leaves that side open. Bounds are widened to whole
+    hours, the bucket precision: a date covers its whole day and a datetime
+    its whole hour, both inclusive.
+    """
+
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+    @classmethod
+    def from_bounds(
+        cls, start: Optional[DateBound] = None, end: Optional[DateBound] = None
+    ) -> Optional["TimeRange"]:
+        """Range of two inclusive bounds; None when both are open"""
+        if start is None and end is None:
+            return None
+        if start is not None:
+            if not isinstance(start, datetime):
+                start = datetime.combine(start, time.min)
+            start = sale_hour(start)
+        if end is not None:
+            if isinstance(end, datetime):
+                end = sale_hour(end) + HOUR
+            else:
+                end = datetime.combine(end + timedelta(days=1), time.min)
+        if start is not None and end is not None and end <= start:
+            raise ValueError("start_date must be before end_date")
+        return cls(start, end)
+
+    def params(self) -> Dict[str, Optional[str]]:
+        """Bounds as ISO strings (cache keys)"""
+        return {
+            "start": self.start.isoformat() if self.start else None,
+            "end": self.end.isoformat() if self.end else None,
+        }
+
+    @property
+    def whole_days(self) -> bool:
+        """True when both bounds fall on midnight (or are open)"""
+        return all(
+            bound is None or bound.time() == time.min
+            for bound in (self.start, self.end)
+        )
+
+    def retail_params(self) -> Dict[str, Optional[str]]:
+        """Same range as retail-api ``date_debut``/``date_fin`` (inclusive).
+
+        Whole days are sent as plain dates, the only form accepted by the
+        ``/sales/stats/summary``, ``by-store`` and ``by-date`` endpoints;
+        other ranges as datetimes, accepted by the sale stream and
+        ``/sales/stats/by-product`` only.
+        """
+        if self.whole_days:
+            return {
+                "date_debut": self.start.date().isoformat() if self.start else None,
+                "date_fin": (
+                    (self.end.date() - timedelta(days=1)).isoformat()
+                    if self.end
+                    else None
+                ),
+            }
+        return {
+            "date_debut": self.start.isoformat() if self.start else None,
+            "date_fin": (
+                (self.end - timedelta(microseconds=1)).isoformat() if self.end else None
+            ),
+        }
+
+    def split(
+        self,
+    ) -> Tuple[List[Tuple[datetime, datetime]], Optional[Tuple[date, date]]]:
+        """(hour spans, day span) covering the range exactly.
+
+        Whole days go to the day span ``[first_day, end_day)`` (either end
+        may be None when open); the partial days at the edges go to hour
+        spans. A year is then about 365 daily buckets plus at most 46 hourly
+        ones per store, whatever the number of sales.
+        """
+        first_day = end_day = None
+        if self.start is not None:
+            first_day = self.start.date()
+            if self.start.time() != time.min:
+                first_day += timedelta(days=1)
+        if self.end is not None:
+            end_day = self.end.date()
+
+        if first_day is not None and end_day is not None and first_day >= end_day:
+            spans = [(self.start, self.end)] if self.start < self.end else []
+            return spans, None
+
+        spans = []
+        if first_day is not None and self.start.date() < first_day:
+            spans.append((self.start, datetime.combine(first_day, time.min)))
+        if end_day is not None and self.end.time() != time.min:
+            spans.append((datetime.combine(end_day, time.min), self.end))
+        return spans, (first_day, end_day)
+
+    def days(self) -> Tuple[Optional[date], Optional[date]]:
+        """``[first_day, end_day)``: the whole days touched by the range"""
+        end_day = None
+        if self.end is not None:
+            end_day = self.end.date()
+            if self.end.time() != time.min:
+                end_day += timedelta(days=1)
+        return (self.start.date() if self.start else None), end_day
+
+
+def _buckets(
+    time_range: TimeRange,
+    daily,
+    hourly,
+    columns: List[str],
+    store_id: Optional[int] = None,
+):
+    """UNION ALL of the daily and hourly bucket rows covering ``time_range``"""
+    hour_spans, day_span = time_range.split()
+    selects = []
+    if day_span is not None:
+        first_day, end_day = day_span
+        conditions = []
+        if first_day is not None:
+            conditions.append(daily.day >= first_day)
+        if end_day is not None:
+            conditions.append(daily.day < end_day)
+        if store_id is not None:
+            conditions.append(daily.store_id == store_id)
+        selects.append(
+            select(*[daily.__table__.c[name] for name in columns]).where(*conditions)
+        )
+    for start, end in hour_spans:
+        conditions = [hourly.hour >= start, hourly.hour < end]
+        if store_id is not None:
+            conditions.append(hourly.store_id == store_id)
+        selects.append(
+            select(*[hourly.__table__.c[name] for name in columns]).where(*conditions)
+        )
+    if not selects:
+        return None
+    return (union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+
+
+def store_totals(
+    db: Session, time_range: TimeRange, store_id: Optional[int] = None
+) -> List[Tuple[int, int, float]]:
+    """(store_id, sales_count, revenue) over ``time_range``, best first"""
+    rows = _buckets(
+        time_range,
+        models.DailySalesProjection,
+        models.HourlySalesProjection,
+        ["store_id", "sales_count", "revenue"],
+        store_id,
+    )
+    if rows is None:
+        return []
+    count = func.sum(rows.c.sales_count)
+    revenue = func.sum(rows.c.revenue)
+    query = (
+        select(rows.c.store_id, count, revenue)
+        .group_by(rows.c.store_id)
+        .having(count > 0)
+        .order_by(revenue.desc(), rows.c.store_id)
+    )
+    return [(sid, count, float(revenue)) for sid, count, revenue in db.execute(query)]
+
+
+def product_totals(
+    db: Session,
+    time_range: TimeRange,
+    limit: int,
+    by: str = "revenue",
+    store_id: Optional[int] = None,
+) -> List[Tuple[int, int, float, int]]:
+    """(product_id, quantity, revenue, sales_count) over ``time_range``,
+    top ``limit`` by ``revenue`` or ``quantity``"""
+    rows = _buckets(
+        time_range,
+        models.DailyProductSalesProjection,
+        models.HourlyProductSalesProjection,
+        ["product_id", "quantity_sold", "revenue", "sales_count"],
+        store_id,
+    )
+    if rows is None:
+        return []
+    quantity = func.sum(rows.c.quantity_sold)
+    revenue = func.sum(rows.c.revenue)
+    count = func.sum(rows.c.sales_count)
+    query = (
+        select(rows.c.product_id, quantity, revenue, count)
+        .group_by(rows.c.product_id)
+        .having(count > 0)
+        .order_by((quantity if by == "quantity" else revenue).desc(), rows.c.product_id)
+        .limit(limit)
+    )
+    return [
+        (product_id, quantity, float(revenue), count)
+        for product_id, quantity, revenue, count in db.execute(query)
+    ]
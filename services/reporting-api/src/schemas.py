@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Any, Dict, List, Literal, Optional, Union
 from datetime import datetime, date
 from decimal import Decimal
 
@@ -29,6 +29,58 @@ class TopProductResponse(BaseModel):
     total_quantity_sold: int
     total_revenue: float
     sales_count: int
+    # Estimated from the streaming sketches (upper bounds) instead of counted
+    approximate: bool = False
+
+
+class SaleDistributionResponse(BaseModel):
+    """Distribution of sale amounts (per store) or line amounts (per product)"""
+
+    id: int
+    name: Optional[str] = None
+    count: int
+    total: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    # Percentiles estimated from the t-digests instead of every amount
+    approximate: bool = False
+
+
+class ReportJobRequest(BaseModel):
+    """Report to compute in the background, with its parameters"""
+
+    report: Literal[
+        "global-summary",
+        "store-performances",
+        "top-products",
+        "sale-distribution",
+        "revenue-trends",
+        "sales-by-period",
+    ]
+    limit: Optional[int] = Field(None, ge=1, le=500)
+    by: Optional[Literal["revenue", "quantity", "store", "product"]] = None
+    days: Optional[int] = Field(None, ge=1, le=3660)
+    period: Optional[Literal["day", "week", "month", "year"]] = None
+    # A date covers its whole day, a datetime its hour (see src.rollups.DateBound)
+    start_date: Optional[Union[datetime, date]] = None
+    end_date: Optional[Union[datetime, date]] = None
+    store_id: Optional[int] = None
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    report: str
+    params: Dict[str, Any]
+    status: str
+    progress: float
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    degraded: List[str] = []
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 class SalesReportResponse(BaseModel):
@@ -1,169 +1,173 @@
+import asyncio
+from concurrent.futures import Executor
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from typing import List, Optional
-import math
-import httpx
-from datetime import datetime, date
+from sqlalchemy import func
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
 
+import src.models as models
+from src.aggregates import STREAM_FIELDS, RunningSalesTotals
+from src.columnar import DEFAULT_PERCENTILES, GroupStats, SaleColumns, group_stats
+from src import projections, rollups, sketches
+from src.rollups import TimeRange
 from src.schemas import (
     GlobalSummaryResponse,
+    SaleDistributionResponse,
     StorePerformanceResponse,
     TopProductResponse,
 )
 from src.external_services import external_client
 
 
+def period_start(day: date, period: str) -> date:
+    """First day of the day/week/month/year bucket containing ``day``"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    if period == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def performance_rating(revenue: float) -> str:
+    """Rating bucket of a store by revenue"""
+    if revenue > 10000:
+        return "Excellent"
+    elif revenue > 5000:
+        return "Good"
+    elif revenue > 2000:
+        return "Average"
+    return "Below Average"
+
+
 class ReportingService:
+    """Reports answered from the local sales projection (src.projections).
+
+    Sales figures come from indexed local tables kept up to date by retail
+    sale events; only store and product names are fetched from other services.
+    Until the projection holds data (fresh deployment, before a rebuild),
+    figures come from the SQL aggregate endpoints of retail-api instead, so
+    raw sales never cross the network. If those endpoints fail, the retail
+    sale stream is folded once into running totals as a last resort.
+
+    Independent upstream calls of a report run concurrently under one
+    deadline (``external_client.fan_out``); the names of the parts that
+    failed or came late are collected in ``degraded``.
+
+    Reports over a ``TimeRange`` sum the hourly and daily buckets of the
+    projection (src.rollups) instead of the all-time totals. Approximate top
+    products and sale percentiles merge per-store, per-day heavy-hitter
+    sketches and t-digests (src.sketches).
+
+    Report jobs (src.report_jobs) set ``cpu_executor`` to run vectorized
+    aggregation in a worker process and ``on_progress`` to follow a report.
+    """
+
     def __init__(self, db: Session):
         self.db = db
+        self._projection_ready: Optional[bool] = None
+        self._streamed_totals: Dict[
+            Tuple[Optional[TimeRange], Optional[int]], RunningSalesTotals
+        ] = {}
+        self.degraded: List[str] = []
+        self.cpu_executor: Optional[Executor] = None
+        self.on_progress: Callable[[float], None] = lambda fraction: None
 
-    async def get_global_summary(self) -> GlobalSummaryResponse:
-        """Get global business summary using data from all services"""
-        # Get sales data from retail-api
-        try:
-            async with httpx.AsyncClient() as client:
-                sales_response = await client.get(
-                    f"{external_client.retail_api_url}/sales/"
-                )
-                if sales_response.status_code == 200:
-                    sales_data = sales_response.json()
-                    total_sales = len(sales_data)
-                    total_revenue = sum(sale.get("total", 0) for sale in sales_data)
-                    average_sale_amount = (
-                        total_revenue / total_sales if total_sales > 0 else 0.0
-                    )
-                else:
-                    total_sales = 0
-                    total_revenue = 0.0
-                    average_sale_amount = 0.0
-        except Exception as e:
-            print(f"Error fetching sales from retail-api: {e}")
-            total_sales = 0
-            total_revenue = 0.0
-            average_sale_amount = 0.0
+    async def _fan_out(self, calls: Dict[str, Any], **defaults) -> Dict[str, Any]:
+        result = await external_client.fan_out(calls, defaults)
+        self.degraded.extend(
+            name for name in result.degraded if name not in self.degraded
+        )
+        return result.values
 
-        # Get data from external services
-        products = await external_client.get_products(page=1, size=1000)
-        stores = await external_client.get_stores(page=1, size=1000)
+    async def get_global_summary(
+        self, time_range: Optional[TimeRange] = None
+    ) -> GlobalSummaryResponse:
+        """Get global business summary"""
+        results = await self._fan_out(
+            {
+                "sales": self._store_totals(time_range=time_range),
+                "products": external_client.count_products(),
+                "stores": external_client.get_stores(page=1, size=1000),
+            },
+            sales=[],
+            products=0,
+            stores=[],
+        )
+        store_totals = results["sales"]
+        total_sales = sum(count for _, count, _ in store_totals)
+        total_revenue = sum(revenue for _, _, revenue in store_totals)
+        average_sale_amount = total_revenue / total_sales if total_sales > 0 else 0.0
 
         return GlobalSummaryResponse(
             total_sales=total_sales,
             total_revenue=float(total_revenue),
-            total_products=len(products or []),
-            total_stores=len(stores or []),
+            total_products=results["products"] or 0,
+            total_stores=len(results["stores"] or []),
             average_sale_amount=float(average_sale_amount),
         )
 
-    async def get_store_performances(self) -> List[StorePerformanceResponse]:
-        """Get performance metrics for all stores"""
-        # Get sales data from retail-api
-        try:
-            async with httpx.AsyncClient() as client:
-                sales_response = await client.get(
-                    f"{external_client.retail_api_url}/sales/"
-                )
-                if sales_response.status_code == 200:
-                    sales_data = sales_response.json()
-                else:
-                    sales_data = []
-        except Exception as e:
-            print(f"Error fetching sales from retail-api: {e}")
-            sales_data = []
-
-        # Group sales by store
-        store_sales = {}
-        for sale in sales_data:
-            store_id = sale.get("store_id")
-            if store_id not in store_sales:
-                store_sales[store_id] = {
-                    "sales_count": 0,
-                    "revenue": 0.0,
-                    "amounts": [],
-                }
-            store_sales[store_id]["sales_count"] += 1
-            store_sales[store_id]["revenue"] += sale.get("total", 0)
-            store_sales[store_id]["amounts"].append(sale.get("total", 0))
-
-        # Get store information from external service
-        stores = await external_client.get_stores(page=1, size=1000)
-        stores_dict = {store["id"]: store for store in stores}
-
-        performances = []
-        for store_id, sales_info in store_sales.items():
-            store_info = stores_dict.get(store_id, {})
-
-            # Calculate average sale amount
-            avg_amount = (
-                sum(sales_info["amounts"]) / len(sales_info["amounts"])
-                if sales_info["amounts"]
-                else 0.0
-            )
+    async def get_store_performances(
+        self, time_range: Optional[TimeRange] = None
+    ) -> List[StorePerformanceResponse]:
+        """Get performance metrics for all stores, best revenue first"""
+        results = await self._fan_out(
+            {
+                "sales": self._store_totals(time_range=time_range),
+                "stores": external_client.get_stores(page=1, size=1000),
+            },
+            sales=[],
+            stores=[],
+        )
+        store_totals = results["sales"]
+        stores_dict = {store["id"]: store for store in results["stores"] or []}
 
-            # Calculate performance rating
-            revenue = float(sales_info["revenue"])
-            if revenue > 10000:
-                rating = "Excellent"
-            elif revenue > 5000:
-                rating = "Good"
-            elif revenue > 2000:
-                rating = "Average"
-            else:
-                rating = "Below Average"
-
-            performances.append(
-                StorePerformanceResponse(
-                    store_id=store_id,
-                    store_name=store_info.get("nom", f"Store {store_id}"),
-                    sales_count=sales_info["sales_count"],
-                    revenue=revenue,
-                    average_sale_amount=avg_amount,
-                    performance_rating=rating,
-                )
+        return [
+            self._store_performance(
+                store_id, count, revenue, stores_dict.get(store_id, {})
             )
+            for store_id, count, revenue in store_totals
+        ]
 
-        return sorted(performances, key=lambda x: x.revenue, reverse=True)
+    async def get_top_products(
+        self,
+        limit: int = 10,
+        by: str = "revenue",
+        time_range: Optional[TimeRange] = None,
+        store_id: Optional[int] = None,
+        approximate: bool = False,
+    ) -> List[TopProductResponse]:
+        """Get top performing products by ``revenue`` or ``quantity``.
 
-    async def get_top_products(self, limit: int = 10) -> List[TopProductResponse]:
-        """Get top performing products"""
-        # Get sales data from retail-api
-        try:
-            async with httpx.AsyncClient() as client:
-                sales_response = await client.get(
-                    f"{external_client.retail_api_url}/sales/"
+        With ``approximate``, figures are sketch estimates over the whole days
+        of ``time_range`` (flagged ``approximate``); without sketches (empty
+        projection) the exact figures are returned.
+        """
+        product_totals = None
+        if approximate and self._use_projection():
+            first_day, end_day = time_range.days() if time_range else (None, None)
+            product_totals = sketches.approximate_product_totals(
+                self.db, limit, by, first_day, end_day, store_id
+            )
+        approximate = product_totals is not None
+        if product_totals is None:
+            product_totals = await self._product_totals(limit, by, time_range, store_id)
+
+        # Product names: one batched lookup for the whole page
+        results = await self._fan_out(
+            {
+                "products": external_client.get_products_by_ids(
+                    [product_id for product_id, *_ in product_totals]
                 )
-                if sales_response.status_code == 200:
-                    sales_data = sales_response.json()
-                else:
-                    sales_data = []
-        except Exception as e:
-            print(f"Error fetching sales from retail-api: {e}")
-            sales_data = []
-
-        # Group sales by product
-        product_sales = {}
-        for sale in sales_data:
-            sale_lines = sale.get("sale_lines", [])
-            for line in sale_lines:
-                product_id = line.get("product_id")
-                if product_id not in product_sales:
-                    product_sales[product_id] = {
-                        "total_quantity": 0,
-                        "total_revenue": 0.0,
-                        "sales_count": 0,
-                    }
-                product_sales[product_id]["total_quantity"] += line.get("quantite", 0)
-                product_sales[product_id]["total_revenue"] += line.get("sous_total", 0)
-                product_sales[product_id]["sales_count"] += 1
-
-        # Sort by revenue and get top products
-        sorted_products = sorted(
-            product_sales.items(), key=lambda x: x[1]["total_revenue"], reverse=True
-        )[:limit]
-
-        # Get product information from external service
+            },
+            products={},
+        )
+        products = results["products"] or {}
+
         top_products = []
-        for product_id, sales_info in sorted_products:
-            product_info = await external_client.get_product(product_id)
+        for product_id, quantity, revenue, sales_count in product_totals:
+            product_info = products.get(product_id)
 
             top_products.append(
                 TopProductResponse(
@@ -174,41 +178,36 @@ class ReportingService:
                         else f"Product {product_id}"
                     ),
                     product_code=product_info.get("code", "") if product_info else "",
-                    total_quantity_sold=sales_info["total_quantity"],
-                    total_revenue=sales_info["total_revenue"],
-                    sales_count=sales_info["sales_count"],
+                    total_quantity_sold=quantity,
+                    total_revenue=revenue,
+                    sales_count=sales_count,
+                    approximate=approximate,
                 )
             )
 
         return top_products
 
     async def get_store_performance(
-        self, store_id: int
+        self, store_id: int, time_range: Optional[TimeRange] = None
     ) -> Optional[StorePerformanceResponse]:
         """Get performance for a specific store"""
-        # Verify store exists
-        store_info = await external_client.get_store(store_id)
-        if not store_info:
+        results = await self._fan_out(
+            {
+                "store": external_client.get_store(store_id),
+                "sales": self._store_totals(store_id, time_range),
+            },
+            sales=[],
+        )
+        if "store" in self.degraded:
+            # Store lookup unavailable: still report the figures we have
+            store_info = {}
+        elif not results["store"]:
             return None
+        else:
+            store_info = results["store"]
 
-        # Get sales data for this store
-        try:
-            async with httpx.AsyncClient() as client:
-                sales_response = await client.get(
-                    f"{external_client.retail_api_url}/sales/"
-                )
-                if sales_response.status_code == 200:
-                    sales_data = sales_response.json()
-                else:
-                    sales_data = []
-        except Exception as e:
-            print(f"Error fetching sales from retail-api: {e}")
-            sales_data = []
-
-        # Filter sales for this store
-        store_sales = [sale for sale in sales_data if sale.get("store_id") == store_id]
-
-        if not store_sales:
+        store_totals = results["sales"]
+        if not store_totals:
             return StorePerformanceResponse(
                 store_id=store_id,
                 store_name=store_info.get("nom", f"Store {store_id}"),
@@ -218,25 +217,310 @@ class ReportingService:
                 performance_rating="No Sales",
             )
 
-        # Calculate metrics
-        total_revenue = sum(sale.get("total", 0) for sale in store_sales)
-        avg_amount = total_revenue / len(store_sales) if store_sales else 0.0
-
-        # Calculate performance rating
-        if total_revenue > 10000:
-            rating = "Excellent"
-        elif total_revenue > 5000:
-            rating = "Good"
-        elif total_revenue > 2000:
-            rating = "Average"
+        _, count, revenue = store_totals[0]
+        return self._store_performance(store_id, count, revenue, store_info)
+
+    async def get_revenue_trends(self, days: int) -> List[Dict[str, Any]]:
+        """Daily sales count and revenue over the last ``days`` days (UTC)"""
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        return [
+            {"date": day.isoformat(), "sales_count": count, "revenue": revenue}
+            for day, count, revenue in await self._daily_totals(since)
+        ]
+
+    async def get_sales_by_period(
+        self,
+        period: str = "month",
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        store_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Sales count and revenue per day, week, month or year (UTC).
+
+        Buckets are labelled by their first day (weeks start on Monday).
+        Without ``start_date`` the whole history is covered.
+        """
+        days = await self._daily_totals(start_date or date.min, end_date, store_id)
+        self.on_progress(0.8)
+
+        buckets: Dict[date, List[Any]] = {}
+        for day, count, revenue in days:
+            bucket = buckets.setdefault(period_start(day, period), [0, 0.0])
+            bucket[0] += count
+            bucket[1] += revenue
+        return [
+            {
+                "period_start": start.isoformat(),
+                "sales_count": count,
+                "revenue": float(revenue),
+            }
+            for start, (count, revenue) in sorted(buckets.items())
+        ]
+
+    async def get_sale_distribution(
+        self,
+        by: str = "store",
+        limit: int = 50,
+        time_range: Optional[TimeRange] = None,
+        approximate: bool = False,
+    ) -> List[SaleDistributionResponse]:
+        """Count, total, mean and percentiles of sale amounts per store, or of
+        line amounts per product, largest total first.
+
+        Exact percentiles need every amount, so rows are loaded into typed
+        columns (``src.columnar``) from the projection, or streamed from
+        retail-api while the projection is empty, and aggregated vectorized.
+        With ``approximate``, store percentiles are read from the per-day
+        t-digests (src.sketches) over the whole days of ``time_range``
+        instead; products always get exact figures.
+        """
+        stats = None
+        if approximate and by == "store" and self._use_projection():
+            first_day, end_day = time_range.days() if time_range else (None, None)
+            digests = sketches.sale_amount_digests(self.db, first_day, end_day)
+            stats = [
+                GroupStats(
+                    key=store_id,
+                    count=digest.count,
+                    total=digest.total,
+                    mean=digest.total / digest.count,
+                    percentiles={
+                        p: digest.quantile(p / 100) for p in DEFAULT_PERCENTILES
+                    },
+                )
+                for store_id, digest in digests.items()
+            ]
+        approximate = stats is not None
+        if stats is None:
+            if self._use_projection():
+                columns = (
+                    SaleColumns.line_amounts_by_product(self.db, time_range)
+                    if by == "product"
+                    else SaleColumns.sale_totals_by_store(self.db, time_range)
+                )
+            else:
+                columns = SaleColumns()
+                params = time_range.retail_params() if time_range else {}
+                async for sale in external_client.iter_sales(
+                    fields=STREAM_FIELDS, **params
+                ):
+                    columns.add_sale(sale, by)
+            self.on_progress(0.5)
+            stats = await self._run_cpu(group_stats, *columns.arrays())
+
+        stats = sorted(stats, key=lambda row: -row.total)[:limit]
+        self.on_progress(0.8)
+        if by == "product":
+            names = await self._fan_out(
+                {
+                    "products": external_client.get_products_by_ids(
+                        [row.key for row in stats]
+                    )
+                },
+                products={},
+            )
+            info = names["products"] or {}
         else:
-            rating = "Below Average"
+            names = await self._fan_out(
+                {"stores": external_client.get_stores(page=1, size=1000)}, stores=[]
+            )
+            info = {store["id"]: store for store in names["stores"] or []}
+
+        return [
+            SaleDistributionResponse(
+                id=row.key,
+                name=(info.get(row.key) or {}).get("nom"),
+                count=row.count,
+                total=row.total,
+                mean=row.mean,
+                p50=row.percentiles[50],
+                p90=row.percentiles[90],
+                p99=row.percentiles[99],
+                approximate=approximate,
+            )
+            for row in stats
+        ]
+
+    async def _run_cpu(self, fn: Callable, *args):
+        """Run CPU-bound ``fn`` in ``cpu_executor`` when one is set"""
+        if self.cpu_executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.cpu_executor, fn, *args
+        )
+
+    def _use_projection(self) -> bool:
+        if self._projection_ready is None:
+            self._projection_ready = projections.is_ready(self.db)
+        return self._projection_ready
+
+    async def _store_totals(
+        self, store_id: Optional[int] = None, time_range: Optional[TimeRange] = None
+    ) -> List[Tuple[int, int, float]]:
+        """(store_id, sales_count, revenue) of stores with sales, best first"""
+        if self._use_projection() and time_range is not None:
+            return rollups.store_totals(self.db, time_range, store_id)
+        if self._use_projection():
+            query = self.db.query(
+                models.StoreSalesProjection.store_id,
+                models.StoreSalesProjection.sales_count,
+                models.StoreSalesProjection.revenue,
+            ).filter(models.StoreSalesProjection.sales_count > 0)
+            if store_id is not None:
+                query = query.filter(models.StoreSalesProjection.store_id == store_id)
+            query = query.order_by(models.StoreSalesProjection.revenue.desc())
+            return [(sid, count, float(revenue)) for sid, count, revenue in query]
+
+        if time_range is not None and not time_range.whole_days:
+            # The retail summary and by-store stats only filter whole days
+            return await self._stream_totals("store_totals", time_range, store_id)
+        dates = time_range.retail_params() if time_range else {}
+        if store_id is not None:
+            summary = await self._retail_stats("summary", store_id=store_id, **dates)
+            if summary is None:
+                return await self._stream_totals("store_totals", time_range, store_id)
+            if not summary.get("nombre_ventes"):
+                return []
+            return [(store_id, summary["nombre_ventes"], summary["total_ventes"])]
+        rows = await self._retail_stats("by-store", **dates)
+        if rows is None:
+            return await self._stream_totals("store_totals", time_range)
+        return [
+            (row["store_id"], row["nombre_ventes"], row["total_ventes"]) for row in rows
+        ]
+
+    async def _product_totals(
+        self,
+        limit: int,
+        by: str,
+        time_range: Optional[TimeRange] = None,
+        store_id: Optional[int] = None,
+    ) -> List[Tuple[int, int, float, int]]:
+        """(product_id, quantity, revenue, sales_count), top ``limit``"""
+        if self._use_projection() and (time_range or store_id is not None):
+            return rollups.product_totals(
+                self.db, time_range or TimeRange(), limit, by, store_id
+            )
+        if self._use_projection():
+            order = (
+                models.ProductSalesProjection.quantity_sold
+                if by == "quantity"
+                else models.ProductSalesProjection.revenue
+            )
+            query = (
+                self.db.query(
+                    models.ProductSalesProjection.product_id,
+                    models.ProductSalesProjection.quantity_sold,
+                    models.ProductSalesProjection.revenue,
+                    models.ProductSalesProjection.sales_count,
+                )
+                .filter(models.ProductSalesProjection.sales_count > 0)
+                .order_by(order.desc(), models.ProductSalesProjection.product_id)
+                .limit(limit)
+            )
+            return [tuple(row) for row in query]
+
+        rows = await self._retail_stats(
+            "by-product",
+            limit=limit,
+            order_by="quantite" if by == "quantity" else "total",
+            store_id=store_id,
+            **(time_range.retail_params() if time_range else {}),
+        )
+        if rows is None:
+            return await self._stream_totals(
+                "product_totals", time_range, limit, by, store_id=store_id
+            )
+        return [
+            (
+                row["product_id"],
+                row["quantite_vendue"],
+                row["total_ventes"],
+                row["nombre_ventes"],
+            )
+            for row in rows
+        ]
+
+    async def _daily_totals(
+        self,
+        since: date,
+        until: Optional[date] = None,
+        store_id: Optional[int] = None,
+    ) -> List[Tuple[date, int, float]]:
+        """(day, sales_count, revenue) from ``since`` to ``until`` (inclusive),
+        oldest first"""
+        if self._use_projection():
+            query = self.db.query(
+                models.DailySalesProjection.day,
+                func.sum(models.DailySalesProjection.sales_count),
+                func.sum(models.DailySalesProjection.revenue),
+            ).filter(models.DailySalesProjection.day >= since)
+            if until is not None:
+                query = query.filter(models.DailySalesProjection.day <= until)
+            if store_id is not None:
+                query = query.filter(models.DailySalesProjection.store_id == store_id)
+            query = query.group_by(models.DailySalesProjection.day).order_by(
+                models.DailySalesProjection.day
+            )
+            return [(day, count, float(revenue)) for day, count, revenue in query]
+
+        rows = await self._retail_stats(
+            "by-date",
+            date_debut=since.isoformat(),
+            date_fin=until.isoformat() if until else None,
+            store_id=store_id,
+        )
+        if rows is None:
+            return await self._stream_totals(
+                "daily_totals", None, since, until, store_id
+            )
+        return [
+            (date.fromisoformat(row["jour"]), row["nombre_ventes"], row["total_ventes"])
+            for row in rows
+        ]
+
+    async def _retail_stats(self, dimension: str, **params):
+        params = {name: value for name, value in params.items() if value is not None}
+        try:
+            return await external_client.get_sales_stats(dimension, **params)
+        except Exception as e:
+            print(f"Error fetching sales stats from retail-api: {e}")
+            return None
+
+    async def _stream_totals(
+        self,
+        method: str,
+        time_range: Optional[TimeRange],
+        *args,
+        store_id: Optional[int] = None,
+    ) -> list:
+        """Answer from the retail sale stream, folded once per service, time
+        range and store (``store_id`` filters the stream itself)"""
+        key = (time_range, store_id)
+        if key not in self._streamed_totals:
+            try:
+                self._streamed_totals[key] = await RunningSalesTotals.fold(
+                    external_client.iter_sales(
+                        fields=STREAM_FIELDS,
+                        store_id=store_id,
+                        **(time_range.retail_params() if time_range else {}),
+                    )
+                )
+            except Exception as e:
+                print(f"Error streaming sales from retail-api: {e}")
+                return []
+        return getattr(self._streamed_totals[key], method)(*args)
 
+    @staticmethod
+    def _store_performance(
+        store_id: int, sales_count: int, revenue: float, store_info: Dict[str, Any]
+    ) -> StorePerformanceResponse:
+        revenue = float(revenue)
         return StorePerformanceResponse(
             store_id=store_id,
             store_name=store_info.get("nom", f"Store {store_id}"),
-            sales_count=len(store_sales),
-            revenue=float(total_revenue),
-            average_sale_amount=float(avg_amount),
-            performance_rating=rating,
+            sales_count=sales_count,
+            revenue=revenue,
+            average_sale_amount=revenue / sales_count if sales_count else 0.0,
+            performance_rating=performance_rating(revenue),
         )
@@ -0,0 +1,463 @@
+import json
+import math
+import os
+import random
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import src.models as models
+
+# Metrics counted per product, in the order of ProductSketch.counts
+REVENUE, QUANTITY, SALES = 0, 1, 2
+METRICS = {"revenue": REVENUE, "quantity": QUANTITY}
+
+SKETCH_WIDTH = int(os.getenv("SKETCH_WIDTH", "256"))
+SKETCH_DEPTH = int(os.getenv("SKETCH_DEPTH", "4"))
+SKETCH_TOP_K = int(os.getenv("SKETCH_TOP_K", "64"))
+SKETCH_COMPRESSION = int(os.getenv("SKETCH_COMPRESSION", "100"))
+
+_PRIME = (1 << 61) - 1
+
+
+def _hash_params(depth: int, seed: int = 20240501) -> List[Tuple[int, int]]:
+    """Fixed (a, b) per row: every sketch hashes alike, so they can be merged"""
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(depth)]
+
+
+class SpaceSaving:
+    """Space-Saving summary of the ``k`` heaviest keys of a weighted stream.
+
+    Each kept key has a count that overestimates its true weight by at most
+    its ``error``. When the summary is full, a new key replaces the lightest
+    one and inherits its count as error. Negative weights (cancellations)
+    only lower the count of a key already kept.
+    """
+
+    def __init__(self, k: int = SKETCH_TOP_K):
+        self.k = k
+        self.counters: Dict[int, List[float]] = {}  # key -> [count, error]
+
+    def add(self, key: int, weight: float) -> None:
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[0] = max(counter[0] + weight, 0.0)
+        elif weight <= 0:
+            return
+        elif len(self.counters) < self.k:
+            self.counters[key] = [weight, 0.0]
+        else:
+            lightest = min(self.counters, key=lambda item: self.counters[item][0])
+            floor = self.counters.pop(lightest)[0]
+            self.counters[key] = [floor + weight, floor]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """Summary of both streams (mergeable summaries, Agarwal et al.)"""
+        floor = self._floor()
+        other_floor = other._floor()
+        merged = SpaceSaving(max(self.k, other.k))
+        for key in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(key, (floor, floor))
+            other_count, other_error = other.counters.get(
+                key, (other_floor, other_floor)
+            )
+            merged.counters[key] = [count + other_count, error + other_error]
+        if len(merged.counters) > merged.k:
+            kept = sorted(merged.counters.items(), key=lambda item: -item[1][0])
+            merged.counters = dict(kept[: merged.k])
+        return merged
+
+    def _floor(self) -> float:
+        """Upper bound of the weight of any key not kept"""
+        if len(self.counters) < self.k:
+            return 0.0
+        return min(count for count, _ in self.counters.values())
+
+    def to_json(self) -> str:
+        return json.dumps([[key, c, e] for key, (c, e) in self.counters.items()])
+
+    @classmethod
+    def from_json(cls, payload: str, k: int = SKETCH_TOP_K) -> "SpaceSaving":
+        summary = cls(k)
+        summary.counters = {key: [c, e] for key, c, e in json.loads(payload or "[]")}
+        return summary
+
+
+class ProductSketch:
+    """Count-Min sketch of revenue, quantity and sales count per product, plus
+    Space-Saving heavy hitters by revenue and by quantity.
+
+    Memory is fixed (``3 x depth x width`` floats and ``2k`` counters)
+    whatever the number of products. A Count-Min estimate never undercounts
+    and overcounts by at most ``e / width`` of the stream total with
+    probability ``1 - exp(-depth)``. Sketches of the same shape add up, so
+    per-store and per-day sketches merge into any store set or date range.
+    """
+
+    def __init__(
+        self,
+        width: int = SKETCH_WIDTH,
+        depth: int = SKETCH_DEPTH,
+        k: int = SKETCH_TOP_K,
+        counts: Optional[np.ndarray] = None,
+    ):
+        self.width = width
+        self.depth = depth
+        self.counts = (
+            counts if counts is not None else np.zeros((3, depth, width), np.float64)
+        )
+        self.top = {metric: SpaceSaving(k) for metric in METRICS}
+        self._hashes = _hash_params(depth)
+
+    def _columns(self, key: int) -> List[int]:
+        return [((a * key + b) % _PRIME) % self.width for a, b in self._hashes]
+
+    def add(self, product_id: int, quantity: float, revenue: float, sales: int) -> None:
+        columns = self._columns(product_id)
+        rows = range(self.depth)
+        self.counts[REVENUE, rows, columns] += revenue
+        self.counts[QUANTITY, rows, columns] += quantity
+        self.counts[SALES, rows, columns] += sales
+        self.top["revenue"].add(product_id, revenue)
+        self.top["quantity"].add(product_id, quantity)
+
+    def estimate(self, product_id: int) -> np.ndarray:
+        """(revenue, quantity, sales) upper estimates of one product"""
+        columns = self._columns(product_id)
+        return self.counts[:, range(self.depth), columns].min(axis=1)
+
+    def merge(self, other: "ProductSketch") -> "ProductSketch":
+        if other.counts.shape != self.counts.shape:
+            raise ValueError("Cannot merge sketches of different shapes")
+        merged = ProductSketch(
+            self.width, self.depth, counts=self.counts + other.counts
+        )
+        merged.top = {
+            metric: self.top[metric].merge(other.top[metric]) for metric in METRICS
+        }
+        return merged
+
+    def heavy_hitters(self, limit: int, by: str = "revenue") -> List[Tuple]:
+        """(product_id, quantity, revenue, sales_count) of the top ``limit``
+        candidates, each figure the tighter of its two upper estimates"""
+        metric = METRICS[by]
+        rows = []
+        for product_id, (count, _) in self.top[by].counters.items():
+            estimate = self.estimate(product_id)
+            estimate[metric] = min(estimate[metric], count)
+            if estimate[metric] > 0:
+                rows.append(
+                    (
+                        product_id,
+                        int(round(estimate[QUANTITY])),
+                        round(float(estimate[REVENUE]), 2),
+                        int(round(estimate[SALES])),
+                    )
+                )
+        rank = 1 if by == "quantity" else 2
+        rows.sort(key=lambda row: (-row[rank], row[0]))
+        return rows[:limit]
+
+    @classmethod
+    def from_row(cls, row: models.ProductSalesSketch) -> "ProductSketch":
+        counts = np.frombuffer(row.counts, dtype=np.float64).reshape(
+            3, row.depth, row.width
+        )
+        sketch = cls(row.width, row.depth, counts=counts.copy())
+        sketch.top = {
+            "revenue": SpaceSaving.from_json(row.top_revenue),
+            "quantity": SpaceSaving.from_json(row.top_quantity),
+        }
+        return sketch
+
+    def to_row(self, row: models.ProductSalesSketch) -> None:
+        row.width = self.width
+        row.depth = self.depth
+        row.counts = self.counts.tobytes()
+        row.top_revenue = self.top["revenue"].to_json()
+        row.top_quantity = self.top["quantity"].to_json()
+
+
+class TDigest:
+    """Merging t-digest (Dunning & Ertl) of a stream of amounts.
+
+    Values are summarized by centroids (mean, weight) sorted by mean. The
+    arcsine scale function keeps centroids small in the tails and larger in
+    the middle, so p99 stays accurate with about ``compression`` centroids
+    whatever the number of values. Digests merge by compressing their
+    centroids together; values cannot be removed.
+    """
+
+    def __init__(self, compression: int = SKETCH_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0, np.float64)
+        self.weights = np.empty(0, np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add_many(self, values: Iterable[float]) -> None:
+        values = np.fromiter(values, np.float64)
+        if not values.size:
+            return
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._compress(
+            np.concatenate([self.means, values]),
+            np.concatenate([self.weights, np.ones(values.size)]),
+        )
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        merged = TDigest(max(self.compression, other.compression))
+        merged.count = self.count + other.count
+        merged.total = self.total + other.total
+        merged.minimum = min(self.minimum, other.minimum)
+        merged.maximum = max(self.maximum, other.maximum)
+        merged._compress(
+            np.concatenate([self.means, other.means]),
+            np.concatenate([self.weights, other.weights]),
+        )
+        return merged
+
+    def _weight_limit(self, q: float) -> float:
+        """Quantile up to which a centroid starting at ``q`` may grow"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        if not means.size:
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = float(weights.sum())
+
+        merged_means, merged_weights = [], []
+        mean, weight, done = float(means[0]), float(weights[0]), 0.0
+        limit = self._weight_limit(0.0) * total
+        for value, value_weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if done + weight + value_weight <= limit:
+                weight += value_weight
+                mean += (value - mean) * value_weight / weight
+            else:
+                merged_means.append(mean)
+                merged_weights.append(weight)
+                done += weight
+                limit = self._weight_limit(done / total) * total
+                mean, weight = value, value_weight
+        merged_means.append(mean)
+        merged_weights.append(weight)
+        self.means = np.array(merged_means)
+        self.weights = np.array(merged_weights)
+
+    def quantile(self, q: float) -> float:
+        """Estimated ``q``-quantile (0 to 1), interpolated between centroids"""
+        if not self.means.size:
+            return 0.0
+        if self.means.size == 1:
+            return float(self.means[0])
+        centers = np.cumsum(self.weights) - self.weights / 2
+        total = float(self.weights.sum())
+        target = q * total
+        if target <= centers[0]:
+            fraction = target / centers[0]
+            return float(self.minimum + (self.means[0] - self.minimum) * fraction)
+        if target >= centers[-1]:
+            fraction = (target - centers[-1]) / (total - centers[-1])
+            return float(self.means[-1] + (self.maximum - self.means[-1]) * fraction)
+        return float(np.interp(target, centers, self.means))
+
+    @classmethod
+    def from_row(cls, row: models.SaleAmountDigest) -> "TDigest":
+        digest = cls()
+        centroids = np.frombuffer(row.centroids, dtype=np.float64).reshape(2, -1)
+        digest.means, digest.weights = centroids[0].copy(), centroids[1].copy()
+        digest.count = row.count
+        digest.total = row.total
+        digest.minimum = row.minimum
+        digest.maximum = row.maximum
+        return digest
+
+    def to_row(self, row: models.SaleAmountDigest) -> None:
+        row.centroids = np.stack([self.means, self.weights]).tobytes()
+        row.count = self.count
+        row.total = self.total
+        row.minimum = self.minimum
+        row.maximum = self.maximum
+
+
+# Net (quantity, revenue, sales) per product, per (store_id, day)
+SketchDeltas = Dict[Tuple[int, date], Dict[int, List[float]]]
+
+
+def new_deltas() -> SketchDeltas:
+    return defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0]))
+
+
+def persist(db: Session, deltas: SketchDeltas) -> None:
+    """Fold the deltas of a batch into the stored per-store, per-day sketches.
+
+    Rows are locked (PostgreSQL) so consumers of other instances updating the
+    same store and day wait instead of losing an update.
+    """
+    for (store_id, day), products in sorted(deltas.items()):
+        row = (
+            db.query(models.ProductSalesSketch)
+            .filter(
+                models.ProductSalesSketch.store_id == store_id,
+                models.ProductSalesSketch.day == day,
+            )
+            .with_for_update()
+            .one_or_none()
+        )
+        if row is None:
+            row = models.ProductSalesSketch(store_id=store_id, day=day)
+            db.add(row)
+            sketch = ProductSketch()
+        else:
+            sketch = ProductSketch.from_row(row)
+        for product_id, (quantity, revenue, sales) in sorted(products.items()):
+            if quantity or revenue or sales:
+                sketch.add(product_id, quantity, revenue, sales)
+        sketch.to_row(row)
+    db.flush()
+
+
+def merged_sketch(
+    db: Session,
+    first_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    store_id: Optional[int] = None,
+) -> Optional[ProductSketch]:
+    """Merge of the sketches of ``[first_day, end_day)``, one store or all"""
+    query = db.query(models.ProductSalesSketch)
+    if first_day is not None:
+        query = query.filter(models.ProductSalesSketch.day >= first_day)
+    if end_day is not None:
+        query = query.filter(models.ProductSalesSketch.day < end_day)
+    if store_id is not None:
+        query = query.filter(models.ProductSalesSketch.store_id == store_id)
+
+    merged = None
+    for row in query.yield_per(100):
+        sketch = ProductSketch.from_row(row)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+def approximate_product_totals(
+    db: Session,
+    limit: int,
+    by: str = "revenue",
+    first_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    store_id: Optional[int] = None,
+) -> List[Tuple[int, int, float, int]]:
+    sketch = merged_sketch(db, first_day, end_day, store_id)
+    return sketch.heavy_hitters(limit, by) if sketch is not None else []
+
+
+def add_sale_lines(
+    deltas: SketchDeltas,
+    store_id: int,
+    day: date,
+    lines: Iterable[Dict],
+    sign: int,
+) -> None:
+    """Record a projected sale (``sign`` -1 for a cancellation)"""
+    products = deltas[(store_id, day)]
+    seen = set()
+    for line in lines:
+        product = products[line["product_id"]]
+        product[0] += sign * line["quantite"]
+        product[1] += sign * line["sous_total"]
+        if line["product_id"] not in seen:
+            product[2] += sign
+            seen.add(line["product_id"])
+
+
+# Sale totals to add per (store_id, day); None: rebuild from the projection
+DigestDeltas = Dict[Tuple[int, date], Optional[List[float]]]
+
+
+def add_sale_amount(
+    deltas: DigestDeltas, store_id: int, day: date, amount: float, sign: int
+) -> None:
+    """Record a projected sale total. A t-digest cannot forget a value, so a
+    cancellation (``sign`` -1) marks the store-day for a rebuild instead"""
+    key = (store_id, day)
+    if sign < 0:
+        deltas[key] = None
+    elif key not in deltas:
+        deltas[key] = [amount]
+    elif deltas[key] is not None:
+        deltas[key].append(amount)
+
+
+def persist_digests(db: Session, deltas: DigestDeltas) -> None:
+    """Fold the deltas of a batch into the stored per-store, per-day digests.
+
+    A store-day marked for rebuild is recomputed from the sales of the
+    projection (a single day of one store).
+    """
+    for (store_id, day), amounts in sorted(deltas.items()):
+        row = (
+            db.query(models.SaleAmountDigest)
+            .filter(
+                models.SaleAmountDigest.store_id == store_id,
+                models.SaleAmountDigest.day == day,
+            )
+            .with_for_update()
+            .one_or_none()
+        )
+        if amounts is None or row is None:
+            digest = TDigest()
+        else:
+            digest = TDigest.from_row(row)
+        if amounts is None:
+            amounts = (
+                total
+                for (total,) in db.query(models.ProjectedSale.total).filter(
+                    models.ProjectedSale.store_id == store_id,
+                    models.ProjectedSale.day == day,
+                    models.ProjectedSale.cancelled.is_(False),
+                )
+            )
+        digest.add_many(amounts)
+
+        if not digest.count:
+            if row is not None:
+                db.delete(row)
+            continue
+        if row is None:
+            row = models.SaleAmountDigest(store_id=store_id, day=day)
+            db.add(row)
+        digest.to_row(row)
+    db.flush()
+
+
+def sale_amount_digests(
+    db: Session, first_day: Optional[date] = None, end_day: Optional[date] = None
+) -> Dict[int, TDigest]:
+    """Per store, the merge of its sale amount digests of ``[first_day,
+    end_day)``"""
+    query = db.query(models.SaleAmountDigest)
+    if first_day is not None:
+        query = query.filter(models.SaleAmountDigest.day >= first_day)
+    if end_day is not None:
+        query = query.filter(models.SaleAmountDigest.day < end_day)
+
+    digests: Dict[int, TDigest] = {}
+    for row in query.yield_per(100):
+        digest = TDigest.from_row(row)
+        known = digests.get(row.store_id)
+        digests[row.store_id] = digest if known is None else known.merge(digest)
+    return digests
@@ -12,6 +12,7 @@ import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+os.environ["TESTING"] = "1"
 
 from main import app
 from src.database import get_db, Base
@@ -43,6 +44,16 @@ def override_get_db():
 app.dependency_overrides[get_db] = override_get_db
 
 
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    """Each test computes its reports from its own data and mocks"""
+    from src.report_cache import report_cache
+
+    report_cache.clear()
+    yield
+    report_cache.clear()
+
+
 @pytest.fixture
 def client():
     """Test client fixture"""
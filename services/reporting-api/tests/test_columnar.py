@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from src.columnar import SaleColumns, group_stats
+from src.projections import SalesProjector, mark_rebuilt
+from tests.test_projections import sale_event
+
+
+def reference(keys, amounts, percentile):
+    return {
+        int(key): np.percentile(amounts[keys == key], percentile)
+        for key in np.unique(keys)
+    }
+
+
+class TestGroupStats:
+    @pytest.mark.parametrize(
+        "amounts",
+        [
+            np.round(np.random.default_rng(1).uniform(1, 500, 5000), 2),
+            np.random.default_rng(2).lognormal(3, 1, 5000),  # not cents
+        ],
+    )
+    @pytest.mark.parametrize("spread", [40, 10**9])  # dense and sparse keys
+    def test_matches_numpy_percentile(self, amounts, spread):
+        keys = np.random.default_rng(3).integers(0, 40, len(amounts)) * spread + 7
+
+        stats = group_stats(keys, amounts)
+
+        assert [row.key for row in stats] == sorted(int(k) for k in np.unique(keys))
+        for percentile in (50, 90, 99):
+            expected = reference(keys, amounts, percentile)
+            for row in stats:
+                assert row.percentiles[percentile] == pytest.approx(
+                    expected[row.key], abs=1e-6
+                )
+        for row in stats:
+            group = amounts[keys == row.key]
+            assert row.count == len(group)
+            assert row.total == pytest.approx(group.sum())
+            assert row.mean == pytest.approx(group.mean())
+
+    def test_empty_columns(self):
+        assert SaleColumns().group_stats() == []
+
+    def test_cancelled_sales_are_skipped(self):
+        columns = SaleColumns()
+        columns.add_sale({"store_id": 1, "total": 5.0, "statut": "annulee"}, "store")
+        columns.add_sale({"store_id": 1, "total": 7.0}, "store")
+        assert [(row.key, row.total) for row in columns.group_stats()] == [(1, 7.0)]
+
+
+class TestSaleDistributionReport:
+    def test_distribution_from_projection(self, client, db_session):
+        projector = SalesProjector(db_session)
+        for sale_id, (store_id, total) in enumerate(
+            [(1, 10.0), (1, 30.0), (2, 100.0), (1, 20.0)], start=1
+        ):
+            projector.apply(
+                sale_event("SaleCreated", sale_id, store_id=store_id, total=total)
+            )
+        projector.apply(sale_event("SaleCancelled", 3, store_id=2, total=100.0))
+        mark_rebuilt(db_session, 0)
+        db_session.commit()
+
+        with patch(
+            "src.services.external_client.get_stores",
+            AsyncMock(return_value=[{"id": 1, "nom": "Centre"}]),
+        ):
+            response = client.get("/api/v1/reports/sale-distribution?by=store")
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "id": 1,
+                "name": "Centre",
+                "count": 3,
+                "total": 60.0,
+                "mean": 20.0,
+                "p50": 20.0,
+                "p90": 28.0,
+                "p99": 29.8,
+                "approximate": False,
+            }
+        ]
@@ -0,0 +1,99 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from src.external_services import ExternalServiceClient
+
+
+def inventory_transport(requests):
+    def handler(request):
+        requests.append(request)
+        ids = [int(i) for i in request.url.params["ids"].split(",")]
+        items = [{"id": i, "nom": f"Produit {i}"} for i in ids if i != 404]
+        return httpx.Response(200, json={"items": items, "total": len(items)})
+
+    return httpx.MockTransport(handler)
+
+
+class TestFanOut:
+    @pytest.mark.asyncio
+    async def test_runs_calls_concurrently_and_degrades_late_ones(self):
+        client = ExternalServiceClient()
+        cancelled = []
+
+        async def fast():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def failing():
+            raise httpx.ConnectError("down")
+
+        started = asyncio.get_running_loop().time()
+        result = await client.fan_out(
+            {"fast": fast(), "slow": slow(), "failing": failing()},
+            {"slow": []},
+            deadline=0.1,
+        )
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(0)
+
+        assert result.values == {"fast": "ok", "slow": [], "failing": None}
+        assert sorted(result.degraded) == ["failing", "slow"]
+        assert cancelled == [True]
+        assert elapsed < 1
+
+    @pytest.mark.asyncio
+    async def test_products_by_ids_are_batched_on_the_pooled_client(self):
+        requests = []
+        client = ExternalServiceClient()
+        client._client = httpx.AsyncClient(transport=inventory_transport(requests))
+        client._client_loop = asyncio.get_running_loop()
+
+        products = await client.get_products_by_ids([3, 1, 3, 404, 2], batch_size=2)
+        await client.aclose()
+
+        assert sorted(products) == [1, 2, 3]
+        assert products[3]["nom"] == "Produit 3"
+        assert sorted(r.url.params["ids"] for r in requests) == ["1,2", "3,404"]
+
+
+class TestDegradedReports:
+    def test_summary_is_flagged_when_an_upstream_is_late(self, client):
+        async def late_stores(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        with patch("src.services.external_client.request_deadline", 0.1), patch(
+            "src.services.external_client.count_products", AsyncMock(return_value=42)
+        ), patch("src.services.external_client.get_stores", late_stores), patch(
+            "src.services.external_client.get_sales_stats", AsyncMock(return_value=[])
+        ):
+            response = client.get("/api/v1/reports/global-summary")
+
+        assert response.status_code == 200
+        assert response.headers["X-Report-Degraded"] == "stores"
+        assert response.json()["total_products"] == 42
+        assert response.json()["total_stores"] == 0
+
+    def test_retail_outage_degrades_the_store_lookup(self, client):
+        retail = ExternalServiceClient()
+        unavailable = httpx.MockTransport(lambda request: httpx.Response(503))
+        retail._http = lambda: httpx.AsyncClient(transport=unavailable)
+
+        with patch("src.services.external_client.get_store", retail.get_store), patch(
+            "src.services.external_client.get_sales_stats",
+            AsyncMock(return_value={"nombre_ventes": 3, "total_ventes": 30.0}),
+        ):
+            response = client.get("/api/v1/reports/store/1/performance")
+
+        # An outage is not "no such store": figures are served, flagged degraded
+        assert response.status_code == 200
+        assert response.headers["X-Report-Degraded"] == "store"
@@ -0,0 +1,94 @@
+import ast
+from pathlib import Path
+
+import httpx
+import pytest
+
+import src.http_cache
+from src.http_cache import ConditionalCache
+
+ECOMMERCE_COPY = (
+    Path(__file__).resolve().parents[2] / "ecommerce-api" / "src" / "http_cache.py"
+)
+
+
+def code_without_docstrings(path):
+    """AST dump of a module, docstrings and comments left out"""
+    tree = ast.parse(Path(path).read_text())
+    for node in ast.walk(tree):
+        body = getattr(node, "body", None)
+        if (
+            isinstance(body, list)
+            and body
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+            and isinstance(body[0].value.value, str)
+        ):
+            node.body = body[1:]
+    return ast.dump(tree)
+
+
+def catalog_transport(state):
+    def handler(request):
+        state["requests"].append(dict(request.headers))
+        etag = f'W/"v{state["version"]}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(
+            200, json={"version": state["version"]}, headers={"ETag": etag}
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class TestConditionalCache:
+    @pytest.mark.asyncio
+    async def test_revalidates_and_reuses_body_on_304(self):
+        state = {"version": 1, "requests": []}
+        cache = ConditionalCache()
+        async with httpx.AsyncClient(transport=catalog_transport(state)) as client:
+            _, first = await cache.get_json(client, "http://inventory/products/1")
+            response, second = await cache.get_json(
+                client, "http://inventory/products/1"
+            )
+            assert response.status_code == 304
+            assert second == first == {"version": 1}
+            assert state["requests"][1]["if-none-match"] == 'W/"v1"'
+
+            state["version"] = 2
+            response, third = await cache.get_json(
+                client, "http://inventory/products/1"
+            )
+            assert response.status_code == 200
+            assert third == {"version": 2}
+
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_keys_include_params_and_respect_max_entries(self):
+        state = {"version": 1, "requests": []}
+        cache = ConditionalCache(max_entries=1)
+        async with httpx.AsyncClient(transport=catalog_transport(state)) as client:
+            await cache.get_json(client, "http://inventory/products/", {"skip": 0})
+            await cache.get_json(client, "http://inventory/products/", {"skip": 100})
+            await cache.get_json(client, "http://inventory/products/", {"skip": 0})
+
+        # The first entry was evicted: no conditional request is sent
+        assert "if-none-match" not in state["requests"][2]
+        assert cache.hits == 0
+
+    @pytest.mark.asyncio
+    async def test_responses_without_validators_are_not_cached(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        cache = ConditionalCache()
+        async with httpx.AsyncClient(transport=transport) as client:
+            await cache.get_json(client, "http://retail/stores/")
+        assert cache.conditional_headers("http://retail/stores/") == {}
+
+    @pytest.mark.skipif(
+        not ECOMMERCE_COPY.exists(), reason="ecommerce-api is not checked out"
+    )
+    def test_ecommerce_copy_is_in_sync(self):
+        assert code_without_docstrings(ECOMMERCE_COPY) == code_without_docstrings(
+            src.http_cache.__file__
+        )
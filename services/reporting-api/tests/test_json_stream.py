@@ -0,0 +1,133 @@
+import asyncio
+import json
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from src.aggregates import RunningSalesTotals
+from src.external_services import ExternalServiceClient
+from src.json_stream import iter_json_array, iter_ndjson
+
+SALES = [
+    {
+        "store_id": 1,
+        "date_vente": "2026-10-01T10:00:00",
+        "total": 12.5,
+        "statut": "complétée",
+        "sale_lines": [
+            {"product_id": 7, "quantite": 2, "sous_total": 10.0},
+            {"product_id": 7, "quantite": 1, "sous_total": 2.5},
+        ],
+    },
+    {
+        "store_id": 2,
+        "date_vente": "2026-10-02T09:30:00",
+        "total": 100,
+        "statut": "complétée",
+        "sale_lines": [{"product_id": 8, "quantite": 1, "sous_total": 100}],
+    },
+    {
+        "store_id": 1,
+        "date_vente": "2026-10-02T11:00:00",
+        "total": 40.0,
+        "statut": "annulee",
+        "sale_lines": [{"product_id": 8, "quantite": 4, "sous_total": 40.0}],
+    },
+]
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+class TestIncrementalParsing:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size", [1, 2, 7, 4096])
+    async def test_json_array_split_anywhere(self, size):
+        body = json.dumps([*SALES, 12345, "é"], ensure_ascii=False).encode()
+        assert await collect(iter_json_array(chunked(body, size))) == [
+            *SALES,
+            12345,
+            "é",
+        ]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("size", [1, 5, 4096])
+    async def test_ndjson_split_anywhere(self, size):
+        body = "".join(json.dumps(sale) + "\n" for sale in SALES).encode()
+        assert await collect(iter_ndjson(chunked(body, size))) == SALES
+
+    @pytest.mark.asyncio
+    async def test_empty_array(self):
+        assert await collect(iter_json_array(chunked(b" [ ] ", 1))) == []
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("body", [b"[1, 2", b"[1,]", b"[1 2]", b"{}", b"[1] 2"])
+    async def test_malformed_arrays_raise(self, body):
+        with pytest.raises(ValueError):
+            await collect(iter_json_array(chunked(body, 2)))
+
+    @pytest.mark.asyncio
+    async def test_client_streams_records_of_either_format(self):
+        def handler(request):
+            if request.url.params.get("format") == "ndjson":
+                body = "".join(json.dumps(sale) + "\n" for sale in SALES)
+                content_type = "application/x-ndjson"
+            else:
+                body = json.dumps(SALES)
+                content_type = "application/json"
+            return httpx.Response(
+                200,
+                stream=httpx.ByteStream(body.encode()),
+                headers={"content-type": content_type},
+            )
+
+        client = ExternalServiceClient()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._client_loop = asyncio.get_running_loop()
+
+        assert await collect(client.iter_sales()) == SALES
+        assert await collect(client.iter_records("http://retail/sales/")) == SALES
+        await client.aclose()
+
+
+class TestRunningSalesTotals:
+    @pytest.mark.asyncio
+    async def test_fold_skips_cancelled_sales(self):
+        async def stream():
+            for sale in SALES:
+                yield sale
+
+        totals = await RunningSalesTotals.fold(stream())
+
+        assert totals.store_totals() == [(2, 1, 100.0), (1, 1, 12.5)]
+        assert totals.product_totals(10, "quantity") == [
+            (7, 3, 12.5, 1),
+            (8, 1, 100.0, 1),
+        ]
+        assert totals.daily_totals(date(2026, 10, 2)) == [(date(2026, 10, 2), 1, 100.0)]
+
+    def test_reports_fall_back_to_the_sale_stream(self, client):
+        async def sales(**kwargs):
+            for sale in SALES:
+                yield sale
+
+        with patch(
+            "src.services.external_client.get_sales_stats",
+            AsyncMock(side_effect=httpx.ConnectError("no stats")),
+        ), patch("src.services.external_client.iter_sales", sales), patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=[])
+        ):
+            performances = client.get("/api/v1/reports/store-performances").json()
+
+        assert [(p["store_id"], p["revenue"]) for p in performances] == [
+            (2, 100.0),
+            (1, 12.5),
+        ]
@@ -0,0 +1,332 @@
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import src.models as models
+from src.projections import (
+    SalesEventConsumer,
+    SalesProjector,
+    is_ready,
+    mark_rebuilt,
+    rebuild,
+)
+from tests.conftest import TestingSessionLocal
+
+
+def sale_event(event_type, sale_id, store_id=1, total=10.0, lines=None, **extra):
+    return {
+        "event_type": event_type,
+        "data": {
+            "sale_id": sale_id,
+            "store_id": store_id,
+            "date_vente": extra.pop("date_vente", "2024-05-02T10:00:00"),
+            "total": total,
+            "statut": extra.pop("statut", "terminee"),
+            "lines": (
+                lines
+                if lines is not None
+                else [{"product_id": 7, "quantite": 2, "sous_total": total}]
+            ),
+        },
+    }
+
+
+def store_row(db_session, store_id=1):
+    db_session.expire_all()
+    row = db_session.get(models.StoreSalesProjection, store_id)
+    return (row.sales_count, row.revenue) if row else None
+
+
+def product_row(db_session, product_id=7):
+    db_session.expire_all()
+    row = db_session.get(models.ProductSalesProjection, product_id)
+    return (row.quantity_sold, row.revenue, row.sales_count) if row else None
+
+
+class FakeStream:
+    """Minimal Redis consumer-group stand-in (single consumer)"""
+
+    def __init__(self, events):
+        self.messages = [
+            (f"{i + 1}-0", {"event": json.dumps(event)})
+            for i, event in enumerate(events)
+        ]
+        self.delivered = []
+        self.acked = []
+        self.added = []
+
+    def xgroup_create(self, *args, **kwargs):
+        pass
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        ((stream, last_id),) = streams.items()
+        if last_id == "0":
+            batch = [m for m in self.delivered if m[0] not in self.acked]
+        else:
+            batch = self.messages[len(self.delivered) :][:count]
+            self.delivered.extend(batch)
+        return [(stream, batch)] if batch else []
+
+    def xack(self, stream, group, *ids):
+        self.acked.extend(ids)
+
+    def xadd(self, stream, fields):
+        self.added.append((stream, fields))
+
+
+class TestSalesProjector:
+    def test_events_are_applied_once(self, db_session):
+        projector = SalesProjector(db_session)
+        assert projector.apply(sale_event("SaleCreated", 1, total=10.0))
+        assert projector.apply(sale_event("SaleCreated", 2, total=5.0))
+        # Redelivery of the same event is a no-op
+        assert not projector.apply(sale_event("SaleCreated", 1, total=10.0))
+        db_session.commit()
+
+        assert store_row(db_session) == (2, 15.0)
+        assert product_row(db_session) == (4, 15.0, 2)
+
+    def test_cancel_and_restore_move_aggregates(self, db_session):
+        projector = SalesProjector(db_session)
+        projector.apply(sale_event("SaleCreated", 1, total=10.0))
+        projector.apply(sale_event("SaleCreated", 2, total=5.0))
+        assert projector.apply(sale_event("SaleCancelled", 1))
+        assert not projector.apply(sale_event("SaleCancelled", 1))
+        db_session.commit()
+        assert store_row(db_session) == (1, 5.0)
+        assert product_row(db_session) == (2, 5.0, 1)
+
+        projector.apply(sale_event("SaleRestored", 1, total=10.0))
+        db_session.commit()
+        assert store_row(db_session) == (2, 15.0)
+
+        daily = db_session.query(models.DailySalesProjection).one()
+        assert (daily.day.isoformat(), daily.sales_count) == ("2024-05-02", 2)
+
+    def test_cancellation_seen_before_creation_is_kept(self, db_session):
+        projector = SalesProjector(db_session)
+        projector.apply(sale_event("SaleCancelled", 3, statut="annulee"))
+        projector.apply(sale_event("SaleCreated", 3))
+        db_session.commit()
+        assert store_row(db_session) is None
+
+
+class TestSalesEventConsumer:
+    def test_consumes_acks_and_replays_pending_after_failure(self, db_session):
+        stream = FakeStream(
+            [sale_event("SaleCreated", i, total=1.0) for i in range(1, 4)]
+        )
+        consumer = SalesEventConsumer(TestingSessionLocal, client=stream, batch_size=2)
+
+        assert consumer.consume_once() == 0  # no pending messages yet
+        db_down = OperationalError("INSERT", {}, Exception("db down"))
+        with patch.object(SalesProjector, "apply", side_effect=db_down):
+            with pytest.raises(OperationalError):
+                consumer.consume_once()
+        assert stream.acked == []
+
+        # Pending batch is re-read first, then the rest of the stream
+        assert consumer.consume_once() == 2
+        assert consumer.consume_once() == 0
+        assert consumer.consume_once() == 1
+        assert stream.acked == ["1-0", "2-0", "3-0"]
+        assert store_row(db_session) == (3, 3.0)
+        assert stream.added == []
+
+    def test_failing_event_is_dead_lettered_alone(self, db_session):
+        # Fails once the sale and store totals are written: all of it is undone
+        poison = sale_event(
+            "SaleCreated",
+            2,
+            total=50.0,
+            lines=[{"product_id": 7, "quantite": None, "sous_total": 50.0}],
+        )
+        stream = FakeStream(
+            [
+                sale_event("SaleCreated", 1, total=1.0),
+                poison,
+                sale_event("SaleCreated", 3, total=2.0),
+            ]
+        )
+        consumer = SalesEventConsumer(TestingSessionLocal, client=stream)
+
+        consumer.consume_once()
+        assert consumer.consume_once() == 3
+
+        assert stream.acked == ["1-0", "2-0", "3-0"]
+        assert store_row(db_session) == (2, 3.0)
+        assert product_row(db_session) == (4, 3.0, 2)
+        assert db_session.get(models.ProjectedSale, 2) is None
+        ((dead_stream, fields),) = stream.added
+        assert dead_stream == consumer.dead_letter_stream
+        assert fields["message_id"] == "2-0"
+        assert "TypeError" in fields["error"]
+        assert json.loads(fields["event"]) == poison
+        # Nothing left pending: the poison event is not re-read
+        assert consumer.consume_once() == 0
+
+
+class TestProjectionReports:
+    @pytest.mark.asyncio
+    async def test_rebuild_replays_retail_sales(self, db_session):
+        SalesProjector(db_session).apply(sale_event("SaleCreated", 99, total=1000.0))
+        db_session.commit()
+
+        async def retail_sales(fields=None, store_id=None):
+            for sale_id, statut in ((1, "terminee"), (2, "annulee"), (3, "terminee")):
+                yield {
+                    "id": sale_id,
+                    "store_id": 1,
+                    "date_vente": datetime(2024, 5, sale_id).isoformat(),
+                    "total": 4.0,
+                    "statut": statut,
+                    "sale_lines": [
+                        {
+                            "id": sale_id,
+                            "product_id": 7,
+                            "quantite": 1,
+                            "sous_total": 4.0,
+                        }
+                    ],
+                }
+
+        assert not is_ready(db_session)
+        with patch("src.projections.external_client.iter_sales", retail_sales):
+            assert await rebuild(TestingSessionLocal) == 3
+
+        assert store_row(db_session) == (2, 8.0)
+        assert product_row(db_session) == (2, 8.0, 2)
+        assert is_ready(db_session)
+
+    @pytest.mark.asyncio
+    async def test_failed_rebuild_keeps_the_previous_projection(self, db_session):
+        SalesProjector(db_session).apply(sale_event("SaleCreated", 99, total=1000.0))
+        db_session.commit()
+
+        async def retail_sales(fields=None, store_id=None):
+            yield {"id": 1, "store_id": 1, "date_vente": "2024-05-01T10:00:00"}
+            raise RuntimeError("retail-api went away")
+
+        with patch("src.projections.external_client.iter_sales", retail_sales):
+            with pytest.raises(RuntimeError):
+                await rebuild(TestingSessionLocal, batch_size=1)
+
+        assert store_row(db_session) == (1, 1000.0)
+        assert not is_ready(db_session)
+
+    @pytest.mark.asyncio
+    async def test_startup_rebuilds_a_projection_never_rebuilt(self, db_session):
+        import main
+
+        rebuilds = []
+
+        async def fake_rebuild(session_factory):
+            rebuilds.append(session_factory)
+            db = session_factory()
+            mark_rebuilt(db, 0)
+            db.commit()
+            db.close()
+            return 0
+
+        with patch.object(main, "SessionLocal", TestingSessionLocal), patch.object(
+            main, "rebuild", fake_rebuild
+        ):
+            await main.projection_bootstrap()
+            await main.projection_bootstrap()
+
+        # Rebuilt once; the second start finds the marker
+        assert rebuilds == [TestingSessionLocal]
+
+    def test_reports_read_the_projection(self, client, db_session):
+        projector = SalesProjector(db_session)
+        projector.apply(sale_event("SaleCreated", 1, store_id=1, total=30.0))
+        projector.apply(
+            sale_event(
+                "SaleCreated",
+                2,
+                store_id=2,
+                total=12.0,
+                lines=[{"product_id": 8, "quantite": 6, "sous_total": 12.0}],
+            )
+        )
+        mark_rebuilt(db_session, 0)
+        db_session.commit()
+
+        stores = [{"id": 1, "nom": "Centre"}, {"id": 2, "nom": "Nord"}]
+        with patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=stores)
+        ), patch(
+            "src.services.external_client.count_products", AsyncMock(return_value=0)
+        ), patch(
+            "src.services.external_client.get_products_by_ids",
+            AsyncMock(return_value={}),
+        ):
+            performances = client.get("/api/v1/reports/store-performances").json()
+            by_volume = client.get("/api/v1/reports/products-by-volume?limit=1").json()
+            summary = client.get("/api/v1/reports/global-summary").json()
+
+        assert [(p["store_name"], p["revenue"]) for p in performances] == [
+            ("Centre", 30.0),
+            ("Nord", 12.0),
+        ]
+        assert [p["product_id"] for p in by_volume] == [8]
+        assert (summary["total_sales"], summary["total_revenue"]) == (2, 42.0)
+
+
+class TestRetailAggregateFallback:
+    def test_events_alone_do_not_switch_reports_to_the_projection(
+        self, client, db_session
+    ):
+        # A deploy's first event must not hide the sales made before it
+        SalesProjector(db_session).apply(sale_event("SaleCreated", 50, total=5.0))
+        db_session.commit()
+
+        sales_stats = AsyncMock(
+            return_value=[{"store_id": 1, "nombre_ventes": 40, "total_ventes": 900.0}]
+        )
+        with patch("src.services.external_client.get_sales_stats", sales_stats), patch(
+            "src.services.external_client.get_stores",
+            AsyncMock(return_value=[{"id": 1, "nom": "Centre"}]),
+        ):
+            performances = client.get("/api/v1/reports/store-performances").json()
+
+        assert [(p["store_name"], p["sales_count"]) for p in performances] == [
+            ("Centre", 40)
+        ]
+
+    def test_empty_projection_uses_retail_aggregates(self, client):
+        calls = []
+
+        async def sales_stats(dimension, **params):
+            calls.append((dimension, params))
+            if dimension == "by-store":
+                return [{"store_id": 2, "nombre_ventes": 4, "total_ventes": 80.0}]
+            return [
+                {
+                    "product_id": 9,
+                    "quantite_vendue": 12,
+                    "total_ventes": 36.0,
+                    "nombre_ventes": 3,
+                }
+            ]
+
+        with patch("src.services.external_client.get_sales_stats", sales_stats), patch(
+            "src.services.external_client.get_stores",
+            AsyncMock(return_value=[{"id": 2, "nom": "Nord"}]),
+        ), patch(
+            "src.services.external_client.get_product", AsyncMock(return_value=None)
+        ):
+            performances = client.get("/api/v1/reports/store-performances").json()
+            products = client.get("/api/v1/reports/products-by-volume?limit=3").json()
+
+        assert [(p["store_name"], p["sales_count"]) for p in performances] == [
+            ("Nord", 4)
+        ]
+        assert products[0]["total_quantity_sold"] == 12
+        assert calls == [
+            ("by-store", {}),
+            ("by-product", {"limit": 3, "order_by": "quantite"}),
+        ]
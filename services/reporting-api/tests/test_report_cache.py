@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from src.report_cache import ReportCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def counting_report(calls, degraded=None, delay=0.0):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return len(calls), list(degraded or [])
+
+    return compute
+
+
+class TestReportCache:
+    @pytest.mark.asyncio
+    async def test_fresh_entries_are_served_from_memory(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+
+        assert await cache.get("summary", {}, counting_report(calls)) == (1, [])
+        clock.now += 4
+        assert await cache.get("summary", {}, counting_report(calls)) == (1, [])
+        assert await cache.get("top", {"limit": 5}, counting_report(calls)) == (2, [])
+
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_while_one_refresh_runs(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+        await cache.get("summary", {}, counting_report(calls))
+
+        clock.now += 10
+        slow = counting_report(calls, delay=0.01)
+        results = await asyncio.gather(
+            *(cache.get("summary", {}, slow) for _ in range(5))
+        )
+        assert results == [(1, [])] * 5
+        await asyncio.sleep(0.05)
+
+        assert len(calls) == 2  # a single background refresh
+        assert await cache.get("summary", {}, slow) == (2, [])
+        assert cache.stale_hits == 5
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_computation(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+        slow = counting_report(calls, delay=0.01)
+
+        results = await asyncio.gather(
+            *(cache.get("summary", {}, slow) for _ in range(5))
+        )
+
+        assert results == [(1, [])] * 5
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_entries_past_hard_ttl_are_recomputed_before_answering(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+        await cache.get("summary", {}, counting_report(calls))
+
+        clock.now += 61
+        assert await cache.get("summary", {}, counting_report(calls)) == (2, [])
+
+    @pytest.mark.asyncio
+    async def test_invalidate_makes_entries_stale(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+        await cache.get("summary", {}, counting_report(calls))
+
+        clock.now += 1
+        cache.invalidate()
+        assert await cache.get("summary", {}, counting_report(calls)) == (1, [])
+        await asyncio.sleep(0.01)
+        assert await cache.get("summary", {}, counting_report(calls)) == (2, [])
+        assert cache.stale_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_degraded_reports_are_not_stored(self, clock):
+        cache = ReportCache(soft_ttl=5, hard_ttl=60, clock=clock)
+        calls = []
+        partial = counting_report(calls, degraded=["stores"])
+
+        assert await cache.get("summary", {}, partial) == (1, ["stores"])
+        assert await cache.get("summary", {}, partial) == (2, ["stores"])
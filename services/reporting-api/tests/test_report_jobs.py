@@ -0,0 +1,181 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from src.projections import SalesProjector, mark_rebuilt
+from src.report_jobs import report_jobs
+from tests.test_projections import sale_event
+
+
+@pytest.fixture
+def jobs_client():
+    """Client whose event loop outlives requests (background jobs keep running)"""
+    with TestClient(app) as client:
+        yield client
+
+
+def wait_for_job(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/reports/jobs/{job_id}").json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish: {job}")
+
+
+class TestReportJobs:
+    def test_job_runs_in_the_background(self, jobs_client):
+        by_date = [
+            {"jour": "2024-01-03", "nombre_ventes": 2, "total_ventes": 30.0},
+            {"jour": "2024-11-20", "nombre_ventes": 1, "total_ventes": 5.0},
+        ]
+        with patch(
+            "src.services.external_client.get_sales_stats",
+            AsyncMock(return_value=by_date),
+        ):
+            response = jobs_client.post(
+                "/api/v1/reports/jobs",
+                json={
+                    "report": "sales-by-period",
+                    "period": "year",
+                    "start_date": "2024-01-01",
+                    "end_date": "2024-12-31",
+                },
+            )
+            assert response.status_code == 202
+            job_id = response.json()["id"]
+            assert response.headers["Location"] == f"/api/v1/reports/jobs/{job_id}"
+
+            job = wait_for_job(jobs_client, job_id)
+
+        assert job["status"] == "succeeded"
+        assert job["progress"] == 1.0
+        assert job["params"] == {
+            "period": "year",
+            "start_date": "2024-01-01",
+            "end_date": "2024-12-31",
+        }
+        assert job["result"] == [
+            {"period_start": "2024-01-01", "sales_count": 3, "revenue": 35.0}
+        ]
+
+    def test_identical_active_jobs_are_deduplicated(self, jobs_client):
+        release = asyncio.Event()
+        calls = []
+
+        async def slow_report(service, request):
+            calls.append(request.report)
+            await release.wait()
+            return {"ok": True}
+
+        with patch.dict("src.report_jobs.REPORTS", {"global-summary": slow_report}):
+            first = jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "global-summary"}
+            )
+            second = jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "global-summary"}
+            )
+            other = jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "global-summary", "limit": 3}
+            )
+
+            assert second.json()["id"] == first.json()["id"]
+            assert second.headers["X-Job-Deduplicated"] == "true"
+            assert other.json()["id"] != first.json()["id"]
+
+            jobs_client.portal.call(release.set)
+            job = wait_for_job(jobs_client, first.json()["id"])
+
+        assert job["result"] == {"ok": True}
+        assert calls == ["global-summary", "global-summary"]
+
+    def test_failed_job_reports_its_error(self, jobs_client):
+        async def broken(service, request):
+            raise RuntimeError("retail-api unavailable")
+
+        with patch.dict("src.report_jobs.REPORTS", {"store-performances": broken}):
+            response = jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "store-performances"}
+            )
+            job = wait_for_job(jobs_client, response.json()["id"])
+
+        assert job["status"] == "failed"
+        assert job["error"] == "retail-api unavailable"
+
+    def test_distribution_job_aggregates_in_a_worker_process(
+        self, jobs_client, db_session
+    ):
+        projector = SalesProjector(db_session)
+        for sale_id, total in enumerate([10.0, 20.0, 30.0], start=1):
+            projector.apply(sale_event("SaleCreated", sale_id, total=total))
+        mark_rebuilt(db_session, 0)
+        db_session.commit()
+
+        with patch.object(report_jobs, "processes", 1), patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=[])
+        ):
+            response = jobs_client.post(
+                "/api/v1/reports/jobs",
+                json={"report": "sale-distribution", "by": "store"},
+            )
+            job = wait_for_job(jobs_client, response.json()["id"])
+            executor = report_jobs._executor
+
+        assert job["status"] == "succeeded"
+        assert executor is not None
+        assert [(row["id"], row["count"], row["p50"]) for row in job["result"]] == [
+            (1, 3, 20.0)
+        ]
+
+    def test_invalid_requests(self, jobs_client):
+        assert (
+            jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "nope"}
+            ).status_code
+            == 422
+        )
+        assert (
+            jobs_client.post(
+                "/api/v1/reports/jobs", json={"report": "top-products", "by": "store"}
+            ).status_code
+            == 400
+        )
+        reversed_range = jobs_client.post(
+            "/api/v1/reports/jobs",
+            json={
+                "report": "global-summary",
+                "start_date": "2024-05-02T10:00:00",
+                "end_date": "2024-05-01",
+            },
+        )
+        assert reversed_range.status_code == 400
+        assert jobs_client.get("/api/v1/reports/jobs/unknown").status_code == 404
+
+    def test_job_accepts_datetime_bounds(self, jobs_client, db_session):
+        projector = SalesProjector(db_session)
+        projector.apply(sale_event("SaleCreated", 1, date_vente="2024-05-02T08:00:00"))
+        projector.apply(sale_event("SaleCreated", 2, date_vente="2024-05-02T15:00:00"))
+        mark_rebuilt(db_session, 0)
+        db_session.commit()
+
+        with patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=[])
+        ):
+            response = jobs_client.post(
+                "/api/v1/reports/jobs",
+                json={
+                    "report": "store-performances",
+                    "start_date": "2024-05-02T12:00:00",
+                    "end_date": "2024-05-02",
+                },
+            )
+            job = wait_for_job(jobs_client, response.json()["id"])
+
+        assert job["status"] == "succeeded"
+        assert job["params"]["start_date"] == "2024-05-02T12:00:00"
+        assert [row["sales_count"] for row in job["result"]] == [1]
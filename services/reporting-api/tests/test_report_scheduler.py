@@ -0,0 +1,157 @@
+import itertools
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.api.v1.reports import PRECOMPUTED_REPORTS
+from src.report_cache import ReportCache, SharedReportStore, report_cache
+from src.report_scheduler import (
+    LeaderLock,
+    ReportScheduler,
+    ScheduledReport,
+    parse_schedule,
+)
+from src.schemas import GlobalSummaryResponse
+from tests.conftest import TestingSessionLocal
+
+
+class FakeRedis:
+    """Minimal Redis stand-in shared by several replicas (no expiry)"""
+
+    tokens = itertools.count()
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+
+    def lock(self, name, timeout=None, thread_local=True):
+        return FakeLock(self, name, next(self.tokens))
+
+
+class FakeLock:
+    def __init__(self, client, name, token):
+        self.client, self.name, self.token = client, name, token
+
+    def acquire(self, blocking=True):
+        return self.client.values.setdefault(self.name, self.token) == self.token
+
+    def owned(self):
+        return self.client.values.get(self.name) == self.token
+
+    def reacquire(self):
+        assert self.owned()
+
+    def release(self):
+        del self.client.values[self.name]
+
+
+def summary(total_sales):
+    return GlobalSummaryResponse(
+        total_sales=total_sales,
+        total_revenue=10.0 * total_sales,
+        total_products=3,
+        total_stores=1,
+        average_sale_amount=10.0,
+    )
+
+
+def replica(client, schedule="global-summary"):
+    cache = ReportCache(soft_ttl=5, hard_ttl=60)
+    cache.shared = SharedReportStore(client)
+    scheduler = ReportScheduler(
+        PRECOMPUTED_REPORTS,
+        parse_schedule(schedule),
+        TestingSessionLocal,
+        cache=cache,
+        leader=LeaderLock(client),
+    )
+    return cache, scheduler
+
+
+def test_parse_schedule():
+    assert parse_schedule("global-summary, top-products?limit=5&by=quantity,") == [
+        ScheduledReport("global-summary"),
+        ScheduledReport("top-products", {"limit": 5, "by": "quantity"}),
+    ]
+    with pytest.raises(ValueError):
+        ReportScheduler(PRECOMPUTED_REPORTS, parse_schedule("nope"), None)
+
+
+@pytest.mark.asyncio
+async def test_leader_precomputes_once_per_data_version():
+    client = FakeRedis()
+    leader_cache, leader = replica(client)
+    _, follower = replica(client)
+    compute = AsyncMock(side_effect=[summary(1), summary(2)])
+
+    with patch("src.services.ReportingService.get_global_summary", compute):
+        assert await leader.run_once() == 1
+        assert await follower.run_once() == 0  # not the leader
+        assert await leader.run_once() == 0  # data version unchanged
+
+        leader_cache.data_changed()
+        assert await leader.run_once() == 1
+
+        leader.leader.release()  # leader gone: the follower takes over
+        assert await follower.run_once() == 0  # stamp already current
+    assert compute.await_count == 2
+
+    published = SharedReportStore(client).get("global-summary?")
+    assert (published["version"], published["value"]["total_sales"]) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_requests_read_published_reports():
+    client = FakeRedis()
+    _, leader = replica(client)
+    follower_cache, _ = replica(client)
+    with patch(
+        "src.services.ReportingService.get_global_summary",
+        AsyncMock(return_value=summary(4)),
+    ):
+        await leader.run_once()
+
+    compute = AsyncMock()
+    value, degraded = await follower_cache.get("global-summary", {}, compute)
+    assert (value["total_sales"], degraded) == (4, [])
+    compute.assert_not_awaited()
+    assert follower_cache.shared_hits == 1
+
+    # Reports that are not precomputed are still computed on demand
+    compute.return_value = ("top", [])
+    assert await follower_cache.get("top-products", {"limit": 3}, compute) == (
+        "top",
+        [],
+    )
+
+
+def test_endpoint_serves_precomputed_report(client):
+    # Registers the precomputed keys in the application cache
+    ReportScheduler(
+        PRECOMPUTED_REPORTS,
+        parse_schedule("global-summary"),
+        TestingSessionLocal,
+        cache=report_cache,
+    )
+    try:
+        report_cache.publish("global-summary", {}, summary(7), version=0)
+        report_cache.invalidate()  # stale entries of precomputed reports are served
+
+        with patch(
+            "src.services.ReportingService.get_global_summary",
+            AsyncMock(side_effect=AssertionError("computed by a request")),
+        ):
+            response = client.get("/api/v1/reports/global-summary")
+    finally:
+        report_cache.precomputed.clear()
+
+    assert response.status_code == 200
+    assert response.json()["total_sales"] == 7
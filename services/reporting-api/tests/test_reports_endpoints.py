@@ -387,12 +387,25 @@ class TestReportsEndpoints:
             assert "top_performing_stores" in data
             assert "top_products" in data
 
-    def test_sales_by_period_mock_endpoint(self, client):
-        """Test sales by period mock endpoint"""
-        response = client.get("/api/v1/reports/sales-by-period?period=month")
+    def test_sales_by_period_endpoint(self, client):
+        """Test sales by period endpoint (empty projection: retail aggregates)"""
+        by_date = [
+            {"jour": "2024-05-02", "nombre_ventes": 2, "total_ventes": 30.0},
+            {"jour": "2024-05-20", "nombre_ventes": 1, "total_ventes": 5.0},
+            {"jour": "2024-06-01", "nombre_ventes": 1, "total_ventes": 7.5},
+        ]
+        with patch(
+            "src.services.external_client.get_sales_stats",
+            AsyncMock(return_value=by_date),
+        ):
+            response = client.get("/api/v1/reports/sales-by-period?period=month")
         assert response.status_code == 200
         data = response.json()
         assert data["period"] == "month"
+        assert data["data"] == [
+            {"period_start": "2024-05-01", "sales_count": 3, "revenue": 35.0},
+            {"period_start": "2024-06-01", "sales_count": 1, "revenue": 7.5},
+        ]
 
     def test_inventory_status_mock_endpoint(self, client):
         """Test inventory status mock endpoint"""
@@ -0,0 +1,222 @@
+from datetime import date, datetime
+from typing import Optional
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+import src.models as models
+from src.projections import SalesProjector, mark_rebuilt
+from src.rollups import TimeRange, product_totals, store_totals
+from tests.test_projections import sale_event
+
+RETAIL_DAY = TypeAdapter(Optional[date])
+
+
+class TestTimeRange:
+    def test_dates_cover_whole_days(self):
+        time_range = TimeRange.from_bounds(date(2024, 5, 1), date(2024, 5, 31))
+
+        assert time_range == TimeRange(datetime(2024, 5, 1), datetime(2024, 6, 1))
+        assert time_range.split() == ([], (date(2024, 5, 1), date(2024, 6, 1)))
+
+    def test_partial_days_use_hourly_buckets(self):
+        time_range = TimeRange.from_bounds(
+            datetime(2024, 5, 1, 22, 30), datetime(2024, 5, 4, 1, 15)
+        )
+
+        assert time_range.split() == (
+            [
+                (datetime(2024, 5, 1, 22), datetime(2024, 5, 2)),
+                (datetime(2024, 5, 4), datetime(2024, 5, 4, 2)),
+            ],
+            (date(2024, 5, 2), date(2024, 5, 4)),
+        )
+
+    def test_range_within_a_day_is_hourly_only(self):
+        time_range = TimeRange.from_bounds(
+            datetime(2024, 5, 1, 9), datetime(2024, 5, 1, 17, 59)
+        )
+
+        assert time_range.split() == (
+            [(datetime(2024, 5, 1, 9), datetime(2024, 5, 1, 18))],
+            None,
+        )
+
+    def test_open_bounds(self):
+        assert TimeRange.from_bounds() is None
+        assert TimeRange.from_bounds(end=datetime(2024, 5, 3, 12)).split() == (
+            [(datetime(2024, 5, 3), datetime(2024, 5, 3, 13))],
+            (None, date(2024, 5, 3)),
+        )
+
+    def test_reversed_bounds_are_rejected(self):
+        with pytest.raises(ValueError):
+            TimeRange.from_bounds(date(2024, 5, 2), date(2024, 5, 1))
+
+
+def apply_sales(db_session):
+    projector = SalesProjector(db_session)
+    for sale_id, store_id, sold_at, total, product_id in [
+        (1, 1, "2024-04-30T23:10:00", 5.0, 7),
+        (2, 1, "2024-05-01T08:30:00", 10.0, 7),
+        (3, 2, "2024-05-01T18:00:00", 40.0, 8),
+        (4, 1, "2024-05-02T09:45:00", 20.0, 8),
+        (5, 2, "2024-05-03T00:05:00", 7.0, 7),
+    ]:
+        projector.apply(
+            sale_event(
+                "SaleCreated",
+                sale_id,
+                store_id=store_id,
+                total=total,
+                date_vente=sold_at,
+                lines=[{"product_id": product_id, "quantite": 1, "sous_total": total}],
+            )
+        )
+    mark_rebuilt(db_session, 0)
+    db_session.commit()
+
+
+class TestRollups:
+    def test_ranges_sum_day_and_hour_buckets(self, db_session):
+        apply_sales(db_session)
+
+        may_first = TimeRange.from_bounds(date(2024, 5, 1), date(2024, 5, 1))
+        assert store_totals(db_session, may_first) == [(2, 1, 40.0), (1, 1, 10.0)]
+
+        edges = TimeRange.from_bounds(
+            datetime(2024, 4, 30, 23), datetime(2024, 5, 2, 9)
+        )
+        assert store_totals(db_session, edges) == [(2, 1, 40.0), (1, 3, 35.0)]
+        assert product_totals(db_session, edges, 10) == [
+            (8, 2, 60.0, 2),
+            (7, 2, 15.0, 2),
+        ]
+        assert store_totals(db_session, edges, store_id=2) == [(2, 1, 40.0)]
+
+    def test_cancelled_sale_leaves_its_buckets(self, db_session):
+        apply_sales(db_session)
+        SalesProjector(db_session).apply(sale_event("SaleCancelled", 3, store_id=2))
+        db_session.commit()
+
+        may = TimeRange.from_bounds(date(2024, 5, 1), date(2024, 5, 31))
+        assert store_totals(db_session, may) == [(1, 2, 30.0), (2, 1, 7.0)]
+        evening = TimeRange.from_bounds(
+            datetime(2024, 5, 1, 18), datetime(2024, 5, 1, 18)
+        )
+        assert product_totals(db_session, evening, 10) == []
+        assert db_session.query(models.HourlyProductSalesProjection).count() == 5
+
+    def test_endpoints_accept_date_ranges(self, client, db_session):
+        apply_sales(db_session)
+
+        with patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=[])
+        ), patch(
+            "src.services.external_client.get_store",
+            AsyncMock(return_value={"id": 1, "nom": "Centre"}),
+        ), patch(
+            "src.services.external_client.count_products", AsyncMock(return_value=2)
+        ), patch(
+            "src.services.external_client.get_products_by_ids",
+            AsyncMock(return_value={}),
+        ):
+            summary = client.get(
+                "/api/v1/reports/global-summary",
+                params={"start_date": "2024-05-01", "end_date": "2024-05-02"},
+            ).json()
+            whole = client.get("/api/v1/reports/global-summary").json()
+            products = client.get(
+                "/api/v1/reports/products-by-volume",
+                params={"start_date": "2024-05-02T00:00:00"},
+            ).json()
+            store = client.get(
+                "/api/v1/reports/store/1/performance",
+                params={"end_date": "2024-04-30"},
+            ).json()
+            reversed_range = client.get(
+                "/api/v1/reports/store-performances",
+                params={"start_date": "2024-05-02", "end_date": "2024-05-01"},
+            )
+
+        assert (summary["total_sales"], summary["total_revenue"]) == (3, 70.0)
+        assert (whole["total_sales"], whole["total_revenue"]) == (5, 82.0)
+        assert [(p["product_id"], p["total_revenue"]) for p in products] == [
+            (7, 7.0),
+            (8, 20.0),
+        ]
+        assert (store["sales_count"], store["revenue"]) == (1, 5.0)
+        assert reversed_range.status_code == 400
+
+    def test_empty_projection_forwards_the_range(self, client):
+        calls = []
+
+        async def sales_stats(dimension, **params):
+            # Parsed like retail-api's ``Optional[date]`` query parameters
+            for name in ("date_debut", "date_fin"):
+                RETAIL_DAY.validate_python(params.get(name))
+            calls.append((dimension, params))
+            return []
+
+        with patch("src.services.external_client.get_sales_stats", sales_stats), patch(
+            "src.services.external_client.get_stores", AsyncMock(return_value=[])
+        ):
+            response = client.get(
+                "/api/v1/reports/store-performances",
+                params={"start_date": "2024-05-01", "end_date": "2024-05-01"},
+            )
+
+        assert response.status_code == 200
+        assert calls == [
+            ("by-store", {"date_debut": "2024-05-01", "date_fin": "2024-05-01"})
+        ]
+
+    def test_partial_days_stream_the_sales(self, client):
+        streamed = []
+
+        async def retail_sales(fields=None, store_id=None, **params):
+            streamed.append(params)
+            yield {
+                "id": 1,
+                "store_id": 1,
+                "date_vente": "2024-05-01T10:00:00",
+                "total": 5.0,
+                "statut": "terminee",
+                "sale_lines": [],
+            }
+
+        stats = AsyncMock(return_value=[])
+        with patch("src.services.external_client.get_sales_stats", stats), patch(
+            "src.services.external_client.iter_sales", retail_sales
+        ), patch("src.services.external_client.get_stores", AsyncMock(return_value=[])):
+            response = client.get(
+                "/api/v1/reports/store-performances",
+                params={"start_date": "2024-05-01T09:30", "end_date": "2024-05-01"},
+            )
+
+        assert response.status_code == 200
+        stats.assert_not_called()
+        assert streamed == [
+            {
+                "date_debut": "2024-05-01T09:00:00",
+                "date_fin": "2024-05-01T23:59:59.999999",
+            }
+        ]
+        assert [(s["store_id"], s["sales_count"]) for s in response.json()] == [(1, 1)]
+
+    def test_retail_params_of_whole_days_are_dates(self):
+        whole = TimeRange.from_bounds(date(2024, 5, 1), date(2024, 5, 31))
+        assert whole.retail_params() == {
+            "date_debut": "2024-05-01",
+            "date_fin": "2024-05-31",
+        }
+        assert TimeRange(end=datetime(2024, 6, 1)).retail_params() == {
+            "date_debut": None,
+            "date_fin": "2024-05-31",
+        }
+
+        partial = TimeRange.from_bounds(datetime(2024, 5, 1, 9), date(2024, 5, 31))
+        assert not partial.whole_days
+        with pytest.raises(ValidationError):
+            RETAIL_DAY.validate_python(partial.retail_params()["date_debut"])
@@ -0,0 +1,252 @@
+import random
+from collections import Counter
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import src.models as models
+from src.projections import SalesProjector, mark_rebuilt
+import numpy as np
+
+from src.sketches import ProductSketch, SpaceSaving, TDigest
+from tests.test_projections import sale_event
+
+
+def zipf_stream(n, keys, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, keys + 1)]
+    return rng.choices(range(1, keys + 1), weights=weights, k=n)
+
+
+class TestSpaceSaving:
+    def test_counts_bound_the_true_weights(self):
+        stream = zipf_stream(20000, 500, seed=1)
+        true = Counter(stream)
+        summary = SpaceSaving(k=20)
+        for key in stream:
+            summary.add(key, 1)
+
+        for key, (count, error) in summary.counters.items():
+            assert count - error <= true[key] <= count
+        # Any key heavier than N / k is guaranteed to be kept
+        assert {key for key, count in true.items() if count > 20000 / 20} <= set(
+            summary.counters
+        )
+
+    def test_merge_keeps_the_heavy_hitters(self):
+        left, right = SpaceSaving(k=20), SpaceSaving(k=20)
+        first, second = zipf_stream(10000, 300, 2), zipf_stream(10000, 300, 3)
+        for key in first:
+            left.add(key, 1)
+        for key in second:
+            right.add(key, 1)
+
+        merged = left.merge(right)
+        true = Counter(first + second)
+        assert len(merged.counters) == 20
+        for key, (count, error) in merged.counters.items():
+            assert count - error <= true[key] <= count
+        assert set(key for key, _ in true.most_common(5)) <= set(merged.counters)
+
+
+class TestProductSketch:
+    def test_estimates_never_undercount(self):
+        sketch = ProductSketch(width=64, depth=4, k=10)
+        true = Counter()
+        for product_id in zipf_stream(5000, 400, seed=4):
+            sketch.add(product_id, 1, 2.5, 1)
+            true[product_id] += 1
+
+        for product_id, count in true.items():
+            revenue, quantity, sales = sketch.estimate(product_id)
+            assert quantity >= count and sales >= count and revenue >= 2.5 * count
+        top = [row[0] for row in sketch.heavy_hitters(10, by="quantity")]
+        assert {key for key, count in true.items() if count > 5000 / 10} <= set(top)
+        assert top[0] == true.most_common(1)[0][0]
+
+    def test_per_store_sketches_merge(self):
+        stores = [ProductSketch(width=128, depth=4, k=10) for _ in range(3)]
+        whole = ProductSketch(width=128, depth=4, k=10)
+        for store, seed in zip(stores, (5, 6, 7)):
+            for product_id in zipf_stream(2000, 200, seed):
+                store.add(product_id, 1, 1.0, 1)
+                whole.add(product_id, 1, 1.0, 1)
+
+        merged = stores[0].merge(stores[1]).merge(stores[2])
+        assert (merged.counts == whole.counts).all()
+        assert [row[0] for row in merged.heavy_hitters(3)] == [
+            row[0] for row in whole.heavy_hitters(3)
+        ]
+
+
+class TestTDigest:
+    def test_percentiles_close_to_exact(self):
+        amounts = np.random.default_rng(8).lognormal(3, 1, 20000)
+        digest = TDigest(compression=100)
+        for chunk in np.array_split(amounts, 100):
+            digest.add_many(chunk)
+
+        assert digest.count == 20000 and len(digest.means) < 100
+        assert abs(digest.total - amounts.sum()) < 1e-6 * amounts.sum()
+        for q in (0.5, 0.9, 0.99):
+            exact = np.quantile(amounts, q)
+            assert abs(digest.quantile(q) - exact) < 0.02 * exact
+        assert digest.quantile(0) == amounts.min()
+        assert digest.quantile(1) == amounts.max()
+
+    def test_merged_digests_match_the_whole_stream(self):
+        amounts = np.random.default_rng(9).exponential(25, 9000)
+        days = []
+        for chunk in np.array_split(amounts, 30):
+            digest = TDigest()
+            digest.add_many(chunk)
+            days.append(digest)
+
+        merged = days[0]
+        for digest in days[1:]:
+            merged = merged.merge(digest)
+        assert merged.count == 9000
+        for q in (0.5, 0.9, 0.99):
+            exact = np.quantile(amounts, q)
+            assert abs(merged.quantile(q) - exact) < 0.03 * exact
+
+
+def project(db_session, *sales):
+    projector = SalesProjector(db_session)
+    for event in sales:
+        projector.apply(event)
+    projector.flush_sketches()
+    mark_rebuilt(db_session, 0)
+    db_session.commit()
+
+
+def line(product_id, quantity, amount):
+    return {"product_id": product_id, "quantite": quantity, "sous_total": amount}
+
+
+class TestApproximateTopProducts:
+    def test_projection_maintains_sketches(self, db_session):
+        project(
+            db_session,
+            sale_event("SaleCreated", 1, store_id=1, lines=[line(7, 2, 20.0)]),
+            sale_event("SaleCreated", 2, store_id=2, lines=[line(7, 1, 10.0)]),
+            sale_event(
+                "SaleCreated",
+                3,
+                store_id=1,
+                date_vente="2024-05-03T10:00:00",
+                lines=[line(8, 5, 15.0)],
+            ),
+        )
+        assert db_session.query(models.ProductSalesSketch).count() == 3
+
+        project(db_session, sale_event("SaleCancelled", 1, store_id=1))
+        row = db_session.get(models.ProductSalesSketch, (date(2024, 5, 2), 1))
+        assert ProductSketch.from_row(row).heavy_hitters(5) == []
+
+    def test_endpoint_flags_approximate_results(self, client, db_session):
+        project(
+            db_session,
+            sale_event("SaleCreated", 1, store_id=1, lines=[line(7, 2, 20.0)]),
+            sale_event(
+                "SaleCreated", 2, store_id=2, lines=[line(7, 1, 10.0), line(8, 9, 9.0)]
+            ),
+            sale_event(
+                "SaleCreated",
+                3,
+                store_id=1,
+                date_vente="2024-05-04T10:00:00",
+                lines=[line(8, 1, 50.0)],
+            ),
+        )
+
+        with patch(
+            "src.services.external_client.get_products_by_ids",
+            AsyncMock(return_value={}),
+        ):
+            approximate = client.get(
+                "/api/v1/reports/top-products",
+                params={"approximate": "true", "end_date": "2024-05-02"},
+            ).json()
+            exact = client.get(
+                "/api/v1/reports/top-products", params={"end_date": "2024-05-02"}
+            ).json()
+            store = client.get(
+                "/api/v1/reports/products-by-volume",
+                params={"approximate": "true", "store_id": 2},
+            ).json()
+
+        assert [
+            (p["product_id"], p["total_revenue"], p["sales_count"], p["approximate"])
+            for p in approximate
+        ] == [(7, 30.0, 2, True), (8, 9.0, 1, True)]
+        assert [(p["product_id"], p["approximate"]) for p in exact] == [
+            (7, False),
+            (8, False),
+        ]
+        assert [(p["product_id"], p["total_quantity_sold"]) for p in store] == [
+            (8, 9),
+            (7, 1),
+        ]
+
+
+class TestApproximateSaleDistribution:
+    def test_cancellation_rebuilds_the_store_day(self, db_session):
+        project(
+            db_session,
+            *[
+                sale_event("SaleCreated", sale_id, store_id=1, total=total)
+                for sale_id, total in enumerate([10.0, 20.0, 30.0], start=1)
+            ],
+        )
+        project(db_session, sale_event("SaleCancelled", 3, store_id=1))
+        row = db_session.get(models.SaleAmountDigest, (date(2024, 5, 2), 1))
+        digest = TDigest.from_row(row)
+        assert (digest.count, digest.total, digest.maximum) == (2, 30.0, 20.0)
+
+        project(
+            db_session,
+            sale_event("SaleCancelled", 1, store_id=1),
+            sale_event("SaleCancelled", 2, store_id=1),
+        )
+        assert db_session.query(models.SaleAmountDigest).count() == 0
+
+    def test_endpoint_merges_days(self, client, db_session):
+        project(
+            db_session,
+            *[
+                sale_event(
+                    "SaleCreated",
+                    sale_id,
+                    store_id=1 + sale_id % 2,
+                    total=float(sale_id),
+                    date_vente=f"2024-05-0{1 + sale_id % 3}T10:00:00",
+                )
+                for sale_id in range(1, 61)
+            ],
+        )
+
+        with patch(
+            "src.services.external_client.get_stores",
+            AsyncMock(return_value=[{"id": 1, "nom": "Centre"}]),
+        ):
+            approximate = client.get(
+                "/api/v1/reports/sale-distribution",
+                params={"approximate": "true", "start_date": "2024-05-02"},
+            ).json()
+            exact = client.get(
+                "/api/v1/reports/sale-distribution",
+                params={"start_date": "2024-05-02"},
+            ).json()
+
+        assert [(s["id"], s["count"], s["approximate"]) for s in approximate] == [
+            (1, 20, True),
+            (2, 20, True),
+        ]
+        assert [(s["id"], s["count"], s["approximate"]) for s in exact] == [
+            (1, 20, False),
+            (2, 20, False),
+        ]
+        for estimate, counted in zip(approximate, exact):
+            assert estimate["total"] == counted["total"]
+            for percentile in ("p50", "p90", "p99"):
+                assert abs(estimate[percentile] - counted[percentile]) <= 3
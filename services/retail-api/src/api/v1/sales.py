@@ -1,49 +1,208 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from datetime import date
+import json
 import logging
 
+from src.columnar_export import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, iter_sales_export
 from src.database import get_db
 import src.models as models
 import src.schemas as schemas
-from src.services import SaleService
+from src.services import (
+    SALE_FIELDS,
+    DateBound,
+    SaleService,
+    decode_sale_cursor,
+    parse_sale_fields,
+    stock_reference,
+)
+from src.stock_sync import stock_sync_relay
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Nombre de ventes sérialisées par morceau de flux NDJSON
+NDJSON_BATCH_SIZE = 500
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_ndjson(items: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer: List[str] = []
+    for item in items:
+        buffer.append(json.dumps(item, default=_json_default))
+        if len(buffer) >= NDJSON_BATCH_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def _pagination_headers(request: Request, next_cursor: Optional[str]) -> Dict[str, str]:
+    if not next_cursor:
+        return {}
+    next_url = request.url.include_query_params(after=next_cursor)
+    return {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+
 
 @router.get("/", response_model=List[schemas.SaleResponse])
 async def get_sales(
+    request: Request,
+    response: Response,
     store_id: Optional[int] = Query(None, description="Filter by store ID"),
     cash_register_id: Optional[int] = Query(
         None, description="Filter by cash register ID"
     ),
-    date_debut: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    date_debut: Optional[DateBound] = Query(
+        None, description="Start (YYYY-MM-DD or ISO 8601 datetime)"
+    ),
+    date_fin: Optional[DateBound] = Query(
+        None,
+        description="End, inclusive (YYYY-MM-DD = whole day, or ISO 8601 datetime)",
+    ),
+    limit: Optional[int] = Query(
+        None,
+        ge=1,
+        le=1000,
+        description="Page size (default 100; no limit in ndjson mode)",
+    ),
+    after: Optional[str] = Query(
+        None, description="Keyset cursor returned in X-Next-Cursor"
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description=f"Comma-separated projection among {', '.join(SALE_FIELDS)}, sale_lines",
+    ),
+    format: str = Query(
+        "json", pattern="^(json|ndjson)$", description="json or ndjson"
+    ),
     db: Session = Depends(get_db),
 ):
-    """Récupérer la liste des ventes avec filtres"""
+    """Récupérer les ventes avec filtres, pagination par clé et projection.
+
+    En JSON, une page est renvoyée et le curseur suivant est dans
+    ``X-Next-Cursor`` / ``Link``. En NDJSON, toutes les ventes sont diffusées
+    en flux à mémoire constante.
+    """
     logger.info(
-        f"💰 Getting sales - store_id={store_id}, cash_register_id={cash_register_id}"
+        f"💰 Getting sales - store_id={store_id}, cash_register_id={cash_register_id}, "
+        f"limit={limit}, format={format}, fields={fields}"
     )
 
-    service = SaleService(db)
-    return service.get_sales(
-        store_id=store_id,
-        cash_register_id=cash_register_id,
-        date_debut=date_debut,
-        date_fin=date_fin,
-    )
+    try:
+        projection = parse_sale_fields(fields)
+        if after:
+            decode_sale_cursor(after)
+        filters = dict(
+            store_id=store_id,
+            cash_register_id=cash_register_id,
+            date_debut=date_debut,
+            date_fin=date_fin,
+            after=after,
+        )
+        service = SaleService(db)
+
+        if format == "ndjson":
+            items = service.iter_sales(
+                projection or SALE_FIELDS + ("sale_lines",), limit=limit, **filters
+            )
+            return StreamingResponse(
+                _encode_ndjson(items), media_type="application/x-ndjson"
+            )
+
+        if projection is not None:
+            items, next_cursor = service.get_sales_projection(
+                projection, limit=limit or 100, **filters
+            )
+            return JSONResponse(
+                content=jsonable_encoder(items),
+                headers=_pagination_headers(request, next_cursor),
+            )
+
+        sales, next_cursor = service.get_sales(limit=limit or 100, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers.update(_pagination_headers(request, next_cursor))
+    return sales
 
 
 @router.post("/", response_model=schemas.SaleResponse, status_code=201)
-async def create_sale(sale: schemas.SaleCreate, db: Session = Depends(get_db)):
-    """Créer une nouvelle vente"""
+async def create_sale(
+    sale: schemas.SaleCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    """Créer une nouvelle vente (le stock est décrémenté après la réponse)"""
     logger.info(f"➕ Creating sale for store {sale.store_id}")
 
     service = SaleService(db)
-    return await service.create_sale(sale)
+    db_sale = service.create_sale(sale)
+    if sale.lines:
+        background_tasks.add_task(stock_sync_relay.deliver, stock_reference(db_sale.id))
+    return db_sale
+
+
+@router.post("/batch", response_model=schemas.SaleBatchResult)
+async def create_sales_batch(
+    batch: schemas.SaleBatchCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    """Importer un lot de ventes enregistrées hors ligne (idempotent par clé)"""
+    logger.info(f"➕ Creating sales batch ({len(batch.sales)} sales)")
+
+    service = SaleService(db)
+    result = await run_in_threadpool(service.create_sales_batch, batch)
+    if result.stock_reference:
+        background_tasks.add_task(stock_sync_relay.deliver, result.stock_reference)
+    return result
+
+
+@router.get("/export")
+async def export_sales(
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
+    date_debut: Optional[DateBound] = Query(
+        None, description="Start (YYYY-MM-DD or ISO 8601 datetime)"
+    ),
+    date_fin: Optional[DateBound] = Query(
+        None,
+        description="End, inclusive (YYYY-MM-DD = whole day, or ISO 8601 datetime)",
+    ),
+    db: Session = Depends(get_db),
+):
+    """Exporter les ventes et leurs lignes au format colonnaire RTCOL.
+
+    Le fichier est produit en flux, par morceaux de colonnes typées ; voir
+    ``src.columnar_export`` pour le format et le lecteur ``mmap``.
+    """
+    logger.info(f"📦 Exporting sales - store_id={store_id}, {date_debut} → {date_fin}")
+
+    filename = f"sales_{date_debut or 'debut'}_{date_fin or 'fin'}.rtcol"
+    return StreamingResponse(
+        iter_sales_export(
+            db, store_id=store_id, date_debut=date_debut, date_fin=date_fin
+        ),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/{sale_id}", response_model=schemas.SaleResponse)
@@ -102,11 +261,13 @@ async def get_sale_lines(sale_id: int, db: Session = Depends(get_db)):
     return lines
 
 
-@router.get("/stats/summary", response_model=schemas.RetailSummary)
+@router.get("/stats/summary", response_model=schemas.SalesSummary)
 async def get_sales_summary(
     store_id: Optional[int] = Query(None, description="Filter by store ID"),
-    date_debut: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    date_debut: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(
+        None, description="End date, inclusive (YYYY-MM-DD)"
+    ),
     db: Session = Depends(get_db),
 ):
     """Obtenir un résumé des ventes"""
@@ -118,26 +279,66 @@ async def get_sales_summary(
     )
 
 
-@router.get("/stats/by-store")
-async def get_sales_by_store(db: Session = Depends(get_db)):
-    """Obtenir les ventes groupées par magasin"""
-    logger.info("📊 Getting sales by store")
+@router.get("/stats/by-store", response_model=List[schemas.SalesByStore])
+async def get_sales_by_store(
+    date_debut: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(
+        None, description="End date, inclusive (YYYY-MM-DD)"
+    ),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Top N stores"),
+    db: Session = Depends(get_db),
+):
+    """Obtenir les ventes groupées par magasin (meilleur chiffre d'affaires en premier)"""
+    logger.info(f"📊 Getting sales by store - {date_debut} → {date_fin}")
+
+    service = SaleService(db)
+    return service.get_sales_by_store(
+        date_debut=date_debut, date_fin=date_fin, limit=limit
+    )
+
+
+@router.get("/stats/by-product", response_model=List[schemas.SalesByProduct])
+async def get_sales_by_product(
+    store_id: Optional[int] = Query(None, description="Filter by store ID"),
+    date_debut: Optional[DateBound] = Query(
+        None, description="Start (YYYY-MM-DD or ISO 8601 datetime)"
+    ),
+    date_fin: Optional[DateBound] = Query(
+        None,
+        description="End, inclusive (YYYY-MM-DD = whole day, or ISO 8601 datetime)",
+    ),
+    limit: int = Query(10, ge=1, le=1000, description="Top N products"),
+    order_by: str = Query(
+        "total", pattern="^(total|quantite)$", description="total or quantite"
+    ),
+    db: Session = Depends(get_db),
+):
+    """Obtenir le top N des produits vendus, par chiffre d'affaires ou quantité"""
+    logger.info(f"📊 Getting top {limit} products by {order_by}")
 
     service = SaleService(db)
-    return service.get_sales_by_store()
+    return service.get_sales_by_product(
+        store_id=store_id,
+        date_debut=date_debut,
+        date_fin=date_fin,
+        limit=limit,
+        order_by=order_by,
+    )
 
 
-@router.get("/stats/by-date")
+@router.get("/stats/by-date", response_model=List[schemas.SalesByDate])
 async def get_sales_by_date(
-    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
-    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    date_debut: Optional[date] = Query(None, description="Start date (YYYY-MM-DD)"),
+    date_fin: Optional[date] = Query(
+        None, description="End date, inclusive (YYYY-MM-DD)"
+    ),
     store_id: Optional[int] = Query(None, description="Filter by store ID"),
     db: Session = Depends(get_db),
 ):
-    """Obtenir les ventes groupées par date"""
-    logger.info(f"📊 Getting sales by date - start={start_date}, end={end_date}")
+    """Obtenir les ventes groupées par jour"""
+    logger.info(f"📊 Getting sales by date - {date_debut} → {date_fin}")
 
     service = SaleService(db)
     return service.get_sales_by_date(
-        start_date=start_date, end_date=end_date, store_id=store_id
+        store_id=store_id, date_debut=date_debut, date_fin=date_fin
     )
@@ -0,0 +1,396 @@
+"""Export des ventes et lignes de vente dans un format colonnaire compact.
+
+Format RTCOL (version 1), destiné à l'analyse hors ligne. Les entiers sont en
+little-endian. ::
+
+    MAGIC (8 octets, b"RTCOL001")
+    morceau*            colonnes d'un morceau de table, bout à bout
+    pied de page        JSON UTF-8 : schéma et emplacement des colonnes
+    longueur du pied    uint64
+    MAGIC
+
+Chaque colonne d'un morceau est un tableau typé contigu, aligné sur 8
+octets : ``int64``, ``float64``, ``timestamp[us]`` (int64, microsecondes
+depuis l'epoch UTC ; ``TIMESTAMP_NULL`` pour une date absente) ou
+``dictionary`` (codes int32 ; les valeurs sont dans le pied de page). Le
+pied de page ::
+
+    {"format": "RTCOL", "version": 1, "metadata": {...},
+     "tables": {"sales": {"rows": N,
+                          "columns": [{"name": "id", "type": "int64"}, ...],
+                          "chunks": [{"rows": n, "buffers": [[offset, nbytes], ...]}]}}}
+
+Le pied de page est écrit en dernier : le fichier se produit en flux, à
+mémoire bornée par la taille d'un morceau. ``ColumnarFile`` le relit en
+mémoire partagée (``mmap``) et expose les colonnes en ``memoryview`` typées,
+sans copie (``numpy.frombuffer`` s'applique directement si numpy est
+disponible).
+
+Usage::
+
+    python -m src.columnar_export export ventes.rtcol --from 2024-01-01 --to 2024-01-31
+    python -m src.columnar_export summary ventes.rtcol
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import struct
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src.rollups import CANCELLED_STATUS
+from src.services import DateBound, sale_date_range
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"RTCOL001"
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/vnd.retail.columnar"
+
+# Lignes par morceau : borne la mémoire de l'export
+EXPORT_CHUNK_ROWS = 65536
+
+# Type de colonne -> code ``array`` / ``memoryview.cast``
+COLUMN_TYPES = {
+    "int64": "q",
+    "float64": "d",
+    "timestamp[us]": "q",
+    "dictionary": "i",
+}
+
+TIMESTAMP_NULL = -(2**63)
+_EPOCH = datetime(1970, 1, 1)
+_ALIGNMENT = 8
+_TRAILER = struct.Struct("<Q")
+
+# Colonnes exportées (les notes libres ne le sont pas)
+SALES_SCHEMA = (
+    ("id", "int64"),
+    ("store_id", "int64"),
+    ("cash_register_id", "int64"),
+    ("date_vente", "timestamp[us]"),
+    ("total", "float64"),
+    ("statut", "dictionary"),
+)
+SALE_LINES_SCHEMA = (
+    ("id", "int64"),
+    ("sale_id", "int64"),
+    ("product_id", "int64"),
+    ("quantite", "int64"),
+    ("prix_unitaire", "float64"),
+    ("sous_total", "float64"),
+)
+
+
+def _timestamp(value: Optional[datetime]) -> int:
+    if value is None:
+        return TIMESTAMP_NULL
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ColumnarWriter:
+    """Sérialise des morceaux de colonnes au format RTCOL.
+
+    Chaque méthode renvoie les octets à écrire à la suite ; le writer tient
+    lui-même les positions, la sortie peut donc être un flux.
+    """
+
+    def __init__(
+        self,
+        schemas: Dict[str, Sequence[Tuple[str, str]]],
+        metadata: Optional[Dict[str, Any]] = None,
+    ):
+        self.schemas = {table: tuple(schema) for table, schema in schemas.items()}
+        self.metadata = metadata or {}
+        self.position = 0
+        self.chunks: Dict[str, List[Dict[str, Any]]] = {t: [] for t in schemas}
+        self.dictionaries: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def begin(self) -> bytes:
+        self.position = len(MAGIC)
+        return MAGIC
+
+    def chunk(self, table: str, rows: Sequence[Sequence[Any]]) -> bytes:
+        """Encoder un morceau de ``rows`` (tuples dans l'ordre du schéma)"""
+        parts = []
+        buffers = []
+        for index, (name, kind) in enumerate(self.schemas[table]):
+            values = (row[index] for row in rows)
+            if kind == "timestamp[us]":
+                values = map(_timestamp, values)
+            elif kind == "dictionary":
+                codes = self.dictionaries.setdefault((table, name), {})
+                values = (codes.setdefault(v, len(codes)) for v in values)
+            data = _to_little_endian(array(COLUMN_TYPES[kind], values))
+            padding = b"\0" * (-len(data) % _ALIGNMENT)
+            buffers.append([self.position, len(data)])
+            parts += [data, padding]
+            self.position += len(data) + len(padding)
+        self.chunks[table].append({"rows": len(rows), "buffers": buffers})
+        return b"".join(parts)
+
+    def finish(self) -> bytes:
+        """Pied de page, longueur et MAGIC de fin"""
+        tables = {}
+        for table, schema in self.schemas.items():
+            columns = []
+            for name, kind in schema:
+                column = {"name": name, "type": kind}
+                if kind == "dictionary":
+                    column["dictionary"] = list(
+                        self.dictionaries.get((table, name), {})
+                    )
+                columns.append(column)
+            tables[table] = {
+                "rows": sum(chunk["rows"] for chunk in self.chunks[table]),
+                "columns": columns,
+                "chunks": self.chunks[table],
+            }
+        footer = json.dumps(
+            {
+                "format": "RTCOL",
+                "version": FORMAT_VERSION,
+                "metadata": self.metadata,
+                "tables": tables,
+            }
+        ).encode()
+        return footer + _TRAILER.pack(len(footer)) + MAGIC
+
+
+def _rows_in_chunks(query, chunk_rows: int) -> Iterator[List[Tuple]]:
+    chunk: List[Tuple] = []
+    for row in query.yield_per(chunk_rows):
+        chunk.append(tuple(row))
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_sales_export(
+    db: Session,
+    store_id: Optional[int] = None,
+    date_debut: Optional[DateBound] = None,
+    date_fin: Optional[DateBound] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[bytes]:
+    """Produire en flux le fichier RTCOL des ventes de la période (tous
+    statuts confondus) et de leurs lignes, par ordre chronologique"""
+    conditions = sale_date_range(date_debut, date_fin)
+    if store_id is not None:
+        conditions.append(models.Sale.store_id == store_id)
+
+    writer = ColumnarWriter(
+        {"sales": SALES_SCHEMA, "sale_lines": SALE_LINES_SCHEMA},
+        metadata={
+            "exported_at": datetime.utcnow().isoformat(),
+            "store_id": store_id,
+            "date_debut": date_debut.isoformat() if date_debut else None,
+            "date_fin": date_fin.isoformat() if date_fin else None,
+        },
+    )
+    yield writer.begin()
+
+    sales = (
+        db.query(*(getattr(models.Sale, name) for name, _ in SALES_SCHEMA))
+        .filter(*conditions)
+        .order_by(models.Sale.date_vente, models.Sale.id)
+    )
+    for chunk in _rows_in_chunks(sales, chunk_rows):
+        yield writer.chunk("sales", chunk)
+
+    lines = (
+        db.query(*(getattr(models.SaleLine, name) for name, _ in SALE_LINES_SCHEMA))
+        .join(models.Sale, models.Sale.id == models.SaleLine.sale_id)
+        .filter(*conditions)
+        .order_by(models.Sale.date_vente, models.SaleLine.sale_id, models.SaleLine.id)
+    )
+    for chunk in _rows_in_chunks(lines, chunk_rows):
+        yield writer.chunk("sale_lines", chunk)
+
+    yield writer.finish()
+    logger.info(f"📦 Columnar export done ({writer.position} bytes of columns)")
+
+
+def export_sales(db: Session, path: str, **filters) -> Dict[str, int]:
+    """Écrire l'export dans ``path`` ; renvoie le nombre de lignes par table"""
+    with open(path, "wb") as output:
+        for part in iter_sales_export(db, **filters):
+            output.write(part)
+    with ColumnarFile(path) as exported:
+        return {table: exported.num_rows(table) for table in exported.tables}
+
+
+class ColumnarFile:
+    """Lecture d'un fichier RTCOL en mémoire partagée.
+
+    Les colonnes sont des ``memoryview`` sur le ``mmap`` : aucune copie, et
+    seules les pages lues sont chargées. Les vues ne doivent plus servir
+    après ``close()`` (le mapping reste ouvert tant qu'il en existe).
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # fichier vide
+            self._file.close()
+            raise ValueError(f"Not a RTCOL file: {path}")
+        self._buffer = memoryview(self._map)
+        size = len(self._map)
+        trailer = len(MAGIC) + _TRAILER.size
+        if (
+            size < len(MAGIC) + trailer
+            or self._map[: len(MAGIC)] != MAGIC
+            or self._map[size - len(MAGIC) :] != MAGIC
+        ):
+            self.close()
+            raise ValueError(f"Not a RTCOL file: {path}")
+        (footer_size,) = _TRAILER.unpack_from(self._map, size - trailer)
+        footer = json.loads(self._map[size - trailer - footer_size : size - trailer])
+        if footer.get("version") != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Unsupported RTCOL version: {footer.get('version')}")
+        self.metadata: Dict[str, Any] = footer["metadata"]
+        self._tables: Dict[str, Dict[str, Any]] = footer["tables"]
+
+    def __enter__(self) -> "ColumnarFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._buffer.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # des vues sont encore utilisées : libéré avec elles
+        self._file.close()
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self._tables)
+
+    def num_rows(self, table: str) -> int:
+        return self._tables[table]["rows"]
+
+    def columns(self, table: str) -> List[str]:
+        return [column["name"] for column in self._tables[table]["columns"]]
+
+    def dictionary(self, table: str, column: str) -> List[str]:
+        """Valeurs d'une colonne ``dictionary`` (indexées par code)"""
+        return self._column_spec(table, column)[1]["dictionary"]
+
+    def chunks(
+        self, table: str, columns: Optional[Sequence[str]] = None
+    ) -> Iterator[Dict[str, memoryview]]:
+        """Morceaux de ``table`` : nom de colonne -> vue typée sans copie"""
+        specs = [
+            self._column_spec(table, name) for name in columns or self.columns(table)
+        ]
+        for chunk in self._tables[table]["chunks"]:
+            views = {}
+            for index, column in specs:
+                offset, nbytes = chunk["buffers"][index]
+                view = self._buffer[offset : offset + nbytes]
+                typecode = COLUMN_TYPES[column["type"]]
+                if sys.byteorder == "big":
+                    values = array(typecode, view)
+                    values.byteswap()
+                    view = memoryview(values)
+                views[column["name"]] = view.cast(typecode)
+            yield views
+
+    def column(self, table: str, name: str) -> Iterator[memoryview]:
+        for chunk in self.chunks(table, [name]):
+            yield chunk[name]
+
+    def sum(self, table: str, column: str) -> float:
+        return sum(sum(values) for values in self.column(table, column))
+
+    def group_sum(
+        self, table: str, key: str, value: str
+    ) -> Dict[int, Tuple[int, float]]:
+        """``key`` -> (nombre de lignes, somme de ``value``)"""
+        groups: Dict[int, Tuple[int, float]] = {}
+        for chunk in self.chunks(table, [key, value]):
+            for k, v in zip(chunk[key], chunk[value]):
+                count, total = groups.get(k, (0, 0.0))
+                groups[k] = (count + 1, total + v)
+        return groups
+
+    def _column_spec(self, table: str, name: str) -> Tuple[int, Dict[str, Any]]:
+        for index, column in enumerate(self._tables[table]["columns"]):
+            if column["name"] == name:
+                return index, column
+        raise KeyError(f"Unknown column {table}.{name}")
+
+
+def revenue_by_store(exported: ColumnarFile) -> Dict[int, Tuple[int, float]]:
+    """Nombre de ventes et chiffre d'affaires par magasin, hors annulées"""
+    statuts = exported.dictionary("sales", "statut")
+    cancelled = statuts.index(CANCELLED_STATUS) if CANCELLED_STATUS in statuts else -1
+    stores: Dict[int, Tuple[int, float]] = {}
+    for chunk in exported.chunks("sales", ["store_id", "total", "statut"]):
+        for store_id, total, statut in zip(
+            chunk["store_id"], chunk["total"], chunk["statut"]
+        ):
+            if statut != cancelled:
+                count, amount = stores.get(store_id, (0, 0.0))
+                stores[store_id] = (count + 1, amount + total)
+    return stores
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export colonnaire des ventes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Exporter une période")
+    export.add_argument("path")
+    export.add_argument("--from", dest="date_debut", type=date.fromisoformat)
+    export.add_argument("--to", dest="date_fin", type=date.fromisoformat)
+    export.add_argument("--store", dest="store_id", type=int)
+    summary = subparsers.add_parser("summary", help="Résumer un export par magasin")
+    summary.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "summary":
+        with ColumnarFile(args.path) as exported:
+            for store_id, (count, amount) in sorted(revenue_by_store(exported).items()):
+                print(f"store {store_id}: {count} sales, {amount:.2f}")
+        return
+
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = export_sales(
+            db,
+            args.path,
+            store_id=args.store_id,
+            date_debut=args.date_debut,
+            date_fin=args.date_fin,
+        )
+        logger.info(f"✅ Exported {rows} to {args.path}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import redis
+from sqlalchemy.orm import Session
+
+import src.models as models
+
+logger = logging.getLogger(__name__)
+
+# Types d'événements de vente publiés sur le bus
+SALE_CREATED = "SaleCreated"
+SALE_CANCELLED = "SaleCancelled"
+SALE_RESTORED = "SaleRestored"
+
+
+def sale_event_data(sale: models.Sale) -> Dict[str, Any]:
+    """Instantané d'une vente (avec ses lignes) porté par ses événements"""
+    return {
+        "sale_id": sale.id,
+        "store_id": sale.store_id,
+        "cash_register_id": sale.cash_register_id,
+        "date_vente": sale.date_vente.isoformat(),
+        "total": sale.total,
+        "statut": sale.statut,
+        "lines": [
+            {
+                "product_id": line.product_id,
+                "quantite": line.quantite,
+                "sous_total": line.sous_total,
+            }
+            for line in sale.sale_lines
+        ],
+    }
+
+
+def record_sale_events(
+    db: Session, event_type: str, sales: Iterable[Dict[str, Any]]
+) -> int:
+    """Inscrire un événement par vente dans l'outbox (sans commit).
+
+    ``sales`` : instantanés produits par ``sale_event_data`` (ou équivalents
+    pour les imports groupés). Les lignes d'outbox partent en un INSERT groupé.
+    """
+    occurred_at = datetime.now(timezone.utc).isoformat()
+    rows: List[Dict[str, Any]] = []
+    for data in sales:
+        event = {
+            "event_id": str(uuid.uuid4()),
+            "event_type": event_type,
+            "occurred_at": occurred_at,
+            "aggregate_type": "sale",
+            "aggregate_id": str(data["sale_id"]),
+            "data": data,
+        }
+        rows.append(
+            {
+                "event_id": event["event_id"],
+                "event_type": event_type,
+                "sale_id": data["sale_id"],
+                "payload": json.dumps(event),
+            }
+        )
+    if rows:
+        db.execute(models.SaleOutboxEvent.__table__.insert(), rows)
+    return len(rows)
+
+
+class EventPublisher:
+    """Publication des événements de vente sur un stream Redis.
+
+    Même enveloppe que les autres services (event_id, event_type, stream,
+    occurred_at, aggregate_type, aggregate_id, data). La connexion est
+    établie au premier usage : sans Redis, les événements restent dans
+    l'outbox et partent au premier passage du relais après son retour.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("EVENT_BUS_URL") or os.getenv(
+            "REDIS_URL", "redis://localhost:6379/0"
+        )
+        self.stream_name = os.getenv("RETAIL_EVENT_STREAM", "retail.sales.events")
+        self.instance_id = os.getenv("INSTANCE_ID", "retail-api")
+        self.maxlen = int(os.getenv("RETAIL_EVENT_STREAM_MAXLEN", "1000000"))
+        self.client: Optional[redis.Redis] = None
+        self._unavailable_logged = False
+
+    @property
+    def enabled(self) -> bool:
+        """Redis joignable. Tant qu'il ne l'a pas été, la connexion est
+        retentée à chaque appel (donc à chaque passage du relais)."""
+        return self._connect() is not None
+
+    def _connect(self) -> Optional[redis.Redis]:
+        if self.client is not None:
+            return self.client
+        try:
+            client = redis.from_url(self.redis_url, decode_responses=True)
+            client.ping()
+        except Exception as e:
+            if not self._unavailable_logged:
+                logger.warning(f"EventPublisher waiting for Redis: {e}")
+                self._unavailable_logged = True
+            return None
+        self.client = client
+        logger.info(
+            f"EventPublisher connected to Redis at {self.redis_url}, stream='{self.stream_name}'"
+        )
+        return client
+
+    def publish(self, event: Dict[str, Any]) -> Optional[str]:
+        """Publier une enveloppe déjà construite. Lève en cas d'échec Redis."""
+        client = self._connect()
+        if client is None:
+            return None
+
+        event = {
+            **event,
+            "stream": self.stream_name,
+            "producer_instance": self.instance_id,
+        }
+        return client.xadd(
+            self.stream_name,
+            {"event": json.dumps(event)},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+
+
+class OutboxRelay:
+    """Relaye les événements de vente de l'outbox vers Redis, dans l'ordre.
+
+    Livraison « au moins une fois » : les consommateurs dédupliquent sur
+    ``sale_id`` (création) et sur l'état courant de la vente (annulation).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        publisher: EventPublisher,
+        batch_size: int = 100,
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher
+        self.batch_size = batch_size
+
+    def relay_pending(self) -> int:
+        """Publier les événements en attente. Retourne le nombre publiés."""
+        if not self.publisher.enabled:
+            return 0
+
+        published = 0
+        db = self.session_factory()
+        try:
+            while True:
+                events = (
+                    db.query(models.SaleOutboxEvent)
+                    .filter(models.SaleOutboxEvent.date_publication.is_(None))
+                    .order_by(models.SaleOutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                    .all()
+                )
+                if not events:
+                    break
+
+                sent = 0
+                try:
+                    for event in events:
+                        self.publisher.publish(json.loads(event.payload))
+                        event.date_publication = datetime.utcnow()
+                        sent += 1
+                except Exception as e:
+                    # On s'arrête au premier échec pour préserver l'ordre
+                    logger.warning(f"⚠️ Sale event relay interrupted: {e}")
+                finally:
+                    db.commit()
+                    published += sent
+
+                if sent < len(events) or len(events) < self.batch_size:
+                    break
+        finally:
+            db.close()
+
+        if published:
+            logger.info(f"📣 Relayed {published} sale events")
+        return published
+
+    @staticmethod
+    def purge_published(db: Session, older_than: datetime) -> int:
+        """Supprimer les événements publiés avant ``older_than``"""
+        deleted = (
+            db.query(models.SaleOutboxEvent)
+            .filter(
+                models.SaleOutboxEvent.date_publication.isnot(None),
+                models.SaleOutboxEvent.date_publication < older_than,
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
@@ -1,7 +1,7 @@
 import httpx
 import logging
 import os
-from typing import Optional, Dict, Any
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +74,35 @@ class InventoryService:
             logger.error(f"❌ Erreur communication Inventory API: {str(e)}")
             raise ExternalServiceError(f"Cannot connect to Inventory API: {str(e)}")
 
+    @staticmethod
+    async def reduce_stock_bulk(
+        reference: str, items: List[Dict[str, int]], reason: str = "vente_retail"
+    ) -> Dict[str, Any]:
+        """Réduit le stock de plusieurs produits en un appel (idempotent)"""
+        try:
+            async with httpx.AsyncClient(timeout=10.0) as client:
+                response = await client.post(
+                    f"{INVENTORY_API_URL}/api/v1/stock/reduce/bulk",
+                    json={"reference": reference, "raison": reason, "items": items},
+                )
+
+                if response.status_code != 200:
+                    raise ExternalServiceError(
+                        f"Inventory API error: {response.status_code}"
+                    )
+
+                result = response.json()
+                if result.get("missing"):
+                    logger.warning(
+                        f"⚠️ Products {result['missing']} not found in inventory "
+                        f"({reference})"
+                    )
+                return result
+
+        except httpx.RequestError as e:
+            logger.error(f"❌ Erreur communication Inventory API: {str(e)}")
+            raise ExternalServiceError(f"Cannot connect to Inventory API: {str(e)}")
+
     @staticmethod
     async def check_stock_availability(
         product_id: int, requested_quantity: int
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from src.database import SessionLocal, engine
 from src.models import Base, Store, CashRegister, Sale, SaleLine
+from src.rollups import SalesRollupService
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -17,6 +18,8 @@ def init_database():
         existing_stores = db.query(Store).count()
         if existing_stores > 0:
             logger.info("📊 Database already contains data, skipping initialization")
+            # Base existante : les agrégats journaliers peuvent manquer
+            SalesRollupService(db).ensure_built()
             return
 
         logger.info("🏪 Initializing retail database with sample data...")
@@ -258,6 +261,9 @@ def init_database():
         db.commit()
         logger.info(f"✅ Created {len(sample_sales)} sample sales")
 
+        # Agrégats journaliers des ventes d'exemple
+        SalesRollupService(db).rebuild()
+
         logger.info("🎉 Retail database initialization completed successfully!")
 
     except Exception as e:
@@ -1,10 +1,12 @@
 from fastapi import FastAPI, Request, HTTPException, Response
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import logging
 import time
 import uuid
 import os
+from datetime import datetime, timedelta
 
 # Configuration du logging structuré
 logging.basicConfig(
@@ -15,11 +17,21 @@ logging.basicConfig(
 
 logger = logging.getLogger("retail-api")
 
-from src.database import engine, Base, get_db
+from src.database import engine, Base, get_db, SessionLocal
 from src.api.v1.router import api_router
 from src.init_db import init_database
 from src.metrics_service import metrics_service, CONTENT_TYPE_LATEST
 from src.metrics_middleware import MetricsMiddleware
+from src.stock_sync import StockSyncRelay, stock_sync_relay
+from src.events import EventPublisher, OutboxRelay
+
+# Relais des décréments de stock en attente vers inventory-api
+STOCK_SYNC_INTERVAL = float(os.getenv("STOCK_SYNC_INTERVAL", "5"))
+STOCK_SYNC_RETENTION_HOURS = float(os.getenv("STOCK_SYNC_RETENTION_HOURS", "24"))
+# Relais de l'outbox des événements de vente vers Redis
+SALE_EVENT_RELAY_INTERVAL = float(os.getenv("SALE_EVENT_RELAY_INTERVAL", "1"))
+SALE_EVENT_RELAY_BATCH_SIZE = int(os.getenv("SALE_EVENT_RELAY_BATCH_SIZE", "500"))
+SALE_EVENT_RETENTION_HOURS = float(os.getenv("SALE_EVENT_RETENTION_HOURS", "24"))
 
 app = FastAPI(
     title="Retail API",
@@ -145,11 +157,74 @@ async def startup_event():
                 logger.error("❌ Failed to initialize database after all retries")
                 raise
 
+    if STOCK_SYNC_INTERVAL > 0 and not os.getenv("TESTING"):
+        app.state.stock_sync = asyncio.create_task(stock_sync_loop())
+        logger.info(f"📦 Stock sync relay started (every {STOCK_SYNC_INTERVAL}s)")
+
+    if SALE_EVENT_RELAY_INTERVAL > 0 and not os.getenv("TESTING"):
+        app.state.sale_event_relay = asyncio.create_task(sale_event_relay())
+        logger.info(f"📣 Sale event relay started (every {SALE_EVENT_RELAY_INTERVAL}s)")
+
+
+def _purge_stock_sync() -> int:
+    db = SessionLocal()
+    try:
+        return StockSyncRelay.purge_sent(
+            db, datetime.utcnow() - timedelta(hours=STOCK_SYNC_RETENTION_HOURS)
+        )
+    finally:
+        db.close()
+
+
+async def stock_sync_loop():
+    """Rejoue périodiquement les décréments de stock non transmis"""
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(STOCK_SYNC_INTERVAL)
+        try:
+            await stock_sync_relay.relay_pending()
+            if time.monotonic() - last_purge > 3600:
+                await asyncio.to_thread(_purge_stock_sync)
+                last_purge = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ Stock sync relay failed: {e}")
+
+
+def _purge_sale_events() -> int:
+    db = SessionLocal()
+    try:
+        return OutboxRelay.purge_published(
+            db, datetime.utcnow() - timedelta(hours=SALE_EVENT_RETENTION_HOURS)
+        )
+    finally:
+        db.close()
+
+
+async def sale_event_relay():
+    """Publie en continu les événements de vente écrits dans l'outbox"""
+    publisher = await asyncio.to_thread(EventPublisher)
+    relay = OutboxRelay(SessionLocal, publisher, batch_size=SALE_EVENT_RELAY_BATCH_SIZE)
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(SALE_EVENT_RELAY_INTERVAL)
+        try:
+            await asyncio.to_thread(relay.relay_pending)
+            if time.monotonic() - last_purge > 3600:
+                await asyncio.to_thread(_purge_sale_events)
+                last_purge = time.monotonic()
+        except Exception as e:
+            logger.warning(f"⚠️ Sale event relay failed: {e}")
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("🛑 Shutting down Retail API")
 
+    for task_name in ("stock_sync", "sale_event_relay"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+
 
 @app.get("/")
 async def root():
@@ -3,8 +3,10 @@ from sqlalchemy import (
     Integer,
     String,
     Float,
+    Date,
     DateTime,
     ForeignKey,
+    Index,
     Text,
     Boolean,
 )
@@ -65,6 +67,18 @@ class Sale(Base):
     total = Column(Float, nullable=False, default=0.0)
     notes = Column(Text, nullable=True)
     statut = Column(String, default="terminee")  # "en_cours", "terminee", "annulee"
+    idempotency_key = Column(
+        String, unique=True, nullable=True
+    )  # Clé générée par la caisse (rejeu hors ligne)
+
+    __table_args__ = (
+        # Filtres magasin/caisse + période, et pagination par (date_vente, id)
+        Index("ix_sales_store_id_date_vente", "store_id", "date_vente", "id"),
+        Index("ix_sales_cash_register_id_date_vente", "cash_register_id", "date_vente"),
+        # Insertion chronologique : BRIN compact pour les rapports par période
+        # sur PostgreSQL (index B-tree classique sur les autres moteurs)
+        Index("ix_sales_date_vente", "date_vente", postgresql_using="brin"),
+    )
 
     # Relations
     store = relationship("Store", back_populates="sales")
@@ -81,7 +95,7 @@ class SaleLine(Base):
     __tablename__ = "sale_lines"
 
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False, index=True)
     product_id = Column(Integer, nullable=False)  # Référence au Product (via API)
     quantite = Column(Integer, nullable=False)
     prix_unitaire = Column(Float, nullable=False)
@@ -94,6 +108,27 @@ class SaleLine(Base):
         return f"<SaleLine(id={self.id}, product_id={self.product_id}, quantite={self.quantite})>"
 
 
+class SalesDailyRollup(Base):
+    """Ventes non annulées agrégées par magasin, caisse et jour (UTC).
+
+    Maintenue incrémentalement à la création et à l'annulation des ventes ;
+    reconstructible avec ``python -m src.rollups rebuild``.
+    """
+
+    __tablename__ = "sales_daily_rollup"
+
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True)
+    cash_register_id = Column(
+        Integer, ForeignKey("cash_registers.id"), primary_key=True
+    )
+    day = Column(Date, primary_key=True, index=True)
+    nombre_ventes = Column(Integer, nullable=False, default=0)
+    total_ventes = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<SalesDailyRollup(store_id={self.store_id}, cash_register_id={self.cash_register_id}, day={self.day}, nombre_ventes={self.nombre_ventes})>"
+
+
 class StoreMetrics(Base):
     __tablename__ = "store_metrics"
 
@@ -109,3 +144,45 @@ class StoreMetrics(Base):
 
     def __repr__(self):
         return f"<StoreMetrics(id={self.id}, store_id={self.store_id}, total_ventes={self.total_ventes})>"
+
+
+class StockSyncOutbox(Base):
+    """Décrément de stock à transmettre à inventory-api (outbox transactionnelle).
+
+    Écrit dans la transaction de la vente ; relayé hors du chemin de requête
+    par ``src.stock_sync``. La référence rend l'appel idempotent côté inventaire.
+    """
+
+    __tablename__ = "stock_sync_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    reference = Column(String, unique=True, nullable=False)  # "sale_42"
+    payload = Column(Text, nullable=False)  # [{"product_id": .., "quantite": ..}]
+    tentatives = Column(Integer, nullable=False, default=0)
+    derniere_erreur = Column(Text, nullable=True)
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    date_envoi = Column(DateTime, index=True, nullable=True)
+
+    def __repr__(self):
+        return f"<StockSyncOutbox(id={self.id}, reference='{self.reference}', envoye={self.date_envoi is not None})>"
+
+
+class SaleOutboxEvent(Base):
+    """Événement de vente en attente de publication sur le bus.
+
+    Écrit dans la même transaction que la vente, puis relayé vers le stream
+    Redis par ``src.events.OutboxRelay`` dans l'ordre des identifiants.
+    """
+
+    __tablename__ = "sale_events_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, unique=True, nullable=False)
+    event_type = Column(String, nullable=False)  # SaleCreated, SaleCancelled...
+    sale_id = Column(Integer, index=True, nullable=False)
+    payload = Column(Text, nullable=False)  # Enveloppe JSON complète
+    date_creation = Column(DateTime, default=datetime.utcnow)
+    date_publication = Column(DateTime, index=True, nullable=True)
+
+    def __repr__(self):
+        return f"<SaleOutboxEvent(id={self.id}, type='{self.event_type}', sale_id={self.sale_id})>"
@@ -0,0 +1,244 @@
+import argparse
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import src.models as models
+
+logger = logging.getLogger(__name__)
+
+# Statut exclu des agrégats
+CANCELLED_STATUS = "annulee"
+
+RollupKey = Tuple[int, int, date]
+
+
+def counts_in_rollup(statut: Optional[str]) -> bool:
+    return statut != CANCELLED_STATUS
+
+
+def _field(sale, name: str):
+    return sale.get(name) if isinstance(sale, dict) else getattr(sale, name)
+
+
+class SalesRollupService:
+    """Maintenance et lecture de ``sales_daily_rollup``.
+
+    Les mises à jour passent par un upsert additif (``valeur = valeur + delta``),
+    sûr en concurrence sur PostgreSQL, dans la transaction de l'appelant.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_sales(self, sales: Iterable, sign: int = 1) -> None:
+        """Ajouter (ou retirer avec ``sign=-1``) des ventes aux agrégats.
+
+        ``sales`` : objets ou dicts avec store_id, cash_register_id,
+        date_vente, total et statut. Les deltas sont groupés par clé.
+        """
+        deltas: Dict[RollupKey, Tuple[int, float]] = {}
+        for sale in sales:
+            if not counts_in_rollup(_field(sale, "statut")):
+                continue
+            key = (
+                _field(sale, "store_id"),
+                _field(sale, "cash_register_id"),
+                _field(sale, "date_vente").date(),
+            )
+            count, total = deltas.get(key, (0, 0.0))
+            deltas[key] = (count + sign, total + sign * (_field(sale, "total") or 0.0))
+        self._apply(deltas)
+
+    def record_status_change(self, sale: models.Sale, previous_statut: str) -> None:
+        """Répercuter un changement de statut (annulation ou rétablissement)"""
+        was_counted = counts_in_rollup(previous_statut)
+        is_counted = counts_in_rollup(sale.statut)
+        if was_counted and not is_counted:
+            self._apply({self._key(sale): (-1, -(sale.total or 0.0))})
+        elif is_counted and not was_counted:
+            self._apply({self._key(sale): (1, sale.total or 0.0)})
+
+    def _key(self, sale: models.Sale) -> RollupKey:
+        return (sale.store_id, sale.cash_register_id, sale.date_vente.date())
+
+    def _apply(self, deltas: Dict[RollupKey, Tuple[int, float]]) -> None:
+        if not deltas:
+            return
+        rollup = models.SalesDailyRollup.__table__
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(rollup)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[rollup.c.store_id, rollup.c.cash_register_id, rollup.c.day],
+            set_={
+                "nombre_ventes": rollup.c.nombre_ventes + stmt.excluded.nombre_ventes,
+                "total_ventes": rollup.c.total_ventes + stmt.excluded.total_ventes,
+            },
+        )
+        self.db.execute(
+            stmt,
+            [
+                {
+                    "store_id": store_id,
+                    "cash_register_id": cash_register_id,
+                    "day": day,
+                    "nombre_ventes": count,
+                    "total_ventes": total,
+                }
+                for (store_id, cash_register_id, day), (count, total) in deltas.items()
+            ],
+        )
+
+    def rebuild(
+        self, day_from: Optional[date] = None, day_to: Optional[date] = None
+    ) -> int:
+        """Recalculer les agrégats depuis ``sales`` (bornes de jours incluses)"""
+        rollup = models.SalesDailyRollup
+        delete = self.db.query(rollup)
+        if day_from:
+            delete = delete.filter(rollup.day >= day_from)
+        if day_to:
+            delete = delete.filter(rollup.day <= day_to)
+        delete.delete(synchronize_session=False)
+
+        day = func.date(models.Sale.date_vente)
+        select = self.db.query(
+            models.Sale.store_id,
+            models.Sale.cash_register_id,
+            day,
+            func.count(models.Sale.id),
+            func.coalesce(func.sum(models.Sale.total), 0.0),
+        ).filter(models.Sale.statut != CANCELLED_STATUS)
+        if day_from:
+            select = select.filter(models.Sale.date_vente >= day_from)
+        if day_to:
+            select = select.filter(
+                models.Sale.date_vente < datetime.combine(day_to, datetime.max.time())
+            )
+        select = select.group_by(
+            models.Sale.store_id, models.Sale.cash_register_id, day
+        )
+
+        result = self.db.execute(
+            rollup.__table__.insert().from_select(
+                [
+                    "store_id",
+                    "cash_register_id",
+                    "day",
+                    "nombre_ventes",
+                    "total_ventes",
+                ],
+                select.statement,
+            )
+        )
+        self.db.commit()
+        logger.info(f"✅ Sales rollup rebuilt ({result.rowcount} rows)")
+        return result.rowcount
+
+    def ensure_built(self) -> int:
+        """Construire les agrégats d'une base antérieure à ``sales_daily_rollup``
+        (table vide alors que des ventes existent) ; sans effet sinon"""
+        if self.db.query(models.SalesDailyRollup.store_id).first() is not None:
+            return 0
+        if self.db.query(models.Sale.id).first() is None:
+            return 0
+        logger.info("🔁 Sales rollup empty, backfilling from sales")
+        return self.rebuild()
+
+    def totals(
+        self,
+        store_id: Optional[int] = None,
+        day_from: Optional[date] = None,
+        day_to: Optional[date] = None,
+    ) -> Tuple[int, float]:
+        """Nombre de ventes et chiffre d'affaires sur une plage de jours"""
+        rollup = models.SalesDailyRollup
+        query = self.db.query(
+            func.coalesce(func.sum(rollup.nombre_ventes), 0),
+            func.coalesce(func.sum(rollup.total_ventes), 0.0),
+        )
+        count, total = self._filter(query, store_id, day_from, day_to).one()
+        return int(count or 0), float(total or 0.0)
+
+    def by_store(
+        self,
+        day_from: Optional[date] = None,
+        day_to: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, int, float]]:
+        """(store_id, nombre_ventes, total_ventes) par chiffre d'affaires décroissant"""
+        rollup = models.SalesDailyRollup
+        total = func.sum(rollup.total_ventes)
+        query = self._filter(
+            self.db.query(rollup.store_id, func.sum(rollup.nombre_ventes), total),
+            None,
+            day_from,
+            day_to,
+        )
+        query = query.group_by(rollup.store_id).having(
+            func.sum(rollup.nombre_ventes) > 0
+        )
+        query = query.order_by(total.desc(), rollup.store_id)
+        if limit:
+            query = query.limit(limit)
+        return [
+            (store_id, int(count), float(amount)) for store_id, count, amount in query
+        ]
+
+    def by_day(
+        self,
+        store_id: Optional[int] = None,
+        day_from: Optional[date] = None,
+        day_to: Optional[date] = None,
+    ) -> List[Tuple[date, int, float]]:
+        """(jour, nombre_ventes, total_ventes) par ordre chronologique"""
+        rollup = models.SalesDailyRollup
+        query = self._filter(
+            self.db.query(
+                rollup.day,
+                func.sum(rollup.nombre_ventes),
+                func.sum(rollup.total_ventes),
+            ),
+            store_id,
+            day_from,
+            day_to,
+        )
+        query = query.group_by(rollup.day).order_by(rollup.day)
+        return [(day, int(count), float(amount)) for day, count, amount in query]
+
+    def _filter(self, query, store_id, day_from, day_to):
+        rollup = models.SalesDailyRollup
+        if store_id is not None:
+            query = query.filter(rollup.store_id == store_id)
+        if day_from:
+            query = query.filter(rollup.day >= day_from)
+        if day_to:
+            query = query.filter(rollup.day <= day_to)
+        return query
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Maintenance de sales_daily_rollup")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recalculer depuis la table sales")
+    rebuild.add_argument("--from", dest="day_from", type=date.fromisoformat)
+    rebuild.add_argument("--to", dest="day_to", type=date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    from src.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        SalesRollupService(db).rebuild(args.day_from, args.day_to)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 
@@ -115,6 +115,35 @@ class SalePage(BaseModel):
     pages: int
 
 
+# Offline POS batch upload schemas
+class SaleBatchItem(SaleBase):
+    idempotency_key: str = Field(
+        ..., min_length=1, max_length=128, description="Client-generated sale key"
+    )
+    date_vente: Optional[datetime] = Field(
+        None, description="Sale time recorded by the register (defaults to now)"
+    )
+    lines: List[SaleLineCreate] = Field(..., min_length=1, description="Sale lines")
+
+
+class SaleBatchCreate(BaseModel):
+    sales: List[SaleBatchItem] = Field(..., min_length=1, max_length=5000)
+
+
+class SaleBatchItemResult(BaseModel):
+    idempotency_key: str
+    sale_id: Optional[int] = None
+    statut: str  # "cree" ou "doublon"
+
+
+class SaleBatchResult(BaseModel):
+    received: int
+    created: int
+    duplicates: int
+    stock_reference: Optional[str] = None
+    results: List[SaleBatchItemResult]
+
+
 # Store with details schemas
 class StoreWithDetails(StoreResponse):
     cash_registers: List[CashRegisterResponse] = []
@@ -157,6 +186,33 @@ class RetailSummary(BaseModel):
     panier_moyen_global: float
 
 
+class SalesSummary(BaseModel):
+    nombre_ventes: int
+    total_ventes: float
+    panier_moyen: float
+
+
+# Agrégats calculés côté SQL (ventes annulées exclues)
+class SalesByStore(BaseModel):
+    store_id: int
+    nombre_ventes: int
+    total_ventes: float
+    panier_moyen: float
+
+
+class SalesByProduct(BaseModel):
+    product_id: int
+    quantite_vendue: int
+    total_ventes: float
+    nombre_ventes: int
+
+
+class SalesByDate(BaseModel):
+    jour: date
+    nombre_ventes: int
+    total_ventes: float
+
+
 class StorePerformance(BaseModel):
     store: StoreResponse
     total_ventes: float
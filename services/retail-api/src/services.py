@@ -1,18 +1,128 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
-from typing import List, Optional, Tuple
-from datetime import datetime, timedelta
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, and_, or_, desc
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from datetime import date, datetime, timedelta, timezone
+import base64
 import logging
+import uuid
 import httpx
 
 import src.models as models
 import src.schemas as schemas
 import src.external_services as external_services
 from src.external_services import InventoryService, ExternalServiceError
+from src.stock_sync import enqueue_stock_decrement
+from src.rollups import CANCELLED_STATUS, SalesRollupService, counts_in_rollup
+from src.events import (
+    SALE_CANCELLED,
+    SALE_CREATED,
+    SALE_RESTORED,
+    record_sale_events,
+    sale_event_data,
+)
 
 logger = logging.getLogger(__name__)
 
 
+# Champs exposables d'une vente (projection ``fields=``) et de ses lignes
+SALE_FIELDS = (
+    "id",
+    "store_id",
+    "cash_register_id",
+    "date_vente",
+    "total",
+    "statut",
+    "notes",
+)
+SALE_LINE_FIELDS = (
+    "id",
+    "sale_id",
+    "product_id",
+    "quantite",
+    "prix_unitaire",
+    "sous_total",
+)
+
+
+def encode_sale_cursor(date_vente: datetime, sale_id: int) -> str:
+    """Curseur opaque de pagination par clé (date_vente, id)"""
+    raw = f"{date_vente.isoformat()}|{sale_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_sale_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Décoder un curseur ; lève ValueError s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_sale_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Valider une projection ``fields=a,b,sale_lines`` ; None = vente complète"""
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in SALE_FIELDS + ("sale_lines",)]
+    if unknown:
+        raise ValueError(f"Unknown sale fields: {', '.join(unknown)}")
+    return requested
+
+
+# Taille des lots pour les requêtes IN et les INSERT groupés
+BATCH_CHUNK_SIZE = 1000
+
+
+def _chunks(
+    items: Sequence[Any], size: int = BATCH_CHUNK_SIZE
+) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    # Les dates de vente sont stockées en UTC naïf
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Borne de période : un jour entier (date) ou un instant précis (datetime)
+DateBound = Union[datetime, date]
+
+
+def sale_date_range(
+    date_debut: Optional[DateBound] = None, date_fin: Optional[DateBound] = None
+) -> list:
+    """Conditions de période sur ``Sale.date_vente``, sargables par l'index.
+
+    Une date seule couvre le jour entier : ``date_fin`` devient une borne
+    exclusive au lendemain minuit.
+    """
+    conditions = []
+    if date_debut is not None:
+        if not isinstance(date_debut, datetime):
+            date_debut = datetime.combine(date_debut, datetime.min.time())
+        conditions.append(models.Sale.date_vente >= _as_naive_utc(date_debut))
+    if date_fin is not None:
+        if isinstance(date_fin, datetime):
+            conditions.append(models.Sale.date_vente <= _as_naive_utc(date_fin))
+        else:
+            next_day = datetime.combine(
+                date_fin + timedelta(days=1), datetime.min.time()
+            )
+            conditions.append(models.Sale.date_vente < next_day)
+    return conditions
+
+
+def stock_reference(sale_id: int) -> str:
+    """Référence d'idempotence du décrément de stock d'une vente"""
+    return f"sale_{sale_id}"
+
+
 class StoreService:
     def __init__(self, db: Session):
         self.db = db
@@ -73,14 +183,9 @@ class StoreService:
         if not store:
             return None
 
-        # Calculer les statistiques
-        sales_stats = (
-            self.db.query(
-                func.count(models.Sale.id).label("nombre_transactions"),
-                func.coalesce(func.sum(models.Sale.total), 0).label("total_sales"),
-            )
-            .filter(models.Sale.store_id == store_id)
-            .first()
+        # Statistiques lues dans les agrégats journaliers
+        nombre_transactions, total_sales = SalesRollupService(self.db).totals(
+            store_id=store_id
         )
 
         # Créer l'objet de réponse
@@ -93,8 +198,8 @@ class StoreService:
             actif=store.actif,
             date_creation=store.date_creation,
             cash_registers=store.cash_registers,
-            total_sales=sales_stats.total_sales or 0.0,
-            nombre_transactions=sales_stats.nombre_transactions or 0,
+            total_sales=total_sales,
+            nombre_transactions=nombre_transactions,
         )
 
         return store_details
@@ -107,24 +212,24 @@ class StoreService:
         if not store:
             return None
 
-        # Calculer les statistiques
-        sales_stats = (
-            self.db.query(
-                func.count(models.Sale.id).label("nombre_transactions"),
-                func.coalesce(func.sum(models.Sale.total), 0).label("total_ventes"),
-                func.coalesce(func.avg(models.Sale.total), 0).label("panier_moyen"),
-                func.max(models.Sale.date_vente).label("derniere_vente"),
-            )
+        # Statistiques lues dans les agrégats journaliers
+        nombre_transactions, total_ventes = SalesRollupService(self.db).totals(
+            store_id=store_id
+        )
+        derniere_vente = (
+            self.db.query(func.max(models.Sale.date_vente))
             .filter(models.Sale.store_id == store_id)
-            .first()
+            .scalar()
         )
 
         return schemas.StorePerformance(
             store=store,
-            total_ventes=sales_stats.total_ventes or 0.0,
-            nombre_transactions=sales_stats.nombre_transactions or 0,
-            panier_moyen=sales_stats.panier_moyen or 0.0,
-            derniere_vente=sales_stats.derniere_vente,
+            total_ventes=total_ventes,
+            nombre_transactions=nombre_transactions,
+            panier_moyen=(
+                total_ventes / nombre_transactions if nombre_transactions else 0.0
+            ),
+            derniere_vente=derniere_vente,
         )
 
 
@@ -200,75 +305,339 @@ class SaleService:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_sales(
+    def _filter_sales(
         self,
+        query,
         store_id: Optional[int] = None,
         cash_register_id: Optional[int] = None,
-        date_debut: Optional[str] = None,
-        date_fin: Optional[str] = None,
-    ) -> List[models.Sale]:
-        """Récupérer la liste des ventes avec filtres"""
-        query = self.db.query(models.Sale)
-
+        date_debut: Optional[DateBound] = None,
+        date_fin: Optional[DateBound] = None,
+        after: Optional[str] = None,
+    ):
         if store_id is not None:
             query = query.filter(models.Sale.store_id == store_id)
 
         if cash_register_id is not None:
             query = query.filter(models.Sale.cash_register_id == cash_register_id)
 
-        if date_debut:
-            query = query.filter(models.Sale.date_vente >= date_debut)
+        query = query.filter(*sale_date_range(date_debut, date_fin))
+
+        if after:
+            # Pagination par clé : (date_vente, id) strictement avant le curseur
+            after_date, after_id = decode_sale_cursor(after)
+            query = query.filter(
+                or_(
+                    models.Sale.date_vente < after_date,
+                    and_(
+                        models.Sale.date_vente == after_date, models.Sale.id < after_id
+                    ),
+                )
+            )
 
-        if date_fin:
-            query = query.filter(models.Sale.date_vente <= date_fin)
+        return query.order_by(desc(models.Sale.date_vente), desc(models.Sale.id))
 
-        return query.order_by(desc(models.Sale.date_vente)).all()
+    def get_sales(
+        self,
+        store_id: Optional[int] = None,
+        cash_register_id: Optional[int] = None,
+        date_debut: Optional[DateBound] = None,
+        date_fin: Optional[DateBound] = None,
+        limit: int = 100,
+        after: Optional[str] = None,
+    ) -> Tuple[List[models.Sale], Optional[str]]:
+        """Récupérer une page de ventes (lignes, magasin et caisse préchargés).
+
+        Retourne les ventes et le curseur de la page suivante (None si fin).
+        """
+        query = self._filter_sales(
+            self.db.query(models.Sale).options(
+                selectinload(models.Sale.sale_lines),
+                selectinload(models.Sale.store),
+                selectinload(models.Sale.cash_register).selectinload(
+                    models.CashRegister.store
+                ),
+            ),
+            store_id,
+            cash_register_id,
+            date_debut,
+            date_fin,
+            after,
+        )
+        sales = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(sales) > limit:
+            last = sales[limit - 1]
+            next_cursor = encode_sale_cursor(last.date_vente, last.id)
+        return sales[:limit], next_cursor
+
+    def get_sales_projection(
+        self,
+        fields: Sequence[str],
+        limit: int = 100,
+        after: Optional[str] = None,
+        **filters: Any,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Page de ventes projetées sur ``fields`` (sans chargement des lignes
+        si ``sale_lines`` n'est pas demandé) et curseur de la page suivante."""
+        keys = [k for k in ("id", "date_vente") if k not in fields]
+        items = list(
+            self.iter_sales([*fields, *keys], limit=limit + 1, after=after, **filters)
+        )
+        next_cursor = None
+        if len(items) > limit:
+            last = items[limit - 1]
+            next_cursor = encode_sale_cursor(last["date_vente"], last["id"])
+        items = items[:limit]
+        for item in items:
+            for key in keys:
+                del item[key]
+        return items, next_cursor
+
+    def iter_sales(
+        self,
+        fields: Sequence[str],
+        store_id: Optional[int] = None,
+        cash_register_id: Optional[int] = None,
+        date_debut: Optional[DateBound] = None,
+        date_fin: Optional[DateBound] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[Dict[str, Any]]:
+        """Parcourir les ventes projetées sur ``fields``, à mémoire bornée.
+
+        Lecture des colonnes via ``yield_per`` (curseur serveur sur PostgreSQL) ;
+        les lignes sont chargées par lot avec un seul ``IN`` par lot de ventes.
+        """
+        with_lines = "sale_lines" in fields
+        sale_fields = [f for f in fields if f != "sale_lines"]
+        # id et date_vente sont nécessaires au chargement des lignes et au tri
+        columns = list(dict.fromkeys(["id", "date_vente", *sale_fields]))
+        query = self._filter_sales(
+            self.db.query(*(getattr(models.Sale, c) for c in columns)),
+            store_id,
+            cash_register_id,
+            date_debut,
+            date_fin,
+            after,
+        )
+        if limit is not None:
+            query = query.limit(limit)
+
+        batch: List[Dict[str, Any]] = []
+        for row in query.yield_per(batch_size):
+            batch.append(row._asdict())
+            if len(batch) >= batch_size:
+                yield from self._project_batch(batch, sale_fields, with_lines)
+                batch = []
+        if batch:
+            yield from self._project_batch(batch, sale_fields, with_lines)
+
+    def _project_batch(
+        self, batch: List[Dict[str, Any]], sale_fields: List[str], with_lines: bool
+    ) -> Iterator[Dict[str, Any]]:
+        lines_by_sale: Dict[int, List[Dict[str, Any]]] = {}
+        if with_lines:
+            lines = (
+                self.db.query(*(getattr(models.SaleLine, c) for c in SALE_LINE_FIELDS))
+                .filter(models.SaleLine.sale_id.in_([row["id"] for row in batch]))
+                .order_by(models.SaleLine.id)
+            )
+            for line in lines:
+                lines_by_sale.setdefault(line.sale_id, []).append(line._asdict())
 
-    async def create_sale(self, sale: schemas.SaleCreate) -> models.Sale:
-        """Créer une nouvelle vente"""
-        # Extraire les lignes de vente
+        for row in batch:
+            item = {field: row[field] for field in sale_fields}
+            if with_lines:
+                item["sale_lines"] = lines_by_sale.get(row["id"], [])
+            yield item
+
+    def create_sale(self, sale: schemas.SaleCreate) -> models.Sale:
+        """Créer une vente et ses lignes en une seule transaction.
+
+        Les lignes partent en un INSERT groupé (RETURNING des ids) au flush.
+        Le décrément de stock est inscrit dans l'outbox de la même transaction
+        et transmis à inventory-api hors du chemin de requête.
+        """
         sale_data = sale.dict()
         lines = sale_data.pop("lines", [])
-
-        # Calculer le total
         total = sum(line["quantite"] * line["prix_unitaire"] for line in lines)
 
-        # Créer la vente
         db_sale = models.Sale(**sale_data, total=total)
-        self.db.add(db_sale)
-        self.db.commit()
-        self.db.refresh(db_sale)
-
-        # Créer les lignes de vente
-        for line in lines:
-            db_line = models.SaleLine(
-                sale_id=db_sale.id,
+        db_sale.sale_lines = [
+            models.SaleLine(
                 product_id=line["product_id"],
                 quantite=line["quantite"],
                 prix_unitaire=line["prix_unitaire"],
                 sous_total=line["quantite"] * line["prix_unitaire"],
             )
-            self.db.add(db_line)
+            for line in lines
+        ]
+        self.db.add(db_sale)
+        self.db.flush()
 
+        if lines:
+            enqueue_stock_decrement(self.db, stock_reference(db_sale.id), lines)
+        SalesRollupService(self.db).record_sales([db_sale])
+        record_sale_events(self.db, SALE_CREATED, [sale_event_data(db_sale)])
         self.db.commit()
-        self.db.refresh(db_sale)
-
-        # Mettre à jour le stock via inventory-api
-        try:
-            for line in lines:
-                await InventoryService.reduce_stock(
-                    line["product_id"],
-                    line["quantite"],
-                    "vente_retail",
-                    f"sale_{db_sale.id}",
-                )
-            logger.info(f"✅ Stock updated for sale {db_sale.id}")
-        except Exception as e:
-            logger.error(f"❌ Error updating stock for sale {db_sale.id}: {e}")
 
         logger.info(f"✅ Sale created: {db_sale.id} with {len(lines)} lines")
         return db_sale
 
+    def create_sales_batch(
+        self, batch: schemas.SaleBatchCreate
+    ) -> schemas.SaleBatchResult:
+        """Importer un lot de ventes hors ligne en une transaction.
+
+        Les ventes dont la clé d'idempotence existe déjà sont ignorées (rejeu).
+        Ventes et lignes sont insérées par INSERT groupés, et un seul décrément
+        de stock agrégé par produit est inscrit dans l'outbox pour tout le lot.
+        """
+        items: Dict[str, schemas.SaleBatchItem] = {}
+        for item in batch.sales:
+            items.setdefault(item.idempotency_key, item)
+
+        sale_ids = self._sale_ids_by_key(list(items))
+        new_items = [item for key, item in items.items() if key not in sale_ids]
+
+        created: Dict[str, int] = {}
+        now = datetime.utcnow()
+        sale_rows = [
+            {
+                "store_id": item.store_id,
+                "cash_register_id": item.cash_register_id,
+                "notes": item.notes,
+                "statut": item.statut,
+                "idempotency_key": item.idempotency_key,
+                "date_vente": (
+                    _as_naive_utc(item.date_vente) if item.date_vente else now
+                ),
+                "total": sum(line.quantite * line.prix_unitaire for line in item.lines),
+            }
+            for item in new_items
+        ]
+        insert_sales = self._insert_ignore_duplicates(models.Sale.__table__).returning(
+            models.Sale.__table__.c.id, models.Sale.__table__.c.idempotency_key
+        )
+        for chunk in _chunks(sale_rows):
+            for sale_id, key in self.db.execute(insert_sales, list(chunk)):
+                created[key] = sale_id
+
+        # Clés insérées entre-temps par un rejeu concurrent : doublons
+        racing = [
+            item.idempotency_key
+            for item in new_items
+            if item.idempotency_key not in created
+        ]
+        if racing:
+            sale_ids.update(self._sale_ids_by_key(racing))
+
+        line_rows = [
+            {
+                "sale_id": created[item.idempotency_key],
+                "product_id": line.product_id,
+                "quantite": line.quantite,
+                "prix_unitaire": line.prix_unitaire,
+                "sous_total": line.quantite * line.prix_unitaire,
+            }
+            for item in new_items
+            if item.idempotency_key in created
+            for line in item.lines
+        ]
+        for chunk in _chunks(line_rows):
+            self.db.execute(models.SaleLine.__table__.insert(), list(chunk))
+
+        reference = None
+        if line_rows:
+            reference = f"pos_batch_{uuid.uuid4().hex}"
+            enqueue_stock_decrement(self.db, reference, line_rows)
+        created_rows = [row for row in sale_rows if row["idempotency_key"] in created]
+        SalesRollupService(self.db).record_sales(created_rows)
+        self._record_batch_events(created_rows, created, line_rows)
+        self.db.commit()
+
+        results = []
+        for item in batch.sales:
+            key = item.idempotency_key
+            # Seule la première occurrence d'une clé dans le lot est créée
+            is_created = key in created and items.get(key) is item
+            results.append(
+                schemas.SaleBatchItemResult(
+                    idempotency_key=key,
+                    sale_id=created.get(key, sale_ids.get(key)),
+                    statut="cree" if is_created else "doublon",
+                )
+            )
+        logger.info(
+            f"✅ Sales batch: {len(created)} created, "
+            f"{len(batch.sales) - len(created)} duplicates"
+        )
+        return schemas.SaleBatchResult(
+            received=len(batch.sales),
+            created=len(created),
+            duplicates=len(batch.sales) - len(created),
+            stock_reference=reference,
+            results=results,
+        )
+
+    def _record_batch_events(
+        self,
+        sale_rows: List[Dict[str, Any]],
+        created: Dict[str, int],
+        line_rows: List[Dict[str, Any]],
+    ) -> None:
+        lines_by_sale: Dict[int, List[Dict[str, Any]]] = {}
+        for line in line_rows:
+            lines_by_sale.setdefault(line["sale_id"], []).append(
+                {
+                    "product_id": line["product_id"],
+                    "quantite": line["quantite"],
+                    "sous_total": line["sous_total"],
+                }
+            )
+        record_sale_events(
+            self.db,
+            SALE_CREATED,
+            (
+                {
+                    "sale_id": created[row["idempotency_key"]],
+                    "store_id": row["store_id"],
+                    "cash_register_id": row["cash_register_id"],
+                    "date_vente": row["date_vente"].isoformat(),
+                    "total": row["total"],
+                    "statut": row["statut"],
+                    "lines": lines_by_sale.get(created[row["idempotency_key"]], []),
+                }
+                for row in sale_rows
+            ),
+        )
+
+    def _record_status_change(self, db_sale: models.Sale, previous_statut: str):
+        """Répercuter une annulation (ou son retrait) sur les agrégats et le bus"""
+        SalesRollupService(self.db).record_status_change(db_sale, previous_statut)
+        was_counted = counts_in_rollup(previous_statut)
+        if was_counted != counts_in_rollup(db_sale.statut):
+            record_sale_events(
+                self.db,
+                SALE_CANCELLED if was_counted else SALE_RESTORED,
+                [sale_event_data(db_sale)],
+            )
+
+    def _sale_ids_by_key(self, keys: List[str]) -> Dict[str, int]:
+        sale_ids: Dict[str, int] = {}
+        for chunk in _chunks(keys):
+            rows = self.db.query(models.Sale.idempotency_key, models.Sale.id).filter(
+                models.Sale.idempotency_key.in_(chunk)
+            )
+            sale_ids.update(dict(rows.all()))
+        return sale_ids
+
+    def _insert_ignore_duplicates(self, table):
+        dialect = self.db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        return insert(table).on_conflict_do_nothing(index_elements=["idempotency_key"])
+
     def get_sale(self, sale_id: int) -> Optional[models.Sale]:
         """Récupérer une vente par son ID"""
         return self.db.query(models.Sale).filter(models.Sale.id == sale_id).first()
@@ -281,10 +650,12 @@ class SaleService:
         if not db_sale:
             return None
 
+        previous_statut = db_sale.statut
         update_data = sale_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_sale, field, value)
 
+        self._record_status_change(db_sale, previous_statut)
         self.db.commit()
         self.db.refresh(db_sale)
         logger.info(f"✅ Sale updated: {db_sale.id}")
@@ -296,7 +667,9 @@ class SaleService:
         if not db_sale:
             return False
 
+        previous_statut = db_sale.statut
         db_sale.statut = "annulee"
+        self._record_status_change(db_sale, previous_statut)
         self.db.commit()
         logger.info(f"✅ Sale cancelled: {db_sale.id}")
         return True
@@ -312,30 +685,94 @@ class SaleService:
     def get_sales_summary(
         self,
         store_id: Optional[int] = None,
-        date_debut: Optional[str] = None,
-        date_fin: Optional[str] = None,
-    ) -> schemas.RetailSummary:
-        """Obtenir un résumé des ventes"""
-        query = self.db.query(models.Sale)
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None,
+    ) -> schemas.SalesSummary:
+        """Obtenir un résumé des ventes (jours inclus, depuis les agrégats)"""
+        nombre_ventes, total_ventes = SalesRollupService(self.db).totals(
+            store_id=store_id,
+            day_from=date_debut,
+            day_to=date_fin,
+        )
 
-        if store_id is not None:
-            query = query.filter(models.Sale.store_id == store_id)
+        return schemas.SalesSummary(
+            nombre_ventes=nombre_ventes,
+            total_ventes=total_ventes,
+            panier_moyen=total_ventes / nombre_ventes if nombre_ventes else 0.0,
+        )
 
-        if date_debut:
-            query = query.filter(models.Sale.date_vente >= date_debut)
+    def get_sales_by_store(
+        self,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> List[schemas.SalesByStore]:
+        """Ventes par magasin (agrégats journaliers), meilleur CA en premier"""
+        return [
+            schemas.SalesByStore(
+                store_id=store_id,
+                nombre_ventes=count,
+                total_ventes=total,
+                panier_moyen=total / count if count else 0.0,
+            )
+            for store_id, count, total in SalesRollupService(self.db).by_store(
+                date_debut, date_fin, limit
+            )
+        ]
 
-        if date_fin:
-            query = query.filter(models.Sale.date_vente <= date_fin)
+    def get_sales_by_date(
+        self,
+        store_id: Optional[int] = None,
+        date_debut: Optional[date] = None,
+        date_fin: Optional[date] = None,
+    ) -> List[schemas.SalesByDate]:
+        """Ventes par jour (agrégats journaliers), ordre chronologique"""
+        return [
+            schemas.SalesByDate(jour=day, nombre_ventes=count, total_ventes=total)
+            for day, count, total in SalesRollupService(self.db).by_day(
+                store_id, date_debut, date_fin
+            )
+        ]
 
-        # Calculer les statistiques
-        stats = query.with_entities(
-            func.count(models.Sale.id).label("nombre_ventes"),
-            func.coalesce(func.sum(models.Sale.total), 0).label("total_ventes"),
-            func.coalesce(func.avg(models.Sale.total), 0).label("panier_moyen"),
-        ).first()
+    def get_sales_by_product(
+        self,
+        store_id: Optional[int] = None,
+        date_debut: Optional[DateBound] = None,
+        date_fin: Optional[DateBound] = None,
+        limit: int = 10,
+        order_by: str = "total",
+    ) -> List[schemas.SalesByProduct]:
+        """Top N des produits vendus (GROUP BY sur les lignes), par CA ou quantité"""
+        quantite = func.sum(models.SaleLine.quantite)
+        total = func.sum(models.SaleLine.sous_total)
+        query = (
+            self.db.query(
+                models.SaleLine.product_id,
+                quantite,
+                total,
+                func.count(func.distinct(models.SaleLine.sale_id)),
+            )
+            .join(models.Sale, models.Sale.id == models.SaleLine.sale_id)
+            .filter(
+                models.Sale.statut != CANCELLED_STATUS,
+                *sale_date_range(date_debut, date_fin),
+            )
+        )
+        if store_id is not None:
+            query = query.filter(models.Sale.store_id == store_id)
 
-        return schemas.RetailSummary(
-            nombre_ventes=stats.nombre_ventes or 0,
-            total_ventes=float(stats.total_ventes or 0),
-            panier_moyen=float(stats.panier_moyen or 0),
+        order = quantite if order_by == "quantite" else total
+        query = (
+            query.group_by(models.SaleLine.product_id)
+            .order_by(order.desc(), models.SaleLine.product_id)
+            .limit(limit)
         )
+        return [
+            schemas.SalesByProduct(
+                product_id=product_id,
+                quantite_vendue=int(qty or 0),
+                total_ventes=float(amount or 0.0),
+                nombre_ventes=count,
+            )
+            for product_id, qty, amount, count in query
+        ]
@@ -0,0 +1,150 @@
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+import src.models as models
+from src.database import SessionLocal
+from src.external_services import InventoryService
+
+logger = logging.getLogger(__name__)
+
+
+def aggregate_stock_items(lines: List[Dict]) -> List[Dict[str, int]]:
+    """Agréger les quantités par produit (un seul décrément par produit)"""
+    quantities: Dict[int, int] = {}
+    for line in lines:
+        quantities[line["product_id"]] = (
+            quantities.get(line["product_id"], 0) + line["quantite"]
+        )
+    return [
+        {"product_id": product_id, "quantite": quantite}
+        for product_id, quantite in sorted(quantities.items())
+    ]
+
+
+def enqueue_stock_decrement(
+    db: Session, reference: str, lines: List[Dict]
+) -> models.StockSyncOutbox:
+    """Inscrire un décrément de stock dans l'outbox (sans commit)"""
+    entry = models.StockSyncOutbox(
+        reference=reference, payload=json.dumps(aggregate_stock_items(lines))
+    )
+    db.add(entry)
+    return entry
+
+
+class StockSyncRelay:
+    """Transmet les décréments en attente à inventory-api.
+
+    Chaque entrée est envoyée en un seul appel groupé ; un échec laisse
+    l'entrée en attente pour le passage suivant (l'appel est idempotent).
+    Les entrées transmises sont purgées après une période de rétention
+    (``purge_sent``).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], batch_size: int = 50):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+    async def send(self, reference: str, payload: str) -> Optional[str]:
+        """Envoyer un décrément ; retourne l'erreur éventuelle"""
+        try:
+            await InventoryService.reduce_stock_bulk(reference, json.loads(payload))
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Stock sync failed for {reference}: {e}")
+            return str(e) or type(e).__name__
+
+    async def deliver(self, reference: str) -> bool:
+        """Envoyer immédiatement une entrée (appelé après la réponse HTTP).
+
+        Ne lève jamais : en cas d'échec, le relais périodique reprendra l'entrée.
+        """
+        try:
+            return await self._deliver(reference)
+        except Exception as e:
+            logger.warning(f"⚠️ Immediate stock sync failed for {reference}: {e}")
+            return False
+
+    async def _deliver(self, reference: str) -> bool:
+        db = self.session_factory()
+        try:
+            entry = (
+                db.query(models.StockSyncOutbox)
+                .filter(models.StockSyncOutbox.reference == reference)
+                .first()
+            )
+            if entry is None or entry.date_envoi is not None:
+                return True
+            entry_id, payload = entry.id, entry.payload
+            db.rollback()  # Pas de transaction ouverte pendant l'appel réseau
+
+            error = await self.send(reference, payload)
+            self._record(db, entry_id, error)
+            return error is None
+        finally:
+            db.close()
+
+    async def relay_pending(self) -> int:
+        """Rejouer les entrées en attente. Retourne le nombre envoyées."""
+        db = self.session_factory()
+        sent_count = 0
+        try:
+            pending = (
+                db.query(
+                    models.StockSyncOutbox.id,
+                    models.StockSyncOutbox.reference,
+                    models.StockSyncOutbox.payload,
+                )
+                .filter(models.StockSyncOutbox.date_envoi.is_(None))
+                .order_by(models.StockSyncOutbox.id)
+                .limit(self.batch_size)
+                .all()
+            )
+            db.rollback()
+
+            for entry_id, reference, payload in pending:
+                error = await self.send(reference, payload)
+                self._record(db, entry_id, error)
+                sent_count += int(error is None)
+        finally:
+            db.close()
+
+        if sent_count:
+            logger.info(f"📦 Stock sync: {sent_count} decrements delivered")
+        return sent_count
+
+    @staticmethod
+    def purge_sent(db: Session, older_than: datetime) -> int:
+        """Supprimer les entrées transmises avant ``older_than``"""
+        deleted = (
+            db.query(models.StockSyncOutbox)
+            .filter(
+                models.StockSyncOutbox.date_envoi.isnot(None),
+                models.StockSyncOutbox.date_envoi < older_than,
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def _record(db: Session, entry_id: int, error: Optional[str]) -> None:
+        values = {
+            "tentatives": models.StockSyncOutbox.tentatives + 1,
+            "derniere_erreur": error,
+        }
+        if error is None:
+            values["date_envoi"] = datetime.utcnow()
+        db.query(models.StockSyncOutbox).filter(
+            models.StockSyncOutbox.id == entry_id,
+            models.StockSyncOutbox.date_envoi.is_(None),
+        ).update(values, synchronize_session=False)
+        db.commit()
+
+
+# Instance partagée par l'API (envoi immédiat) et la boucle de relais
+stock_sync_relay = StockSyncRelay(SessionLocal)
@@ -8,6 +8,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
 # Override database configuration before importing app
 os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["TESTING"] = "1"
 
 from main import app
 from src.database import get_db, engine
@@ -22,3 +23,56 @@ def client():
     """Create a test client."""
     with TestClient(app) as test_client:
         yield test_client
+
+
+# Base isolée (une seule connexion partagée) pour les tests qui touchent la DB
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+test_engine = create_engine(
+    "sqlite:///:memory:",
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture
+def db_session():
+    """Create a new database session for a test."""
+    Base.metadata.create_all(bind=test_engine)
+    session = TestingSessionLocal()
+
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=test_engine)
+
+
+@pytest.fixture
+def db_client(db_session):
+    """Create a test client bound to the isolated test database."""
+
+    def override_get_db():
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def store(db_session):
+    """Un magasin avec deux caisses"""
+    from src.models import CashRegister, Store
+
+    store = Store(nom="Magasin Test")
+    store.cash_registers = [
+        CashRegister(numero=1, nom="Caisse 1"),
+        CashRegister(numero=2, nom="Caisse 2"),
+    ]
+    db_session.add(store)
+    db_session.commit()
+    return store
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import status
+
+from src.columnar_export import (
+    MAGIC,
+    ColumnarFile,
+    export_sales,
+    iter_sales_export,
+    revenue_by_store,
+)
+from src.models import Sale, SaleLine
+
+
+@pytest.fixture
+def sales(db_session, store):
+    register = store.cash_registers[0]
+    start = datetime(2024, 3, 1, 9, 0)
+    created = []
+    for index in range(5):
+        sale = Sale(
+            store_id=store.id,
+            cash_register_id=register.id,
+            date_vente=start + timedelta(days=index),
+            total=10.0 * (index + 1),
+            statut="annulee" if index == 1 else "terminee",
+        )
+        sale.sale_lines = [
+            SaleLine(
+                product_id=product_id,
+                quantite=index + 1,
+                prix_unitaire=5.0,
+                sous_total=5.0 * (index + 1),
+            )
+            for product_id in (1, 2)
+        ]
+        created.append(sale)
+    db_session.add_all(created)
+    db_session.commit()
+    return created
+
+
+class TestColumnarExport:
+    def test_round_trip_through_mmap(self, db_session, sales, tmp_path):
+        path = tmp_path / "ventes.rtcol"
+        rows = export_sales(
+            db_session,
+            str(path),
+            date_debut=date(2024, 3, 2),
+            date_fin=date(2024, 3, 4),
+        )
+        assert rows == {"sales": 3, "sale_lines": 6}
+
+        with ColumnarFile(str(path)) as exported:
+            assert exported.metadata["date_fin"] == "2024-03-04"
+            ids = [list(view) for view in exported.column("sales", "id")]
+            assert ids == [[sale.id for sale in sales[1:4]]]
+            assert exported.sum("sale_lines", "quantite") == 2 * (2 + 3 + 4)
+            assert exported.group_sum("sale_lines", "product_id", "sous_total") == {
+                1: (3, 45.0),
+                2: (3, 45.0),
+            }
+            # Les annulées sont exportées mais exclues du chiffre d'affaires
+            assert exported.dictionary("sales", "statut") == ["annulee", "terminee"]
+            assert revenue_by_store(exported) == {sales[0].store_id: (2, 70.0)}
+
+            (chunk,) = exported.chunks("sales", ["date_vente"])
+            first = datetime(1970, 1, 1) + timedelta(
+                microseconds=chunk["date_vente"][0]
+            )
+            assert first == sales[1].date_vente
+            del chunk
+
+    def test_columns_are_written_in_chunks(self, db_session, sales, tmp_path):
+        path = tmp_path / "ventes.rtcol"
+        path.write_bytes(b"".join(iter_sales_export(db_session, chunk_rows=2)))
+
+        with ColumnarFile(str(path)) as exported:
+            sizes = [len(view) for view in exported.column("sales", "total")]
+            assert sizes == [2, 2, 1]
+            assert exported.sum("sales", "total") == 150.0
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "ventes.json"
+        path.write_bytes(b'{"sales": []}' * 4)
+        with pytest.raises(ValueError):
+            ColumnarFile(str(path))
+
+    def test_export_endpoint_streams_file(self, db_client, sales, tmp_path):
+        response = db_client.get(
+            "/api/v1/sales/export", params={"date_debut": "2024-03-01"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "attachment" in response.headers["content-disposition"]
+        assert response.content.startswith(MAGIC)
+        path = tmp_path / "export.rtcol"
+        path.write_bytes(response.content)
+        with ColumnarFile(str(path)) as exported:
+            assert exported.num_rows("sales") == 5
+            assert exported.num_rows("sale_lines") == 10
@@ -0,0 +1,128 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+
+import src.stock_sync as stock_sync
+from src.external_services import ExternalServiceError
+from src.models import Sale, StockSyncOutbox
+
+
+@pytest.fixture
+def inventory_calls(monkeypatch):
+    calls = []
+
+    async def reduce_stock_bulk(reference, items, reason="vente_retail"):
+        calls.append((reference, items))
+        return {"reference": reference, "applied": items}
+
+    monkeypatch.setattr(
+        stock_sync.InventoryService, "reduce_stock_bulk", reduce_stock_bulk
+    )
+    return calls
+
+
+def sale_payload(store, lines):
+    return {
+        "store_id": store.id,
+        "cash_register_id": store.cash_registers[0].id,
+        "lines": lines,
+    }
+
+
+class TestSaleCreation:
+    def test_sale_and_lines_committed_with_stock_outbox(
+        self, db_client, db_session, store, inventory_calls
+    ):
+        lines = [
+            {"product_id": 1, "quantite": 2, "prix_unitaire": 5.0},
+            {"product_id": 2, "quantite": 1, "prix_unitaire": 3.5},
+            {"product_id": 1, "quantite": 1, "prix_unitaire": 5.0},
+        ]
+        response = db_client.post("/api/v1/sales/", json=sale_payload(store, lines))
+        assert response.status_code == status.HTTP_201_CREATED
+        sale = response.json()
+        assert sale["total"] == 18.5
+        assert [line["sous_total"] for line in sale["sale_lines"]] == [10.0, 3.5, 5.0]
+
+        entry = db_session.query(StockSyncOutbox).one()
+        assert entry.reference == f"sale_{sale['id']}"
+        # Un seul décrément par produit
+        assert json.loads(entry.payload) == [
+            {"product_id": 1, "quantite": 3},
+            {"product_id": 2, "quantite": 1},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_relay_delivers_pending_decrements_once(
+        self, db_session, store, inventory_calls
+    ):
+        db_session.add_all(
+            [
+                StockSyncOutbox(
+                    reference="sale_1", payload='[{"product_id": 1, "quantite": 2}]'
+                ),
+                StockSyncOutbox(
+                    reference="sale_2", payload='[{"product_id": 3, "quantite": 1}]'
+                ),
+            ]
+        )
+        db_session.commit()
+        relay = stock_sync.StockSyncRelay(sessionmaker(bind=db_session.get_bind()))
+
+        assert await relay.deliver("sale_1") is True
+        assert await relay.relay_pending() == 1
+        assert await relay.relay_pending() == 0
+        assert [reference for reference, _ in inventory_calls] == ["sale_1", "sale_2"]
+
+        db_session.expire_all()
+        assert all(entry.date_envoi for entry in db_session.query(StockSyncOutbox))
+
+    @pytest.mark.asyncio
+    async def test_relay_keeps_failed_entries_pending(self, db_session, monkeypatch):
+        async def unavailable(reference, items, reason="vente_retail"):
+            raise ExternalServiceError("inventory down")
+
+        monkeypatch.setattr(
+            stock_sync.InventoryService, "reduce_stock_bulk", unavailable
+        )
+        db_session.add(StockSyncOutbox(reference="sale_9", payload="[]"))
+        db_session.commit()
+
+        relay = stock_sync.StockSyncRelay(sessionmaker(bind=db_session.get_bind()))
+        assert await relay.relay_pending() == 0
+
+        db_session.expire_all()
+        entry = db_session.query(StockSyncOutbox).one()
+        assert entry.date_envoi is None
+        assert entry.tentatives == 1
+        assert entry.derniere_erreur == "inventory down"
+
+    def test_purge_removes_only_old_delivered_entries(self, db_session):
+        now = datetime.utcnow()
+        db_session.add_all(
+            [
+                StockSyncOutbox(
+                    reference="sale_old",
+                    payload="[]",
+                    date_envoi=now - timedelta(days=2),
+                ),
+                StockSyncOutbox(reference="sale_recent", payload="[]", date_envoi=now),
+                StockSyncOutbox(reference="sale_pending", payload="[]"),
+            ]
+        )
+        db_session.commit()
+
+        purged = stock_sync.StockSyncRelay.purge_sent(
+            db_session, now - timedelta(hours=24)
+        )
+
+        assert purged == 1
+        assert sorted(
+            entry.reference for entry in db_session.query(StockSyncOutbox)
+        ) == [
+            "sale_pending",
+            "sale_recent",
+        ]
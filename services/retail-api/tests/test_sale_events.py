@@ -0,0 +1,131 @@
+import json
+from unittest.mock import patch
+
+from fastapi import status
+from sqlalchemy.orm import sessionmaker
+
+from src.events import EventPublisher, OutboxRelay
+from src.models import SaleOutboxEvent
+
+
+class RecordingPublisher:
+    enabled = True
+
+    def __init__(self, fail_after=None):
+        self.events = []
+        self.fail_after = fail_after
+
+    def publish(self, event):
+        if self.fail_after is not None and len(self.events) >= self.fail_after:
+            raise ConnectionError("redis down")
+        self.events.append(event)
+        return f"{len(self.events)}-0"
+
+
+class FakeRedis:
+    def __init__(self):
+        self.entries = []
+
+    def ping(self):
+        return True
+
+    def xadd(self, stream, fields, **kwargs):
+        self.entries.append((stream, fields))
+        return f"{len(self.entries)}-0"
+
+
+def outbox(db_session):
+    db_session.expire_all()
+    return db_session.query(SaleOutboxEvent).order_by(SaleOutboxEvent.id).all()
+
+
+def sale_payload(store, quantite=2, prix_unitaire=3.0):
+    return {
+        "store_id": store.id,
+        "cash_register_id": store.cash_registers[0].id,
+        "lines": [
+            {"product_id": 5, "quantite": quantite, "prix_unitaire": prix_unitaire}
+        ],
+    }
+
+
+class TestSaleEvents:
+    def test_create_and_cancel_are_recorded_in_outbox(
+        self, db_client, db_session, store
+    ):
+        sale_id = db_client.post("/api/v1/sales/", json=sale_payload(store)).json()[
+            "id"
+        ]
+        response = db_client.delete(f"/api/v1/sales/{sale_id}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        # Une deuxième annulation ne change rien : pas de nouvel événement
+        db_client.delete(f"/api/v1/sales/{sale_id}")
+
+        events = [json.loads(row.payload) for row in outbox(db_session)]
+        assert [e["event_type"] for e in events] == ["SaleCreated", "SaleCancelled"]
+        created = events[0]
+        assert created["aggregate_id"] == str(sale_id)
+        assert created["data"]["total"] == 6.0
+        assert created["data"]["lines"] == [
+            {"product_id": 5, "quantite": 2, "sous_total": 6.0}
+        ]
+        assert events[1]["data"]["statut"] == "annulee"
+
+    def test_batch_records_one_event_per_created_sale(
+        self, db_client, db_session, store
+    ):
+        payload = {
+            "sales": [
+                {"idempotency_key": f"evt-{i}", **sale_payload(store, quantite=i + 1)}
+                for i in range(3)
+            ]
+        }
+        db_client.post("/api/v1/sales/batch", json=payload)
+        db_client.post("/api/v1/sales/batch", json=payload)
+
+        events = [json.loads(row.payload) for row in outbox(db_session)]
+        assert len(events) == 3
+        assert sorted(e["data"]["total"] for e in events) == [3.0, 6.0, 9.0]
+        assert all(len(e["data"]["lines"]) == 1 for e in events)
+
+    def test_relay_publishes_in_order_and_stops_on_failure(
+        self, db_client, db_session, store
+    ):
+        for _ in range(3):
+            db_client.post("/api/v1/sales/", json=sale_payload(store))
+
+        publisher = RecordingPublisher(fail_after=2)
+        relay = OutboxRelay(
+            sessionmaker(bind=db_session.get_bind()), publisher, batch_size=10
+        )
+        assert relay.relay_pending() == 2
+        assert [row.date_publication is not None for row in outbox(db_session)] == [
+            True,
+            True,
+            False,
+        ]
+
+        publisher.fail_after = None
+        assert relay.relay_pending() == 1
+        sale_ids = [e["data"]["sale_id"] for e in publisher.events]
+        assert sale_ids == sorted(sale_ids)
+
+    def test_relay_connects_once_redis_is_back(self, db_client, db_session, store):
+        for _ in range(2):
+            db_client.post("/api/v1/sales/", json=sale_payload(store))
+        session_factory = sessionmaker(bind=db_session.get_bind())
+        redis_client = FakeRedis()
+        with patch(
+            "src.events.redis.from_url",
+            side_effect=[ConnectionError("redis down"), redis_client],
+        ):
+            publisher = EventPublisher()
+            relay = OutboxRelay(session_factory, publisher)
+            # Redis absent au démarrage : rien n'est publié, rien n'est perdu
+            assert relay.relay_pending() == 0
+            assert relay.relay_pending() == 2
+
+        assert len(redis_client.entries) == 2
+        assert all(
+            stream == publisher.stream_name for stream, _ in redis_client.entries
+        )
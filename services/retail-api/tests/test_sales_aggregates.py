@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+from fastapi import status
+
+from src.models import CashRegister, Sale, SaleLine, Store
+from src.rollups import SalesRollupService
+
+
+@pytest.fixture
+def sales(db_session, store):
+    other = Store(nom="Magasin Nord", adresse="2 rue du Nord")
+    other.cash_registers = [CashRegister(numero=1, nom="Caisse 1")]
+    db_session.add(other)
+    db_session.flush()
+
+    def add(shop, day, lines, statut="terminee"):
+        sale = Sale(
+            store_id=shop.id,
+            cash_register_id=shop.cash_registers[0].id,
+            date_vente=datetime(2024, 4, day, 15),
+            total=sum(q * p for _, q, p in lines),
+            statut=statut,
+        )
+        sale.sale_lines = [
+            SaleLine(product_id=pid, quantite=q, prix_unitaire=p, sous_total=q * p)
+            for pid, q, p in lines
+        ]
+        db_session.add(sale)
+
+    add(store, 1, [(1, 2, 10.0), (2, 1, 5.0)])
+    add(store, 2, [(1, 1, 10.0)])
+    add(other, 2, [(2, 10, 5.0)])
+    add(other, 3, [(3, 1, 99.0)], statut="annulee")
+    db_session.commit()
+    SalesRollupService(db_session).rebuild()
+    return store, other
+
+
+class TestSalesAggregates:
+    def test_by_store_orders_by_revenue_and_honours_limit(self, db_client, sales):
+        store, other = sales
+        response = db_client.get("/api/v1/sales/stats/by-store")
+        assert response.status_code == status.HTTP_200_OK
+        assert [
+            (r["store_id"], r["nombre_ventes"], r["total_ventes"])
+            for r in response.json()
+        ] == [
+            (other.id, 1, 50.0),
+            (store.id, 2, 35.0),
+        ]
+
+        response = db_client.get(
+            "/api/v1/sales/stats/by-store",
+            params={"date_debut": "2024-04-01", "date_fin": "2024-04-01", "limit": 1},
+        )
+        assert [r["store_id"] for r in response.json()] == [store.id]
+
+    def test_by_product_top_n_excludes_cancelled_sales(self, db_client, sales):
+        response = db_client.get("/api/v1/sales/stats/by-product")
+        assert [
+            (
+                r["product_id"],
+                r["quantite_vendue"],
+                r["total_ventes"],
+                r["nombre_ventes"],
+            )
+            for r in response.json()
+        ] == [(2, 11, 55.0, 2), (1, 3, 30.0, 2)]
+
+        store, _ = sales
+        response = db_client.get(
+            "/api/v1/sales/stats/by-product",
+            params={"store_id": store.id, "order_by": "quantite", "limit": 1},
+        )
+        assert [r["product_id"] for r in response.json()] == [1]
+
+    def test_by_date_groups_days(self, db_client, sales):
+        response = db_client.get(
+            "/api/v1/sales/stats/by-date", params={"date_debut": "2024-04-02"}
+        )
+        assert response.json() == [
+            {"jour": "2024-04-02", "nombre_ventes": 2, "total_ventes": 60.0}
+        ]
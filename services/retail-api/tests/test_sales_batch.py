@@ -0,0 +1,112 @@
+import json
+
+from fastapi import status
+
+from src.models import Sale, SaleLine, StockSyncOutbox
+
+
+def batch_sale(store, key, lines, **extra):
+    return {
+        "idempotency_key": key,
+        "store_id": store.id,
+        "cash_register_id": store.cash_registers[1].id,
+        "lines": lines,
+        **extra,
+    }
+
+
+class TestSalesBatch:
+    def test_batch_inserts_sales_and_one_aggregated_decrement(
+        self, db_client, db_session, store
+    ):
+        payload = {
+            "sales": [
+                batch_sale(
+                    store,
+                    "pos-2-0001",
+                    [{"product_id": 1, "quantite": 2, "prix_unitaire": 4.0}],
+                    date_vente="2024-05-02T08:15:00+02:00",
+                ),
+                batch_sale(
+                    store,
+                    "pos-2-0002",
+                    [
+                        {"product_id": 1, "quantite": 1, "prix_unitaire": 4.0},
+                        {"product_id": 7, "quantite": 3, "prix_unitaire": 1.5},
+                    ],
+                ),
+            ]
+        }
+        response = db_client.post("/api/v1/sales/batch", json=payload)
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        assert (result["received"], result["created"], result["duplicates"]) == (
+            2,
+            2,
+            0,
+        )
+        assert all(item["statut"] == "cree" for item in result["results"])
+
+        sale = db_session.get(Sale, result["results"][0]["sale_id"])
+        assert sale.total == 8.0
+        # Heure de caisse conservée, normalisée en UTC
+        assert sale.date_vente.isoformat() == "2024-05-02T06:15:00"
+        assert db_session.query(SaleLine).count() == 3
+
+        entry = db_session.query(StockSyncOutbox).one()
+        assert entry.reference == result["stock_reference"]
+        assert json.loads(entry.payload) == [
+            {"product_id": 1, "quantite": 3},
+            {"product_id": 7, "quantite": 3},
+        ]
+
+    def test_replayed_batch_is_deduplicated(self, db_client, db_session, store):
+        line = [{"product_id": 1, "quantite": 1, "prix_unitaire": 2.0}]
+        first = db_client.post(
+            "/api/v1/sales/batch",
+            json={"sales": [batch_sale(store, "pos-2-0100", line)]},
+        ).json()
+
+        replay = db_client.post(
+            "/api/v1/sales/batch",
+            json={
+                "sales": [
+                    batch_sale(store, "pos-2-0100", line),
+                    batch_sale(store, "pos-2-0101", line),
+                    batch_sale(store, "pos-2-0101", line),
+                ]
+            },
+        ).json()
+
+        assert replay["created"] == 1
+        assert replay["duplicates"] == 2
+        assert [item["statut"] for item in replay["results"]] == [
+            "doublon",
+            "cree",
+            "doublon",
+        ]
+        assert replay["results"][0]["sale_id"] == first["results"][0]["sale_id"]
+        assert db_session.query(Sale).count() == 2
+        # Chaque lot ne décrémente que les ventes nouvellement créées
+        payloads = [
+            json.loads(entry.payload) for entry in db_session.query(StockSyncOutbox)
+        ]
+        assert payloads == [
+            [{"product_id": 1, "quantite": 1}],
+            [{"product_id": 1, "quantite": 1}],
+        ]
+
+    def test_fully_duplicated_batch_emits_no_decrement(
+        self, db_client, db_session, store
+    ):
+        sale = batch_sale(
+            store,
+            "pos-2-0200",
+            [{"product_id": 1, "quantite": 1, "prix_unitaire": 2.0}],
+        )
+        db_client.post("/api/v1/sales/batch", json={"sales": [sale]})
+        replay = db_client.post("/api/v1/sales/batch", json={"sales": [sale]}).json()
+
+        assert replay["created"] == 0
+        assert replay["stock_reference"] is None
+        assert db_session.query(StockSyncOutbox).count() == 1
@@ -0,0 +1,122 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+
+from src.models import Sale, SaleLine
+
+
+@pytest.fixture
+def sales(db_session, store):
+    register = store.cash_registers[0]
+    start = datetime(2024, 3, 1, 9, 0)
+    created = []
+    for index in range(5):
+        sale = Sale(
+            store_id=store.id,
+            cash_register_id=register.id,
+            date_vente=start + timedelta(hours=index),
+            total=10.0 * (index + 1),
+        )
+        sale.sale_lines = [
+            SaleLine(
+                product_id=index + 1,
+                quantite=1,
+                prix_unitaire=10.0 * (index + 1),
+                sous_total=10.0 * (index + 1),
+            )
+        ]
+        created.append(sale)
+    # Deux ventes à la même seconde pour exercer le départage par id
+    created.append(
+        Sale(
+            store_id=store.id,
+            cash_register_id=register.id,
+            date_vente=start + timedelta(hours=4),
+            total=1.0,
+        )
+    )
+    db_session.add_all(created)
+    db_session.commit()
+    return created
+
+
+class TestSalesListing:
+    def test_keyset_pagination_walks_all_sales_once(self, db_client, sales):
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = db_client.get("/api/v1/sales/", params=params)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(sale["id"] for sale in response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+            assert 'rel="next"' in response.headers["link"]
+            params = {"limit": 2, "after": cursor}
+
+        assert len(seen) == len(sales)
+        assert len(set(seen)) == len(sales)
+        # Plus récentes d'abord, id décroissant à date égale
+        assert seen[:2] == [sales[5].id, sales[4].id]
+
+    def test_full_items_include_lines(self, db_client, sales):
+        response = db_client.get("/api/v1/sales/", params={"limit": 1})
+        sale = db_client.get(
+            "/api/v1/sales/",
+            params={"limit": 1, "after": response.headers["x-next-cursor"]},
+        ).json()[0]
+        assert sale["sale_lines"][0]["product_id"] == 5
+        assert sale["store"]["nom"] == "Magasin Test"
+
+    def test_fields_projection_drops_lines(self, db_client, sales):
+        response = db_client.get(
+            "/api/v1/sales/", params={"fields": "id,total", "limit": 3}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        items = response.json()
+        assert items == [
+            {"id": sales[5].id, "total": 1.0},
+            {"id": sales[4].id, "total": 50.0},
+            {"id": sales[3].id, "total": 40.0},
+        ]
+        assert response.headers["x-next-cursor"]
+
+    def test_unknown_field_or_bad_cursor_is_rejected(self, db_client, sales):
+        response = db_client.get("/api/v1/sales/", params={"fields": "id,secret"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = db_client.get("/api/v1/sales/", params={"after": "not-a-cursor"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_ndjson_streams_every_sale(self, db_client, sales):
+        response = db_client.get(
+            "/api/v1/sales/",
+            params={"format": "ndjson", "fields": "id,store_id,sale_lines"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == len(sales)
+        assert set(rows[0]) == {"id", "store_id", "sale_lines"}
+        assert rows[0]["sale_lines"] == []
+        assert rows[1]["sale_lines"][0]["quantite"] == 1
+
+    def test_date_range_accepts_days_and_datetimes(self, db_client, sales):
+        # Une date seule en borne de fin couvre toute la journée
+        response = db_client.get(
+            "/api/v1/sales/",
+            params={"date_debut": "2024-03-01", "date_fin": "2024-03-01"},
+        )
+        assert len(response.json()) == 6
+
+        # Instant avec fuseau : converti en UTC (12h+01:00 = 11h UTC)
+        response = db_client.get(
+            "/api/v1/sales/",
+            params={"date_debut": "2024-03-01T12:00:00+01:00", "fields": "id"},
+        )
+        assert len(response.json()) == 4
+
+        response = db_client.get("/api/v1/sales/", params={"date_fin": "hier"})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
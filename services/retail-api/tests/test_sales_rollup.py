@@ -0,0 +1,148 @@
+from datetime import date, datetime
+
+from fastapi import status
+
+from src.models import Sale, SalesDailyRollup
+from src.rollups import SalesRollupService
+
+
+def sale_payload(store, register_index=0, quantite=1, prix_unitaire=10.0):
+    return {
+        "store_id": store.id,
+        "cash_register_id": store.cash_registers[register_index].id,
+        "lines": [
+            {"product_id": 1, "quantite": quantite, "prix_unitaire": prix_unitaire}
+        ],
+    }
+
+
+def rollup_rows(db_session):
+    db_session.expire_all()
+    return {
+        (row.cash_register_id, row.day): (row.nombre_ventes, row.total_ventes)
+        for row in db_session.query(SalesDailyRollup).all()
+    }
+
+
+class TestSalesDailyRollup:
+    def test_create_and_cancel_maintain_rollup(self, db_client, db_session, store):
+        first = db_client.post("/api/v1/sales/", json=sale_payload(store, 0, 2, 5.0))
+        db_client.post("/api/v1/sales/", json=sale_payload(store, 0, 1, 4.0))
+        db_client.post("/api/v1/sales/", json=sale_payload(store, 1, 1, 7.0))
+
+        today = datetime.utcnow().date()
+        register_a, register_b = (r.id for r in store.cash_registers)
+        assert rollup_rows(db_session) == {
+            (register_a, today): (2, 14.0),
+            (register_b, today): (1, 7.0),
+        }
+
+        response = db_client.delete(f"/api/v1/sales/{first.json()['id']}")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert rollup_rows(db_session)[(register_a, today)] == (1, 4.0)
+
+        summary = db_client.get(
+            "/api/v1/sales/stats/summary", params={"store_id": store.id}
+        ).json()
+        assert summary == {
+            "nombre_ventes": 2,
+            "total_ventes": 11.0,
+            "panier_moyen": 5.5,
+        }
+
+    def test_batch_sales_rolled_up_by_day(self, db_client, db_session, store):
+        register = store.cash_registers[1]
+        payload = {
+            "sales": [
+                {
+                    "idempotency_key": f"pos-{i}",
+                    "store_id": store.id,
+                    "cash_register_id": register.id,
+                    "date_vente": f"2024-05-0{day}T10:00:00",
+                    "lines": [{"product_id": 1, "quantite": 1, "prix_unitaire": 3.0}],
+                }
+                for i, day in enumerate([1, 1, 2])
+            ]
+        }
+        db_client.post("/api/v1/sales/batch", json=payload)
+        # Rejeu : aucun double comptage
+        db_client.post("/api/v1/sales/batch", json=payload)
+
+        assert rollup_rows(db_session) == {
+            (register.id, date(2024, 5, 1)): (2, 6.0),
+            (register.id, date(2024, 5, 2)): (1, 3.0),
+        }
+        summary = db_client.get(
+            "/api/v1/sales/stats/summary",
+            params={"date_debut": "2024-05-02", "date_fin": "2024-05-02"},
+        ).json()
+        assert summary["nombre_ventes"] == 1
+
+    def test_rebuild_matches_sales_table(self, db_session, store):
+        register = store.cash_registers[0]
+        for day, total, statut in [
+            (1, 10.0, "terminee"),
+            (1, 5.0, "terminee"),
+            (2, 8.0, "annulee"),
+            (3, 2.5, "terminee"),
+        ]:
+            db_session.add(
+                Sale(
+                    store_id=store.id,
+                    cash_register_id=register.id,
+                    date_vente=datetime(2024, 6, day, 12),
+                    total=total,
+                    statut=statut,
+                )
+            )
+        db_session.commit()
+
+        SalesRollupService(db_session).rebuild()
+        assert rollup_rows(db_session) == {
+            (register.id, date(2024, 6, 1)): (2, 15.0),
+            (register.id, date(2024, 6, 3)): (1, 2.5),
+        }
+
+        # Reconstruction partielle : les autres jours restent intacts
+        SalesRollupService(db_session).rebuild(date(2024, 6, 3), date(2024, 6, 3))
+        assert len(rollup_rows(db_session)) == 2
+
+    def test_ensure_built_backfills_an_existing_database(
+        self, db_session, db_client, store
+    ):
+        register = store.cash_registers[0]
+        db_session.add(
+            Sale(
+                store_id=store.id,
+                cash_register_id=register.id,
+                date_vente=datetime(2024, 6, 1, 12),
+                total=12.0,
+                statut="terminee",
+            )
+        )
+        db_session.commit()
+
+        # Ventes antérieures aux agrégats : la table est vide au démarrage
+        assert SalesRollupService(db_session).ensure_built() == 1
+        assert rollup_rows(db_session) == {(register.id, date(2024, 6, 1)): (1, 12.0)}
+        summary = db_client.get("/api/v1/sales/stats/summary").json()
+        assert summary["nombre_ventes"] == 1
+
+        # Déjà construite : aucun recalcul
+        assert SalesRollupService(db_session).ensure_built() == 0
+
+    def test_store_performance_reads_rollup(self, db_client, store):
+        db_client.post("/api/v1/sales/", json=sale_payload(store, 0, 3, 2.0))
+        db_client.post("/api/v1/sales/", json=sale_payload(store, 1, 1, 4.0))
+
+        performance = db_client.get(f"/api/v1/stores/{store.id}/performance").json()
+        assert performance["nombre_transactions"] == 2
+        assert performance["total_ventes"] == 10.0
+        assert performance["panier_moyen"] == 5.0
+        assert performance["derniere_vente"] is not None
+
+    def test_summary_rejects_invalid_date(self, db_client):
+        response = db_client.get(
+            "/api/v1/sales/stats/summary", params={"date_debut": "demain"}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -37,6 +37,11 @@ class SagaOrchestrator:
         # Clé API pour Kong
         self.kong_api_key = os.getenv("KONG_API_KEY", "admin-api-key-12345")
         
+        # Durée de vie des réservations de stock (libérées automatiquement à expiration)
+        self.reservation_ttl_seconds = int(
+            os.getenv("STOCK_RESERVATION_TTL_SECONDS", "900")
+        )
+        
         # Configuration HTTP client avec headers d'authentification
         self.http_timeout = 30.0
         self.http_headers = {
@@ -184,7 +189,7 @@ class SagaOrchestrator:
                 await self._update_saga_state(saga_id, SagaState.STOCK_CHECKING)
                 
             elif step == SagaStep.RESERVE_STOCK:
-                result = await self._reserve_stock(request_data)
+                result = await self._reserve_stock(saga_id, request_data)
                 await self._update_saga_state(saga_id, SagaState.STOCK_RESERVED)
                 
             elif step == SagaStep.CREATE_ORDER:
@@ -196,7 +201,7 @@ class SagaOrchestrator:
                 await self._update_saga_state(saga_id, SagaState.PAYMENT_COMPLETED)
                 
             elif step == SagaStep.CONFIRM_ORDER:
-                result = await self._confirm_order(request_data)
+                result = await self._confirm_order(saga_id, request_data)
                 
             else:
                 raise ValueError(f"Unknown step: {step.value}")
@@ -274,7 +279,10 @@ class SagaOrchestrator:
                 raise Exception(f"Failed to check stock for product {product_id}")
                 
             stock_data = response.json()
-            available_quantity = stock_data["quantite_stock"]
+            # Le stock retenu par d'autres réservations n'est pas disponible
+            available_quantity = stock_data.get(
+                "quantite_disponible", stock_data["quantite_stock"]
+            )
             
             sufficient = available_quantity >= requested_quantity
             
@@ -290,38 +298,48 @@ class SagaOrchestrator:
         
         return {"stock_checks": stock_check_results, "all_sufficient": True}
 
-    async def _reserve_stock(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Réserve le stock pour tous les produits"""
+    async def _reserve_stock(
+        self, saga_id: str, request_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Réserve le stock pour tous les produits en une seule réservation temporaire"""
         logger.info("🔒 Starting stock reservation...")
         products = request_data["products"]
-        reservations = []
         
-        for product in products:
-            product_id = product["product_id"]
-            quantity = product["quantity"]
-            
-            logger.info(f"📦 Reserving {quantity} units of product {product_id}")
-            response = await self._make_http_request(
-                "PUT",
-                f"{self.inventory_api_url}/api/v1/stock/products/{product_id}/stock/reduce",
-                params={
-                    "quantity": quantity,
-                    "raison": f"Réservation saga {request_data.get('saga_id', 'unknown')}",
-                    "reference": f"saga_{request_data.get('saga_id', 'unknown')}"
-                }
-            )
-                
-            if response.status_code != 200:
-                raise Exception(f"Failed to reserve stock for product {product_id}")
-                
-            reservation_data = response.json()
-            reservations.append({
-                "product_id": product_id,
-                "reserved_quantity": quantity,
-                "new_stock_level": reservation_data["new_stock"]
-            })
+        # Une seule réservation (hold) pour toutes les lignes : le stock n'est
+        # décrémenté qu'à la confirmation, la compensation est une simple libération
+        response = await self._make_http_request(
+            "POST",
+            f"{self.inventory_api_url}/api/v1/reservations/",
+            json={
+                "lines": [
+                    {
+                        "product_id": product["product_id"],
+                        "quantite": product["quantity"],
+                    }
+                    for product in products
+                ],
+                "ttl_seconds": self.reservation_ttl_seconds,
+                "reference": f"saga_{saga_id}"
+            }
+        )
+        
+        if response.status_code != 201:
+            raise Exception(f"Failed to reserve stock: {response.text}")
+        
+        reservation_data = response.json()
+        reservations = [
+            {
+                "product_id": product["product_id"],
+                "reserved_quantity": product["quantity"]
+            }
+            for product in products
+        ]
         
-        return {"reservations": reservations}
+        return {
+            "reservation_id": reservation_data["id"],
+            "expires_at": reservation_data["date_expiration"],
+            "reservations": reservations
+        }
 
     async def _create_order(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
         """Crée la commande dans le service ecommerce"""
@@ -426,10 +444,30 @@ class SagaOrchestrator:
             "transaction_id": transaction_id
         }
 
-    async def _confirm_order(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Confirme la commande"""
-        # Cette étape finalise la commande et peut inclure des notifications
-        return {"confirmed": True, "confirmation_time": datetime.utcnow().isoformat()}
+    async def _confirm_order(
+        self, saga_id: str, request_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Confirme la commande et la réservation de stock associée"""
+        reservation_id = self._get_step_output(saga_id, SagaStep.RESERVE_STOCK).get(
+            "reservation_id"
+        )
+        
+        if reservation_id:
+            response = await self._make_http_request(
+                "POST",
+                f"{self.inventory_api_url}/api/v1/reservations/{reservation_id}/confirm"
+            )
+            
+            if response.status_code != 200:
+                raise Exception(
+                    f"Failed to confirm stock reservation {reservation_id}: {response.text}"
+                )
+        
+        return {
+            "confirmed": True,
+            "reservation_id": reservation_id,
+            "confirmation_time": datetime.utcnow().isoformat()
+        }
 
     async def _compensate_saga(self, saga_id: str, executed_steps: List[tuple]):
         """Exécute les actions de compensation pour les étapes réussies"""
@@ -475,21 +513,20 @@ class SagaOrchestrator:
             await self._refund_payment(original_step_result)
 
     async def _release_stock(self, request_data: Dict[str, Any], reservation_result: Dict[str, Any]):
-        """Libère le stock réservé"""
-        products = request_data["products"]
+        """Libère la réservation de stock (aucun mouvement de stock à annuler)"""
+        reservation_id = reservation_result.get("reservation_id")
+        if not reservation_id:
+            logger.warning("⚠️ No reservation to release")
+            return
         
-        for product in products:
-            product_id = product["product_id"]
-            quantity = product["quantity"]
-            
-            await self._make_http_request(
-                "PUT",
-                f"{self.inventory_api_url}/api/v1/stock/products/{product_id}/stock/increase",
-                params={
-                    "quantity": quantity,
-                    "raison": f"Compensation saga {request_data.get('saga_id', 'unknown')}",
-                    "reference": f"compensation_saga_{request_data.get('saga_id', 'unknown')}"
-                }
+        response = await self._make_http_request(
+            "POST",
+            f"{self.inventory_api_url}/api/v1/reservations/{reservation_id}/release"
+        )
+        
+        if response.status_code != 200:
+            raise Exception(
+                f"Failed to release stock reservation {reservation_id}: {response.text}"
             )
 
     async def _cancel_order(self, order_result: Dict[str, Any]):
@@ -566,6 +603,20 @@ class SagaOrchestrator:
         self.db.add(event)
         self.db.commit()
 
+    def _get_step_output(self, saga_id: str, step: SagaStep) -> Dict[str, Any]:
+        """Récupère le résultat de la dernière exécution réussie d'une étape"""
+        step_execution = (
+            self.db.query(SagaStepExecution)
+            .filter(
+                SagaStepExecution.saga_id == saga_id,
+                SagaStepExecution.step == step,
+                SagaStepExecution.status == SagaStepStatus.COMPLETED
+            )
+            .order_by(SagaStepExecution.id.desc())
+            .first()
+        )
+        return (step_execution.output_data or {}) if step_execution else {}
+
     def _get_saga(self, saga_id: str) -> Optional[Saga]:
         """Récupère une saga par son ID"""
         return self.db.query(Saga).filter(Saga.saga_id == saga_id).first()
@@ -0,0 +1,103 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.models import SagaStep
+from src.saga_orchestrator import SagaOrchestrator
+
+
+def response(status_code, payload=None):
+    resp = MagicMock()
+    resp.status_code = status_code
+    resp.json.return_value = payload or {}
+    resp.text = str(payload)
+    return resp
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = SagaOrchestrator(MagicMock())
+    orchestrator._make_http_request = AsyncMock()
+    return orchestrator
+
+
+class TestReservationSteps:
+    """Étapes de la saga appuyées sur une réservation de stock unique"""
+
+    @pytest.mark.asyncio
+    async def test_reserve_stock_creates_one_reservation(self, orchestrator):
+        orchestrator._make_http_request.return_value = response(
+            201, {"id": 12, "date_expiration": "2024-05-01T10:15:00"}
+        )
+        request_data = {
+            "products": [
+                {"product_id": 1, "quantity": 2},
+                {"product_id": 2, "quantity": 1},
+            ]
+        }
+
+        result = await orchestrator._reserve_stock("abc", request_data)
+
+        method, url = orchestrator._make_http_request.call_args.args
+        body = orchestrator._make_http_request.call_args.kwargs["json"]
+        assert (method, url) == (
+            "POST",
+            f"{orchestrator.inventory_api_url}/api/v1/reservations/",
+        )
+        assert body["reference"] == "saga_abc"
+        assert body["lines"] == [
+            {"product_id": 1, "quantite": 2},
+            {"product_id": 2, "quantite": 1},
+        ]
+        assert result["reservation_id"] == 12
+        assert result["expires_at"] == "2024-05-01T10:15:00"
+        assert [r["reserved_quantity"] for r in result["reservations"]] == [2, 1]
+
+    @pytest.mark.asyncio
+    async def test_reserve_stock_fails_on_conflict(self, orchestrator):
+        orchestrator._make_http_request.return_value = response(
+            409, {"detail": "Insufficient stock"}
+        )
+        with pytest.raises(Exception, match="Failed to reserve stock"):
+            await orchestrator._reserve_stock(
+                "abc", {"products": [{"product_id": 1, "quantity": 9}]}
+            )
+
+    @pytest.mark.asyncio
+    async def test_confirm_order_confirms_the_saga_reservation(self, orchestrator):
+        orchestrator._make_http_request.return_value = response(200)
+        with patch.object(
+            orchestrator, "_get_step_output", return_value={"reservation_id": 12}
+        ) as step_output:
+            result = await orchestrator._confirm_order("abc", {})
+
+        step_output.assert_called_once_with("abc", SagaStep.RESERVE_STOCK)
+        orchestrator._make_http_request.assert_awaited_once_with(
+            "POST", f"{orchestrator.inventory_api_url}/api/v1/reservations/12/confirm"
+        )
+        assert result["confirmed"] and result["reservation_id"] == 12
+
+    @pytest.mark.asyncio
+    async def test_confirm_order_fails_when_reservation_is_gone(self, orchestrator):
+        orchestrator._make_http_request.return_value = response(
+            409, {"detail": "Reservation 12 is expiree"}
+        )
+        with patch.object(
+            orchestrator, "_get_step_output", return_value={"reservation_id": 12}
+        ):
+            with pytest.raises(Exception, match="Failed to confirm"):
+                await orchestrator._confirm_order("abc", {})
+
+    @pytest.mark.asyncio
+    async def test_release_stock_releases_the_reservation(self, orchestrator):
+        orchestrator._make_http_request.return_value = response(200)
+
+        await orchestrator._release_stock({}, {"reservation_id": 12})
+
+        orchestrator._make_http_request.assert_awaited_once_with(
+            "POST", f"{orchestrator.inventory_api_url}/api/v1/reservations/12/release"
+        )
+
+    @pytest.mark.asyncio
+    async def test_release_stock_without_reservation_is_a_no_op(self, orchestrator):
+        await orchestrator._release_stock({}, {})
+        orchestrator._make_http_request.assert_not_awaited()
@@ -2,11 +2,15 @@ from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 import time
 import logging
+import os
 
 from src.api.v1.api import api_router
 from src.api.v1.errors import add_exception_handlers
 from src.api.v1.middleware.metrics_middleware import MetricsMiddleware
 from src.api.v1.services.metrics_service import metrics_service, CONTENT_TYPE_LATEST
+from src.api.v1.services.cache_service import cache_service
+from src.api.v1.services.report_scheduler import scheduler_from_env
+from src.db import db
 from .logging_config import setup_logging, get_logger, log_api_call
 
 # Setup logging before creating the app
@@ -112,6 +116,27 @@ app.add_middleware(
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+def start_report_scheduler():
+    """Précalcul des rapports récurrents dans le cache partagé (Redis),
+    activé par PRECOMPUTE_ENABLED=1"""
+    if os.getenv("PRECOMPUTE_ENABLED", "0") != "1":
+        return
+    if not cache_service.enabled:
+        logger.warning("Report precomputation disabled: Redis cache unavailable")
+        return
+    app.state.report_scheduler = scheduler_from_env(db.SessionLocal)
+    app.state.report_scheduler.start()
+    logger.info("Report scheduler started")
+
+
+@app.on_event("shutdown")
+def stop_report_scheduler():
+    scheduler = getattr(app.state, "report_scheduler", None)
+    if scheduler:
+        scheduler.stop()
+
+
 # Endpoint de santé (sans authentification)
 @app.get("/health", tags=["health"])
 async def health_check():
@@ -1,3 +1,10 @@
 from .report import GlobalSummary, StorePerformance, TopProduct
+from .revenue_series import Resolution, RevenuePoint
 
-__all__ = ["GlobalSummary", "StorePerformance", "TopProduct"]
+__all__ = [
+    "GlobalSummary",
+    "StorePerformance",
+    "TopProduct",
+    "Resolution",
+    "RevenuePoint",
+]
@@ -0,0 +1,166 @@
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# Fixed-width buckets are aligned on a Monday midnight, so weeks start on Mondays
+ORIGIN = datetime(1970, 1, 5)
+
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Granularities (seconds) of the pre-aggregated buckets in series_ventes,
+# coarsest first (see src.app.models.statistiques)
+STORED_GRANULARITIES = (86400, 3600, 60)
+
+# Upper bound on the points of a series before downsampling
+MAX_BUCKETS = 100_000
+
+_RESOLUTION = re.compile(r"^(\d+)([mhdwM])$")
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """
+    Resolution Value Object - Width of the buckets of a time series:
+    ``count`` minutes (m), hours (h), days (d), weeks (w) or calendar months (M)
+    """
+
+    count: int
+    unit: str
+
+    def __post_init__(self):
+        if self.count < 1:
+            raise ValueError("Resolution must be at least one unit")
+        if self.unit not in UNIT_SECONDS and self.unit != "M":
+            raise ValueError(f"Unknown resolution unit: {self.unit}")
+
+    @classmethod
+    def parse(cls, value: str) -> "Resolution":
+        """``"15m"``, ``"6h"``, ``"1d"``, ``"1w"``, ``"3M"``..."""
+        match = _RESOLUTION.match(value or "")
+        if not match:
+            raise ValueError(f"Invalid resolution: {value}")
+        return cls(int(match.group(1)), match.group(2))
+
+    def __str__(self) -> str:
+        return f"{self.count}{self.unit}"
+
+    @property
+    def seconds(self) -> Optional[int]:
+        """Bucket width, None for calendar months"""
+        if self.unit == "M":
+            return None
+        return self.count * UNIT_SECONDS[self.unit]
+
+    def index(self, timestamp: datetime) -> int:
+        """Number of the bucket containing ``timestamp``"""
+        if self.unit == "M":
+            return (timestamp.year * 12 + timestamp.month - 1) // self.count
+        return (timestamp - ORIGIN) // timedelta(seconds=self.seconds)
+
+    def bucket_start(self, index: int) -> datetime:
+        if self.unit == "M":
+            month = index * self.count
+            return datetime(month // 12, month % 12 + 1, 1)
+        return ORIGIN + index * timedelta(seconds=self.seconds)
+
+    def source_granularity(self, start: datetime, end: datetime) -> int:
+        """Coarsest stored granularity whose buckets tile both the buckets of
+        this resolution and the [start, end) range"""
+        for granularity in STORED_GRANULARITIES:
+            width_fits = self.seconds is None or self.seconds % granularity == 0
+            if (
+                width_fits
+                and _is_aligned(start, granularity)
+                and _is_aligned(end, granularity)
+            ):
+                return granularity
+        return STORED_GRANULARITIES[-1]
+
+
+def _is_aligned(timestamp: datetime, granularity: int) -> bool:
+    offset = timestamp - ORIGIN
+    return (
+        offset.microseconds == 0 and offset // timedelta(seconds=1) % granularity == 0
+    )
+
+
+@dataclass
+class RevenuePoint:
+    """
+    Revenue Point Entity - Sales of one bucket of a revenue time series
+    """
+
+    start: datetime
+    sales_count: int
+    revenue: float
+
+
+def bucket_series(
+    rows: Iterable[Tuple[datetime, int, float]],
+    resolution: Resolution,
+    start: datetime,
+    end: datetime,
+) -> List[RevenuePoint]:
+    """Dense series at ``resolution`` over [start, end), empty buckets included,
+    built from finer pre-aggregated ``(bucket start, sales, revenue)`` rows"""
+    first = resolution.index(start)
+    count = resolution.index(end - timedelta(microseconds=1)) - first + 1
+    if count > MAX_BUCKETS:
+        raise ValueError(
+            f"Resolution {resolution} is too fine for this range "
+            f"({count} buckets, at most {MAX_BUCKETS})"
+        )
+    points = [
+        RevenuePoint(resolution.bucket_start(first + offset), 0, 0.0)
+        for offset in range(count)
+    ]
+    for row_start, sales_count, revenue in rows:
+        offset = resolution.index(row_start) - first
+        if not 0 <= offset < count:
+            continue
+        point = points[offset]
+        point.sales_count += sales_count
+        point.revenue += revenue
+    return points
+
+
+def lttb(points: Sequence[RevenuePoint], threshold: int) -> List[RevenuePoint]:
+    """Largest-Triangle-Three-Buckets downsampling of the revenue curve.
+
+    Keeps the first and last points and, from each of ``threshold - 2``
+    equal slices of the others, the point forming the largest triangle with
+    the previously kept point and the average of the next slice: peaks and
+    troughs survive, and the kept points are actual buckets.
+    """
+    if threshold >= len(points) or threshold < 3:
+        return list(points)
+
+    def x(point: RevenuePoint) -> float:
+        return (point.start - ORIGIN).total_seconds()
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    kept = 0
+    for slice_index in range(threshold - 2):
+        slice_start = int(math.floor(slice_index * every)) + 1
+        slice_end = int(math.floor((slice_index + 1) * every)) + 1
+        next_end = min(int(math.floor((slice_index + 2) * every)) + 1, len(points))
+        following = points[slice_end:next_end] or points[-1:]
+        average_x = sum(x(p) for p in following) / len(following)
+        average_y = sum(p.revenue for p in following) / len(following)
+
+        anchor_x, anchor_y = x(points[kept]), points[kept].revenue
+        best_area, best = -1.0, slice_start
+        for index in range(slice_start, slice_end):
+            area = abs(
+                (anchor_x - average_x) * (points[index].revenue - anchor_y)
+                - (anchor_x - x(points[index])) * (average_y - anchor_y)
+            )
+            if area > best_area:
+                best_area, best = area, index
+        sampled.append(points[best])
+        kept = best
+    sampled.append(points[-1])
+    return sampled
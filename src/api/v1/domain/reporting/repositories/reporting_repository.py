@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, func
 from decimal import Decimal
 
 from ..entities.report import GlobalSummary, StorePerformance, TopProduct
@@ -11,27 +12,93 @@ class ReportingRepositoryInterface(ABC):
     """Abstract interface for Reporting Repository"""
 
     @abstractmethod
-    def get_global_summary(self) -> GlobalSummary:
+    def get_global_summary(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> GlobalSummary:
         pass
 
     @abstractmethod
-    def get_store_performances(self) -> List[StorePerformance]:
+    def get_store_performances(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> List[StorePerformance]:
         pass
 
     @abstractmethod
-    def get_top_products(self, limit: int = 10) -> List[TopProduct]:
+    def get_store_performance(
+        self,
+        store_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Optional[StorePerformance]:
+        pass
+
+    @abstractmethod
+    def get_top_products(
+        self,
+        limit: int = 10,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[TopProduct]:
+        pass
+
+    @abstractmethod
+    def get_revenue_buckets(
+        self,
+        granularity: int,
+        start: datetime,
+        end: datetime,
+        store_id: Optional[int] = None,
+    ) -> List[Tuple[datetime, int, float]]:
         pass
 
 
+def sale_date_conditions(
+    start_date: Optional[date] = None, end_date: Optional[date] = None
+) -> list:
+    """Conditions on the sale timestamp for an inclusive [start_date, end_date]
+    range of days (end_date covers the whole day)"""
+    from src.app.models.models import Vente
+
+    conditions = []
+    if start_date is not None:
+        conditions.append(Vente.date_heure >= datetime.combine(start_date, time.min))
+    if end_date is not None:
+        conditions.append(
+            Vente.date_heure < datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+    return conditions
+
+
 class ReportingRepository(ReportingRepositoryInterface):
-    """Concrete implementation of Reporting Repository"""
+    """Concrete implementation of Reporting Repository
+
+    Without a date range, store figures are read from the per-store
+    aggregates of ``statistiques_magasins``, kept up to date on every flush
+    (see src.app.models.statistiques). Date ranges query the sales, except
+    revenue time series, read from the time buckets of ``series_ventes``.
+    """
 
     def __init__(self, db: Session):
         self.db = db
 
-    def get_global_summary(self) -> GlobalSummary:
-        """Get global summary from sales data"""
-        from src.app.models.models import Vente, LigneVente
+    def get_global_summary(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> GlobalSummary:
+        """Get global summary from sales data, optionally over a date range"""
+        from src.app.models.models import Vente, LigneVente, StatistiquesMagasin
+
+        if start_date is None and end_date is None:
+            result = self.db.query(
+                func.coalesce(func.sum(StatistiquesMagasin.chiffre_affaires), 0).label(
+                    "total_revenue"
+                ),
+                func.coalesce(func.sum(StatistiquesMagasin.nombre_ventes), 0).label(
+                    "total_sales_count"
+                ),
+            ).first()
+            return GlobalSummary.calculate_from_data(
+                Decimal(str(result.total_revenue)), result.total_sales_count
+            )
 
         # Calculate total revenue and sales count
         result = (
@@ -42,6 +109,7 @@ class ReportingRepository(ReportingRepositoryInterface):
                 func.count(func.distinct(Vente.id)).label("total_sales_count"),
             )
             .join(Vente, LigneVente.vente_id == Vente.id)
+            .filter(*sale_date_conditions(start_date, end_date))
             .first()
         )
 
@@ -54,13 +122,52 @@ class ReportingRepository(ReportingRepositoryInterface):
 
         return GlobalSummary.calculate_from_data(total_revenue, total_sales_count)
 
-    def get_store_performances(self) -> List[StorePerformance]:
-        """Get performance metrics for all stores"""
+    def get_store_performances(
+        self, start_date: Optional[date] = None, end_date: Optional[date] = None
+    ) -> List[StorePerformance]:
+        """Get performance metrics for all stores, optionally over a date range"""
+        return [
+            self._store_performance(result)
+            for result in self._store_performance_rows(start_date, end_date)
+        ]
+
+    def get_store_performance(
+        self,
+        store_id: int,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> Optional[StorePerformance]:
+        """Get performance metrics for one store (a primary key lookup)"""
+        results = self._store_performance_rows(start_date, end_date, store_id)
+        return self._store_performance(results[0]) if results else None
+
+    def _store_performance_rows(
+        self,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        store_id: Optional[int] = None,
+    ):
+        """(id, nom, sales_count, revenue) rows of every store, or of one"""
         from src.app.models.models import Magasin, Vente, LigneVente
 
-        from src.app.models.models import Caisse
+        from src.app.models.models import Caisse, StatistiquesMagasin
 
-        results = (
+        if start_date is None and end_date is None:
+            query = self.db.query(
+                Magasin.id,
+                Magasin.nom,
+                func.coalesce(StatistiquesMagasin.nombre_ventes, 0).label(
+                    "sales_count"
+                ),
+                func.coalesce(StatistiquesMagasin.chiffre_affaires, 0).label("revenue"),
+            ).outerjoin(
+                StatistiquesMagasin, StatistiquesMagasin.magasin_id == Magasin.id
+            )
+            if store_id is not None:
+                query = query.filter(Magasin.id == store_id)
+            return query.all()
+
+        query = (
             self.db.query(
                 Magasin.id,
                 Magasin.nom,
@@ -70,51 +177,71 @@ class ReportingRepository(ReportingRepositoryInterface):
                 ).label("revenue"),
             )
             .join(Caisse, Magasin.id == Caisse.magasin_id, isouter=True)
-            .join(Vente, Caisse.id == Vente.caisse_id, isouter=True)
+            # Date range in the join: stores without sales in it are kept
+            .join(
+                Vente,
+                and_(
+                    Caisse.id == Vente.caisse_id,
+                    *sale_date_conditions(start_date, end_date),
+                ),
+                isouter=True,
+            )
             .join(LigneVente, Vente.id == LigneVente.vente_id, isouter=True)
-            .group_by(Magasin.id, Magasin.nom)
-            .all()
         )
+        if store_id is not None:
+            query = query.filter(Magasin.id == store_id)
+        return query.group_by(Magasin.id, Magasin.nom).all()
 
-        performances = []
-        for result in results:
-            revenue = (
-                Decimal(str(result.revenue))
-                if result.revenue is not None
-                else Decimal("0.00")
-            )
-            sales_count = result.sales_count or 0
-
-            performance = StorePerformance.calculate_from_data(
-                store_id=result.id,
-                store_name=result.nom,
-                sales_count=sales_count,
-                revenue=revenue,
-            )
-            performances.append(performance)
-
-        return performances
+    @staticmethod
+    def _store_performance(result) -> StorePerformance:
+        revenue = (
+            Decimal(str(result.revenue))
+            if result.revenue is not None
+            else Decimal("0.00")
+        )
+        return StorePerformance.calculate_from_data(
+            store_id=result.id,
+            store_name=result.nom,
+            sales_count=result.sales_count or 0,
+            revenue=revenue,
+        )
 
-    def get_top_products(self, limit: int = 10) -> List[TopProduct]:
-        """Get top performing products"""
+    def get_top_products(
+        self,
+        limit: int = 10,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+    ) -> List[TopProduct]:
+        """Get top performing products, optionally over a date range"""
         from src.app.models.models import Produit, LigneVente, Vente
 
+        # Sale lines of the range, outer-joined so unsold products are kept
+        lines = (
+            self.db.query(
+                LigneVente.produit_id,
+                LigneVente.vente_id,
+                LigneVente.quantite,
+                LigneVente.prix_unitaire,
+            )
+            .join(Vente, LigneVente.vente_id == Vente.id)
+            .filter(*sale_date_conditions(start_date, end_date))
+            .subquery()
+        )
+        revenue = func.sum(lines.c.quantite * lines.c.prix_unitaire)
+
         results = (
             self.db.query(
                 Produit.code,
                 Produit.nom,
-                func.coalesce(func.sum(LigneVente.quantite), 0).label(
+                func.coalesce(func.sum(lines.c.quantite), 0).label(
                     "total_quantity_sold"
                 ),
-                func.coalesce(
-                    func.sum(LigneVente.quantite * LigneVente.prix_unitaire), 0
-                ).label("total_revenue"),
-                func.count(func.distinct(Vente.id)).label("total_orders"),
+                func.coalesce(revenue, 0).label("total_revenue"),
+                func.count(func.distinct(lines.c.vente_id)).label("total_orders"),
             )
-            .join(LigneVente, Produit.id == LigneVente.produit_id, isouter=True)
-            .join(Vente, LigneVente.vente_id == Vente.id, isouter=True)
+            .join(lines, Produit.id == lines.c.produit_id, isouter=True)
             .group_by(Produit.id, Produit.code, Produit.nom)
-            .order_by(func.sum(LigneVente.quantite * LigneVente.prix_unitaire).desc())
+            .order_by(revenue.desc())
             .limit(limit)
             .all()
         )
@@ -139,3 +266,31 @@ class ReportingRepository(ReportingRepositoryInterface):
             top_products.append(top_product)
 
         return top_products
+
+    def get_revenue_buckets(
+        self,
+        granularity: int,
+        start: datetime,
+        end: datetime,
+        store_id: Optional[int] = None,
+    ) -> List[Tuple[datetime, int, float]]:
+        """(bucket start, sales count, revenue) of the pre-aggregated buckets
+        of ``granularity`` seconds in [start, end), all stores or one"""
+        from src.app.models.models import SerieVentes
+
+        query = self.db.query(
+            SerieVentes.debut,
+            func.sum(SerieVentes.nombre_ventes),
+            func.sum(SerieVentes.chiffre_affaires),
+        ).filter(
+            SerieVentes.granularite == granularity,
+            SerieVentes.debut >= start,
+            SerieVentes.debut < end,
+        )
+        if store_id is not None:
+            query = query.filter(SerieVentes.magasin_id == store_id)
+        rows = query.group_by(SerieVentes.debut).order_by(SerieVentes.debut)
+        return [
+            (debut, int(count or 0), float(revenue or 0.0))
+            for debut, count, revenue in rows
+        ]
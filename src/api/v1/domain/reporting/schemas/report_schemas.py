@@ -1,7 +1,7 @@
 from pydantic import BaseModel, ConfigDict
 from decimal import Decimal
 from typing import List, Dict, Any, Optional
-from datetime import date
+from datetime import date, datetime
 
 
 class GlobalSummaryResponse(BaseModel):
@@ -53,3 +53,28 @@ class SalesReportResponse(BaseModel):
     total_sales: int
     total_revenue: Decimal
     sales_data: List[Dict[str, Any]]
+
+
+class RevenuePointResponse(BaseModel):
+    """Schema for one bucket of a revenue time series"""
+
+    model_config = ConfigDict(from_attributes=True)
+
+    start: datetime
+    sales_count: int
+    revenue: float
+
+
+class RevenueSeriesResponse(BaseModel):
+    """Schema for revenue time series response"""
+
+    resolution: str
+    start: datetime
+    end: datetime
+    store_id: Optional[int] = None
+    source_granularity: int
+    total_sales: int
+    total_revenue: float
+    total_points: int
+    downsampled: bool
+    points: List[RevenuePointResponse]
@@ -1,14 +1,47 @@
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
 from ..entities.report import GlobalSummary, StorePerformance, TopProduct
+from ..entities.revenue_series import (
+    Resolution,
+    RevenuePoint,
+    bucket_series,
+    lttb,
+)
 from ..repositories.reporting_repository import ReportingRepositoryInterface
 from ..schemas.report_schemas import (
     GlobalSummaryResponse,
     StorePerformanceResponse,
     TopProductResponse,
     SalesReportResponse,
+    RevenuePointResponse,
+    RevenueSeriesResponse,
 )
 
+# Bucket resolution of the daily / weekly / monthly reports
+PERIOD_RESOLUTIONS = {"daily": "1d", "weekly": "1w", "monthly": "1M"}
+
+DEFAULT_SERIES_RANGE = timedelta(days=30)
+
+# Growth (percent) beyond which a revenue trend is "up" or "down"
+TREND_THRESHOLD = 5.0
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Sale timestamps are stored as naive UTC
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _floor_minute(value: datetime) -> datetime:
+    return value.replace(second=0, microsecond=0)
+
+
+def _ceil_minute(value: datetime) -> datetime:
+    floored = _floor_minute(value)
+    return floored if floored == value else floored + timedelta(minutes=1)
+
 
 class ReportingService:
     """Application service for Reporting domain operations"""
@@ -20,7 +53,7 @@ class ReportingService:
         self, start_date: Optional[date] = None, end_date: Optional[date] = None
     ) -> GlobalSummaryResponse:
         """Get global business summary"""
-        summary = self.reporting_repository.get_global_summary()
+        summary = self.reporting_repository.get_global_summary(start_date, end_date)
         return self._global_summary_to_response(summary)
 
     def get_store_performance(
@@ -30,9 +63,8 @@ class ReportingService:
         end_date: Optional[date] = None,
     ) -> Optional[StorePerformanceResponse]:
         """Get performance for a specific store"""
-        performances = self.reporting_repository.get_store_performances()
-        store_performance = next(
-            (p for p in performances if p.store_id == store_id), None
+        store_performance = self.reporting_repository.get_store_performance(
+            store_id, start_date, end_date
         )
         if store_performance:
             return self._store_performance_to_response(store_performance)
@@ -45,7 +77,9 @@ class ReportingService:
         limit: int = 10,
     ) -> List[StorePerformanceResponse]:
         """Get performance for all stores"""
-        performances = self.reporting_repository.get_store_performances()
+        performances = self.reporting_repository.get_store_performances(
+            start_date, end_date
+        )
         # Sort by revenue descending and limit
         sorted_performances = sorted(
             performances, key=lambda x: x.revenue, reverse=True
@@ -98,7 +132,9 @@ class ReportingService:
         end_date: Optional[date] = None,
     ) -> List[TopProductResponse]:
         """Get top performing products"""
-        top_products = self.reporting_repository.get_top_products(limit)
+        top_products = self.reporting_repository.get_top_products(
+            limit, start_date, end_date
+        )
         return [self._top_product_to_response(product) for product in top_products]
 
     def get_products_by_revenue(self, limit: int = 10) -> List[TopProductResponse]:
@@ -126,18 +162,25 @@ class ReportingService:
         end_date: Optional[date] = None,
         store_id: Optional[int] = None,
     ) -> SalesReportResponse:
-        """Get sales aggregated by time period"""
-        # For now, return a mock response - would need real implementation
-        from datetime import datetime
-
+        """Get sales aggregated by time period over [start_date, end_date]"""
+        start_date = start_date or date.today()
+        end_date = end_date or date.today()
+        if start_date > end_date:
+            raise ValueError("start_date must not be after end_date")
+        points = self._revenue_points(
+            Resolution.parse(PERIOD_RESOLUTIONS[period]),
+            datetime.combine(start_date, time.min),
+            datetime.combine(end_date + timedelta(days=1), time.min),
+            store_id,
+        )
         return SalesReportResponse(
             period=period,
-            start_date=start_date or date.today(),
-            end_date=end_date or date.today(),
+            start_date=start_date,
+            end_date=end_date,
             store_id=store_id,
-            total_sales=0,
-            total_revenue=0,
-            sales_data=[],
+            total_sales=sum(p.sales_count for p in points),
+            total_revenue=Decimal(str(round(sum(p.revenue for p in points), 2))),
+            sales_data=[self._period_data(point) for point in points],
         )
 
     def get_inventory_status(
@@ -159,14 +202,101 @@ class ReportingService:
         months_back: int = 12,
         store_id: Optional[int] = None,
     ) -> dict:
-        """Get revenue trends over time"""
+        """Get revenue trends over the last ``months_back`` months (current
+        month included), comparing the two halves of the series"""
+        resolution = Resolution.parse(PERIOD_RESOLUTIONS[period])
+        today = date.today()
+        month = today.year * 12 + today.month - months_back
+        start = datetime(month // 12, month % 12 + 1, 1)
+        end = datetime.combine(today + timedelta(days=1), time.min)
+        points = self._revenue_points(resolution, start, end, store_id)
+
+        half = len(points) // 2
+        earlier = sum(p.revenue for p in points[:half]) / half if half else 0.0
+        later = (
+            sum(p.revenue for p in points[half:]) / (len(points) - half)
+            if points
+            else 0.0
+        )
+        growth_rate = round((later - earlier) / earlier * 100, 2) if earlier else 0
+        if growth_rate > TREND_THRESHOLD:
+            trend_direction = "up"
+        elif growth_rate < -TREND_THRESHOLD:
+            trend_direction = "down"
+        else:
+            trend_direction = "stable"
         return {
             "period": period,
             "months_back": months_back,
             "store_id": store_id,
-            "trends": [],
-            "growth_rate": 0,
-            "trend_direction": "stable",
+            "trends": [self._period_data(point) for point in points],
+            "growth_rate": growth_rate,
+            "trend_direction": trend_direction,
+        }
+
+    def get_revenue_series(
+        self,
+        resolution: str = "1h",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        store_id: Optional[int] = None,
+        max_points: Optional[int] = None,
+    ) -> RevenueSeriesResponse:
+        """Get revenue over [start, end) in buckets of ``resolution``
+        (``15m``, ``1h``, ``1d``, ``1w``, ``1M``...), LTTB-downsampled to at
+        most ``max_points`` points. Bounds are rounded to the minute; the
+        range defaults to the last 30 days."""
+        series_resolution = Resolution.parse(resolution)
+        end = _ceil_minute(_naive_utc(end) if end else datetime.utcnow())
+        start = _floor_minute(
+            _naive_utc(start) if start else end - DEFAULT_SERIES_RANGE
+        )
+        if start >= end:
+            raise ValueError("start must be before end")
+
+        granularity = series_resolution.source_granularity(start, end)
+        points = self._revenue_points(series_resolution, start, end, store_id)
+        sampled = lttb(points, max_points) if max_points else points
+        return RevenueSeriesResponse(
+            resolution=str(series_resolution),
+            start=start,
+            end=end,
+            store_id=store_id,
+            source_granularity=granularity,
+            total_sales=sum(p.sales_count for p in points),
+            total_revenue=round(sum(p.revenue for p in points), 2),
+            total_points=len(points),
+            downsampled=len(sampled) < len(points),
+            points=[
+                RevenuePointResponse(
+                    start=p.start,
+                    sales_count=p.sales_count,
+                    revenue=round(p.revenue, 2),
+                )
+                for p in sampled
+            ],
+        )
+
+    def _revenue_points(
+        self,
+        resolution: Resolution,
+        start: datetime,
+        end: datetime,
+        store_id: Optional[int] = None,
+    ) -> List[RevenuePoint]:
+        """Dense series read from the coarsest pre-aggregated buckets that fit"""
+        granularity = resolution.source_granularity(start, end)
+        rows = self.reporting_repository.get_revenue_buckets(
+            granularity, start, end, store_id
+        )
+        return bucket_series(rows, resolution, start, end)
+
+    @staticmethod
+    def _period_data(point: RevenuePoint) -> dict:
+        return {
+            "period_start": point.start.date().isoformat(),
+            "sales_count": point.sales_count,
+            "revenue": round(point.revenue, 2),
         }
 
     def get_business_insights(self) -> dict:
@@ -5,6 +5,7 @@ from datetime import datetime, date
 
 from src.db import get_db
 from ..dependencies import api_token_auth
+from ..services.report_scheduler import precomputed_report
 from ..errors import NotFoundError, BusinessLogicError
 from ..domain.reporting.entities.report import (
     GlobalSummary,
@@ -18,6 +19,7 @@ from ..domain.reporting.schemas.report_schemas import (
     StorePerformanceResponse,
     TopProductResponse,
     SalesReportResponse,
+    RevenueSeriesResponse,
 )
 
 router = APIRouter()
@@ -44,6 +46,10 @@ async def get_global_summary(
     Get global business summary using DDD architecture
     """
     try:
+        if start_date is None and end_date is None:
+            summary = precomputed_report("global-summary")
+            if summary is not None:
+                return summary
         summary = reporting_service.get_global_summary(start_date, end_date)
         return summary
     except Exception as e:
@@ -58,6 +64,9 @@ def get_store_performances(
     Get performance metrics for all stores using DDD architecture
     """
     try:
+        performances = precomputed_report("store-performances")
+        if performances is not None:
+            return performances
         return reporting_service.get_store_performances()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -111,6 +120,10 @@ async def get_top_products(
     Get top performing products using DDD architecture
     """
     try:
+        if start_date is None and end_date is None:
+            top_products = precomputed_report("top-products", {"limit": limit})
+            if top_products is not None:
+                return top_products
         top_products = reporting_service.get_top_products(limit, start_date, end_date)
         return top_products
     except Exception as e:
@@ -294,3 +307,34 @@ async def get_revenue_trends(
         raise BusinessLogicError(str(e))
     except Exception as e:
         raise BusinessLogicError(f"Failed to generate revenue trends: {str(e)}")
+
+
+@router.get("/revenue-series", response_model=RevenueSeriesResponse)
+async def get_revenue_series(
+    resolution: str = Query(
+        default="1h",
+        pattern="^[0-9]+[mhdwM]$",
+        description="Bucket width: minutes (15m), hours (1h), days (1d), weeks (1w) or months (1M)",
+    ),
+    start: Optional[datetime] = Query(
+        default=None, description="Start of the series (default: 30 days before end)"
+    ),
+    end: Optional[datetime] = Query(
+        default=None, description="End of the series, exclusive (default: now)"
+    ),
+    store_id: Optional[int] = Query(
+        default=None, description="Filter by specific store"
+    ),
+    max_points: Optional[int] = Query(
+        default=500, ge=3, le=10000, description="Downsample to at most N points"
+    ),
+    _: str = Depends(api_token_auth),  # Authentification requise
+    reporting_service: ReportingService = Depends(get_reporting_service),
+):
+    """Get a revenue time series at any resolution, downsampled for charts."""
+    try:
+        return reporting_service.get_revenue_series(
+            resolution, start, end, store_id, max_points
+        )
+    except ValueError as e:
+        raise BusinessLogicError(str(e))
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from src.app.models.models import StatistiquesMagasin
+from ..domain.reporting.repositories.reporting_repository import ReportingRepository
+from ..domain.reporting.services.reporting_service import ReportingService
+from .cache_service import CacheService, cache_service
+
+logger = logging.getLogger(__name__)
+
+# Clés partagées par toutes les instances (sans INSTANCE_ID)
+PRECOMPUTED_PREFIX = "api:precomputed"
+LOCK_NAME = "api:report-scheduler"
+
+# Rapports précalculables : nom -> calcul depuis le service et les paramètres
+PRECOMPUTED_REPORTS: Dict[str, Callable[..., Any]] = {
+    "global-summary": lambda service: service.get_global_summary(),
+    "store-performances": lambda service: service.get_store_performances(),
+    "top-products": lambda service, limit=10: service.get_top_products(limit),
+}
+
+DEFAULT_SCHEDULE = "global-summary,store-performances,top-products?limit=10"
+
+# Clés planifiées dans ce processus : seules celles-ci sont lues par les requêtes
+_scheduled_keys = set()
+
+
+def precomputed_key(report: str, params: Optional[Dict[str, Any]] = None) -> str:
+    items = sorted((params or {}).items())
+    return f"{PRECOMPUTED_PREFIX}:{report}?" + "&".join(f"{k}={v}" for k, v in items)
+
+
+def parse_schedule(spec: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """``"global-summary,top-products?limit=5"`` -> [(rapport, paramètres)]"""
+    schedule = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        report, _, query = item.partition("?")
+        params = {
+            name: int(value) if value.isdigit() else value
+            for name, value in parse_qsl(query)
+        }
+        schedule.append((report, params))
+    return schedule
+
+
+def precomputed_report(
+    report: str, params: Optional[Dict[str, Any]] = None, cache: CacheService = None
+) -> Optional[Any]:
+    """Rapport publié par le planificateur, ou None s'il n'est pas planifié
+    ou pas encore calculé (la requête le calcule alors elle-même)"""
+    key = precomputed_key(report, params)
+    if key not in _scheduled_keys:
+        return None
+    published = (cache or cache_service).get(key)
+    return published["value"] if published else None
+
+
+def data_version(session: Session) -> str:
+    """Empreinte des statistiques par magasin, maintenues à chaque vente :
+    elle change dès qu'une vente est créée, modifiée ou supprimée"""
+    rows = (
+        session.query(
+            StatistiquesMagasin.magasin_id,
+            StatistiquesMagasin.nombre_ventes,
+            StatistiquesMagasin.chiffre_affaires,
+        )
+        .order_by(StatistiquesMagasin.magasin_id)
+        .all()
+    )
+    payload = json.dumps([[m, n, round(ca or 0.0, 2)] for m, n, ca in rows])
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class ReportScheduler:
+    """Planificateur de précalcul des rapports récurrents.
+
+    Toutes les ``interval`` secondes (± ``jitter``), l'instance qui détient le
+    verrou Redis (élection de leader, expiré après ``lock_ttl`` si le leader
+    disparaît) recalcule chaque rapport planifié dont la version publiée
+    diffère de la version des données ou est plus vieille que ``max_age``,
+    et le publie dans le cache partagé. Les requêtes servent la version
+    publiée au lieu de recalculer.
+    """
+
+    def __init__(
+        self,
+        schedule: List[Tuple[str, Dict[str, Any]]],
+        session_factory: Callable[[], Session],
+        cache: CacheService = None,
+        interval: float = 15.0,
+        jitter: float = 0.2,
+        max_age: float = 300.0,
+        lock_ttl: int = 60,
+    ):
+        unknown = [
+            report for report, _ in schedule if report not in PRECOMPUTED_REPORTS
+        ]
+        if unknown:
+            raise ValueError(f"Reports cannot be precomputed: {', '.join(unknown)}")
+        self.schedule = schedule
+        self.session_factory = session_factory
+        self.cache = cache or cache_service
+        self.interval = interval
+        self.jitter = jitter
+        self.max_age = max_age
+        self.ttl = int(max(max_age, 3 * interval))
+        self.lock = self.cache.redis_client.lock(
+            LOCK_NAME, timeout=lock_ttl, thread_local=False
+        )
+        self._stop = threading.Event()
+        _scheduled_keys.update(precomputed_key(r, p) for r, p in schedule)
+
+    def is_leader(self) -> bool:
+        if self.lock.owned():
+            self.lock.reacquire()
+            return True
+        return self.lock.acquire(blocking=False)
+
+    def run_once(self) -> int:
+        """Un passage ; retourne le nombre de rapports recalculés"""
+        if not self.is_leader():
+            return 0
+        session = self.session_factory()
+        try:
+            version = data_version(session)
+            service = ReportingService(ReportingRepository(session))
+            computed = 0
+            for report, params in self.schedule:
+                key = precomputed_key(report, params)
+                published = self.cache.get(key)
+                if (
+                    published
+                    and published["version"] == version
+                    and time.time() - published["computed_at"] < self.max_age
+                ):
+                    continue
+                value = PRECOMPUTED_REPORTS[report](service, **params)
+                self.cache.set(
+                    key,
+                    {
+                        "version": version,
+                        "computed_at": time.time(),
+                        "value": jsonable_encoder(value),
+                    },
+                    ttl=self.ttl,
+                )
+                computed += 1
+            return computed
+        finally:
+            session.close()
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                computed = self.run_once()
+                if computed:
+                    logger.info(f"Precomputed {computed} reports")
+            except Exception as e:
+                logger.warning(f"Report precomputation failed: {e}")
+            spread = self.interval * self.jitter
+            self._stop.wait(self.interval + random.uniform(-spread, spread))
+        if self.lock.owned():
+            self.lock.release()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="report-scheduler", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def scheduler_from_env(session_factory: Callable[[], Session]) -> ReportScheduler:
+    """Planificateur configuré par les variables ``PRECOMPUTE_*``"""
+    return ReportScheduler(
+        parse_schedule(os.getenv("PRECOMPUTE_REPORTS", DEFAULT_SCHEDULE)),
+        session_factory,
+        interval=float(os.getenv("PRECOMPUTE_INTERVAL", "15")),
+        jitter=float(os.getenv("PRECOMPUTE_JITTER", "0.2")),
+        max_age=float(os.getenv("PRECOMPUTE_MAX_AGE", "300")),
+        lock_ttl=int(os.getenv("PRECOMPUTE_LOCK_TTL", "60")),
+    )
@@ -8,4 +8,8 @@ from .models import (
     StockMagasin,
     StockCentral,
     DemandeReapprovisionnement,
+    StatistiquesMagasin,
+    SerieVentes,
 )
+from . import statistiques  # noqa: F401 - maintient StatistiquesMagasin et SerieVentes
+from . import tableau_de_bord  # noqa: F401 - invalide les instantanés du rapport
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -118,6 +118,42 @@ class LigneVente(db.Model):
         return f"<LigneVente(id={self.id}, quantite={self.quantite}, produit_id={self.produit_id})>"
 
 
+class StatistiquesMagasin(db.Model):
+    """Agrégats de ventes par magasin, tenus à jour à chaque flush
+    (voir statistiques.py) : un rapport par magasin est une lecture par clé"""
+
+    __tablename__ = "statistiques_magasins"
+
+    magasin_id = Column(Integer, ForeignKey("magasins.id"), primary_key=True)
+    nombre_ventes = Column(Integer, nullable=False, default=0)
+    chiffre_affaires = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<StatistiquesMagasin(magasin_id={self.magasin_id}, chiffre_affaires={self.chiffre_affaires})>"
+
+
+class SerieVentes(db.Model):
+    """Ventes et chiffre d'affaires par magasin et intervalle de temps, tenus
+    à jour à chaque flush (voir statistiques.py) à trois granularités : la
+    minute, l'heure et le jour (``granularite`` en secondes)"""
+
+    __tablename__ = "series_ventes"
+
+    granularite = Column(Integer, primary_key=True)
+    magasin_id = Column(Integer, ForeignKey("magasins.id"), primary_key=True)
+    debut = Column(DateTime, primary_key=True)
+    nombre_ventes = Column(Integer, nullable=False, default=0)
+    chiffre_affaires = Column(Float, nullable=False, default=0.0)
+
+    # Séries tous magasins : une plage de ``debut`` à une granularité
+    __table_args__ = (
+        Index("ix_series_ventes_granularite_debut", "granularite", "debut"),
+    )
+
+    def __repr__(self):
+        return f"<SerieVentes(granularite={self.granularite}, magasin_id={self.magasin_id}, debut={self.debut})>"
+
+
 class StockCentral(db.Model):
     __tablename__ = "stock_central"
 
@@ -0,0 +1,413 @@
+"""
+Maintien incrémental de StatistiquesMagasin et SerieVentes.
+
+Chaque flush d'une session (Flask ou API) qui crée, modifie ou supprime des
+ventes ou des lignes de vente ajoute ses écarts aux agrégats du magasin et à
+ses intervalles de temps (minute, heure, jour), dans la même transaction :
+les rapports n'ont plus à rejoindre Magasin → Caisse → Vente → LigneVente.
+
+Les INSERT/UPDATE/DELETE en masse (``session.execute(update(Vente))``,
+``query(Vente).delete()``...) ne passent pas par le flush : ils sont refusés
+sur ventes et lignes de vente, sauf avec l'option d'exécution
+``SANS_STATISTIQUES`` si l'appelant reconstruit ensuite les agrégats.
+
+Au démarrage (``src.app.run``), ``initialiser_agregats`` remplit les agrégats
+d'une base qui a des ventes mais pas encore d'agrégats. Recalcul complet :
+    python -m src.app.models.statistiques
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import Caisse, LigneVente, SerieVentes, StatistiquesMagasin, Vente
+
+# Mouvements calculés avant le flush, appliqués après
+_CLE_MOUVEMENTS = "statistiques_magasins"
+
+# Option d'exécution d'une instruction en masse sur les ventes dont
+# l'appelant reconstruit lui-même les agrégats
+SANS_STATISTIQUES = "sans_statistiques"
+
+# Granularités de series_ventes, en secondes : minute, heure, jour
+MINUTE, HEURE, JOUR = 60, 3600, 86400
+GRANULARITES = (MINUTE, HEURE, JOUR)
+
+# (magasin, date ou vente à dater après le flush, ventes, chiffre d'affaires)
+Mouvement = Tuple[int, Union[datetime, Vente, None], int, float]
+
+
+def _montant(quantite, prix_unitaire) -> float:
+    return (quantite if quantite is not None else 1) * (prix_unitaire or 0.0)
+
+
+def _magasin_de_caisse(session: Session, caisse_id: Optional[int]) -> Optional[int]:
+    if caisse_id is None:
+        return None
+    caisse = session.get(Caisse, caisse_id)
+    return caisse.magasin_id if caisse else None
+
+
+def _magasin_de_vente(session: Session, vente: Vente) -> Optional[int]:
+    # Une caisse affectée par la relation prime sur caisse_id (pas encore à jour)
+    if inspect(vente).attrs.caisse.history.added and vente.caisse is not None:
+        return vente.caisse.magasin_id
+    if vente.caisse_id is not None:
+        return _magasin_de_caisse(session, vente.caisse_id)
+    return vente.caisse.magasin_id if vente.caisse is not None else None
+
+
+def _vente_en_base(session: Session, vente_id: Optional[int]):
+    """(magasin, date_heure) d'une vente d'après la base (état avant le flush)"""
+    if vente_id is None:
+        return None, None
+    vente = (
+        session.query(Caisse.magasin_id, Vente.date_heure)
+        .join(Vente, Vente.caisse_id == Caisse.id)
+        .filter(Vente.id == vente_id)
+        .first()
+    )
+    return (vente.magasin_id, vente.date_heure) if vente else (None, None)
+
+
+def _ligne_en_base(session: Session, ligne_id: int):
+    """(vente_id, montant) d'une ligne d'après la base (état avant le flush) :
+    l'historique des attributs ne garde pas l'ancienne valeur d'un attribut
+    expiré"""
+    ligne = (
+        session.query(
+            LigneVente.vente_id, LigneVente.quantite, LigneVente.prix_unitaire
+        )
+        .filter(LigneVente.id == ligne_id)
+        .first()
+    )
+    if ligne is None:
+        return None, 0.0
+    return ligne.vente_id, _montant(ligne.quantite, ligne.prix_unitaire)
+
+
+def _chiffre_affaires_vente(session: Session, vente_id: int) -> float:
+    return (
+        session.query(
+            func.coalesce(func.sum(LigneVente.quantite * LigneVente.prix_unitaire), 0)
+        )
+        .filter(LigneVente.vente_id == vente_id)
+        .scalar()
+    )
+
+
+def _est_deplacee(vente: Vente) -> bool:
+    """Vente changée de caisse ou de date"""
+    etat = inspect(vente)
+    return any(
+        etat.attrs[nom].history.has_changes()
+        for nom in ("caisse_id", "caisse", "date_heure")
+    )
+
+
+def calculer_mouvements(session: Session) -> List[Mouvement]:
+    """Mouvements (magasin, horodatage, ventes, CA) du prochain flush.
+
+    L'horodatage est une date, ou la vente elle-même si elle est créée ou
+    modifiée par ce flush : sa date n'est connue qu'après (valeur par défaut).
+    """
+    mouvements: List[Mouvement] = []
+
+    def ajouter(magasin_id, quand, ventes=0, montant=0.0):
+        if magasin_id is not None and (ventes or montant):
+            mouvements.append((magasin_id, quand, ventes, montant))
+
+    # Ventes supprimées : leurs lignes sont retirées avec elles
+    ventes_supprimees = {
+        obj.id for obj in session.deleted if isinstance(obj, Vente) and obj.id
+    }
+    # Ventes déplacées : tout leur CA en base part vers le nouvel emplacement
+    ventes_deplacees = {
+        obj.id: obj
+        for obj in session.dirty
+        if isinstance(obj, Vente) and obj.id and _est_deplacee(obj)
+    }
+
+    def emplacement_ancienne_ligne(vente_id):
+        """Où retirer le montant en base d'une ligne de ``vente_id`` : chez
+        une vente déplacée, il a suivi la vente"""
+        vente = ventes_deplacees.get(vente_id)
+        if vente is not None:
+            return _magasin_de_vente(session, vente), vente
+        return _vente_en_base(session, vente_id)
+
+    for obj in session.new:
+        if isinstance(obj, Vente):
+            ajouter(_magasin_de_vente(session, obj), obj, ventes=1)
+        elif isinstance(obj, LigneVente) and (obj.vente or obj.vente_id):
+            vente = obj.vente or session.get(Vente, obj.vente_id)
+            ajouter(
+                _magasin_de_vente(session, vente),
+                vente,
+                montant=_montant(obj.quantite, obj.prix_unitaire),
+            )
+
+    for obj in session.deleted:
+        if isinstance(obj, Vente):
+            ajouter(
+                *_vente_en_base(session, obj.id),
+                ventes=-1,
+                montant=-_chiffre_affaires_vente(session, obj.id),
+            )
+        elif isinstance(obj, LigneVente):
+            vente_id, montant = _ligne_en_base(session, obj.id)
+            if vente_id not in ventes_supprimees:
+                ajouter(*emplacement_ancienne_ligne(vente_id), montant=-montant)
+
+    for obj in session.dirty:
+        etat = inspect(obj)
+        if isinstance(obj, LigneVente) and any(
+            etat.attrs[nom].history.has_changes()
+            for nom in ("quantite", "prix_unitaire", "vente_id", "vente")
+        ):
+            ancienne_vente, ancien_montant = _ligne_en_base(session, obj.id)
+            if ancienne_vente not in ventes_supprimees:
+                ajouter(
+                    *emplacement_ancienne_ligne(ancienne_vente),
+                    montant=-ancien_montant,
+                )
+            vente = obj.vente or (
+                session.get(Vente, obj.vente_id) if obj.vente_id else None
+            )
+            if vente is not None:
+                ajouter(
+                    _magasin_de_vente(session, vente),
+                    vente,
+                    montant=_montant(obj.quantite, obj.prix_unitaire),
+                )
+        elif isinstance(obj, Vente) and obj.id in ventes_deplacees:
+            # Vente déplacée (autre caisse ou autre date) : ses lignes la suivent
+            montant = _chiffre_affaires_vente(session, obj.id)
+            ajouter(*_vente_en_base(session, obj.id), ventes=-1, montant=-montant)
+            ajouter(_magasin_de_vente(session, obj), obj, ventes=1, montant=montant)
+
+    return mouvements
+
+
+def ecarts_par_magasin(mouvements: List[Mouvement]) -> Dict[int, List[float]]:
+    ecarts: Dict[int, List[float]] = defaultdict(lambda: [0, 0.0])
+    for magasin_id, _, ventes, montant in mouvements:
+        ecarts[magasin_id][0] += ventes
+        ecarts[magasin_id][1] += montant
+    return ecarts
+
+
+def calculer_ecarts(session: Session) -> Dict[int, List[float]]:
+    """Écarts [nombre_ventes, chiffre_affaires] par magasin du prochain flush"""
+    return ecarts_par_magasin(calculer_mouvements(session))
+
+
+def debut_intervalle(horodatage: datetime, granularite: int) -> datetime:
+    """Début de l'intervalle de ``granularite`` secondes (diviseur d'un jour)
+    contenant ``horodatage``"""
+    secondes = horodatage.hour * 3600 + horodatage.minute * 60 + horodatage.second
+    return horodatage.replace(microsecond=0) - timedelta(seconds=secondes % granularite)
+
+
+def ecarts_par_intervalle(
+    mouvements: List[Mouvement],
+) -> Dict[Tuple[int, int, datetime], List[float]]:
+    """Écarts [nombre_ventes, chiffre_affaires] par (granularité, magasin,
+    début d'intervalle), à résoudre après le flush"""
+    ecarts: Dict[Tuple[int, int, datetime], List[float]] = defaultdict(lambda: [0, 0.0])
+    for magasin_id, quand, ventes, montant in mouvements:
+        horodatage = quand.date_heure if isinstance(quand, Vente) else quand
+        if horodatage is None:
+            continue
+        for granularite in GRANULARITES:
+            cle = (granularite, magasin_id, debut_intervalle(horodatage, granularite))
+            ecarts[cle][0] += ventes
+            ecarts[cle][1] += montant
+    return ecarts
+
+
+def appliquer_ecarts(session: Session, ecarts: Dict[int, List[float]]) -> None:
+    """Ajoute les écarts aux lignes de statistiques_magasins (upsert)"""
+    lignes = [
+        {
+            "magasin_id": magasin_id,
+            "nombre_ventes": ventes,
+            "chiffre_affaires": montant,
+        }
+        for magasin_id, (ventes, montant) in ecarts.items()
+        if ventes or montant
+    ]
+    if not lignes:
+        return
+    table = StatistiquesMagasin.__table__
+    dialecte = session.get_bind().dialect.name
+    insert = postgresql.insert if dialecte == "postgresql" else sqlite.insert
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["magasin_id"],
+        set_={
+            "nombre_ventes": table.c.nombre_ventes + stmt.excluded.nombre_ventes,
+            "chiffre_affaires": table.c.chiffre_affaires
+            + stmt.excluded.chiffre_affaires,
+        },
+    )
+    session.execute(stmt, lignes)
+
+
+def appliquer_ecarts_series(
+    session: Session, ecarts: Dict[Tuple[int, int, datetime], List[float]]
+) -> None:
+    """Ajoute les écarts aux intervalles de series_ventes (upsert)"""
+    lignes = [
+        {
+            "granularite": granularite,
+            "magasin_id": magasin_id,
+            "debut": debut,
+            "nombre_ventes": ventes,
+            "chiffre_affaires": montant,
+        }
+        for (granularite, magasin_id, debut), (ventes, montant) in ecarts.items()
+        if ventes or montant
+    ]
+    if not lignes:
+        return
+    table = SerieVentes.__table__
+    dialecte = session.get_bind().dialect.name
+    insert = postgresql.insert if dialecte == "postgresql" else sqlite.insert
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularite", "magasin_id", "debut"],
+        set_={
+            "nombre_ventes": table.c.nombre_ventes + stmt.excluded.nombre_ventes,
+            "chiffre_affaires": table.c.chiffre_affaires
+            + stmt.excluded.chiffre_affaires,
+        },
+    )
+    session.execute(stmt, lignes)
+
+
+@event.listens_for(Session, "before_flush")
+def _avant_flush(session, flush_context, instances):
+    with session.no_autoflush:
+        session.info[_CLE_MOUVEMENTS] = calculer_mouvements(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _apres_flush(session, flush_context):
+    mouvements = session.info.pop(_CLE_MOUVEMENTS, None)
+    if mouvements:
+        appliquer_ecarts(session, ecarts_par_magasin(mouvements))
+        appliquer_ecarts_series(session, ecarts_par_intervalle(mouvements))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _refuser_dml_en_masse(orm_execute_state):
+    if not (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return
+    if orm_execute_state.execution_options.get(SANS_STATISTIQUES):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in (
+        Vente.__tablename__,
+        LigneVente.__tablename__,
+    ):
+        raise RuntimeError(
+            f"Écriture en masse sur {table.name} : les statistiques ne "
+            "suivraient pas. Passer par l'ORM, ou par "
+            f"execution_options({SANS_STATISTIQUES}=True) puis reconstruire"
+        )
+
+
+def reconstruire_statistiques(session: Session) -> int:
+    """Recalcule statistiques_magasins depuis les ventes ; retourne le nombre
+    de magasins"""
+    session.query(StatistiquesMagasin).delete(synchronize_session=False)
+    lignes = (
+        session.query(
+            Caisse.magasin_id,
+            func.count(func.distinct(Vente.id)),
+            func.coalesce(func.sum(LigneVente.quantite * LigneVente.prix_unitaire), 0),
+        )
+        .join(Vente, Vente.caisse_id == Caisse.id)
+        .outerjoin(LigneVente, LigneVente.vente_id == Vente.id)
+        .group_by(Caisse.magasin_id)
+        .all()
+    )
+    session.add_all(
+        StatistiquesMagasin(
+            magasin_id=magasin_id, nombre_ventes=ventes, chiffre_affaires=montant
+        )
+        for magasin_id, ventes, montant in lignes
+    )
+    return len(lignes)
+
+
+def reconstruire_series(session: Session) -> int:
+    """Recalcule series_ventes depuis les ventes ; retourne le nombre
+    d'intervalles"""
+    session.query(SerieVentes).delete(synchronize_session=False)
+    ventes = (
+        session.query(
+            Caisse.magasin_id,
+            Vente.date_heure,
+            func.coalesce(func.sum(LigneVente.quantite * LigneVente.prix_unitaire), 0),
+        )
+        .join(Vente, Vente.caisse_id == Caisse.id)
+        .outerjoin(LigneVente, LigneVente.vente_id == Vente.id)
+        .group_by(Vente.id, Caisse.magasin_id, Vente.date_heure)
+    )
+    ecarts = ecarts_par_intervalle(
+        [
+            (magasin_id, date_heure, 1, montant)
+            for magasin_id, date_heure, montant in ventes
+        ]
+    )
+    session.add_all(
+        SerieVentes(
+            granularite=granularite,
+            magasin_id=magasin_id,
+            debut=debut,
+            nombre_ventes=nombre,
+            chiffre_affaires=montant,
+        )
+        for (granularite, magasin_id, debut), (nombre, montant) in ecarts.items()
+    )
+    return len(ecarts)
+
+
+def initialiser_agregats(session: Session) -> Tuple[int, int]:
+    """Remplit statistiques_magasins et series_ventes d'une base qui a des
+    ventes mais des agrégats vides (tables ajoutées après coup) ; sans effet
+    sinon. Retourne (magasins, intervalles) recalculés."""
+    if session.query(Vente.id).first() is None:
+        return 0, 0
+    nombre = intervalles = 0
+    if session.query(StatistiquesMagasin.magasin_id).first() is None:
+        nombre = reconstruire_statistiques(session)
+    if session.query(SerieVentes.magasin_id).first() is None:
+        intervalles = reconstruire_series(session)
+    session.commit()
+    return nombre, intervalles
+
+
+if __name__ == "__main__":
+    from src.app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        nombre = reconstruire_statistiques(db.session)
+        intervalles = reconstruire_series(db.session)
+        db.session.commit()
+        print(
+            f"✅ Statistiques recalculées pour {nombre} magasins "
+            f"({intervalles} intervalles de séries)"
+        )
@@ -0,0 +1,343 @@
+"""
+Instantané du tableau de bord de rapport_controller.index.
+
+Tous les indicateurs de ventes (CA total, du mois, de la semaine, nombres de
+ventes, 7 derniers jours) sont calculés en une seule passe sur les ventes par
+agrégation conditionnelle (SUM(CASE WHEN ...)), plus une passe groupée par
+magasin ou par caisse, au lieu d'une requête par indicateur et par jour.
+
+L'instantané est mis en cache par magasin pendant RAPPORT_CACHE_TTL secondes
+et invalidé dès qu'une transaction du processus modifie ventes, lignes,
+stocks, produits, caisses ou magasins. Le cache garde au plus
+RAPPORT_CACHE_MAX instantanés : le moins récemment consulté est évincé.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, desc, event, func
+from sqlalchemy.orm import Session
+
+from .models import Caisse, LigneVente, Magasin, Produit, StockMagasin, Vente
+
+DUREE_CACHE = float(os.getenv("RAPPORT_CACHE_TTL", "30"))
+TAILLE_CACHE = int(os.getenv("RAPPORT_CACHE_MAX", "64"))
+
+# Modèles dont la modification rend les instantanés périmés
+_MODELES_SUIVIS = (Vente, LigneVente, StockMagasin, Produit, Caisse, Magasin)
+_CLE_PERIME = "tableau_de_bord_perime"
+
+NOMBRE_JOURS = 7
+
+
+@dataclass
+class InstantaneRapport:
+    """Indicateurs du rapport consolidé, global ou d'un magasin"""
+
+    magasin_id: Optional[int]
+    date_rapport: str
+    ca_total: float = 0.0
+    ca_mois: float = 0.0
+    ca_semaine: float = 0.0
+    nb_ventes_total: int = 0
+    nb_ventes_mois: int = 0
+    ticket_moyen: float = 0.0
+    ventes_par_caisse: List[Any] = field(default_factory=list)
+    top_produits: List[Any] = field(default_factory=list)
+    stocks_critique: List[Any] = field(default_factory=list)
+    stocks_rupture: int = 0
+    stocks_faibles: int = 0
+    produits_reappro: List[Dict[str, Any]] = field(default_factory=list)
+    ventes_quotidiennes: List[Dict[str, Any]] = field(default_factory=list)
+    tous_magasins: List[Any] = field(default_factory=list)
+
+
+def _somme_si(condition, valeur):
+    return func.coalesce(func.sum(case((condition, valeur), else_=0)), 0)
+
+
+def _indicateurs_ventes(
+    session: Session, magasin_id: Optional[int], aujourd_hui: datetime
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """CA et nombres de ventes (total, mois, semaine, jours) en une passe"""
+    debut_mois = aujourd_hui.replace(day=1)
+    debut_semaine = aujourd_hui - timedelta(days=aujourd_hui.weekday())
+    jours = []
+    for i in range(NOMBRE_JOURS):
+        jour = aujourd_hui - timedelta(days=i)
+        debut_jour = jour.replace(hour=0, minute=0, second=0, microsecond=0)
+        jours.append((jour, debut_jour, debut_jour + timedelta(days=1)))
+
+    colonnes = [
+        func.coalesce(func.sum(Vente.montant_total), 0),
+        func.count(Vente.id),
+        _somme_si(Vente.date_heure >= debut_mois, Vente.montant_total),
+        _somme_si(Vente.date_heure >= debut_mois, 1),
+        _somme_si(Vente.date_heure >= debut_semaine, Vente.montant_total),
+    ]
+    for _, debut_jour, fin_jour in jours:
+        dans_le_jour = (Vente.date_heure >= debut_jour) & (Vente.date_heure < fin_jour)
+        colonnes.append(_somme_si(dans_le_jour, Vente.montant_total))
+        colonnes.append(_somme_si(dans_le_jour, 1))
+
+    query = session.query(*colonnes).select_from(Vente)
+    if magasin_id:
+        query = query.join(Caisse).filter(Caisse.magasin_id == magasin_id)
+    ligne = query.one()
+
+    ca_total, nb_total, ca_mois, nb_mois, ca_semaine = ligne[:5]
+    indicateurs = {
+        "ca_total": ca_total,
+        "ca_mois": ca_mois,
+        "ca_semaine": ca_semaine,
+        "nb_ventes_total": nb_total,
+        "nb_ventes_mois": nb_mois,
+        "ticket_moyen": ca_total / nb_total if nb_total > 0 else 0,
+    }
+    ventes_quotidiennes = [
+        {
+            "date": jour.strftime("%d/%m"),
+            "jour": jour.strftime("%A"),
+            "ca": ligne[5 + 2 * i],
+            "nb_ventes": ligne[6 + 2 * i],
+        }
+        for i, (jour, _, _) in enumerate(jours)
+    ]
+    ventes_quotidiennes.reverse()  # Ordre chronologique
+    return indicateurs, ventes_quotidiennes
+
+
+def _ventes_par_caisse(session: Session, magasin_id: Optional[int]) -> List[Any]:
+    if magasin_id:
+        # Pour un magasin spécifique, on affiche les performances par caisse
+        return (
+            session.query(
+                Caisse.nom.label("nom_caisse"),
+                Caisse.numero,
+                func.count(Vente.id).label("nombre_ventes"),
+                func.sum(Vente.montant_total).label("chiffre_affaires"),
+                func.avg(Vente.montant_total).label("ticket_moyen"),
+            )
+            .select_from(Caisse)
+            .outerjoin(Vente, Caisse.id == Vente.caisse_id)
+            .filter(Caisse.magasin_id == magasin_id)
+            .group_by(Caisse.id, Caisse.nom, Caisse.numero)
+            .order_by(desc("chiffre_affaires"))
+            .all()
+        )
+    # Vue globale par magasin
+    return (
+        session.query(
+            Magasin.nom.label("nom_caisse"),
+            Magasin.adresse.label("numero"),
+            func.count(Vente.id).label("nombre_ventes"),
+            func.sum(Vente.montant_total).label("chiffre_affaires"),
+            func.avg(Vente.montant_total).label("ticket_moyen"),
+        )
+        .select_from(Magasin)
+        .outerjoin(Caisse, Magasin.id == Caisse.magasin_id)
+        .outerjoin(Vente, Caisse.id == Vente.caisse_id)
+        .group_by(Magasin.id, Magasin.nom, Magasin.adresse)
+        .order_by(desc("chiffre_affaires"))
+        .all()
+    )
+
+
+def _top_produits(session: Session, magasin_id: Optional[int]) -> List[Any]:
+    query = (
+        session.query(
+            Produit.code,
+            Produit.nom,
+            Produit.prix,
+            func.sum(LigneVente.quantite).label("quantite_totale"),
+            func.sum(LigneVente.quantite * LigneVente.prix_unitaire).label(
+                "ca_produit"
+            ),
+            func.count(func.distinct(Vente.id)).label("nb_commandes"),
+        )
+        .select_from(Produit)
+        .join(LigneVente, Produit.id == LigneVente.produit_id)
+        .join(Vente, LigneVente.vente_id == Vente.id)
+    )
+    if magasin_id:
+        query = query.join(Caisse, Vente.caisse_id == Caisse.id).filter(
+            Caisse.magasin_id == magasin_id
+        )
+    return (
+        query.group_by(Produit.id, Produit.code, Produit.nom, Produit.prix)
+        .order_by(desc("quantite_totale"))
+        .limit(15)
+        .all()
+    )
+
+
+def _stocks_critiques(session: Session, magasin_id: Optional[int]) -> List[Any]:
+    if magasin_id:
+        # Pour un magasin spécifique, utiliser les stocks du magasin
+        return (
+            session.query(
+                Produit.code,
+                Produit.nom,
+                Produit.prix,
+                StockMagasin.quantite_stock,
+                func.sum(LigneVente.quantite).label("ventes_totales"),
+                case(
+                    (StockMagasin.quantite_stock == 0, "RUPTURE"),
+                    (StockMagasin.quantite_stock <= 5, "CRITIQUE"),
+                    (StockMagasin.quantite_stock <= 20, "FAIBLE"),
+                    else_="NORMAL",
+                ).label("statut_stock"),
+            )
+            .select_from(Produit)
+            .join(StockMagasin, Produit.id == StockMagasin.produit_id)
+            .outerjoin(LigneVente, Produit.id == LigneVente.produit_id)
+            .outerjoin(Vente, LigneVente.vente_id == Vente.id)
+            .outerjoin(Caisse, Vente.caisse_id == Caisse.id)
+            .filter(StockMagasin.magasin_id == magasin_id)
+            .group_by(
+                Produit.id,
+                Produit.code,
+                Produit.nom,
+                Produit.prix,
+                StockMagasin.quantite_stock,
+            )
+            .order_by(StockMagasin.quantite_stock)
+            .all()
+        )
+    # Vue globale : somme des stocks de tous les magasins
+    return (
+        session.query(
+            Produit.code,
+            Produit.nom,
+            Produit.prix,
+            func.sum(StockMagasin.quantite_stock).label("quantite_stock"),
+            func.sum(LigneVente.quantite).label("ventes_totales"),
+            case(
+                (func.sum(StockMagasin.quantite_stock) == 0, "RUPTURE"),
+                (func.sum(StockMagasin.quantite_stock) <= 5, "CRITIQUE"),
+                (func.sum(StockMagasin.quantite_stock) <= 20, "FAIBLE"),
+                else_="NORMAL",
+            ).label("statut_stock"),
+        )
+        .select_from(Produit)
+        .join(StockMagasin, Produit.id == StockMagasin.produit_id)
+        .outerjoin(LigneVente, Produit.id == LigneVente.produit_id)
+        .group_by(Produit.id, Produit.code, Produit.nom, Produit.prix)
+        .order_by(func.sum(StockMagasin.quantite_stock))
+        .all()
+    )
+
+
+def _produits_reappro(stocks_critique: List[Any]) -> List[Dict[str, Any]]:
+    produits_reappro = []
+    for stock in stocks_critique:
+        if stock.ventes_totales and stock.ventes_totales > 0:
+            ventes_par_jour = stock.ventes_totales / 30
+            jours_restants = (
+                stock.quantite_stock / ventes_par_jour if ventes_par_jour > 0 else 999
+            )
+
+            if jours_restants <= 14:
+                produits_reappro.append(
+                    {
+                        "code": stock.code,
+                        "nom": stock.nom,
+                        "stock_actuel": stock.quantite_stock,
+                        "ventes_mensuelles": stock.ventes_totales or 0,
+                        "jours_restants": int(jours_restants),
+                        "priorite": "URGENT" if jours_restants <= 7 else "MOYEN",
+                    }
+                )
+    produits_reappro.sort(key=lambda x: x["jours_restants"])
+    return produits_reappro
+
+
+def construire_instantane(
+    session: Session, magasin_id: Optional[int] = None
+) -> InstantaneRapport:
+    """Calcule tous les indicateurs du tableau de bord (sans cache)"""
+    aujourd_hui = datetime.now()
+    indicateurs, ventes_quotidiennes = _indicateurs_ventes(
+        session, magasin_id, aujourd_hui
+    )
+    stocks_critique = _stocks_critiques(session, magasin_id)
+
+    return InstantaneRapport(
+        magasin_id=magasin_id,
+        date_rapport=aujourd_hui.strftime("%d/%m/%Y à %H:%M"),
+        ventes_par_caisse=_ventes_par_caisse(session, magasin_id),
+        top_produits=_top_produits(session, magasin_id),
+        stocks_critique=stocks_critique,
+        stocks_rupture=len([s for s in stocks_critique if s.quantite_stock == 0]),
+        stocks_faibles=len([s for s in stocks_critique if 0 < s.quantite_stock <= 20]),
+        produits_reappro=_produits_reappro(stocks_critique),
+        ventes_quotidiennes=ventes_quotidiennes,
+        tous_magasins=session.query(Magasin.id, Magasin.nom, Magasin.adresse)
+        .order_by(Magasin.nom)
+        .all(),
+        **indicateurs,
+    )
+
+
+# Cache des instantanés : magasin_id -> (expiration, instantané), du moins
+# au plus récemment consulté
+_instantanes: "OrderedDict[Optional[int], Tuple[float, InstantaneRapport]]" = (
+    OrderedDict()
+)
+_verrou = threading.Lock()
+_generation = 0
+
+
+def instantane_rapport(
+    session: Session, magasin_id: Optional[int] = None
+) -> InstantaneRapport:
+    """Instantané du tableau de bord, depuis le cache s'il est encore valide"""
+    with _verrou:
+        entree = _instantanes.get(magasin_id)
+        if entree:
+            _instantanes.move_to_end(magasin_id)
+        generation = _generation
+    if entree and entree[0] > time.monotonic():
+        return entree[1]
+
+    instantane = construire_instantane(session, magasin_id)
+    with _verrou:
+        # Une invalidation pendant le calcul rend ce résultat déjà périmé
+        if generation == _generation:
+            _instantanes[magasin_id] = (time.monotonic() + DUREE_CACHE, instantane)
+            _instantanes.move_to_end(magasin_id)
+            while len(_instantanes) > TAILLE_CACHE:
+                _instantanes.popitem(last=False)
+    return instantane
+
+
+def invalider_instantanes() -> None:
+    global _generation
+    with _verrou:
+        _generation += 1
+        _instantanes.clear()
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_modifications(session, flush_context):
+    if any(
+        isinstance(obj, _MODELES_SUIVIS)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        session.info[_CLE_PERIME] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apres_commit(session):
+    if session.info.pop(_CLE_PERIME, False):
+        invalider_instantanes()
+
+
+@event.listens_for(Session, "after_rollback")
+def _apres_rollback(session):
+    session.info.pop(_CLE_PERIME, None)
@@ -16,6 +16,7 @@ if project_root not in sys.path:
 
 from src.app import create_app, db
 from src.app.models.models import Caisse, Categorie, Magasin
+from src.app.models.statistiques import initialiser_agregats
 
 # Créer l'application Flask au niveau du module pour Gunicorn
 app = create_app()
@@ -37,6 +38,14 @@ def main():
             db.create_all()
             print("✅ Base de données prête")
 
+            # Base antérieure aux agrégats de ventes : remplissage initial
+            magasins, intervalles = initialiser_agregats(db.session)
+            if magasins or intervalles:
+                print(
+                    f"📈 Agrégats de ventes initialisés: {magasins} magasins, "
+                    f"{intervalles} intervalles"
+                )
+
             # Vérifier qu'on a des données
             nb_magasins = Magasin.query.count()
             nb_caisses = Caisse.query.count()
@@ -0,0 +1,139 @@
+import itertools
+import json
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.api.main import app
+from src.api.v1.dependencies import api_token_auth
+from src.api.v1.endpoints.reports import get_reporting_service
+from src.api.v1.services import report_scheduler
+from src.api.v1.services.report_scheduler import (
+    ReportScheduler,
+    parse_schedule,
+    precomputed_report,
+)
+from src.app import db
+from src.app.models.models import Caisse, LigneVente, Magasin, Produit, Vente
+
+
+class FakeRedis:
+    tokens = itertools.count()
+
+    def __init__(self):
+        self.values = {}
+
+    def lock(self, name, timeout=None, thread_local=True):
+        return FakeLock(self.values, name, next(self.tokens))
+
+
+class FakeLock:
+    def __init__(self, values, name, token):
+        self.values, self.name, self.token = values, name, token
+
+    def acquire(self, blocking=True):
+        return self.values.setdefault(self.name, self.token) == self.token
+
+    def owned(self):
+        return self.values.get(self.name) == self.token
+
+    def reacquire(self):
+        assert self.owned()
+
+    def release(self):
+        del self.values[self.name]
+
+
+class FakeCache:
+    """CacheService partagé par plusieurs instances, en mémoire"""
+
+    def __init__(self):
+        self.redis_client = FakeRedis()
+        self.entries = {}
+
+    def get(self, key):
+        value = self.entries.get(key)
+        return json.loads(value) if value else None
+
+    def set(self, key, value, ttl=300):
+        self.entries[key] = json.dumps(value)
+        return True
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://")
+    db.Model.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add_all(
+        [
+            Magasin(id=1, nom="Centre"),
+            Caisse(id=1, numero=1, nom="C1", magasin_id=1),
+            Produit(id=1, code="P1", nom="Pomme", prix=2.0),
+        ]
+    )
+    session.commit()
+    session.close()
+    yield factory
+    report_scheduler._scheduled_keys.clear()
+
+
+def vendre(session_factory, quantite):
+    session = session_factory()
+    vente = Vente(caisse_id=1, date_heure=datetime(2024, 5, 1))
+    session.add(vente)
+    session.add(
+        LigneVente(vente=vente, produit_id=1, quantite=quantite, prix_unitaire=2.0)
+    )
+    session.commit()
+    session.close()
+
+
+def test_leader_precomputes_when_data_changes(session_factory):
+    cache = FakeCache()
+    schedule = parse_schedule("global-summary,top-products?limit=5")
+    leader = ReportScheduler(schedule, session_factory, cache=cache)
+    follower = ReportScheduler(schedule, session_factory, cache=cache)
+    vendre(session_factory, 2)
+
+    assert leader.run_once() == 2
+    assert follower.run_once() == 0  # pas leader
+    assert leader.run_once() == 0  # données inchangées
+    summary = precomputed_report("global-summary", cache=cache)
+    assert summary["total_sales_count"] == 1
+
+    vendre(session_factory, 3)
+    leader.lock.release()  # le leader disparaît : le suiveur prend le relais
+    assert follower.run_once() == 2
+    assert precomputed_report("global-summary", cache=cache)["total_sales_count"] == 2
+    top = precomputed_report("top-products", {"limit": 5}, cache=cache)
+    assert top[0]["total_quantity_sold"] == 5
+
+    # Seuls les rapports planifiés sont lus depuis le cache
+    assert precomputed_report("top-products", {"limit": 7}, cache=cache) is None
+
+
+def test_endpoint_serves_precomputed_report(session_factory):
+    cache = FakeCache()
+    vendre(session_factory, 4)
+    ReportScheduler(
+        parse_schedule("global-summary"), session_factory, cache=cache
+    ).run_once()
+
+    service = MagicMock()
+    app.dependency_overrides[api_token_auth] = lambda: "test-token"
+    app.dependency_overrides[get_reporting_service] = lambda: service
+    try:
+        with patch.object(report_scheduler, "cache_service", cache):
+            response = TestClient(app).get("/api/v1/reports/global-summary")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["total_sales_count"] == 1
+    service.get_global_summary.assert_not_called()
@@ -2,7 +2,7 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
 from decimal import Decimal
-from datetime import date
+from datetime import date, datetime
 
 from src.api.main import app
 from src.api.v1.dependencies import api_token_auth
@@ -412,6 +412,55 @@ class TestReportsEndpoints:
         data = response.json()
         assert data["error_code"] == "VALIDATION_ERROR"
 
+    def test_get_revenue_series_success(self, client, mock_reporting_service):
+        """Test revenue series with resolution, range and downsampling"""
+        # Arrange
+        mock_reporting_service.get_revenue_series.return_value = {
+            "resolution": "15m",
+            "start": "2024-05-01T10:00:00",
+            "end": "2024-05-01T11:00:00",
+            "store_id": 2,
+            "source_granularity": 60,
+            "total_sales": 3,
+            "total_revenue": 30.0,
+            "total_points": 4,
+            "downsampled": False,
+            "points": [
+                {"start": "2024-05-01T10:00:00", "sales_count": 3, "revenue": 30.0}
+            ],
+        }
+
+        # Act
+        response = client.get(
+            "/api/v1/reports/revenue-series?resolution=15m"
+            "&start=2024-05-01T10:00:00&end=2024-05-01T11:00:00"
+            "&store_id=2&max_points=100"
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["points"][0]["sales_count"] == 3
+        mock_reporting_service.get_revenue_series.assert_called_once_with(
+            "15m", datetime(2024, 5, 1, 10), datetime(2024, 5, 1, 11), 2, 100
+        )
+
+    def test_get_revenue_series_range_too_large(self, client, mock_reporting_service):
+        """Test revenue series rejected by the service"""
+        # Arrange
+        mock_reporting_service.get_revenue_series.side_effect = ValueError(
+            "Resolution 1m is too fine for this range"
+        )
+
+        # Act
+        response = client.get("/api/v1/reports/revenue-series?resolution=1m")
+        invalid = client.get("/api/v1/reports/revenue-series?resolution=10s")
+
+        # Assert
+        assert response.status_code == 422
+        assert response.json()["error_code"] == "BUSINESS_LOGIC_ERROR"
+        assert invalid.status_code == 422
+        assert invalid.json()["error_code"] == "VALIDATION_ERROR"
+
     def test_business_logic_error_handling(self, client, mock_reporting_service):
         """Test business logic error handling"""
         # Arrange
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.app import db
+from src.app.models.models import Caisse, LigneVente, Magasin, Produit, Vente
+
+
+@pytest.fixture
+def session():
+    """Session sur une base SQLite en mémoire : deux magasins d'une caisse
+    chacun et un produit"""
+    engine = create_engine("sqlite://")
+    db.Model.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(
+        [
+            Magasin(id=1, nom="Centre"),
+            Magasin(id=2, nom="Nord"),
+            Caisse(id=1, numero=1, nom="C1", magasin_id=1),
+            Caisse(id=2, numero=1, nom="N1", magasin_id=2),
+            Produit(id=1, code="P1", nom="Pomme", prix=2.0),
+        ]
+    )
+    session.commit()
+    yield session
+    session.close()
+
+
+def vendre(session, caisse_id, *quantites, date_heure=None, prix_unitaire=2.0):
+    """Enregistre une vente du produit 1, une ligne par quantité"""
+    vente = Vente(
+        caisse_id=caisse_id,
+        date_heure=date_heure or datetime(2024, 5, 1),
+        montant_total=sum(quantites) * prix_unitaire,
+    )
+    session.add(vente)
+    for quantite in quantites:
+        session.add(
+            LigneVente(
+                vente=vente,
+                produit_id=1,
+                quantite=quantite,
+                prix_unitaire=prix_unitaire,
+            )
+        )
+    session.commit()
+    return vente
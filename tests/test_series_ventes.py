@@ -0,0 +1,159 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.app.models.models import LigneVente, SerieVentes, StatistiquesMagasin
+from src.app.models.statistiques import HEURE, JOUR, MINUTE, reconstruire_series
+from src.api.v1.domain.reporting.entities.revenue_series import (
+    Resolution,
+    RevenuePoint,
+    lttb,
+)
+from src.api.v1.domain.reporting.repositories.reporting_repository import (
+    ReportingRepository,
+)
+from src.api.v1.domain.reporting.services.reporting_service import ReportingService
+from tests.conftest import vendre
+
+
+def series(session, granularite):
+    session.expire_all()
+    return {
+        (s.magasin_id, s.debut): (s.nombre_ventes, s.chiffre_affaires)
+        for s in session.query(SerieVentes).filter_by(granularite=granularite)
+        if s.nombre_ventes or s.chiffre_affaires
+    }
+
+
+def test_intervalles_tenus_a_jour(session):
+    vente = vendre(session, 1, 2, date_heure=datetime(2024, 5, 1, 10, 14, 30))
+    vendre(session, 1, 1, date_heure=datetime(2024, 5, 1, 10, 50))
+    vendre(session, 2, 5, date_heure=datetime(2024, 5, 2, 8, 0))
+
+    assert series(session, MINUTE)[(1, datetime(2024, 5, 1, 10, 14))] == (1, 4.0)
+    assert series(session, HEURE)[(1, datetime(2024, 5, 1, 10))] == (2, 6.0)
+    assert series(session, JOUR) == {
+        (1, datetime(2024, 5, 1)): (2, 6.0),
+        (2, datetime(2024, 5, 2)): (1, 10.0),
+    }
+
+    # Vente redatée : elle change d'intervalle avec ses lignes
+    vente.date_heure = datetime(2024, 5, 2, 9, 0)
+    session.commit()
+    assert series(session, JOUR) == {
+        (1, datetime(2024, 5, 1)): (1, 2.0),
+        (1, datetime(2024, 5, 2)): (1, 4.0),
+        (2, datetime(2024, 5, 2)): (1, 10.0),
+    }
+
+    attendu = {g: series(session, g) for g in (MINUTE, HEURE, JOUR)}
+    reconstruire_series(session)
+    session.commit()
+    assert {g: series(session, g) for g in (MINUTE, HEURE, JOUR)} == attendu
+
+
+def test_vente_deplacee_et_lignes_modifiees_en_un_flush(session):
+    vente = vendre(session, 1, 2, date_heure=datetime(2024, 5, 1, 10, 0))
+    session.add(LigneVente(vente=vente, produit_id=1, quantite=3, prix_unitaire=2.0))
+    session.commit()
+    modifiee, supprimee = vente.lignes
+
+    # Un seul flush : autre magasin, autre jour, une ligne modifiée, une
+    # supprimée et une ajoutée
+    vente.caisse_id = 2
+    vente.date_heure = datetime(2024, 5, 3, 9, 0)
+    modifiee.quantite = 5
+    session.delete(supprimee)
+    session.add(LigneVente(vente=vente, produit_id=1, quantite=1, prix_unitaire=2.0))
+    session.commit()
+
+    assert series(session, JOUR) == {(2, datetime(2024, 5, 3)): (1, 12.0)}
+    session.expire_all()
+    assert {
+        s.magasin_id: (s.nombre_ventes, s.chiffre_affaires)
+        for s in session.query(StatistiquesMagasin)
+        if s.nombre_ventes or s.chiffre_affaires
+    } == {2: (1, 12.0)}
+
+    attendu = {g: series(session, g) for g in (MINUTE, HEURE, JOUR)}
+    reconstruire_series(session)
+    session.commit()
+    assert {g: series(session, g) for g in (MINUTE, HEURE, JOUR)} == attendu
+
+
+def test_serie_a_resolution_arbitraire(session):
+    for minute in range(0, 60, 5):
+        vendre(session, 1, 1, date_heure=datetime(2024, 5, 1, 10, minute))
+    vendre(session, 2, 10, date_heure=datetime(2024, 5, 1, 11, 20))
+    service = ReportingService(ReportingRepository(session))
+
+    serie = service.get_revenue_series(
+        "15m", datetime(2024, 5, 1, 10), datetime(2024, 5, 1, 12)
+    )
+    assert serie.source_granularity == MINUTE
+    assert [(p.start.minute, p.sales_count) for p in serie.points] == [
+        (0, 3),
+        (15, 3),
+        (30, 3),
+        (45, 3),
+        (0, 0),
+        (15, 1),
+        (30, 0),
+        (45, 0),
+    ]
+    assert (serie.total_sales, serie.total_revenue) == (13, 44.0)
+
+    horaire = service.get_revenue_series(
+        "1h", datetime(2024, 5, 1), datetime(2024, 5, 2), store_id=1
+    )
+    assert horaire.source_granularity == HEURE
+    assert [p.revenue for p in horaire.points if p.revenue] == [24.0]
+
+    reduite = service.get_revenue_series(
+        "1m", datetime(2024, 5, 1, 10), datetime(2024, 5, 1, 12), max_points=10
+    )
+    assert (reduite.total_points, len(reduite.points)) == (120, 10)
+    assert reduite.downsampled
+    # Le pic est conservé par le sous-échantillonnage
+    assert max(p.revenue for p in reduite.points) == 20.0
+
+    with pytest.raises(ValueError):
+        service.get_revenue_series("1m", datetime(2020, 1, 1), datetime(2024, 1, 1))
+
+
+def test_ventes_par_periode(session):
+    vendre(session, 1, 1, date_heure=datetime(2024, 4, 30, 23, 59))
+    vendre(session, 1, 2, date_heure=datetime(2024, 5, 1, 0, 0))
+    vendre(session, 2, 3, date_heure=datetime(2024, 5, 20, 12, 0))
+    service = ReportingService(ReportingRepository(session))
+
+    rapport = service.get_sales_by_period(
+        "monthly", date(2024, 4, 1), date(2024, 5, 31)
+    )
+    assert [(d["period_start"], d["sales_count"]) for d in rapport.sales_data] == [
+        ("2024-04-01", 1),
+        ("2024-05-01", 2),
+    ]
+    assert (rapport.total_sales, float(rapport.total_revenue)) == (3, 12.0)
+
+    hebdo = service.get_sales_by_period("weekly", date(2024, 5, 1), date(2024, 5, 1), 1)
+    assert hebdo.sales_data == [
+        {"period_start": "2024-04-29", "sales_count": 1, "revenue": 4.0}
+    ]
+
+
+def test_lttb_garde_les_extremites():
+    points = [
+        RevenuePoint(datetime(2024, 5, 1, 0, minute), 1, float(minute % 7))
+        for minute in range(50)
+    ]
+    reduits = lttb(points, 5)
+    assert len(reduits) == 5
+    assert (reduits[0], reduits[-1]) == (points[0], points[-1])
+    assert lttb(points, 100) == points
+
+    trimestre = Resolution.parse("3M")
+    debut = trimestre.bucket_start(trimestre.index(datetime(2024, 5, 17)))
+    assert debut == datetime(2024, 4, 1)
+    with pytest.raises(ValueError):
+        Resolution.parse("10s")
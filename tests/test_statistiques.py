@@ -0,0 +1,124 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import delete, update
+
+from src.app.models.models import LigneVente, SerieVentes, StatistiquesMagasin, Vente
+from src.app.models.statistiques import (
+    SANS_STATISTIQUES,
+    initialiser_agregats,
+    reconstruire_statistiques,
+)
+from src.api.v1.domain.reporting.repositories.reporting_repository import (
+    ReportingRepository,
+)
+from tests.conftest import vendre
+
+
+def statistiques(session):
+    session.expire_all()
+    return {
+        s.magasin_id: (s.nombre_ventes, s.chiffre_affaires)
+        for s in session.query(StatistiquesMagasin)
+    }
+
+
+def test_ventes_mettent_a_jour_les_statistiques(session):
+    vendre(session, 1, 2, 3)
+    vendre(session, 1, 1)
+    vendre(session, 2, 5)
+
+    assert statistiques(session) == {1: (2, 12.0), 2: (1, 10.0)}
+
+
+def test_modifications_et_suppressions(session):
+    vente = vendre(session, 1, 2, 3)
+    autre = vendre(session, 2, 1)
+
+    vente.lignes[0].quantite = 4
+    session.commit()
+    assert statistiques(session)[1] == (1, 14.0)
+
+    session.delete(vente.lignes[1])
+    session.commit()
+    assert statistiques(session)[1] == (1, 8.0)
+
+    autre.caisse_id = 1
+    session.commit()
+    assert statistiques(session) == {1: (2, 10.0), 2: (0, 0.0)}
+
+    session.delete(vente)
+    session.commit()
+    assert statistiques(session) == {1: (1, 2.0), 2: (0, 0.0)}
+
+
+def test_reconstruction_identique(session):
+    vendre(session, 1, 2, 3)
+    vendre(session, 2, 1)
+    attendu = statistiques(session)
+
+    session.query(StatistiquesMagasin).delete()
+    assert reconstruire_statistiques(session) == 2
+    session.commit()
+
+    assert statistiques(session) == attendu
+
+
+def test_repository_lit_les_statistiques(session):
+    vendre(session, 1, 2, 3, date_heure=datetime(2024, 4, 30, 12))
+    vendre(session, 1, 1)
+    repository = ReportingRepository(session)
+
+    magasin = repository.get_store_performance(1)
+    assert (magasin.sales_count, float(magasin.revenue)) == (2, 12.0)
+    assert repository.get_store_performance(2).sales_count == 0
+    assert repository.get_store_performance(99) is None
+
+    mai = repository.get_store_performance(1, date(2024, 5, 1), date(2024, 5, 31))
+    assert (mai.sales_count, float(mai.revenue)) == (1, 2.0)
+
+    resume = repository.get_global_summary()
+    assert (resume.total_sales_count, float(resume.total_revenue)) == (2, 12.0)
+
+
+def test_initialisation_d_une_base_existante(session):
+    vendre(session, 1, 2, 3)
+    vendre(session, 2, 1)
+    attendu = statistiques(session)
+    series = {
+        (s.granularite, s.magasin_id, s.debut): (s.nombre_ventes, s.chiffre_affaires)
+        for s in session.query(SerieVentes)
+    }
+    session.query(StatistiquesMagasin).delete()
+    session.query(SerieVentes).delete()
+    session.commit()
+
+    assert initialiser_agregats(session) == (2, 6)
+    assert statistiques(session) == attendu
+    assert {
+        (s.granularite, s.magasin_id, s.debut): (s.nombre_ventes, s.chiffre_affaires)
+        for s in session.query(SerieVentes)
+    } == series
+    # Agrégats déjà présents : rien n'est recalculé
+    assert initialiser_agregats(session) == (0, 0)
+
+
+def test_ecritures_en_masse_refusees(session):
+    vendre(session, 1, 2)
+
+    with pytest.raises(RuntimeError):
+        session.query(LigneVente).update({"quantite": 5})
+    session.rollback()
+    with pytest.raises(RuntimeError):
+        session.execute(delete(Vente))
+    session.rollback()
+
+    # Opt-in explicite : l'appelant reconstruit les agrégats
+    session.execute(
+        update(LigneVente)
+        .values(quantite=5)
+        .execution_options(**{SANS_STATISTIQUES: True})
+    )
+    reconstruire_statistiques(session)
+    session.commit()
+    assert statistiques(session) == {1: (1, 10.0)}
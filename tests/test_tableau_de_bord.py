@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.app.models import tableau_de_bord
+from src.app.models.models import StockMagasin, Vente
+from src.app.models.tableau_de_bord import (
+    construire_instantane,
+    instantane_rapport,
+    invalider_instantanes,
+)
+from tests.conftest import vendre
+
+
+@pytest.fixture
+def session(session):
+    session.add(StockMagasin(magasin_id=1, produit_id=1, quantite_stock=3))
+    session.commit()
+    invalider_instantanes()
+    yield session
+    invalider_instantanes()
+
+
+def test_instantane_en_une_passe(session):
+    maintenant = datetime.now()
+    vendre(session, 1, 1, date_heure=maintenant, prix_unitaire=10.0)
+    vendre(session, 1, 1, date_heure=maintenant - timedelta(days=2), prix_unitaire=30.0)
+    vendre(
+        session, 2, 1, date_heure=maintenant - timedelta(days=400), prix_unitaire=5.0
+    )
+
+    rapport = construire_instantane(session)
+    assert (rapport.ca_total, rapport.nb_ventes_total) == (45.0, 3)
+    assert rapport.ticket_moyen == 15.0
+    quotidien = [
+        (jour["ca"], jour["nb_ventes"]) for jour in rapport.ventes_quotidiennes
+    ]
+    assert quotidien == [(0, 0)] * 4 + [(30.0, 1), (0, 0), (10.0, 1)]
+    assert [m.nom for m in rapport.tous_magasins] == ["Centre", "Nord"]
+    assert rapport.stocks_rupture == 0 and rapport.stocks_faibles == 1
+
+    centre = construire_instantane(session, 1)
+    assert (centre.ca_total, centre.nb_ventes_total) == (40.0, 2)
+    assert [c.nom_caisse for c in centre.ventes_par_caisse] == ["C1"]
+    assert centre.top_produits[0].quantite_totale == 2
+
+
+def test_cache_invalide_par_les_ventes(session, monkeypatch):
+    monkeypatch.setattr(tableau_de_bord, "DUREE_CACHE", 60.0)
+    premier = instantane_rapport(session, 1)
+    assert instantane_rapport(session, 1) is premier
+    assert instantane_rapport(session, 2) is not premier
+
+    vendre(session, 1, 1, date_heure=datetime.now(), prix_unitaire=10.0)
+    apres_vente = instantane_rapport(session, 1)
+    assert apres_vente is not premier
+    assert apres_vente.ca_total == 10.0
+
+    session.add(Vente(caisse_id=1, montant_total=99.0))
+    session.flush()
+    session.rollback()
+    assert instantane_rapport(session, 1) is apres_vente
+
+
+def test_cache_borne(session, monkeypatch):
+    monkeypatch.setattr(tableau_de_bord, "DUREE_CACHE", 60.0)
+    monkeypatch.setattr(tableau_de_bord, "TAILLE_CACHE", 2)
+    centre = instantane_rapport(session, 1)
+    instantane_rapport(session, 2)
+    assert instantane_rapport(session, 1) is centre
+
+    # Le moins récemment consulté (le magasin 2) laisse sa place
+    instantane_rapport(session)
+    assert list(tableau_de_bord._instantanes) == [1, None]
+    assert instantane_rapport(session, 1) is centre